@@ -0,0 +1,345 @@
+"""
+Потоковая выгрузка коллекций для продуктовой аналитики
+
+Каждый источник (users, focus_sessions, habits/*/history, points_history,
+chat_history, completed_tasks) читается как collection group: выборка
+делится на части через get_partitions(), части читаются страницами по
+курсору __name__ не более чем по max_concurrency одновременно, а все
+чтения проходят через общий бюджет документов в секунду. Поэтому
+ночная выгрузка миллионов документов идет с предсказуемой скоростью и
+не отнимает квоту Firestore у бота.
+
+Документы пишутся шардами: gzip NDJSON или Parquet (если установлен
+pyarrow). Шард сначала пишется во временный файл и переименовывается
+после закрытия, затем курсор части сохраняется в _checkpoint.json.
+Прерванная выгрузка продолжается с последнего закрытого шарда; его
+незаконченный преемник перезаписывается.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+PARQUET_AVAILABLE = find_spec('pyarrow') is not None
+
+NAME_FIELD = '__name__'
+CHECKPOINT_FILE = '_checkpoint.json'
+
+PAGE_SIZE = 500
+SHARD_DOCS = 100_000
+DEFAULT_PARTITIONS = 8
+DEFAULT_CONCURRENCY = 4
+# Документов в секунду на всю выгрузку
+DEFAULT_READ_RATE = 1000
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    """Выгружаемая коллекция"""
+    name: str
+    collection_id: str
+    # Поля по умолчанию: без свободного текста (сообщения, ответы онбординга)
+    fields: Optional[Sequence[str]] = None
+
+
+EXPORT_SOURCES: Dict[str, ExportSource] = {source.name: source for source in (
+    ExportSource('users', 'users', (
+        'created_at', 'onboarding_completed', 'points_balance', 'total_points_earned',
+        'achievements_count', 'focus_stats', 'checklist_stats', 'ai_profile.active_category')),
+    ExportSource('focus_sessions', 'focus_sessions', (
+        'user_id', 'type', 'status', 'duration_minutes', 'completed_minutes',
+        'started_at', 'completed_at')),
+    ExportSource('habit_history', 'history', ('completed_at',)),
+    ExportSource('points_history', 'points_history', ('points', 'reason', 'timestamp', 'balance_after')),
+    ExportSource('chat_history', 'chat_history', ('role', 'scenario', 'tokens_used', 'timestamp')),
+    ExportSource('completed_tasks', 'completed_tasks', ('priority', 'points_earned', 'completed_at')),
+)}
+
+
+def _plain(value: Any) -> Any:
+    """Значение Firestore в JSON-совместимый вид"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, 'path') and hasattr(value, 'id'):
+        return value.path  # DocumentReference
+    if hasattr(value, 'latitude') and hasattr(value, 'longitude'):
+        return {'latitude': value.latitude, 'longitude': value.longitude}
+    return value
+
+
+def to_row(doc) -> Dict[str, Any]:
+    """
+    Строка выгрузки: служебные колонки и поля документа
+
+    _path - полный путь, _id - ID документа, _user_id - ID пользователя
+    для документов под users/{id} (для остальных - None).
+    """
+    path = doc.reference.path
+    segments = path.split('/')
+    row = {
+        '_path': path,
+        '_id': doc.id,
+        '_user_id': segments[1] if segments[0] == 'users' else None,
+    }
+    for key, value in (doc.to_dict() or {}).items():
+        row[key] = _plain(value)
+    return row
+
+
+class ShardWriter:
+    """Один шард выгрузки: пишется во временный файл, публикуется при close()"""
+
+    def __init__(self, path: Path, fmt: str):
+        """
+        Args:
+            path: Итоговый путь шарда
+            fmt: ndjson или parquet
+        """
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._tmp = path.with_name(path.name + '.tmp')
+        self._buffer: List[Dict[str, Any]] = []
+        self._file = gzip.open(self._tmp, 'wt', encoding='utf-8', compresslevel=6) if fmt == 'ndjson' else None
+
+    def write(self, row: Dict[str, Any]):
+        """Добавляет строку"""
+        if self._file is not None:
+            self._file.write(json.dumps(row, ensure_ascii=False, default=str))
+            self._file.write('\n')
+        else:
+            self._buffer.append(row)
+        self.rows += 1
+
+    def close(self):
+        """Дописывает шард и атомарно публикует его (выполняется в отдельном потоке)"""
+        if self._file is not None:
+            self._file.close()
+        else:
+            _write_parquet(self._tmp, self._buffer)
+            self._buffer = []
+        os.replace(self._tmp, self.path)
+
+    def discard(self):
+        """Удаляет недописанный шард"""
+        if self._file is not None:
+            self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def _write_parquet(path: Path, rows: List[Dict[str, Any]]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns: Dict[str, List[Any]] = {}
+    for index, row in enumerate(rows):
+        for key in row:
+            if key not in columns:
+                columns[key] = [None] * index
+        for key, values in columns.items():
+            values.append(row.get(key))
+
+    arrays = {}
+    for key, values in columns.items():
+        try:
+            arrays[key] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Разные типы в одной колонке (например, число и строка) - храним JSON
+            arrays[key] = pa.array([None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+                                    for value in values])
+    pq.write_table(pa.table(arrays), path, compression='zstd')
+
+
+class ExportCheckpoint:
+    """
+    Прогресс выгрузки в _checkpoint.json
+
+    Для каждого источника - части выборки: границы (пути документов),
+    курсор последнего документа в закрытых шардах, номер следующего шарда,
+    количество документов и признак завершения. Файл перезаписывается
+    атомарно (временный файл + os.replace).
+    """
+
+    def __init__(self, directory: Path):
+        self.path = directory / CHECKPOINT_FILE
+        self.data: Dict[str, Any] = {'sources': {}}
+        if self.path.exists():
+            self.data = json.loads(self.path.read_text(encoding='utf-8'))
+
+    def partitions(self, source: str) -> Optional[List[Dict[str, Any]]]:
+        """Сохраненные части источника или None если источник еще не начинали"""
+        return self.data['sources'].get(source)
+
+    def set_partitions(self, source: str, partitions: List[Dict[str, Any]]):
+        self.data['sources'][source] = partitions
+
+    def save(self):
+        """Записывает файл прогресса"""
+        self.data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=1), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+class AnalyticsExporter:
+    """Выгрузка источников в шарды с бюджетом чтений и продолжением после сбоя"""
+
+    def __init__(self, db, output_dir: Path, fmt: str = 'ndjson', all_fields: bool = False,
+                 partitions: int = DEFAULT_PARTITIONS, max_concurrency: int = DEFAULT_CONCURRENCY,
+                 read_rate: float = DEFAULT_READ_RATE, page_size: int = PAGE_SIZE,
+                 shard_docs: int = SHARD_DOCS):
+        """
+        Args:
+            db: Клиент Firestore (синхронный, вызовы выполняются в потоках)
+            output_dir: Каталог выгрузки (в нем же файл прогресса)
+            fmt: ndjson (gzip) или parquet
+            all_fields: Выгружать документы целиком, а не поля по умолчанию
+            partitions: На сколько частей делить каждый источник
+            max_concurrency: Максимум одновременно читаемых частей
+            read_rate: Бюджет чтений, документов в секунду
+            page_size: Документов в одном запросе
+            shard_docs: Документов в одном шарде
+        """
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            raise RuntimeError("Для формата parquet нужен pyarrow (pip install pyarrow)")
+        self.db = db
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.all_fields = all_fields
+        self.partitions = max(1, partitions)
+        self.page_size = max(1, page_size)
+        self.shard_docs = max(self.page_size, shard_docs)
+        self.budget = RateLimiter(read_rate, burst=max(self.page_size, int(read_rate)))
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint = ExportCheckpoint(self.output_dir)
+        options = {'format': fmt, 'all_fields': all_fields}
+        if self.checkpoint.data.setdefault('options', options) != options:
+            raise RuntimeError(f"Выгрузка в {self.output_dir} начата с другими параметрами: "
+                               f"{self.checkpoint.data['options']}")
+        # Документов прочитано в этом запуске
+        self.docs_read = 0
+
+    async def export(self, sources: Sequence[str]) -> Dict[str, int]:
+        """
+        Выгружает источники (части всех источников читаются параллельно)
+
+        Args:
+            sources: Имена из EXPORT_SOURCES
+
+        Returns:
+            {источник: документов в выгрузке} с учетом прошлых запусков
+        """
+        tasks = []
+        for name in sources:
+            source = EXPORT_SOURCES[name]
+            partitions = await self._plan(source)
+            (self.output_dir / name).mkdir(exist_ok=True)
+            for number, state in enumerate(partitions):
+                if not state['done']:
+                    tasks.append(self._export_partition(source, number, state))
+        await asyncio.gather(*tasks)
+        return {
+            name: sum(state['docs'] for state in self.checkpoint.partitions(name))
+            for name in sources
+        }
+
+    async def _plan(self, source: ExportSource) -> List[Dict[str, Any]]:
+        """Части источника: из файла прогресса или новое разбиение"""
+        partitions = self.checkpoint.partitions(source.name)
+        if partitions is not None:
+            return partitions
+
+        def split():
+            query = self.db.collection_group(source.collection_id)
+            return [
+                (partition.start_at.path if partition.start_at is not None else None,
+                 partition.end_at.path if partition.end_at is not None else None)
+                for partition in query.get_partitions(self.partitions)
+            ]
+
+        bounds = await asyncio.to_thread(split)
+        partitions = [
+            {'start': start, 'end': end, 'cursor': None, 'shard': 0, 'docs': 0, 'done': False}
+            for start, end in bounds
+        ]
+        self.checkpoint.set_partitions(source.name, partitions)
+        self.checkpoint.save()
+        logger.info(f"{source.name}: {len(partitions)} частей")
+        return partitions
+
+    def _read_page(self, source: ExportSource, state: Dict[str, Any], cursor: Optional[str]) -> List:
+        query = self.db.collection_group(source.collection_id).order_by(NAME_FIELD)
+        if source.fields and not self.all_fields:
+            query = query.select(list(source.fields))
+        if cursor is not None:
+            query = query.start_after({NAME_FIELD: self.db.document(cursor)})
+        elif state['start'] is not None:
+            query = query.start_at({NAME_FIELD: self.db.document(state['start'])})
+        if state['end'] is not None:
+            query = query.end_before({NAME_FIELD: self.db.document(state['end'])})
+        return query.limit(self.page_size).get()
+
+    def _shard_path(self, source: ExportSource, number: int, shard: int) -> Path:
+        suffix = 'ndjson.gz' if self.fmt == 'ndjson' else 'parquet'
+        return self.output_dir / source.name / f"part-{number:04d}-{shard:05d}.{suffix}"
+
+    async def _export_partition(self, source: ExportSource, number: int, state: Dict[str, Any]):
+        async with self._semaphore:
+            started = time.perf_counter()
+            cursor = state['cursor']
+            writer = ShardWriter(self._shard_path(source, number, state['shard']), self.fmt)
+            try:
+                while True:
+                    await self.budget.acquire(self.page_size)
+                    docs = await asyncio.to_thread(self._read_page, source, state, cursor)
+                    self.docs_read += len(docs)
+                    for doc in docs:
+                        writer.write(to_row(doc))
+                    if docs:
+                        cursor = docs[-1].reference.path
+                    finished = len(docs) < self.page_size
+
+                    if writer.rows >= self.shard_docs or (finished and writer.rows):
+                        await asyncio.to_thread(writer.close)
+                        state.update(cursor=cursor, shard=state['shard'] + 1, docs=state['docs'] + writer.rows)
+                        if not finished:
+                            writer = ShardWriter(self._shard_path(source, number, state['shard']), self.fmt)
+                        self._save_progress(state, done=finished)
+                    elif finished:
+                        writer.discard()
+                        self._save_progress(state, done=True)
+                    if finished:
+                        break
+            except BaseException:
+                # Прогресс сохранен по последний закрытый шард
+                writer.discard()
+                raise
+            logger.info(f"{source.name} часть {number}: {state['docs']} документов, "
+                        f"{time.perf_counter() - started:.1f} с")
+
+    def _save_progress(self, state: Dict[str, Any], done: bool):
+        # Файл в несколько КБ пишется в event loop: так его содержимое
+        # не меняется другими частями во время записи
+        state['done'] = done
+        self.checkpoint.save()
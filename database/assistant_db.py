@@ -4,11 +4,20 @@
 from typing import Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 import logging
-from google.cloud import firestore
+from utils.lazy_import import lazy_module
+from database.bulk_delete import BulkDeleter
+from database.projections import get_fields
+from utils.metrics import instrument_db
+
+firestore = lazy_module('google.cloud.firestore')
 
 logger = logging.getLogger(__name__)
 
+# Метка последней очистки истории: сообщения не позже нее не показываются
+HISTORY_CLEARED_FIELD = 'assistant_stats.history_cleared_at'
+
 
+@instrument_db
 class AssistantDB:
     """Класс для работы с данными ИИ-ассистента в Firestore"""
     
@@ -21,6 +30,27 @@ class AssistantDB:
         """
         self.db = db
         self.collection_name = 'users'
+        self.bulk_deleter = BulkDeleter(db)
+    
+    def _history_query(self, user_ref):
+        """
+        История чата без сообщений, очищенных пользователем
+        
+        Фоновое удаление может еще идти, поэтому чтения отсекают
+        сообщения по метке history_cleared_at.
+        
+        Args:
+            user_ref: Ссылка на документ пользователя
+            
+        Returns:
+            Запрос к подколлекции chat_history
+        """
+        query = user_ref.collection('chat_history')
+        data = get_fields(user_ref, [HISTORY_CLEARED_FIELD]) or {}
+        cleared_at = (data.get('assistant_stats') or {}).get('history_cleared_at')
+        if cleared_at:
+            query = query.where('timestamp', '>', cleared_at)
+        return query
     
     async def save_message(self, user_id: int, user_message: str, 
                          assistant_response: str, tokens_used: int = 0) -> bool:
@@ -128,7 +158,7 @@ class AssistantDB:
             user_ref = self.db.collection(self.collection_name).document(str(user_id))
             
             # Получаем последние сообщения
-            messages = user_ref.collection('chat_history')\
+            messages = self._history_query(user_ref)\
                 .order_by('timestamp', direction=firestore.Query.DESCENDING)\
                 .limit(limit)\
                 .get()
@@ -236,7 +266,7 @@ class AssistantDB:
         """
         try:
             user_ref = self.db.collection(self.collection_name).document(str(user_id))
-            messages = user_ref.collection('chat_history').get()
+            messages = self._history_query(user_ref).get()
             
             scenario_count = {}
             total = 0
@@ -273,7 +303,7 @@ class AssistantDB:
             hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
             
             user_ref = self.db.collection(self.collection_name).document(str(user_id))
-            messages = user_ref.collection('chat_history')\
+            messages = self._history_query(user_ref)\
                 .where('timestamp', '>=', hour_ago)\
                 .get()
             
@@ -300,104 +330,20 @@ class AssistantDB:
         """
         try:
             user_ref = self.db.collection(self.collection_name).document(str(user_id))
+            cleared_at = datetime.now(timezone.utc)
             
-            # Получаем все сообщения
-            messages = user_ref.collection('chat_history').get()
-            
-            # Удаляем каждое сообщение
-            for msg in messages:
-                msg.reference.delete()
-            
-            # Обнуляем статистику
+            # Обнуляем статистику; метка сразу скрывает старые сообщения
             user_ref.set({
                 'assistant_stats': {
                     'total_messages': 0,
                     'total_tokens': 0,
-                    'last_interaction': datetime.now(timezone.utc)
-                }
-            }, merge=True)
-            
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при очистке истории: {e}")
-            return False
-
-    async def get_last_use_date(self, user_id: int) -> Optional[datetime]:
-        """
-        Получает дату последнего использования ассистента
-        
-        Args:
-            user_id: ID пользователя
-            
-        Returns:
-            Optional[datetime]: Дата последнего использования
-        """
-        try:
-            user_ref = self.db.collection(self.collection_name).document(str(user_id))
-            doc = user_ref.get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                stats = data.get('assistant_stats', {})
-                return stats.get('last_interaction')
-            
-            return None
-        except Exception as e:
-            logger.error(f"Ошибка при получении даты последнего использования: {e}")
-            return None
-
-    async def update_last_use_date(self, user_id: int) -> bool:
-        """
-        Обновляет дату последнего использования
-        
-        Args:
-            user_id: ID пользователя
-            
-        Returns:
-            bool: Успешность обновления
-        """
-        try:
-            user_ref = self.db.collection(self.collection_name).document(str(user_id))
-            
-            user_ref.set({
-                'assistant_stats': {
-                    'last_interaction': datetime.now(timezone.utc)
+                    'last_interaction': cleared_at,
+                    'history_cleared_at': cleared_at
                 }
             }, merge=True)
             
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении даты последнего использования: {e}")
-            return False
-        
-    async def clear_history(self, user_id: int) -> bool:
-        """
-        Очищает историю чата пользователя
-        
-        Args:
-            user_id: ID пользователя
-            
-        Returns:
-            bool: Успешность очистки
-        """
-        try:
-            user_ref = self.db.collection(self.collection_name).document(str(user_id))
-            
-            # Получаем все сообщения
-            messages = user_ref.collection('chat_history').get()
-            
-            # Удаляем каждое сообщение
-            for msg in messages:
-                msg.reference.delete()
-            
-            # Обнуляем статистику
-            user_ref.set({
-                'assistant_stats': {
-                    'total_messages': 0,
-                    'total_tokens': 0,
-                    'last_interaction': datetime.now(timezone.utc)
-                }
-            }, merge=True)
+            # Сообщения удаляются в фоне пакетами по 500; новые не трогаем
+            await self.bulk_deleter.schedule([f"{user_ref.path}/chat_history"], until=cleared_at)
             
             return True
         except Exception as e:
@@ -416,10 +362,9 @@ class AssistantDB:
         """
         try:
             user_ref = self.db.collection(self.collection_name).document(str(user_id))
-            doc = user_ref.get()
+            data = get_fields(user_ref, ['assistant_stats.last_interaction'])
             
-            if doc.exists:
-                data = doc.to_dict()
+            if data is not None:
                 stats = data.get('assistant_stats', {})
                 return stats.get('last_interaction')
             
@@ -450,4 +395,4 @@ class AssistantDB:
             return True
         except Exception as e:
             logger.error(f"Ошибка при обновлении даты последнего использования: {e}")
-            return False
\ No newline at end of file
+            return False
@@ -1,34 +1,41 @@
 """
 База данных для работы с профилями ИИ-ассистента
 """
-from typing import Dict, Any, Optional, List
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Optional, List
 from datetime import datetime, timezone
+import asyncio
 import logging
-from google.cloud import firestore
-from google.cloud.firestore_v1 import FieldFilter
+from utils.lazy_import import lazy_module
 
 # Импорт моделей - избегаем циклических импортов
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.ai_profile import (
-    AIProfile, 
-    CategoryType,
-    OnboardingData,
-    PlanData,
-    ConstraintsData,
-    ProgressData,
-    PreferencesData
-)
+if TYPE_CHECKING:
+    from models.ai_profile import AIProfile, PlanData
+from utils.plan_cache import plan_cache, plan_version
+from database.reminder_db import ReminderDB
+from utils.metrics import instrument_db
+
+firestore = lazy_module('google.cloud.firestore')
+# pydantic-модели профиля загружаются при первом чтении или записи профиля
+ai_profile = lazy_module('models.ai_profile')
 
 logger = logging.getLogger(__name__)
 
+# Задачи плана хранятся по дням: users/{id}/plan_days/{NNN},
+# в документе пользователя остается только заголовок плана
+PLAN_DAYS_COLLECTION = 'plan_days'
 
+
+@instrument_db
 class AssistantProfileDB:
     """Класс для работы с профилями ИИ-ассистента в Firestore"""
     
-    def __init__(self, db: firestore.Client):
+    def __init__(self, db: "firestore.Client"):
         """
         Инициализация с подключением к Firestore
         
@@ -39,12 +46,16 @@ class AssistantProfileDB:
         self.collection_name = 'users'
         logger.info("AssistantProfileDB инициализирована")
     
-    async def get_profile(self, telegram_id: int) -> Optional[AIProfile]:
+    async def get_profile(self, telegram_id: int, with_plan_days: bool = False) -> Optional[AIProfile]:
         """
         Получает профиль ИИ-ассистента пользователя
         
+        По умолчанию план загружается только заголовком: задачи нужных
+        дней читаются через get_plan_day / get_plan_days.
+        
         Args:
             telegram_id: ID пользователя в Telegram
+            with_plan_days: Загружать ли все задачи плана (отдельный запрос)
             
         Returns:
             AIProfile или None если профиль не найден
@@ -54,7 +65,7 @@ class AssistantProfileDB:
             doc = user_ref.get()
             
             if not doc.exists:
-                logger.info(f"Профиль для пользователя {telegram_id} не найден")
+                logger.debug(f"Профиль для пользователя {telegram_id} не найден")
                 return None
             
             data = doc.to_dict()
@@ -64,9 +75,16 @@ class AssistantProfileDB:
                 logger.info(f"AI профиль отсутствует для пользователя {telegram_id}")
                 return None
             
-            # Преобразуем данные из Firestore в модель
-            profile = AIProfile.from_firestore(ai_profile_data)
-            logger.info(f"Профиль пользователя {telegram_id} успешно загружен")
+            # Преобразуем данные из Firestore в модель (без повторной валидации)
+            plan_header = ai_profile_data.pop('plan', None)
+            profile = ai_profile.AIProfile.from_firestore(ai_profile_data)
+            
+            if plan_header:
+                if plan_header.get('split_days') and not with_plan_days:
+                    profile.plan = ai_profile.construct_trusted(ai_profile.PlanData, plan_header)
+                else:
+                    profile.plan = self._get_cached_plan(telegram_id, user_ref, plan_header)
+            logger.debug(f"Профиль пользователя {telegram_id} успешно загружен")
             
             return profile
             
@@ -91,31 +109,40 @@ class AssistantProfileDB:
         Returns:
             bool: Успешность сохранения
         """
+        return await self.save_onboarding_answers(telegram_id, {qid: answer})
+    
+    async def save_onboarding_answers(self, telegram_id: int, answers: Dict[str, Any]) -> bool:
+        """
+        Сохраняет пачку ответов онбординга одной записью (контрольная точка)
+        
+        Профиль должен существовать: он создается при выборе категории.
+        
+        Args:
+            telegram_id: ID пользователя
+            answers: Ответы {ID вопроса: ответ}
+            
+        Returns:
+            bool: Успешность сохранения
+        """
+        if not answers:
+            return True
         try:
             user_ref = self.db.collection(self.collection_name).document(str(telegram_id))
+            now = datetime.now(timezone.utc)
             
-            # Проверяем существование профиля
-            doc = user_ref.get()
-            if not doc.exists:
-                # Создаем новый профиль с пустым онбордингом
-                initial_profile = AIProfile()
-                user_ref.set({
-                    'ai_profile': initial_profile.to_firestore(),
-                    'updated_at': datetime.now(timezone.utc)
-                })
-            
-            # Обновляем ответ в онбординге
-            user_ref.update({
-                f'ai_profile.onboarding.answers.{qid}': answer,
-                'ai_profile.updated_at': datetime.now(timezone.utc),
-                'updated_at': datetime.now(timezone.utc)
-            })
+            update_data = {
+                f'ai_profile.onboarding.answers.{qid}': answer
+                for qid, answer in answers.items()
+            }
+            update_data['ai_profile.updated_at'] = now
+            update_data['updated_at'] = now
+            user_ref.update(update_data)
             
-            logger.info(f"Ответ {qid} сохранен для пользователя {telegram_id}")
+            logger.info(f"Сохранено ответов онбординга: {len(answers)} для пользователя {telegram_id}")
             return True
             
         except Exception as e:
-            logger.error(f"Ошибка при сохранении ответа онбординга: {e}")
+            logger.error(f"Ошибка при сохранении ответов онбординга для {telegram_id}: {e}")
             return False
     
     async def finalize_onboarding(
@@ -183,7 +210,7 @@ class AssistantProfileDB:
         
         Args:
             telegram_id: ID пользователя
-            plan: Данные плана (может быть dict или PlanData)
+            plan: Данные плана (PlanData, dict или компактная форма PlanData.to_compact)
             
         Returns:
             bool: Успешность сохранения
@@ -191,15 +218,27 @@ class AssistantProfileDB:
         try:
             user_ref = self.db.collection(self.collection_name).document(str(telegram_id))
             
-            # Преобразуем план в словарь если это модель
-            if hasattr(plan, 'dict'):
-                plan_data = plan.dict()
+            # План из внешнего источника валидируем на границе записи
+            if isinstance(plan, ai_profile.PlanData):
+                plan_model = plan
+            elif ai_profile.PlanData.is_compact(plan):
+                plan_model = ai_profile.PlanData(**ai_profile.PlanData.expand_compact(plan))
             else:
-                plan_data = plan
+                plan_model = ai_profile.PlanData(**plan)
+            plan_data = plan_model.dict(exclude={'days'})
+            
+            # Задачи раскладываем по документам дней
+            tasks_by_day = {
+                day: [task.dict() for task in tasks]
+                for day, tasks in plan_model.tasks_by_day().items()
+            }
             
             # Добавляем временные метки
             plan_data['created_at'] = datetime.now(timezone.utc)
             plan_data['updated_at'] = datetime.now(timezone.utc)
+            plan_data['split_days'] = True
+            plan_data['days_count'] = len(tasks_by_day)
+            plan_data['tasks_count'] = sum(len(tasks) for tasks in tasks_by_day.values())
             
             # Обновляем план и сбрасываем прогресс
             update_data = {
@@ -216,7 +255,12 @@ class AssistantProfileDB:
                 'updated_at': datetime.now(timezone.utc)
             }
             
-            user_ref.update(update_data)
+            # Заголовок и дни пишем одним batch (план до 90 дней)
+            batch = self.db.batch()
+            batch.update(user_ref, update_data)
+            self._replace_plan_days(user_ref, batch, tasks_by_day)
+            batch.commit()
+            plan_cache.invalidate(telegram_id)
             
             logger.info(f"План сохранен для пользователя {telegram_id}")
             return True
@@ -259,7 +303,11 @@ class AssistantProfileDB:
                 'updated_at': datetime.now(timezone.utc)
             }
             
-            user_ref.update(update_data)
+            batch = self.db.batch()
+            batch.update(user_ref, update_data)
+            self._replace_plan_days(user_ref, batch, {})
+            batch.commit()
+            plan_cache.invalidate(telegram_id)
             
             logger.info(f"План удален для пользователя {telegram_id}")
             return True
@@ -337,7 +385,7 @@ class AssistantProfileDB:
             user_ref = self.db.collection(self.collection_name).document(str(telegram_id))
             
             # Создаем пустой профиль
-            profile = AIProfile()
+            profile = ai_profile.AIProfile()
             
             # Сохраняем или обновляем
             user_ref.set({
@@ -381,6 +429,16 @@ class AssistantProfileDB:
             
             user_ref.update(update_data)
             
+            # Держим индекс напоминаний в согласии с предпочтениями
+            reminder_db = ReminderDB(self.db)
+            enabled = preferences.get('notifications_enabled')
+            if preferences.get('reminder_time'):
+                await reminder_db.set_reminder(str(telegram_id), preferences['reminder_time'])
+                if enabled is False:
+                    await reminder_db.set_enabled(str(telegram_id), False)
+            elif enabled is not None:
+                await reminder_db.set_enabled(str(telegram_id), enabled)
+            
             logger.info(f"Предпочтения обновлены для пользователя {telegram_id}")
             return True
             
@@ -441,38 +499,45 @@ class AssistantProfileDB:
         """
         try:
             user_ref = self.db.collection(self.collection_name).document(str(telegram_id))
-            doc = user_ref.get()
-            
-            if not doc.exists:
-                return False
-            
-            data = doc.to_dict()
-            ai_profile = data.get('ai_profile', {})
-            plan = ai_profile.get('plan', {})
-            days = plan.get('days', [])
-            
-            # Находим и обновляем задачу
-            task_updated = False
-            for i, day_task in enumerate(days):
-                if day_task.get('id') == task_id:
-                    days[i]['status'] = status
-                    days[i]['completed_at'] = datetime.now(timezone.utc).isoformat() if status == 'completed' else None
-                    if notes:
-                        days[i]['notes'] = notes
-                    task_updated = True
-                    break
-            
-            if not task_updated:
-                logger.warning(f"Задача {task_id} не найдена")
-                return False
-            
-            # Обновляем план
-            user_ref.update({
-                'ai_profile.plan.days': days,
-                'ai_profile.updated_at': datetime.now(timezone.utc),
-                'updated_at': datetime.now(timezone.utc)
-            })
+            now = datetime.now(timezone.utc)
+            
+            # Ищем документ дня по ID задачи - читаем только его
+            day_doc = self._find_day_doc(telegram_id, user_ref, task_id)
+            
+            if day_doc is not None:
+                tasks = day_doc.to_dict().get('tasks', [])
+                if not self._apply_task_status(tasks, task_id, status, notes, now):
+                    logger.warning(f"Задача {task_id} не найдена")
+                    return False
+                
+                batch = self.db.batch()
+                batch.update(day_doc.reference, {'tasks': tasks})
+                batch.update(user_ref, {
+                    'ai_profile.plan.updated_at': now,
+                    'ai_profile.updated_at': now,
+                    'updated_at': now
+                })
+                batch.commit()
+            else:
+                # План старого формата хранит задачи в документе пользователя
+                doc = user_ref.get()
+                if not doc.exists:
+                    return False
+                
+                plan = (doc.to_dict().get('ai_profile') or {}).get('plan') or {}
+                days = plan.get('days', [])
+                if not self._apply_task_status(days, task_id, status, notes, now):
+                    logger.warning(f"Задача {task_id} не найдена")
+                    return False
+                
+                user_ref.update({
+                    'ai_profile.plan.days': days,
+                    'ai_profile.plan.updated_at': now,
+                    'ai_profile.updated_at': now,
+                    'updated_at': now
+                })
             
+            self._update_cached_task(telegram_id, task_id, status, notes, now)
             logger.info(f"Статус задачи {task_id} обновлен для пользователя {telegram_id}")
             return True
             
@@ -484,6 +549,8 @@ class AssistantProfileDB:
         """
         Получает список пользователей с активной категорией
         
+        Для больших сегментов используйте iter_active_users_by_category.
+        
         Args:
             category: Категория для поиска
             
@@ -491,15 +558,207 @@ class AssistantProfileDB:
             List[int]: Список telegram_id пользователей
         """
         try:
-            users = self.db.collection(self.collection_name)\
-                .where(filter=FieldFilter('ai_profile.active_category', '==', category))\
-                .get()
-            
-            user_ids = [int(user.id) for user in users]
+            user_ids = []
+            async for page in self.iter_active_users_by_category(category):
+                user_ids.extend(page)
             logger.info(f"Найдено {len(user_ids)} пользователей с категорией {category}")
             
             return user_ids
             
         except Exception as e:
             logger.error(f"Ошибка при поиске пользователей по категории: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    async def iter_active_users_by_category(
+        self,
+        category: str,
+        page_size: int = 500,
+        start_after: Optional[int] = None
+    ) -> AsyncIterator[List[int]]:
+        """
+        Постранично выдает пользователей с активной категорией
+        
+        Читаются только ID (select без полей), страницы идут по курсору
+        в порядке ID документа, поэтому обход можно продолжить с места
+        остановки.
+        
+        Args:
+            category: Категория для поиска
+            page_size: Размер страницы
+            start_after: ID пользователя, после которого продолжить обход
+            
+        Yields:
+            List[int]: Страница telegram_id пользователей
+        """
+        collection = self.db.collection(self.collection_name)
+        query = collection\
+            .where(filter=firestore.FieldFilter('ai_profile.active_category', '==', category))\
+            .order_by('__name__')\
+            .select([])\
+            .limit(page_size)
+        
+        # Курсор по ID документа без его чтения: пользователь мог быть удален
+        cursor = None
+        if start_after is not None:
+            cursor = {'__name__': collection.document(str(start_after))}
+        
+        while True:
+            page_query = query.start_after(cursor) if cursor is not None else query
+            docs = await asyncio.to_thread(page_query.get)
+            if not docs:
+                return
+            yield [int(doc.id) for doc in docs]
+            if len(docs) < page_size:
+                return
+            cursor = {'__name__': docs[-1].reference}
+    
+    async def get_plan_day(self, telegram_id: int, day_number: int) -> List[Dict[str, Any]]:
+        """
+        Получает задачи одного дня плана
+        
+        Args:
+            telegram_id: ID пользователя
+            day_number: Номер дня в плане
+            
+        Returns:
+            List[Dict]: Задачи дня (пустой список если их нет)
+        """
+        return await self.get_plan_days(telegram_id, day_number, day_number)
+    
+    async def get_plan_days(self, telegram_id: int, start_day: int, end_day: int) -> List[Dict[str, Any]]:
+        """
+        Получает задачи диапазона дней плана одним запросом
+        
+        Args:
+            telegram_id: ID пользователя
+            start_day: Первый день (включительно)
+            end_day: Последний день (включительно)
+            
+        Returns:
+            List[Dict]: Задачи дней в порядке плана (пустой список если их нет)
+        """
+        try:
+            user_ref = self.db.collection(self.collection_name).document(str(telegram_id))
+            day_docs = user_ref.collection(PLAN_DAYS_COLLECTION)\
+                .where(filter=firestore.FieldFilter('day_number', '>=', start_day))\
+                .where(filter=firestore.FieldFilter('day_number', '<=', end_day))\
+                .order_by('day_number')\
+                .get()
+            
+            if day_docs:
+                return [task for day_doc in day_docs for task in day_doc.to_dict().get('tasks', [])]
+            
+            # План старого формата: задачи в заголовке
+            profile = await self.get_profile(telegram_id)
+            if profile and profile.plan:
+                return [
+                    task.dict()
+                    for day_number in range(start_day, end_day + 1)
+                    for task in profile.plan.tasks_for_day(day_number)
+                ]
+            return []
+            
+        except Exception as e:
+            logger.error(f"Ошибка при получении дней {start_day}-{end_day} плана: {e}")
+            return []
+    
+    # === Приватные методы ===
+    
+    @staticmethod
+    def _day_doc_id(day_number: int) -> str:
+        """ID документа дня: с ведущими нулями, чтобы порядок совпадал с номером"""
+        return f"{day_number:03d}"
+    
+    def _get_cached_plan(self, telegram_id: int, user_ref, plan_header: Dict[str, Any]) -> PlanData:
+        """Возвращает план из кэша или собирает его (с задачами из plan_days)"""
+        version = plan_version(plan_header)
+        plan = plan_cache.get(telegram_id, version)
+        if plan is None:
+            plan_data = plan_header
+            if plan_header.get('split_days'):
+                plan_data = {**plan_header, 'days': self._load_plan_tasks(user_ref)}
+            plan = ai_profile.construct_trusted(ai_profile.PlanData, plan_data)
+            plan_cache.put(telegram_id, version, plan)
+        return plan
+    
+    def _load_plan_tasks(self, user_ref) -> List[Dict[str, Any]]:
+        """Загружает все задачи плана одним запросом"""
+        tasks = []
+        for day_doc in user_ref.collection(PLAN_DAYS_COLLECTION).order_by('day_number').get():
+            tasks.extend(day_doc.to_dict().get('tasks', []))
+        return tasks
+    
+    def _replace_plan_days(self, user_ref, batch, tasks_by_day: Dict[int, List[Dict[str, Any]]]):
+        """Добавляет в batch запись новых дней плана и удаление устаревших"""
+        days_ref = user_ref.collection(PLAN_DAYS_COLLECTION)
+        new_ids = {self._day_doc_id(day) for day in tasks_by_day}
+        
+        for old_doc in days_ref.select([]).get():
+            if old_doc.id not in new_ids:
+                batch.delete(old_doc.reference)
+        
+        for day_number, tasks in tasks_by_day.items():
+            batch.set(days_ref.document(self._day_doc_id(day_number)), {
+                'day_number': day_number,
+                'task_ids': [task.get('id') for task in tasks],
+                'tasks': tasks
+            })
+    
+    def _find_day_doc(self, telegram_id: int, user_ref, task_id: str):
+        """
+        Документ дня с задачей или None
+        
+        Если план пользователя в кэше, день берется из индекса task_id ->
+        позиция и документ читается по ID; иначе (или если кэш устарел) -
+        запросом по task_ids.
+        """
+        days_ref = user_ref.collection(PLAN_DAYS_COLLECTION)
+        cached = plan_cache.peek(telegram_id)
+        task = cached[1].get_task(task_id) if cached else None
+        if task is not None:
+            day_doc = days_ref.document(self._day_doc_id(task.day_number)).get()
+            if day_doc.exists and task_id in (day_doc.to_dict().get('task_ids') or ()):
+                return day_doc
+        
+        day_docs = days_ref\
+            .where(filter=firestore.FieldFilter('task_ids', 'array_contains', task_id))\
+            .limit(1)\
+            .get()
+        return day_docs[0] if day_docs else None
+    
+    def _update_cached_task(self, telegram_id: int, task_id: str, status: str,
+                            notes: Optional[str], updated_at: datetime):
+        """
+        Применяет новый статус к плану в кэше вместо сброса кэша
+        
+        Запись перекладывается под версию с новым updated_at, поэтому
+        следующее чтение профиля не перезагружает все дни плана.
+        """
+        cached = plan_cache.peek(telegram_id)
+        if cached is None:
+            return
+        version, plan = cached
+        changes = {
+            'status': status,
+            'completed_at': updated_at if status == 'completed' else None
+        }
+        if notes:
+            changes['notes'] = notes
+        if plan.update_task(task_id, **changes) is None:
+            plan_cache.invalidate(telegram_id)
+            return
+        created_at, _, tasks_count = version
+        plan_cache.put(telegram_id, (created_at, str(updated_at), tasks_count), plan)
+    
+    @staticmethod
+    def _apply_task_status(tasks: List[Dict[str, Any]], task_id: str, status: str,
+                           notes: Optional[str], updated_at: datetime) -> bool:
+        """Обновляет статус задачи в списке, возвращает True если задача найдена"""
+        for task in tasks:
+            if task.get('id') == task_id:
+                task['status'] = status
+                task['completed_at'] = updated_at.isoformat() if status == 'completed' else None
+                if notes:
+                    task['notes'] = notes
+                return True
+        return False
@@ -0,0 +1,214 @@
+"""
+Пакетное удаление подколлекций в Firestore
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+from utils.lazy_import import lazy_module
+
+firestore = lazy_module('google.cloud.firestore')
+
+logger = logging.getLogger(__name__)
+
+# Firestore ограничивает один batch 500 операциями
+BATCH_LIMIT = 500
+DEFAULT_CONCURRENCY = 4
+JOBS_COLLECTION = 'cleanup_jobs'
+# Поле времени создания документа для удаления с отсечкой (until)
+CUTOFF_FIELD = 'timestamp'
+
+
+class BulkDeleter:
+    """
+    Удаляет подколлекции страницами по 500 документов.
+
+    Страницы читаются последовательно (по курсору), а batch-коммиты
+    выполняются параллельно, но не более max_concurrency одновременно.
+    Все блокирующие вызовы клиента Firestore вынесены в отдельный поток,
+    чтобы не блокировать event loop.
+
+    Фоновые задания регистрируются в коллекции cleanup_jobs и удаляются
+    по завершении, поэтому прерванная очистка продолжается через
+    resume_pending_jobs() после перезапуска.
+
+    Отсечка until ограничивает удаление документами, созданными не позже
+    нее: сообщения, записанные после очистки, задание не трогает, даже
+    если оно продолжено после перезапуска.
+    """
+
+    # Ссылки на фоновые задачи, чтобы их не собрал GC
+    _background_tasks: Set[asyncio.Task] = set()
+
+    def __init__(self, db, batch_size: int = BATCH_LIMIT,
+                 max_concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Args:
+            db: Клиент Firestore
+            batch_size: Размер страницы и batch-коммита (не больше 500)
+            max_concurrency: Максимум одновременных batch-коммитов
+        """
+        self.db = db
+        self.batch_size = max(1, min(BATCH_LIMIT, batch_size))
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def delete_collection(self, collection_path: str, recursive: bool = False,
+                                job_id: Optional[str] = None,
+                                until: Optional[datetime] = None) -> int:
+        """
+        Удаляет все документы коллекции
+
+        Args:
+            collection_path: Путь коллекции (например users/1/chat_history)
+            recursive: Удалять ли вложенные подколлекции документов
+            job_id: ID задания для сохранения прогресса (опционально)
+            until: Удалять только документы с CUTOFF_FIELD <= until (опционально)
+
+        Returns:
+            Количество удаленных документов
+        """
+        base_query = self.db.collection(collection_path)
+        if until is not None:
+            base_query = base_query.where(CUTOFF_FIELD, '<=', until).order_by(CUTOFF_FIELD)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending: List[asyncio.Task] = []
+        deleted = 0
+        last_doc = None
+
+        while True:
+            query = base_query.limit(self.batch_size)
+            if last_doc is not None:
+                query = query.start_after(last_doc)
+
+            docs = await asyncio.to_thread(query.get)
+            if not docs:
+                break
+            last_doc = docs[-1]
+
+            if recursive:
+                for doc in docs:
+                    deleted += await self._delete_subcollections(doc.reference)
+
+            await semaphore.acquire()
+            task = asyncio.create_task(self._commit_deletes(docs, semaphore))
+            pending.append(task)
+
+            if len(docs) < self.batch_size:
+                break
+
+        for count in await asyncio.gather(*pending):
+            deleted += count
+
+        if job_id and deleted:
+            await self._save_progress(job_id, deleted)
+
+        logger.info(f"Удалено {deleted} документов из {collection_path}")
+        return deleted
+
+    async def schedule(self, collection_paths: List[str], recursive: bool = False,
+                       until: Optional[datetime] = None) -> str:
+        """
+        Регистрирует задание на удаление и запускает его в фоне
+
+        Args:
+            collection_paths: Пути коллекций для удаления
+            recursive: Удалять ли вложенные подколлекции
+            until: Удалять только документы с CUTOFF_FIELD <= until (опционально)
+
+        Returns:
+            ID задания
+        """
+        job_id = str(uuid.uuid4())
+
+        # Сохраняем задание до начала удаления, чтобы его можно было продолжить
+        job_ref = self.db.collection(JOBS_COLLECTION).document(job_id)
+        await asyncio.to_thread(job_ref.set, {
+            'collections': collection_paths,
+            'recursive': recursive,
+            'until': until,
+            'deleted_count': 0,
+            'created_at': datetime.now(timezone.utc)
+        })
+
+        self._spawn(job_id, collection_paths, recursive, until)
+        return job_id
+
+    async def resume_pending_jobs(self) -> int:
+        """
+        Продолжает задания, прерванные перезапуском
+
+        Returns:
+            Количество возобновленных заданий
+        """
+        try:
+            jobs = await asyncio.to_thread(self.db.collection(JOBS_COLLECTION).get)
+
+            resumed = 0
+            for job in jobs:
+                data = job.to_dict()
+                self._spawn(job.id, data.get('collections', []), data.get('recursive', False),
+                            data.get('until'))
+                resumed += 1
+
+            if resumed:
+                logger.info(f"Возобновлено {resumed} заданий очистки")
+            return resumed
+        except Exception as e:
+            logger.error(f"Ошибка при возобновлении заданий очистки: {e}")
+            return 0
+
+    # === Приватные методы ===
+
+    def _spawn(self, job_id: str, collection_paths: List[str], recursive: bool,
+               until: Optional[datetime] = None):
+        """Запускает задание в фоне"""
+        task = asyncio.create_task(self._run_job(job_id, collection_paths, recursive, until))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _run_job(self, job_id: str, collection_paths: List[str], recursive: bool,
+                       until: Optional[datetime] = None):
+        """Выполняет задание и удаляет его запись"""
+        try:
+            for path in collection_paths:
+                await self.delete_collection(path, recursive=recursive, job_id=job_id, until=until)
+
+            job_ref = self.db.collection(JOBS_COLLECTION).document(job_id)
+            await asyncio.to_thread(job_ref.delete)
+        except Exception as e:
+            # Запись задания остается, очистка продолжится после перезапуска
+            logger.error(f"Ошибка задания очистки {job_id}: {e}")
+
+    async def _delete_subcollections(self, doc_ref) -> int:
+        """Рекурсивно удаляет подколлекции документа"""
+        deleted = 0
+        subcollections = await asyncio.to_thread(lambda: list(doc_ref.collections()))
+        for subcollection in subcollections:
+            deleted += await self.delete_collection(
+                f"{doc_ref.path}/{subcollection.id}",
+                recursive=True
+            )
+        return deleted
+
+    async def _commit_deletes(self, docs: List, semaphore: asyncio.Semaphore) -> int:
+        """Удаляет страницу документов одним batch-коммитом"""
+        try:
+            batch = self.db.batch()
+            for doc in docs:
+                batch.delete(doc.reference)
+            await asyncio.to_thread(batch.commit)
+            return len(docs)
+        finally:
+            semaphore.release()
+
+    async def _save_progress(self, job_id: str, deleted: int):
+        """Сохраняет прогресс задания"""
+        try:
+            job_ref = self.db.collection(JOBS_COLLECTION).document(job_id)
+            await asyncio.to_thread(job_ref.update, {
+                'deleted_count': firestore.Increment(deleted),
+                'updated_at': datetime.now(timezone.utc)
+            })
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить прогресс задания {job_id}: {e}")
@@ -1,19 +1,32 @@
 """
 Функции для работы с чек-листом в Firestore
 """
-from google.cloud import firestore
+from utils.lazy_import import lazy_module
 from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, date
+from datetime import datetime
 import logging
 import uuid
+from utils.streaks import TZ_OFFSET_FIELD, advance_streak, get_tz_offset, local_date, today_local
+from database.projections import get_fields
+from utils.metrics import instrument_db
+
+firestore = lazy_module('google.cloud.firestore')
 
 logger = logging.getLogger(__name__)
 
+PRIORITY_KEYS = (
+    'urgent_important',
+    'not_urgent_important',
+    'urgent_not_important',
+    'not_urgent_not_important'
+)
+
 
+@instrument_db
 class ChecklistDB:
     """Класс для работы с задачами в Firestore"""
     
-    def __init__(self, db: firestore.Client):
+    def __init__(self, db: "firestore.Client"):
         """
         Инициализация с существующим клиентом Firestore
         
@@ -222,13 +235,8 @@ class ChecklistDB:
         """
         try:
             user_ref = self.db.collection('users').document(str(telegram_id))
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                data = user_doc.to_dict()
-                checklist_stats = data.get('checklist_stats', {})
-            else:
-                checklist_stats = {}
+            user_data = get_fields(user_ref, ['checklist_stats']) or {}
+            checklist_stats = user_data.get('checklist_stats', {})
             
             # Дефолтные значения
             default_stats = {
@@ -281,48 +289,38 @@ class ChecklistDB:
     async def _update_user_stats(self, telegram_id: int, priority: str, points: int):
         """
         Обновляет статистику пользователя
+        
+        Счетчики обновляются атомарными инкрементами, поля серии
+        пишутся только если день еще не был засчитан.
         """
         try:
             user_ref = self.db.collection('users').document(str(telegram_id))
+            user_data = get_fields(user_ref, ['checklist_stats', TZ_OFFSET_FIELD]) or {}
+            stats = user_data.get('checklist_stats', {})
             
-            # Получаем текущую статистику
-            stats = await self.get_user_stats(telegram_id)
-            
-            # Обновляем общие показатели
-            stats['total_completed'] += 1
-            stats['total_points'] += points
+            update_data = {
+                'checklist_stats.total_completed': firestore.Increment(1),
+                'checklist_stats.total_points': firestore.Increment(points)
+            }
             
             # Обновляем по приоритету
-            if priority in stats['completed_by_priority']:
-                stats['completed_by_priority'][priority] += 1
+            if priority in PRIORITY_KEYS:
+                update_data[f'checklist_stats.completed_by_priority.{priority}'] = firestore.Increment(1)
             
             # Обновляем streak
-            today = date.today()
-            last_date = stats.get('last_completion_date')
-            
-            if last_date:
-                last_date = last_date.date() if isinstance(last_date, datetime) else last_date
-                days_diff = (today - last_date).days
-                
-                if days_diff == 0:
-                    # Уже выполняли сегодня
-                    pass
-                elif days_diff == 1:
-                    # Выполняли вчера - продолжаем streak
-                    stats['current_streak'] += 1
-                else:
-                    # Пропустили день - сбрасываем streak
-                    stats['current_streak'] = 1
-            else:
-                # Первое выполнение
-                stats['current_streak'] = 1
-            
-            # Обновляем лучший streak
-            stats['best_streak'] = max(stats['current_streak'], stats.get('best_streak', 0))
-            stats['last_completion_date'] = datetime.utcnow()
-            
-            # Сохраняем обновленную статистику
-            user_ref.update({'checklist_stats': stats})
+            tz_offset = get_tz_offset(user_data)
+            streak = advance_streak(
+                local_date(stats.get('last_completion_date'), tz_offset),
+                stats.get('current_streak', 0),
+                stats.get('best_streak', 0),
+                today_local(tz_offset)
+            )
+            if streak.counted:
+                update_data['checklist_stats.current_streak'] = streak.current_streak
+                update_data['checklist_stats.best_streak'] = streak.best_streak
+            update_data['checklist_stats.last_completion_date'] = datetime.utcnow()
+            
+            user_ref.update(update_data)
             
         except Exception as e:
             logger.error(f"Ошибка при обновлении статистики: {e}")
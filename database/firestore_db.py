@@ -1,13 +1,70 @@
 """
 Модуль для работы с Firestore
 """
-from google.cloud import firestore
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from datetime import datetime
+import asyncio
 import logging
+import os
+import threading
+import time
+from database.memory_client import get_memory_client
+from database.projections import get_fields
+from utils.firestore_trace import TracedClient
+from utils.lazy_import import lazy_module
+from utils.metrics import instrument_db
+
+# google.cloud.firestore (gRPC) загружается при первом обращении
+firestore = lazy_module('google.cloud.firestore')
 
 logger = logging.getLogger(__name__)
 
+_clients: Dict[Optional[str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_firestore_client(project_id: Optional[str] = None):
+    """
+    Общий клиент Firestore процесса (создается при первом вызове)
+    
+    Args:
+        project_id: ID проекта в Google Cloud (опционально)
+        
+    Returns:
+        google.cloud.firestore.Client
+    """
+    client = _clients.get(project_id)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(project_id)
+            if client is None:
+                started = time.perf_counter()
+                client = _clients[project_id] = firestore.Client(project=project_id)
+                logger.info(f"Клиент Firestore создан за {(time.perf_counter() - started) * 1000:.0f} мс")
+    return client
+
+
+class LazyClient:
+    """
+    Клиент Firestore, создаваемый при первом обращении
+    
+    Модули обработчиков создают FirestoreDB при импорте; с LazyClient
+    это не стоит ни загрузки учетных данных, ни gRPC-канала, а все
+    экземпляры используют один клиент.
+    """
+    
+    __slots__ = ('_project_id',)
+    
+    def __init__(self, project_id: Optional[str] = None):
+        self._project_id = project_id
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_firestore_client(self._project_id), name)
+    
+    def __repr__(self):
+        return f"LazyClient(project={self._project_id!r}, created={self._project_id in _clients})"
+
+
 def is_connected(self) -> bool:
         """Проверка подключения к БД"""
         return self.db is not None
@@ -17,6 +74,7 @@ def get_client(self):
         return self.db
 
 
+@instrument_db
 class FirestoreDB:
     """Класс для работы с Firestore"""
     
@@ -27,9 +85,30 @@ class FirestoreDB:
         Args:
             project_id: ID проекта в Google Cloud (опционально)
         """
-        self.db = firestore.Client(project=project_id)
+        # FIRESTORE_BACKEND=memory - данные в памяти (локальные прогоны и бенчмарки)
+        if os.getenv('FIRESTORE_BACKEND', 'firestore').lower() == 'memory':
+            client = get_memory_client()
+        else:
+            client = LazyClient(project_id)
+        # Трассировка операций для бюджета на апдейт (FIRESTORE_TRACE=0 - выключить)
+        self.db = TracedClient(client) if os.getenv('FIRESTORE_TRACE', '1') != '0' else client
         self.users_collection = 'users'
     
+    async def connect(self) -> bool:
+        """
+        Создает клиент Firestore заранее, в отдельном потоке
+        
+        Returns:
+            True если клиент готов, False если подключиться не удалось
+        """
+        try:
+            # Обращение к клиенту создает его; collection() не ходит в сеть
+            await asyncio.to_thread(self.db.collection, self.users_collection)
+            return True
+        except Exception as e:
+            logger.error(f"Не удалось подключиться к Firestore: {e}")
+            return False
+    
     async def user_exists(self, telegram_id: int) -> bool:
         """
         Проверяет, существует ли пользователь в базе
@@ -75,18 +154,22 @@ class FirestoreDB:
             logger.error(f"Ошибка при создании пользователя {telegram_id}: {e}")
             return False
     
-    async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+    async def get_user(self, telegram_id: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
         """
         Получает данные пользователя из базы
         
         Args:
             telegram_id: Telegram ID пользователя
+            fields: Читать только эти поля (по умолчанию весь документ)
             
         Returns:
             Словарь с данными пользователя или None если не найден
         """
         try:
             doc_ref = self.db.collection(self.users_collection).document(str(telegram_id))
+            if fields is not None:
+                return get_fields(doc_ref, fields)
+            
             doc = doc_ref.get()
             
             if doc.exists:
@@ -141,4 +224,4 @@ class FirestoreDB:
             return await self.update_user(telegram_id, update_data)
         except Exception as e:
             logger.error(f"Ошибка при сохранении ответов опроса для {telegram_id}: {e}")
-            return False
\ No newline at end of file
+            return False
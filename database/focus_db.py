@@ -1,14 +1,25 @@
 """
 База данных для модуля фокус-сессий
 """
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, date, timedelta, timezone
-from google.cloud import firestore
+from utils.lazy_import import lazy_module
+from utils.streaks import TZ_OFFSET_FIELD, active_streak, advance_streak, get_tz_offset, local_date, today_local
+from database.projections import get_fields
+from utils.metrics import instrument_db
+from utils.leaderboard import leaderboards
+
+firestore = lazy_module('google.cloud.firestore')
 
 logger = logging.getLogger(__name__)
 
+# Дневные агрегаты статистики: users/{id}/focus_daily/{YYYY-MM-DD}
+ROLLUP_COLLECTION = 'focus_daily'
+
 
+@instrument_db
 class FocusDB:
     """Класс для работы с фокус-сессиями в Firestore"""
     
@@ -118,13 +129,60 @@ class FocusDB:
             update_data['updated_at'] = firestore.SERVER_TIMESTAMP
             doc_ref.update(update_data)
             
-            logger.info(f"Обновлена сессия {session_id}")
+            logger.debug(f"Обновлена сессия {session_id}")
             return True
             
         except Exception as e:
             logger.error(f"Ошибка обновления сессии {session_id}: {e}")
             return False
     
+    async def checkpoint_sessions(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        Сохраняет точное оставшееся время активных сессий (при остановке бота)
+        
+        Все записи уходят batch-коммитами (до 500 операций в каждом).
+        Удаленные сессии пропускаются: одна отсутствующая сессия не должна
+        отменять запись всего batch.
+        
+        Args:
+            entries: Список {'session_id', 'remaining_seconds'}
+            
+        Returns:
+            Количество сохраненных сессий
+        """
+        if not entries:
+            return 0
+        
+        now = datetime.now(timezone.utc)
+        saved = 0
+        sessions_ref = self.db.collection('focus_sessions')
+        try:
+            for start in range(0, len(entries), 500):
+                chunk = entries[start:start + 500]
+                refs = [sessions_ref.document(entry['session_id']) for entry in chunk]
+                # Одно чтение на пачку: какие сессии еще существуют
+                snapshots = await asyncio.to_thread(
+                    lambda: list(self.db.get_all(refs, field_paths=['status']))
+                )
+                existing = {snapshot.id for snapshot in snapshots if snapshot.exists}
+                batch = self.db.batch()
+                for ref, entry in zip(refs, chunk):
+                    if ref.id not in existing:
+                        logger.warning(f"Сессия {ref.id} удалена, оставшееся время не сохранено")
+                        continue
+                    # merge вместо update: сессия, удаленная после чтения, не роняет batch
+                    batch.set(ref, {
+                        'checkpoint_remaining_seconds': entry['remaining_seconds'],
+                        'checkpointed_at': now,
+                    }, merge=True)
+                if existing:
+                    await asyncio.to_thread(batch.commit)
+                saved += len(existing)
+            logger.info(f"Сохранено оставшееся время {saved} сессий")
+        except Exception as e:
+            logger.error(f"Ошибка сохранения оставшегося времени сессий: {e}")
+        return saved
+    
     async def get_all_active_sessions(self) -> List[Dict[str, Any]]:
         """
         Получает все активные сессии (для восстановления).
@@ -236,22 +294,17 @@ class FocusDB:
             Словарь со статистикой
         """
         try:
-            user_ref = self.db.collection('users').document(user_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                data = user_doc.to_dict()
-                stats = data.get('focus_stats', {})
-            else:
-                stats = {}
+            user_data = await self._get_user_data(user_id)
+            stats = user_data.get('focus_stats', {})
+            today = await self._get_rollups(user_id, user_data, days=1)
             
             return {
                 'total_sessions': stats.get('total_sessions', 0),
                 'total_minutes': stats.get('total_minutes', 0),
-                'current_streak': stats.get('current_streak', 0),
+                'current_streak': self._active_streak(user_data),
                 'best_streak': stats.get('best_streak', 0),
                 'last_session_date': stats.get('last_session_date'),
-                'sessions_today': await self._get_sessions_count_today(user_id)
+                'sessions_today': today['completed_sessions']
             }
             
         except Exception as e:
@@ -271,55 +324,56 @@ class FocusDB:
     ):
         """
         Увеличивает статистику пользователя.
+        
+        Общие счетчики и дневной rollup обновляются одним batch-коммитом.
         """
         try:
             user_ref = self.db.collection('users').document(user_id)
             
             # Получаем текущую статистику
             user_doc = user_ref.get()
-            if user_doc.exists:
-                data = user_doc.to_dict()
-                stats = data.get('focus_stats', {})
-            else:
-                stats = {}
-            
-            # Обновляем статистику
-            current_date = date.today()
-            last_session_date = stats.get('last_session_date')
+            user_data = user_doc.to_dict() if user_doc.exists else {}
+            stats = user_data.get('focus_stats', {})
             
             # Обновляем streak
-            if last_session_date:
-                last_date = last_session_date.date() if hasattr(last_session_date, 'date') else last_session_date
-                days_diff = (current_date - last_date).days
-                
-                if days_diff == 0:
-                    # Сессия в тот же день
-                    current_streak = stats.get('current_streak', 0)
-                elif days_diff == 1:
-                    # Следующий день - увеличиваем streak
-                    current_streak = stats.get('current_streak', 0) + 1
-                else:
-                    # Пропущены дни - сбрасываем streak
-                    current_streak = 1
-            else:
-                # Первая сессия
-                current_streak = 1
-            
-            # Обновляем лучший streak
-            best_streak = max(current_streak, stats.get('best_streak', 0))
+            tz_offset = get_tz_offset(user_data)
+            today = today_local(tz_offset)
+            streak = advance_streak(
+                local_date(stats.get('last_session_date'), tz_offset),
+                stats.get('current_streak', 0),
+                stats.get('best_streak', 0),
+                today
+            )
             
             # Обновляем данные
-            update_data = {
-                'focus_stats.total_sessions': firestore.Increment(1),
-                'focus_stats.total_minutes': firestore.Increment(completed_minutes),
-                'focus_stats.current_streak': current_streak,
-                'focus_stats.best_streak': best_streak,
-                'focus_stats.last_session_date': current_date
+            focus_stats = {
+                'total_sessions': firestore.Increment(1),
+                'total_minutes': firestore.Increment(completed_minutes),
+                'last_session_date': datetime.now(timezone.utc)
             }
+            if streak.counted:
+                focus_stats['current_streak'] = streak.current_streak
+                focus_stats['best_streak'] = streak.best_streak
+            
+            batch = self.db.batch()
+            # set(merge=True) с вложенным словарем: документа пользователя
+            # может не быть (in-memory режим), update упал бы с NotFound
+            batch.set(user_ref, {'focus_stats': focus_stats}, merge=True)
+            batch.set(self._rollup_ref(user_id, today), {
+                'date': today.isoformat(),
+                'completed_sessions': firestore.Increment(1),
+                'total_minutes': firestore.Increment(completed_minutes),
+                'updated_at': firestore.SERVER_TIMESTAMP
+            }, merge=True)
+            batch.commit()
             
-            user_ref.update(update_data)
+            leaderboards.record_focus(
+                int(user_id),
+                stats.get('total_minutes', 0) + completed_minutes,
+                streak.best_streak if streak.counted else stats.get('best_streak', 0)
+            )
             
-            logger.info(f"Обновлена статистика пользователя {user_id}")
+            logger.debug(f"Обновлена статистика пользователя {user_id}")
             
         except Exception as e:
             logger.error(f"Ошибка обновления статистики: {e}")
@@ -328,161 +382,38 @@ class FocusDB:
         """
         Получает статистику за сегодня.
         """
-        try:
-            today_start = datetime.combine(
-                date.today(),
-                datetime.min.time()
-            ).replace(tzinfo=timezone.utc)
-            
-            sessions_ref = self.db.collection('focus_sessions')
-            query = sessions_ref.where(
-                'user_id', '==', user_id
-            ).where(
-                'status', '==', 'completed'
-            ).where(
-                'started_at', '>=', today_start
-            )
-            
-            docs = query.get()
-            
-            total_minutes = 0
-            sessions_count = 0
-            
-            for doc in docs:
-                data = doc.to_dict()
-                total_minutes += data.get('completed_minutes', 0)
-                sessions_count += 1
-            
-            return {
-                'completed_sessions': sessions_count,
-                'total_minutes': total_minutes,
-                'avg_duration': total_minutes // sessions_count if sessions_count > 0 else 0
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения статистики за сегодня: {e}")
-            return {
-                'completed_sessions': 0,
-                'total_minutes': 0,
-                'avg_duration': 0
-            }
+        return await self._get_period_stats(user_id, days=1)
     
     async def get_week_stats(self, user_id: str) -> Dict[str, Any]:
         """
         Получает статистику за неделю.
         """
-        try:
-            week_start = datetime.combine(
-                date.today() - timedelta(days=7),
-                datetime.min.time()
-            ).replace(tzinfo=timezone.utc)
-            
-            sessions_ref = self.db.collection('focus_sessions')
-            query = sessions_ref.where(
-                'user_id', '==', user_id
-            ).where(
-                'status', '==', 'completed'
-            ).where(
-                'started_at', '>=', week_start
-            )
-            
-            docs = query.get()
-            
-            total_minutes = 0
-            sessions_count = 0
-            
-            for doc in docs:
-                data = doc.to_dict()
-                total_minutes += data.get('completed_minutes', 0)
-                sessions_count += 1
-            
-            # Получаем общую статистику для streak
-            user_stats = await self.get_user_stats(user_id)
-            
-            return {
-                'completed_sessions': sessions_count,
-                'total_minutes': total_minutes,
-                'avg_duration': total_minutes // sessions_count if sessions_count > 0 else 0,
-                'current_streak': user_stats.get('current_streak', 0),
-                'best_streak': user_stats.get('best_streak', 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения статистики за неделю: {e}")
-            return {
-                'completed_sessions': 0,
-                'total_minutes': 0,
-                'avg_duration': 0,
-                'current_streak': 0,
-                'best_streak': 0
-            }
+        return await self._get_period_stats(user_id, days=8)
     
     async def get_month_stats(self, user_id: str) -> Dict[str, Any]:
         """
         Получает статистику за месяц.
         """
-        try:
-            month_start = datetime.combine(
-                date.today() - timedelta(days=30),
-                datetime.min.time()
-            ).replace(tzinfo=timezone.utc)
-            
-            sessions_ref = self.db.collection('focus_sessions')
-            query = sessions_ref.where(
-                'user_id', '==', user_id
-            ).where(
-                'status', '==', 'completed'
-            ).where(
-                'started_at', '>=', month_start
-            )
-            
-            docs = query.get()
-            
-            total_minutes = 0
-            sessions_count = 0
-            
-            for doc in docs:
-                data = doc.to_dict()
-                total_minutes += data.get('completed_minutes', 0)
-                sessions_count += 1
-            
-            # Получаем общую статистику для streak
-            user_stats = await self.get_user_stats(user_id)
-            
-            return {
-                'completed_sessions': sessions_count,
-                'total_minutes': total_minutes,
-                'avg_duration': total_minutes // sessions_count if sessions_count > 0 else 0,
-                'current_streak': user_stats.get('current_streak', 0),
-                'best_streak': user_stats.get('best_streak', 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения статистики за месяц: {e}")
-            return {
-                'completed_sessions': 0,
-                'total_minutes': 0,
-                'avg_duration': 0,
-                'current_streak': 0,
-                'best_streak': 0
-            }
+        return await self._get_period_stats(user_id, days=31)
     
     async def get_all_time_stats(self, user_id: str) -> Dict[str, Any]:
         """
         Получает статистику за всё время.
         """
         try:
-            user_stats = await self.get_user_stats(user_id)
+            # Дневные rollup'ы не нужны - общие счетчики лежат в документе пользователя
+            user_data = await self._get_user_data(user_id)
+            stats = user_data.get('focus_stats', {})
             
             return {
-                'completed_sessions': user_stats.get('total_sessions', 0),
-                'total_minutes': user_stats.get('total_minutes', 0),
+                'completed_sessions': stats.get('total_sessions', 0),
+                'total_minutes': stats.get('total_minutes', 0),
                 'avg_duration': (
-                    user_stats.get('total_minutes', 0) // user_stats.get('total_sessions', 1)
-                    if user_stats.get('total_sessions', 0) > 0 else 0
+                    stats.get('total_minutes', 0) // stats.get('total_sessions', 1)
+                    if stats.get('total_sessions', 0) > 0 else 0
                 ),
-                'current_streak': user_stats.get('current_streak', 0),
-                'best_streak': user_stats.get('best_streak', 0)
+                'current_streak': self._active_streak(user_data),
+                'best_streak': stats.get('best_streak', 0)
             }
             
         except Exception as e:
@@ -497,14 +428,78 @@ class FocusDB:
     
     # === Вспомогательные методы ===
     
-    async def _get_sessions_count_today(self, user_id: str) -> int:
+    def _rollup_ref(self, user_id: str, day: date):
+        """Ссылка на дневной rollup: users/{id}/focus_daily/{YYYY-MM-DD}"""
+        return self.db.collection('users').document(user_id)\
+            .collection(ROLLUP_COLLECTION).document(day.isoformat())
+    
+    @staticmethod
+    def _active_streak(user_data: Dict[str, Any]) -> int:
+        """Серия фокус-сессий на сегодня в часовом поясе пользователя"""
+        stats = user_data.get('focus_stats', {})
+        tz_offset = get_tz_offset(user_data)
+        return active_streak(
+            local_date(stats.get('last_session_date'), tz_offset),
+            stats.get('current_streak', 0),
+            today_local(tz_offset)
+        )
+    
+    async def _get_user_data(self, user_id: str) -> Dict[str, Any]:
+        """Получает из документа пользователя только поля статистики"""
+        user_ref = self.db.collection('users').document(user_id)
+        return get_fields(user_ref, ['focus_stats', TZ_OFFSET_FIELD]) or {}
+    
+    async def _get_rollups(
+        self,
+        user_id: str,
+        user_data: Dict[str, Any],
+        days: int
+    ) -> Dict[str, int]:
         """
-        Получает количество сессий за сегодня.
+        Суммирует дневные rollup'ы за последние days дней (включая сегодня).
+        Все документы читаются одним запросом get_all.
+        """
+        today = today_local(get_tz_offset(user_data))
+        refs = [self._rollup_ref(user_id, today - timedelta(days=i)) for i in range(days)]
+        
+        total_minutes = 0
+        sessions_count = 0
+        for doc in self.db.get_all(refs):
+            if doc.exists:
+                data = doc.to_dict()
+                total_minutes += data.get('total_minutes', 0)
+                sessions_count += data.get('completed_sessions', 0)
+        
+        return {
+            'completed_sessions': sessions_count,
+            'total_minutes': total_minutes
+        }
+    
+    async def _get_period_stats(self, user_id: str, days: int) -> Dict[str, Any]:
+        """
+        Получает статистику за период из дневных rollup'ов
         """
         try:
-            stats = await self.get_today_stats(user_id)
-            return stats.get('completed_sessions', 0)
+            user_data = await self._get_user_data(user_id)
+            stats = user_data.get('focus_stats', {})
+            period = await self._get_rollups(user_id, user_data, days)
+            sessions_count = period['completed_sessions']
+            total_minutes = period['total_minutes']
+            
+            return {
+                'completed_sessions': sessions_count,
+                'total_minutes': total_minutes,
+                'avg_duration': total_minutes // sessions_count if sessions_count > 0 else 0,
+                'current_streak': self._active_streak(user_data),
+                'best_streak': stats.get('best_streak', 0)
+            }
             
         except Exception as e:
-            logger.error(f"Ошибка подсчета сессий за сегодня: {e}")
-            return 0
\ No newline at end of file
+            logger.error(f"Ошибка получения статистики за {days} дн.: {e}")
+            return {
+                'completed_sessions': 0,
+                'total_minutes': 0,
+                'avg_duration': 0,
+                'current_streak': 0,
+                'best_streak': 0
+            }
@@ -1,19 +1,26 @@
 """
 Функции для работы с геймификацией в Firestore
 """
-from google.cloud import firestore
-from typing import Dict, List, Optional, Any, Tuple
+from utils.lazy_import import lazy_module
+from collections import ChainMap
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime, date
 import logging
 from utils.achievements import ACHIEVEMENTS, POINTS_TABLE, check_achievements_for_user
+from database.projections import get_fields
+from utils.metrics import instrument_db
+from utils.leaderboard import leaderboards
+
+firestore = lazy_module('google.cloud.firestore')
 
 logger = logging.getLogger(__name__)
 
 
+@instrument_db
 class GamificationDB:
     """Класс для работы с очками и достижениями в Firestore"""
     
-    def __init__(self, db: firestore.Client):
+    def __init__(self, db: "firestore.Client"):
         """
         Инициализация с существующим клиентом Firestore
         
@@ -43,10 +50,8 @@ class GamificationDB:
             
             # Получаем текущий баланс
             user_doc = user_ref.get()
-            if user_doc.exists:
-                current_balance = user_doc.to_dict().get('points_balance', 0)
-            else:
-                current_balance = 0
+            user_data = user_doc.to_dict() if user_doc.exists else {}
+            current_balance = user_data.get('points_balance', 0)
             
             new_balance = current_balance + points
             
@@ -68,7 +73,11 @@ class GamificationDB:
             
             user_ref.collection('points_history').add(history_data)
             
-            logger.info(f"Начислено {points} очков пользователю {telegram_id}. Новый баланс: {new_balance}")
+            leaderboards.record_points(
+                int(telegram_id), user_data.get('total_points_earned', 0) + points, points
+            )
+            
+            logger.debug(f"Начислено {points} очков пользователю {telegram_id}. Новый баланс: {new_balance}")
             return True, new_balance
             
         except Exception as e:
@@ -81,16 +90,41 @@ class GamificationDB:
         """
         try:
             user_ref = self.db.collection('users').document(str(telegram_id))
-            user_doc = user_ref.get()
+            user_data = get_fields(user_ref, ['points_balance'])
             
-            if user_doc.exists:
-                return user_doc.to_dict().get('points_balance', 0)
+            if user_data is not None:
+                return user_data.get('points_balance', 0)
             return 0
             
         except Exception as e:
             logger.error(f"Ошибка при получении баланса: {e}")
             return 0
     
+    async def get_display_names(self, telegram_ids: List[int]) -> Dict[int, str]:
+        """
+        Имена пользователей для рейтинга одним запросом
+        
+        Args:
+            telegram_ids: ID пользователей
+            
+        Returns:
+            {telegram_id: full_name} для найденных пользователей
+        """
+        if not telegram_ids:
+            return {}
+        try:
+            users = self.db.collection('users')
+            refs = [users.document(str(telegram_id)) for telegram_id in telegram_ids]
+            names = {}
+            for doc in self.db.get_all(refs, field_paths=['full_name']):
+                if doc.exists:
+                    names[int(doc.id)] = (doc.to_dict() or {}).get('full_name') or 'Пользователь'
+            return names
+            
+        except Exception as e:
+            logger.error(f"Ошибка при получении имен пользователей: {e}")
+            return {}
+    
     async def get_points_history(self, telegram_id: int, limit: int = 10) -> List[Dict]:
         """
         Получает историю начисления очков
@@ -176,11 +210,12 @@ class GamificationDB:
                 ach_data = ach.to_dict()
                 ach_id = ach_data['achievement_id']
                 
-                # Добавляем информацию о достижении
+                # Данные пользователя поверх общего описания (без копирования каталога)
                 if ach_id in ACHIEVEMENTS:
-                    ach_info = ACHIEVEMENTS[ach_id].copy()
-                    ach_info['unlocked_at'] = ach_data['unlocked_at']
-                    achievements_list.append(ach_info)
+                    achievements_list.append(ChainMap(
+                        {'achievement_id': ach_id, 'unlocked_at': ach_data['unlocked_at']},
+                        ACHIEVEMENTS[ach_id]
+                    ))
             
             return achievements_list
             
@@ -188,6 +223,17 @@ class GamificationDB:
             logger.error(f"Ошибка при получении достижений: {e}")
             return []
     
+    async def get_unlocked_achievement_ids(self, telegram_id: int) -> Set[str]:
+        """
+        Получает ID разблокированных достижений (без чтения полей документов)
+        """
+        try:
+            user_ref = self.db.collection('users').document(str(telegram_id))
+            return {ach.id for ach in user_ref.collection('achievements').select([]).stream()}
+        except Exception as e:
+            logger.error(f"Ошибка при получении ID достижений: {e}")
+            return set()
+    
     async def check_and_unlock_achievements(self, telegram_id: int) -> List[str]:
         """
         Проверяет и разблокирует новые достижения
@@ -200,9 +246,7 @@ class GamificationDB:
             user_stats = await self._get_user_stats(telegram_id)
             
             # Получаем уже разблокированные достижения
-            user_ref = self.db.collection('users').document(str(telegram_id))
-            unlocked = user_ref.collection('achievements').stream()
-            unlocked_ids = [ach.id for ach in unlocked]
+            unlocked_ids = await self.get_unlocked_achievement_ids(telegram_id)
             
             # Проверяем новые достижения
             new_achievements = check_achievements_for_user(user_stats, unlocked_ids)
@@ -304,11 +348,9 @@ class GamificationDB:
         
         try:
             user_ref = self.db.collection('users').document(str(telegram_id))
-            user_doc = user_ref.get()
+            user_data = get_fields(user_ref, ['focus_settings', 'checklist_stats'])
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                
+            if user_data is not None:
                 # Статистика привычек
                 try:
                     habits = user_ref.collection('habits').stream()
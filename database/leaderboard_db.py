@@ -0,0 +1,119 @@
+"""
+Снимки рейтингов в Firestore
+
+leaderboards/{board} - метаданные снимка (поколение, число шардов, размер,
+неделя), leaderboards/{board}/shards/{поколение}-{номер} - ключи рейтинга
+блоками по SHARD_KEYS (8 байт на пользователя, до ~800 КБ на документ).
+Новое поколение шардов записывается целиком до переключения метаданных,
+поэтому прерванная запись не портит предыдущий снимок.
+"""
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+from utils.lazy_import import lazy_module
+from utils.metrics import instrument_db
+
+firestore = lazy_module('google.cloud.firestore')
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARDS_COLLECTION = 'leaderboards'
+SHARDS_COLLECTION = 'shards'
+# Ключей в одном шарде: документ Firestore ограничен 1 МБ
+SHARD_KEYS = 100_000
+KEY_BYTES = 8
+
+
+@instrument_db
+class LeaderboardDB:
+    """Запись и загрузка снимков рейтингов"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Клиент Firestore
+        """
+        self.db = db
+
+    def _meta_ref(self, board: str):
+        return self.db.collection(LEADERBOARDS_COLLECTION).document(board)
+
+    def _shard_ref(self, board: str, generation: int, number: int):
+        return self._meta_ref(board).collection(SHARDS_COLLECTION).document(f"{generation}-{number:04d}")
+
+    def _save(self, board: str, data: bytes, week: str) -> int:
+        meta_ref = self._meta_ref(board)
+        meta_doc = meta_ref.get()
+        previous = meta_doc.to_dict() if meta_doc.exists else {}
+        generation = previous.get('generation', 0) + 1
+
+        shard_bytes = SHARD_KEYS * KEY_BYTES
+        shards = [data[i:i + shard_bytes] for i in range(0, len(data), shard_bytes)]
+        for number, chunk in enumerate(shards):
+            self._shard_ref(board, generation, number).set({'keys': chunk})
+
+        meta_ref.set({
+            'generation': generation,
+            'shards': len(shards),
+            'size': len(data) // KEY_BYTES,
+            'week': week,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+
+        # Предыдущее поколение больше не нужно
+        old_generation = previous.get('generation')
+        if old_generation is not None:
+            for number in range(previous.get('shards', 0)):
+                self._shard_ref(board, old_generation, number).delete()
+        return len(shards)
+
+    async def save_snapshot(self, board: str, data: bytes, week: str) -> bool:
+        """
+        Сохраняет снимок рейтинга
+
+        Args:
+            board: Имя рейтинга
+            data: Ключи рейтинга (LeaderboardSet.dump)
+            week: Текущая неделя недельного рейтинга
+
+        Returns:
+            True если снимок записан
+        """
+        try:
+            shards = await asyncio.to_thread(self._save, board, data, week)
+            logger.debug(f"Снимок рейтинга {board}: {len(data) // KEY_BYTES} пользователей, {shards} шардов")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения рейтинга {board}: {e}")
+            return False
+
+    def _load(self, board: str) -> Optional[Tuple[bytes, str]]:
+        meta_doc = self._meta_ref(board).get()
+        if not meta_doc.exists:
+            return None
+        meta = meta_doc.to_dict()
+        chunks = []
+        for number in range(meta.get('shards', 0)):
+            shard = self._shard_ref(board, meta['generation'], number).get()
+            if not shard.exists:
+                logger.error(f"Снимок рейтинга {board} неполный: нет шарда {number}, "
+                             f"восстановите его scripts/rebuild_leaderboards.py")
+                return None
+            chunks.append(bytes(shard.to_dict()['keys']))
+        return b''.join(chunks), meta.get('week', '')
+
+    async def load_snapshot(self, board: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Загружает снимок рейтинга
+
+        Ошибки чтения не глотаются: пустой рейтинг вместо недочитанного
+        снимка затер бы его при следующем сохранении.
+
+        Args:
+            board: Имя рейтинга
+
+        Returns:
+            (ключи рейтинга, неделя) или None если снимка нет
+        """
+        return await asyncio.to_thread(self._load, board)
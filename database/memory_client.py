@@ -0,0 +1,806 @@
+"""
+In-memory клиент Firestore для разработки, тестов и нагрузочных прогонов
+
+Реализует подмножество API google.cloud.firestore.Client, которое
+используют классы из database/: коллекции и подколлекции, документы,
+запросы (where/order_by/limit/start_after/end_before/select, сортировка
+по __name__), batch-записи, get_all, collection_group с get_partitions
+и трансформации Increment/ArrayUnion/ArrayRemove/
+SERVER_TIMESTAMP/DELETE_FIELD. Поэтому любой *DB класс работает с ним
+без изменений и с той же семантикой, что и с Firestore.
+
+Для реалистичной нагрузки поддерживаются вторичные индексы
+(равенство по набору полей и диапазон по одному полю), а также
+искусственная задержка и доля ошибок на каждый RPC.
+"""
+import bisect
+import copy
+import logging
+import os
+import random
+import string
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TRANSFORMS_MODULE = 'google.cloud.firestore_v1.transforms'
+
+
+def _get_transforms():
+    # Сентинелы (Increment, SERVER_TIMESTAMP...) существуют, только если
+    # вызывающий код уже импортировал библиотеку, - сами ее не грузим
+    return sys.modules.get(_TRANSFORMS_MODULE)
+
+
+DESCENDING = 'DESCENDING'
+ASCENDING = 'ASCENDING'
+
+# Индексы по умолчанию - те же, что нужны запросам FocusDB в Firestore
+DEFAULT_EQUALITY_INDEXES = {
+    'focus_sessions': [('user_id', 'status'), ('status',)],
+}
+DEFAULT_RANGE_INDEXES = {
+    'focus_sessions': ['started_at'],
+    'reminders': ['next_due'],
+}
+
+
+class MemoryDBError(Exception):
+    """Искусственная ошибка, имитирующая сбой RPC"""
+
+
+class NotFound(Exception):
+    """Документ не найден (аналог google.api_core.exceptions.NotFound)"""
+
+
+def _auto_id() -> str:
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(random.choice(alphabet) for _ in range(20))
+
+
+def _is_sentinel(value: Any, name: str) -> bool:
+    transforms = _get_transforms()
+    return transforms is not None and value is getattr(transforms, name, None)
+
+
+def _normalize(value: Any) -> Any:
+    """Приводит значение к виду, в котором его хранит Firestore"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+    if isinstance(value, date):
+        raise TypeError(f"Cannot convert to a Firestore Value: {value!r}")
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if hasattr(value, 'value') and hasattr(value, 'name') and isinstance(value.value, str):
+        # Enum со строковыми значениями
+        return value.value
+    return value
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    """Ключ сортировки по правилам Firestore: сначала тип, затем значение"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value.timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, list):
+        return (8, tuple(_sort_key(item) for item in value))
+    if isinstance(value, dict):
+        return (9, tuple(sorted((key, _sort_key(item)) for key, item in value.items())))
+    return (6, str(value))
+
+
+_MISSING = object()
+
+# Поле пути документа (FieldPath.document_id()) в order_by и курсорах
+NAME_FIELD = '__name__'
+
+
+def _path_key(path: str) -> Tuple[int, Tuple[str, ...]]:
+    """Ключ сортировки по пути документа: Firestore сравнивает посегментно"""
+    return (10, tuple(path.split('/')))
+
+
+def _order_key(path: str, data: Dict[str, Any], field: str) -> Tuple:
+    if field == NAME_FIELD:
+        return _path_key(path)
+    return _sort_key(_get_path(data, field))
+
+
+def _get_path(data: Dict[str, Any], field_path: str) -> Any:
+    current: Any = data
+    for part in field_path.split('.'):
+        if not isinstance(current, dict) or part not in current:
+            return _MISSING
+        current = current[part]
+    return current
+
+
+def _set_path(data: Dict[str, Any], field_path: str, value: Any):
+    parts = field_path.split('.')
+    current = data
+    for part in parts[:-1]:
+        if not isinstance(current.get(part), dict):
+            current[part] = {}
+        current = current[part]
+    current[parts[-1]] = value
+
+
+def _delete_path(data: Dict[str, Any], field_path: str):
+    parts = field_path.split('.')
+    current = data
+    for part in parts[:-1]:
+        current = current.get(part)
+        if not isinstance(current, dict):
+            return
+    current.pop(parts[-1], None)
+
+
+def _apply_value(current: Any, value: Any) -> Any:
+    """Применяет трансформацию к текущему значению поля"""
+    now = datetime.now(timezone.utc)
+    if _is_sentinel(value, 'SERVER_TIMESTAMP'):
+        return now
+    transforms = _get_transforms()
+    if transforms is not None:
+        if isinstance(value, transforms.Increment):
+            base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+            return base + value.value
+        if isinstance(value, transforms.ArrayUnion):
+            result = list(current) if isinstance(current, list) else []
+            for item in _normalize(list(value.values)):
+                if item not in result:
+                    result.append(item)
+            return result
+        if isinstance(value, transforms.ArrayRemove):
+            removed = _normalize(list(value.values))
+            return [item for item in (current if isinstance(current, list) else []) if item not in removed]
+    if isinstance(value, dict):
+        return {key: _apply_value(_MISSING, item) for key, item in value.items()}
+    return _normalize(value)
+
+
+def _deep_merge(target: Dict[str, Any], source: Dict[str, Any]):
+    for key, value in source.items():
+        if _is_sentinel(value, 'DELETE_FIELD'):
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = _apply_value(target.get(key, _MISSING), value)
+
+
+def _project(data: Dict[str, Any], field_paths: Optional[Sequence[str]]) -> Dict[str, Any]:
+    if field_paths is None:
+        return copy.deepcopy(data)
+    result: Dict[str, Any] = {}
+    for field_path in field_paths:
+        value = _get_path(data, field_path)
+        if value is not _MISSING:
+            _set_path(result, field_path, copy.deepcopy(value))
+    return result
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return _sort_key(value) == _sort_key(expected)
+    if op == '!=':
+        return value is not None and _sort_key(value) != _sort_key(expected)
+    if op == 'in':
+        return any(_sort_key(value) == _sort_key(item) for item in expected)
+    if op == 'not-in':
+        return value is not None and all(_sort_key(value) != _sort_key(item) for item in expected)
+    if op == 'array_contains':
+        return isinstance(value, list) and any(_sort_key(item) == _sort_key(expected) for item in value)
+    if op == 'array_contains_any':
+        return isinstance(value, list) and any(
+            _sort_key(item) == _sort_key(candidate) for item in value for candidate in expected
+        )
+
+    left, right = _sort_key(value), _sort_key(expected)
+    if left[0] != right[0]:
+        # Диапазонные фильтры сравнивают только значения одного типа
+        return False
+    if op == '<':
+        return left < right
+    if op == '<=':
+        return left <= right
+    if op == '>':
+        return left > right
+    if op == '>=':
+        return left >= right
+    raise ValueError(f"Неподдерживаемый оператор: {op}")
+
+
+class MemoryDocumentSnapshot:
+    """Снимок документа"""
+
+    def __init__(self, reference: 'MemoryDocumentReference', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        if self._data is None:
+            return None
+        value = _get_path(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryQuery:
+    """Запрос к коллекции (неизменяемый, как в Firestore)"""
+
+    def __init__(self, client: 'MemoryFirestoreClient', collection_path: Optional[str],
+                 collection_id: Optional[str] = None, filters: Tuple = (), orders: Tuple = (),
+                 limit_count: Optional[int] = None, cursor: Optional[Tuple] = None,
+                 end_cursor: Optional[Tuple] = None, projection: Optional[Tuple[str, ...]] = None):
+        self._client = client
+        self._collection_path = collection_path
+        self._collection_id = collection_id  # для collection_group
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit_count
+        self._cursor = cursor
+        self._end_cursor = end_cursor
+        self._projection = projection
+
+    def _copy(self, **changes) -> 'MemoryQuery':
+        params = {
+            'collection_path': self._collection_path,
+            'collection_id': self._collection_id,
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit_count': self._limit,
+            'cursor': self._cursor,
+            'end_cursor': self._end_cursor,
+            'projection': self._projection,
+        }
+        params.update(changes)
+        return MemoryQuery(self._client, **params)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None,
+              value: Any = None, *, filter=None) -> 'MemoryQuery':
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, _normalize(value)),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> 'MemoryQuery':
+        return self._copy(orders=self._orders + ((field_path, str(direction).upper()),))
+
+    def limit(self, count: int) -> 'MemoryQuery':
+        return self._copy(limit_count=count)
+
+    def start_after(self, document_fields_or_snapshot) -> 'MemoryQuery':
+        return self._copy(cursor=(document_fields_or_snapshot, False))
+
+    def start_at(self, document_fields_or_snapshot) -> 'MemoryQuery':
+        return self._copy(cursor=(document_fields_or_snapshot, True))
+
+    def end_before(self, document_fields_or_snapshot) -> 'MemoryQuery':
+        return self._copy(end_cursor=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot) -> 'MemoryQuery':
+        return self._copy(end_cursor=(document_fields_or_snapshot, True))
+
+    def get_partitions(self, partition_count: int):
+        """
+        Делит выборку на диапазоны по пути документа (как Firestore)
+
+        Возвращает partition_count или меньше частей: границы - ссылки на
+        документы, start_at включительно, end_at - не включительно.
+        """
+        self._client._rpc('partition')
+        with self._client._lock:
+            paths = sorted((path for path, _ in self._copy(orders=(), cursor=None, end_cursor=None,
+                                                             limit_count=None)._execute()), key=_path_key)
+        count = max(1, min(partition_count, len(paths)))
+        bounds = [MemoryDocumentReference(self._client, paths[len(paths) * i // count]) for i in range(1, count)]
+        for start_at, end_at in zip([None] + bounds, bounds + [None]):
+            yield MemoryQueryPartition(self, start_at, end_at)
+
+    def select(self, field_paths: Iterable[str]) -> 'MemoryQuery':
+        return self._copy(projection=tuple(field_paths))
+
+    def stream(self, transaction=None):
+        yield from self.get()
+
+    def get(self, transaction=None) -> List[MemoryDocumentSnapshot]:
+        client = self._client
+        client._rpc('query')
+        with client._lock:
+            docs = self._execute()
+            client.stats['docs_read'] += max(1, len(docs))
+            return [
+                MemoryDocumentSnapshot(MemoryDocumentReference(client, path), _project(data, self._projection))
+                for path, data in docs
+            ]
+
+    # === Выполнение запроса ===
+
+    def _execute(self) -> List[Tuple[str, Dict[str, Any]]]:
+        client = self._client
+        if self._collection_id is not None:
+            paths = [
+                f"{collection_path}/{doc_id}"
+                for collection_path in client._groups.get(self._collection_id, ())
+                for doc_id in client._collections.get(collection_path, ())
+            ]
+        else:
+            paths = [f"{self._collection_path}/{doc_id}" for doc_id in self._candidates()]
+
+        results = []
+        for path in paths:
+            data = client._docs.get(path)
+            if data is None:
+                continue
+            if all(_matches(_get_path(data, field), op, value) for field, op, value in self._filters):
+                results.append((path, data))
+
+        # Firestore неявно сортирует по полю диапазонного фильтра
+        orders = list(self._orders)
+        if not orders:
+            for field, op, _ in self._filters:
+                if op in ('<', '<=', '>', '>=', '!=', 'not-in'):
+                    orders.append((field, ASCENDING))
+                    break
+
+        # Документы без поля сортировки исключаются из результата
+        results = [item for item in results
+                   if all(f == NAME_FIELD or _get_path(item[1], f) is not _MISSING for f, _ in orders)]
+
+        results.sort(key=lambda item: item[0])
+        for field, direction in reversed(orders):
+            results.sort(key=lambda item: _order_key(item[0], item[1], field),
+                         reverse=direction == DESCENDING)
+
+        if self._cursor is not None:
+            results = self._apply_cursor(results, orders, self._cursor, end=False)
+        if self._end_cursor is not None:
+            results = self._apply_cursor(results, orders, self._end_cursor, end=True)
+
+        if self._limit is not None:
+            results = results[:self._limit]
+        return results
+
+    def _candidates(self) -> Iterable[str]:
+        """Выбирает ID документов через индекс, если он подходит"""
+        client = self._client
+        collection_path = self._collection_path
+        collection_id = collection_path.rsplit('/', 1)[-1]
+        equalities = {field: value for field, op, value in self._filters if op == '=='}
+        in_filters = {field: value for field, op, value in self._filters if op == 'in'}
+
+        for fields in client.equality_indexes.get(collection_id, ()):
+            if not all(field in equalities or field in in_filters for field in fields):
+                continue
+            index = client._eq_index[(collection_path, fields)]
+            value_sets = [
+                [equalities[field]] if field in equalities else list(in_filters[field])
+                for field in fields
+            ]
+            ids = set()
+            for combo in _product(value_sets):
+                ids.update(index.get(tuple(_sort_key(v) for v in combo), ()))
+            client.stats['index_hits'] += 1
+            return sorted(ids)
+
+        for field in client.range_indexes.get(collection_id, ()):
+            bounds = [(op, value) for f, op, value in self._filters if f == field and op in ('<', '<=', '>', '>=')]
+            if not bounds:
+                continue
+            entries = client._range_index[(collection_path, field)]
+            lo, hi = 0, len(entries)
+            for op, value in bounds:
+                key = _sort_key(value)
+                if op == '>':
+                    lo = max(lo, bisect.bisect_right(entries, (key, '\U0010ffff')))
+                elif op == '>=':
+                    lo = max(lo, bisect.bisect_left(entries, (key, '')))
+                elif op == '<':
+                    hi = min(hi, bisect.bisect_left(entries, (key, '')))
+                else:
+                    hi = min(hi, bisect.bisect_right(entries, (key, '\U0010ffff')))
+            client.stats['index_hits'] += 1
+            return sorted(doc_id for _, doc_id in entries[lo:hi])
+
+        client.stats['full_scans'] += 1
+        return sorted(client._collections.get(collection_path, ()))
+
+    def _apply_cursor(self, results, orders, cursor_spec, end: bool):
+        cursor, inclusive = cursor_spec
+        if isinstance(cursor, MemoryDocumentReference):
+            cursor = MemoryDocumentSnapshot(cursor, self._client._docs.get(cursor.path))
+        if isinstance(cursor, MemoryDocumentSnapshot):
+            if not cursor.exists:
+                # Как в Firestore: у снимка удаленного документа нет значений для курсора
+                raise TypeError(f"Снимок несуществующего документа {cursor.reference.path} как курсор")
+            path = cursor.reference.path
+            data = self._client._docs.get(path) or cursor._data or {}
+            values = [_order_key(path, data, field) for field, _ in orders] + [path]
+        else:
+            values = [
+                _path_key(getattr(cursor[field], 'path', cursor[field])) if field == NAME_FIELD
+                else _sort_key(_get_path(cursor, field))
+                for field, _ in orders
+            ] + [None]
+
+        def compare(item) -> int:
+            """-1/0/1: документ до курсора, на нем или после"""
+            for (field, direction), cursor_key in zip(orders, values):
+                item_key = _order_key(item[0], item[1], field)
+                if item_key != cursor_key:
+                    after = 1 if item_key > cursor_key else -1
+                    return after if direction != DESCENDING else -after
+            if values[-1] is None or item[0] == values[-1]:
+                return 0
+            return 1 if item[0] > values[-1] else -1
+
+        side = -1 if end else 1
+        return [item for item in results if compare(item) in ((side, 0) if inclusive else (side,))]
+
+
+class MemoryQueryPartition:
+    """Часть выборки из get_partitions(): диапазон [start_at, end_at) по пути документа"""
+
+    def __init__(self, parent: MemoryQuery, start_at: Optional['MemoryDocumentReference'],
+                 end_at: Optional['MemoryDocumentReference']):
+        self._parent = parent
+        self.start_at = start_at
+        self.end_at = end_at
+
+    def query(self) -> MemoryQuery:
+        query = self._parent.order_by(NAME_FIELD)
+        if self.start_at is not None:
+            query = query.start_at({NAME_FIELD: self.start_at})
+        if self.end_at is not None:
+            query = query.end_before({NAME_FIELD: self.end_at})
+        return query
+
+
+def _product(value_sets):
+    if not value_sets:
+        yield ()
+        return
+    for value in value_sets[0]:
+        for rest in _product(value_sets[1:]):
+            yield (value,) + rest
+
+
+class MemoryCollectionReference(MemoryQuery):
+    """Ссылка на коллекцию"""
+
+    def __init__(self, client: 'MemoryFirestoreClient', path: str):
+        super().__init__(client, path)
+        self.path = path
+
+    @property
+    def id(self) -> str:
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self) -> Optional['MemoryDocumentReference']:
+        if '/' not in self.path:
+            return None
+        return MemoryDocumentReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def document(self, document_id: Optional[str] = None) -> 'MemoryDocumentReference':
+        return MemoryDocumentReference(self._client, f"{self.path}/{document_id or _auto_id()}")
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        doc_ref = self.document(document_id)
+        doc_ref.set(document_data)
+        return datetime.now(timezone.utc), doc_ref
+
+    def list_documents(self, page_size: Optional[int] = None):
+        self._client._rpc('list')
+        with self._client._lock:
+            ids = sorted(self._client._collections.get(self.path, ()))
+        return [self.document(doc_id) for doc_id in ids]
+
+
+class MemoryDocumentReference:
+    """Ссылка на документ"""
+
+    def __init__(self, client: 'MemoryFirestoreClient', path: str):
+        self._client = client
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    @property
+    def id(self) -> str:
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, collection_id: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def collections(self, page_size: Optional[int] = None):
+        self._client._rpc('list')
+        prefix = self.path + '/'
+        with self._client._lock:
+            paths = [
+                path for path, ids in self._client._collections.items()
+                if ids and path.startswith(prefix) and '/' not in path[len(prefix):]
+            ]
+        return [MemoryCollectionReference(self._client, path) for path in sorted(paths)]
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction=None) -> MemoryDocumentSnapshot:
+        self._client._rpc('get')
+        with self._client._lock:
+            self._client.stats['docs_read'] += 1
+            data = self._client._docs.get(self.path)
+            projection = tuple(field_paths) if field_paths is not None else None
+            return MemoryDocumentSnapshot(self, _project(data, projection) if data is not None else None)
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        self._client._rpc('set')
+        with self._client._lock:
+            self._client._write(self.path, 'set', document_data, merge)
+
+    def update(self, field_updates: Dict[str, Any]):
+        self._client._rpc('update')
+        with self._client._lock:
+            self._client._write(self.path, 'update', field_updates)
+
+    def delete(self):
+        self._client._rpc('delete')
+        with self._client._lock:
+            self._client._write(self.path, 'delete')
+
+
+class MemoryWriteBatch:
+    """Пакет записей, применяемый атомарно при commit()"""
+
+    def __init__(self, client: 'MemoryFirestoreClient'):
+        self._client = client
+        self._writes: List[Tuple] = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference: MemoryDocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._writes.append((reference.path, 'set', document_data, merge))
+
+    def update(self, reference: MemoryDocumentReference, field_updates: Dict[str, Any]):
+        self._writes.append((reference.path, 'update', field_updates, False))
+
+    def delete(self, reference: MemoryDocumentReference):
+        self._writes.append((reference.path, 'delete', None, False))
+
+    def commit(self):
+        if len(self._writes) > 500:
+            raise ValueError("Batch не может содержать больше 500 операций")
+        self._client._rpc('commit')
+        with self._client._lock:
+            # Сначала проверяем, что все update применимы - batch атомарен
+            for path, op, _, _ in self._writes:
+                if op == 'update' and path not in self._client._docs:
+                    raise NotFound(f"No document to update: {path}")
+            for path, op, data, merge in self._writes:
+                self._client._write(path, op, data, merge)
+        self._writes = []
+
+
+class MemoryFirestoreClient:
+    """
+    In-memory замена google.cloud.firestore.Client
+
+    Args:
+        latency_ms: Задержка на каждый RPC (имитирует сетевой вызов
+            синхронного клиента, который так же блокирует поток)
+        jitter_ms: Случайная добавка к задержке
+        error_rate: Доля RPC, завершающихся MemoryDBError (0..1)
+        equality_indexes: {collection_id: [(field, ...), ...]}
+        range_indexes: {collection_id: [field, ...]}
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 equality_indexes: Optional[Dict[str, List[Tuple[str, ...]]]] = None,
+                 range_indexes: Optional[Dict[str, List[str]]] = None, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.equality_indexes = equality_indexes if equality_indexes is not None else DEFAULT_EQUALITY_INDEXES
+        self.range_indexes = range_indexes if range_indexes is not None else DEFAULT_RANGE_INDEXES
+        self.stats: Counter = Counter()
+
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._collections: Dict[str, set] = defaultdict(set)
+        self._groups: Dict[str, set] = defaultdict(set)
+        self._eq_index: Dict[Tuple, Dict[Tuple, set]] = defaultdict(lambda: defaultdict(set))
+        self._range_index: Dict[Tuple[str, str], List[Tuple]] = defaultdict(list)
+
+    @classmethod
+    def from_env(cls) -> 'MemoryFirestoreClient':
+        """Создает клиент с параметрами из MEMORY_DB_* переменных окружения"""
+        return cls(
+            latency_ms=float(os.getenv('MEMORY_DB_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv('MEMORY_DB_JITTER_MS', '0')),
+            error_rate=float(os.getenv('MEMORY_DB_ERROR_RATE', '0'))
+        )
+
+    # === API клиента Firestore ===
+
+    def collection(self, *path: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self, '/'.join(path))
+
+    def document(self, *path: str) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self, '/'.join(path))
+
+    def collection_group(self, collection_id: str) -> MemoryQuery:
+        return MemoryQuery(self, None, collection_id=collection_id)
+
+    def collections(self):
+        with self._lock:
+            paths = [path for path, ids in self._collections.items() if ids and '/' not in path]
+        return [MemoryCollectionReference(self, path) for path in sorted(paths)]
+
+    def batch(self) -> MemoryWriteBatch:
+        return MemoryWriteBatch(self)
+
+    def get_all(self, references: Iterable[MemoryDocumentReference], field_paths=None, transaction=None):
+        references = list(references)
+        self._rpc('get_all')
+        projection = tuple(field_paths) if field_paths is not None else None
+        with self._lock:
+            self.stats['docs_read'] += len(references)
+            snapshots = [
+                MemoryDocumentSnapshot(ref, _project(self._docs[ref.path], projection) if ref.path in self._docs else None)
+                for ref in references
+            ]
+        yield from snapshots
+
+    def close(self):
+        pass
+
+    def clear(self):
+        """Удаляет все документы (изоляция тестов на общем клиенте)"""
+        with self._lock:
+            self._docs.clear()
+            self._collections.clear()
+            self._groups.clear()
+            self._eq_index.clear()
+            self._range_index.clear()
+            self.stats.clear()
+
+    # === Внутреннее ===
+
+    def _rpc(self, op: str):
+        """Учет, задержка и инъекция ошибок для одного RPC"""
+        self.stats[op] += 1
+        delay = self.latency_ms + (self._random.random() * self.jitter_ms if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            raise MemoryDBError(f"Injected failure on {op}")
+
+    def _write(self, path: str, op: str, data: Optional[Dict[str, Any]] = None, merge: bool = False):
+        old = self._docs.get(path)
+        if op == 'delete':
+            new = None
+        elif op == 'update':
+            if old is None:
+                raise NotFound(f"No document to update: {path}")
+            new = copy.deepcopy(old)
+            for field_path, value in data.items():
+                if _is_sentinel(value, 'DELETE_FIELD'):
+                    _delete_path(new, field_path)
+                else:
+                    current = _get_path(new, field_path)
+                    _set_path(new, field_path, _apply_value(current, value))
+        elif merge and old is not None:
+            new = copy.deepcopy(old)
+            _deep_merge(new, data)
+        else:
+            new = {}
+            _deep_merge(new, data)
+
+        self.stats['writes'] += 1
+        self._reindex(path, old, new)
+        if new is None:
+            self._docs.pop(path, None)
+        else:
+            self._docs[path] = new
+
+    def _reindex(self, path: str, old: Optional[Dict], new: Optional[Dict]):
+        collection_path, doc_id = path.rsplit('/', 1)
+        collection_id = collection_path.rsplit('/', 1)[-1]
+
+        if new is None:
+            self._collections[collection_path].discard(doc_id)
+        else:
+            self._collections[collection_path].add(doc_id)
+            self._groups[collection_id].add(collection_path)
+
+        for fields in self.equality_indexes.get(collection_id, ()):
+            index = self._eq_index[(collection_path, fields)]
+            for data, add in ((old, False), (new, True)):
+                if data is None:
+                    continue
+                values = [_get_path(data, field) for field in fields]
+                if any(value is _MISSING for value in values):
+                    continue
+                key = tuple(_sort_key(value) for value in values)
+                if add:
+                    index[key].add(doc_id)
+                else:
+                    index[key].discard(doc_id)
+
+        for field in self.range_indexes.get(collection_id, ()):
+            entries = self._range_index[(collection_path, field)]
+            for data, add in ((old, False), (new, True)):
+                if data is None:
+                    continue
+                value = _get_path(data, field)
+                if value is _MISSING:
+                    continue
+                entry = (_sort_key(value), doc_id)
+                position = bisect.bisect_left(entries, entry)
+                if add:
+                    entries.insert(position, entry)
+                elif position < len(entries) and entries[position] == entry:
+                    entries.pop(position)
+
+
+_shared_client: Optional[MemoryFirestoreClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_memory_client() -> MemoryFirestoreClient:
+    """
+    Возвращает общий для процесса in-memory клиент
+
+    Каждый модуль хендлеров создает свой FirestoreDB, поэтому клиент
+    должен быть один - иначе модули не увидят данные друг друга.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = MemoryFirestoreClient.from_env()
+            logger.info(
+                f"In-memory Firestore: задержка {_shared_client.latency_ms} мс, "
+                f"доля ошибок {_shared_client.error_rate}"
+            )
+        return _shared_client
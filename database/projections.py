@@ -0,0 +1,24 @@
+"""
+Чтение документов с маской полей (projection)
+
+Документ пользователя содержит ai_profile с ответами онбординга и
+заголовком плана, поэтому горячие пути читают только нужные им поля.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+
+def get_fields(doc_ref, field_paths: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Читает только указанные поля документа
+
+    Args:
+        doc_ref: Ссылка на документ
+        field_paths: Пути полей (поддерживаются вложенные, через точку)
+
+    Returns:
+        Словарь с найденными полями или None если документа нет
+    """
+    doc = doc_ref.get(field_paths=list(field_paths))
+    if not doc.exists:
+        return None
+    return doc.to_dict() or {}
@@ -0,0 +1,205 @@
+"""
+Индекс напоминаний: пользователи по минуте следующего напоминания
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from utils.lazy_import import lazy_module
+from utils.metrics import instrument_db
+
+firestore = lazy_module('google.cloud.firestore')
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_COLLECTION = 'reminders'
+# Часовой пояс, в котором пользователи указывают reminder_time
+DEFAULT_TIMEZONE = os.getenv('REMINDER_TIMEZONE', 'Europe/Moscow')
+# Firestore ограничивает один batch 500 операциями
+BATCH_LIMIT = 500
+
+
+def minute_bucket(moment: datetime) -> int:
+    """Номер минуты UTC с начала эпохи - ключ корзины напоминаний"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()) // 60
+
+
+def bucket_start(bucket: int) -> datetime:
+    """Начало минутной корзины в UTC"""
+    return datetime.fromtimestamp(bucket * 60, tz=timezone.utc)
+
+
+def next_due_bucket(reminder_time: str, tz_name: str, after_bucket: int) -> int:
+    """
+    Ближайшая корзина напоминания строго после after_bucket
+
+    Args:
+        reminder_time: Время напоминания HH:MM в часовом поясе пользователя
+        tz_name: Часовой пояс (IANA)
+        after_bucket: Корзина, после которой ищется следующая
+
+    Returns:
+        int: Номер минуты UTC
+    """
+    hours, minutes = (int(part) for part in reminder_time.split(':'))
+    tz = ZoneInfo(tz_name)
+    local = bucket_start(after_bucket).astimezone(tz)
+    candidate = local.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    # Перебираем дни: на переходе на летнее время локальной минуты может не быть
+    while minute_bucket(candidate) <= after_bucket:
+        candidate = (candidate + timedelta(days=1)).replace(hour=hours, minute=minutes)
+    return minute_bucket(candidate)
+
+
+@instrument_db
+class ReminderDB:
+    """
+    Индекс напоминаний в коллекции reminders
+
+    Один документ на пользователя: время напоминания, часовой пояс и
+    next_due - номер минуты UTC следующей отправки. next_due одновременно
+    служит курсором доставки: его сдвигают только после отправки, поэтому
+    после перезапуска диспетчер продолжает с того же места. У выключенных
+    напоминаний поля next_due нет, и запрос по диапазону их не видит.
+    """
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Клиент Firestore
+        """
+        self.db = db
+
+    def _ref(self, telegram_id: str):
+        return self.db.collection(REMINDERS_COLLECTION).document(str(telegram_id))
+
+    async def set_reminder(self, telegram_id: str, reminder_time: str,
+                           tz_name: Optional[str] = None) -> Optional[int]:
+        """
+        Включает ежедневное напоминание или меняет его время
+
+        Args:
+            telegram_id: Telegram ID пользователя
+            reminder_time: Время HH:MM
+            tz_name: Часовой пояс (по умолчанию REMINDER_TIMEZONE)
+
+        Returns:
+            Корзина следующей отправки или None при ошибке
+        """
+        try:
+            tz_name = tz_name or DEFAULT_TIMEZONE
+            next_due = next_due_bucket(reminder_time, tz_name, minute_bucket(datetime.now(timezone.utc)))
+            await asyncio.to_thread(self._ref(telegram_id).set, {
+                'telegram_id': str(telegram_id),
+                'reminder_time': reminder_time,
+                'timezone': tz_name,
+                'next_due': next_due,
+                'updated_at': datetime.now(timezone.utc)
+            })
+            logger.info(f"Напоминание {reminder_time} ({tz_name}) для пользователя {telegram_id}")
+            return next_due
+        except Exception as e:
+            logger.error(f"Ошибка сохранения напоминания для {telegram_id}: {e}")
+            return None
+
+    async def set_enabled(self, telegram_id: str, enabled: bool) -> bool:
+        """
+        Включает или выключает напоминания, сохраняя выбранное время
+
+        Args:
+            telegram_id: Telegram ID пользователя
+            enabled: Новое состояние
+
+        Returns:
+            bool: Успешность операции (True, если напоминание не настроено)
+        """
+        try:
+            doc_ref = self._ref(telegram_id)
+            if not enabled:
+                # Без next_due документ выпадает из выборки диспетчера
+                await asyncio.to_thread(doc_ref.set, {'next_due': firestore.DELETE_FIELD}, merge=True)
+                return True
+
+            doc = await asyncio.to_thread(doc_ref.get)
+            data = doc.to_dict() if doc.exists else None
+            if not data or not data.get('reminder_time'):
+                return True
+            await self.set_reminder(telegram_id, data['reminder_time'], data.get('timezone'))
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка переключения напоминаний для {telegram_id}: {e}")
+            return False
+
+    async def get_reminder(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Документ напоминания пользователя
+
+        Args:
+            telegram_id: Telegram ID пользователя
+
+        Returns:
+            Данные документа или None, если напоминание не настроено
+        """
+        try:
+            doc = await asyncio.to_thread(self._ref(telegram_id).get)
+            return doc.to_dict() if doc.exists else None
+        except Exception as e:
+            logger.error(f"Ошибка чтения напоминания для {telegram_id}: {e}")
+            return None
+
+    async def get_due(self, bucket: int, limit: int,
+                      after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Напоминания, срок которых наступил к корзине bucket
+
+        Args:
+            bucket: Текущая минутная корзина
+            limit: Размер страницы
+            after: Последний документ предыдущей страницы (курсор)
+
+        Returns:
+            Список документов (с полем id), самые старые первыми
+        """
+        query = self.db.collection(REMINDERS_COLLECTION)\
+            .where('next_due', '<=', bucket)\
+            .order_by('next_due')\
+            .order_by('__name__')\
+            .limit(limit)
+        if after is not None:
+            # Курсор по значениям, без чтения документа
+            query = query.start_after({'next_due': after['next_due'], '__name__': self._ref(after['id'])})
+        docs = await asyncio.to_thread(query.get)
+        return [{'id': doc.id, **doc.to_dict()} for doc in docs]
+
+    async def advance(self, entries: Iterable[Dict[str, Any]], now_bucket: int):
+        """
+        Сдвигает курсоры доставки на следующий день
+
+        Args:
+            entries: Документы из get_due
+            now_bucket: Текущая корзина (следующая отправка - строго после нее)
+        """
+        entries = list(entries)
+        for start in range(0, len(entries), BATCH_LIMIT):
+            batch = self.db.batch()
+            for entry in entries[start:start + BATCH_LIMIT]:
+                next_due = next_due_bucket(
+                    entry['reminder_time'], entry.get('timezone') or DEFAULT_TIMEZONE, now_bucket
+                )
+                batch.update(self._ref(entry['id']), {'next_due': next_due, 'last_sent_bucket': entry['next_due']})
+            await asyncio.to_thread(batch.commit)
+
+    async def disable_many(self, telegram_ids: Iterable[str]):
+        """Выключает напоминания пользователям, заблокировавшим бота"""
+        telegram_ids = list(telegram_ids)
+        for start in range(0, len(telegram_ids), BATCH_LIMIT):
+            batch = self.db.batch()
+            for telegram_id in telegram_ids[start:start + BATCH_LIMIT]:
+                # merge: у пользователя может не быть документа напоминаний
+                batch.set(self._ref(telegram_id), {'next_due': firestore.DELETE_FIELD}, merge=True)
+            await asyncio.to_thread(batch.commit)
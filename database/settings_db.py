@@ -1,135 +1,224 @@
 """
 База данных для настроек пользователей
 """
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from utils.metrics import instrument_db
 
 logger = logging.getLogger(__name__)
 
+# Задержка записи: изменения за это окно (например, повторные нажатия
+# "Уведомления") уходят в Firestore одной операцией
+WRITE_DELAY = 2.0
+# Сколько секунд снимок настроек считается актуальным без перечитывания
+SNAPSHOT_TTL = 300
+# Пауза перед повтором неудавшейся записи
+RETRY_DELAY = 10.0
 
+
+@instrument_db
 class SettingsDB:
-    """Класс для работы с настройками пользователей в Firestore"""
-    
+    """
+    Класс для работы с настройками пользователей в Firestore
+
+    Хранит снимок настроек каждого пользователя в памяти. Значения по
+    умолчанию подставляются при чтении, документ в Firestore создается
+    только при первом изменении. Изменения сразу применяются к снимку,
+    а запись откладывается на WRITE_DELAY секунд и объединяется в один
+    set(merge=True). Неудавшаяся запись возвращается в очередь и
+    повторяется через RETRY_DELAY секунд. Блокирующие вызовы клиента
+    вынесены в отдельный поток.
+    """
+
     DEFAULT_SETTINGS = {
         'notifications_enabled': True,
         'theme': 'system'
     }
-    
+
     VALID_THEMES = ['system', 'light', 'dark']
-    
-    def __init__(self, db):
+
+    def __init__(self, db, write_delay: float = WRITE_DELAY, snapshot_ttl: float = SNAPSHOT_TTL):
         """
         Инициализация с существующим Firestore клиентом
-        
+
         Args:
             db: Firestore database instance
+            write_delay: Окно объединения записей в секундах (0 - писать сразу)
+            snapshot_ttl: Время жизни снимка настроек в секундах
         """
         self.db = db
-    
-    def get_settings(self, telegram_id: str) -> Dict[str, Any]:
+        self.write_delay = write_delay
+        self.snapshot_ttl = snapshot_ttl
+        # telegram_id -> (время загрузки, настройки)
+        self._snapshots: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # telegram_id -> еще не записанные поля
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        # При остановке повторные записи не планируются - flush_all пишет сам
+        self._closing = False
+
+    def _settings_ref(self, telegram_id: str):
+        return self.db.collection('users').document(telegram_id).collection('settings').document('main')
+
+    def _cached(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        """Снимок из памяти, если он еще актуален (или есть незаписанные изменения)"""
+        entry = self._snapshots.get(telegram_id)
+        if entry is None:
+            return None
+        loaded_at, settings = entry
+        if telegram_id not in self._pending and time.monotonic() - loaded_at > self.snapshot_ttl:
+            del self._snapshots[telegram_id]
+            return None
+        return settings
+
+    async def get_settings(self, telegram_id: str) -> Dict[str, Any]:
         """
         Получить настройки пользователя
-        
+
         Args:
             telegram_id: Telegram ID пользователя
-            
+
         Returns:
             Словарь с настройками (с дефолтными значениями если документа нет)
         """
+        cached = self._cached(telegram_id)
+        if cached is not None:
+            return dict(cached)
+
         try:
-            doc_ref = self.db.collection('users').document(telegram_id).collection('settings').document('main')
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                settings = doc.to_dict()
-                # Проверяем наличие всех полей
-                for key, default_value in self.DEFAULT_SETTINGS.items():
-                    if key not in settings:
-                        settings[key] = default_value
-                return settings
-            else:
-                # Создаем документ с дефолтными настройками
-                settings = self.DEFAULT_SETTINGS.copy()
-                settings['updated_at'] = datetime.now()
-                doc_ref.set(settings)
-                logger.info(f"Создан документ настроек для пользователя {telegram_id}")
-                return settings
-                
+            doc = await asyncio.to_thread(self._settings_ref(telegram_id).get)
+            settings = {**self.DEFAULT_SETTINGS, **(doc.to_dict() or {})} if doc.exists else dict(self.DEFAULT_SETTINGS)
         except Exception as e:
             logger.error(f"Ошибка получения настроек для {telegram_id}: {e}", exc_info=True)
-            # Возвращаем дефолтные настройки в случае ошибки
+            # Возвращаем дефолтные настройки в случае ошибки (не кэшируем)
             return self.DEFAULT_SETTINGS.copy()
-    
-    def update_settings(self, telegram_id: str, partial: Dict[str, Any]) -> Dict[str, Any]:
+
+        # Пока шло чтение, настройки могли измениться - локальные правки новее
+        cached = self._cached(telegram_id)
+        if cached is not None:
+            return dict(cached)
+        self._snapshots[telegram_id] = (time.monotonic(), settings)
+        return dict(settings)
+
+    def _validate(self, partial: Dict[str, Any]):
+        """
+        Проверяет значения настроек
+
+        Raises:
+            ValueError: Если передано невалидное значение
+        """
+        # Валидация theme если передана
+        if 'theme' in partial and partial['theme'] not in self.VALID_THEMES:
+            raise ValueError(f"Недопустимое значение темы: {partial['theme']}")
+
+        # Валидация notifications_enabled
+        if 'notifications_enabled' in partial and not isinstance(partial['notifications_enabled'], bool):
+            raise ValueError(f"notifications_enabled должно быть bool, получено: {type(partial['notifications_enabled'])}")
+
+    async def update_settings(self, telegram_id: str, partial: Dict[str, Any]) -> Dict[str, Any]:
         """
         Обновить настройки пользователя
-        
+
+        Изменения сразу видны в снимке, запись в Firestore отложена
+        (см. WRITE_DELAY) и объединяется с соседними изменениями.
+
         Args:
             telegram_id: Telegram ID пользователя
             partial: Частичный словарь с обновляемыми полями
-            
+
         Returns:
             Обновленные настройки
-            
+
         Raises:
             ValueError: Если передано невалидное значение
         """
         try:
-            # Валидация theme если передана
-            if 'theme' in partial and partial['theme'] not in self.VALID_THEMES:
-                raise ValueError(f"Недопустимое значение темы: {partial['theme']}")
-            
-            # Валидация notifications_enabled
-            if 'notifications_enabled' in partial and not isinstance(partial['notifications_enabled'], bool):
-                raise ValueError(f"notifications_enabled должно быть bool, получено: {type(partial['notifications_enabled'])}")
-            
-            # Добавляем timestamp
-            partial['updated_at'] = datetime.now()
-            
-            # Обновляем документ
-            doc_ref = self.db.collection('users').document(telegram_id).collection('settings').document('main')
-            
-            # Проверяем существование документа
-            doc = doc_ref.get()
-            if not doc.exists:
-                # Создаем новый документ с дефолтными значениями + обновления
-                settings = self.DEFAULT_SETTINGS.copy()
-                settings.update(partial)
-                doc_ref.set(settings)
-                logger.info(f"Создан и обновлен документ настроек для пользователя {telegram_id}")
-            else:
-                # Обновляем существующий
-                doc_ref.update(partial)
-                logger.info(f"Обновлены настройки для пользователя {telegram_id}: {list(partial.keys())}")
-            
-            # Возвращаем актуальные настройки
-            return self.get_settings(telegram_id)
-            
+            self._validate(partial)
         except ValueError as e:
             logger.error(f"Ошибка валидации настроек: {e}")
             raise
-        except Exception as e:
-            logger.error(f"Ошибка обновления настроек для {telegram_id}: {e}", exc_info=True)
-            raise
-    
-    def toggle_notifications(self, telegram_id: str) -> bool:
+
+        settings = await self.get_settings(telegram_id)
+        changes = {**partial, 'updated_at': datetime.now()}
+        settings.update(changes)
+        self._snapshots[telegram_id] = (time.monotonic(), settings)
+        self._pending.setdefault(telegram_id, {}).update(changes)
+
+        if self.write_delay <= 0:
+            await self.flush(telegram_id)
+        else:
+            self._schedule_flush(telegram_id)
+
+        return dict(settings)
+
+    async def toggle_notifications(self, telegram_id: str) -> Dict[str, Any]:
         """
         Переключить уведомления вкл/выкл
-        
+
+        Args:
+            telegram_id: Telegram ID пользователя
+
+        Returns:
+            Обновленные настройки (новое значение в notifications_enabled)
+        """
+        settings = await self.get_settings(telegram_id)
+        new_value = not settings.get('notifications_enabled', True)
+        return await self.update_settings(telegram_id, {'notifications_enabled': new_value})
+
+    def _schedule_flush(self, telegram_id: str, delay: Optional[float] = None):
+        """Планирует отложенную запись, если она еще не запланирована"""
+        if telegram_id not in self._flush_tasks and not self._closing:
+            delay = self.write_delay if delay is None else delay
+            self._flush_tasks[telegram_id] = asyncio.create_task(self._delayed_flush(telegram_id, delay))
+
+    async def _delayed_flush(self, telegram_id: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flush_tasks.pop(telegram_id, None)
+        await self.flush(telegram_id)
+
+    async def flush(self, telegram_id: str) -> bool:
+        """
+        Записывает накопленные изменения пользователя одной операцией
+
         Args:
             telegram_id: Telegram ID пользователя
-            
+
         Returns:
-            Новое значение notifications_enabled
+            True если запись не требовалась или прошла успешно
         """
+        changes = self._pending.pop(telegram_id, None)
+        if not changes:
+            return True
+
         try:
-            current_settings = self.get_settings(telegram_id)
-            new_value = not current_settings.get('notifications_enabled', True)
-            
-            self.update_settings(telegram_id, {'notifications_enabled': new_value})
-            return new_value
-            
+            # merge=True создает документ при первом изменении без предварительного чтения
+            await asyncio.to_thread(self._settings_ref(telegram_id).set, changes, merge=True)
+            logger.info(f"Обновлены настройки для пользователя {telegram_id}: {list(changes.keys())}")
+            return True
         except Exception as e:
-            logger.error(f"Ошибка переключения уведомлений для {telegram_id}: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            logger.error(f"Ошибка обновления настроек для {telegram_id}: {e}", exc_info=True)
+            # Возвращаем изменения в очередь: поля, измененные во время записи, новее
+            self._pending[telegram_id] = {**changes, **self._pending.get(telegram_id, {})}
+            self._schedule_flush(telegram_id, max(self.write_delay, RETRY_DELAY))
+            return False
+
+    async def flush_all(self) -> int:
+        """
+        Записывает все отложенные изменения (вызывается при остановке бота)
+
+        Returns:
+            Количество пользователей, чьи изменения записаны
+        """
+        self._closing = True
+        for task in list(self._flush_tasks.values()):
+            task.cancel()
+        self._flush_tasks.clear()
+
+        user_ids = list(self._pending)
+        results = await asyncio.gather(*(self.flush(user_id) for user_id in user_ids))
+        return sum(1 for ok in results if ok)
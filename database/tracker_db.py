@@ -1,20 +1,25 @@
 """
 Функции для работы с привычками в Firestore
 """
-from google.cloud import firestore
+from utils.lazy_import import lazy_module
 from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, date
+from datetime import datetime
 import logging
 import uuid
-from google.cloud.firestore import SERVER_TIMESTAMP
+from database.bulk_delete import BulkDeleter
+from utils.streaks import TZ_OFFSET_FIELD, advance_streak, get_tz_offset, local_date, today_local
+from utils.metrics import instrument_db
+
+firestore = lazy_module('google.cloud.firestore')
 
 logger = logging.getLogger(__name__)
 
 
+@instrument_db
 class TrackerDB:
     """Класс для работы с привычками в Firestore"""
     
-    def __init__(self, db: firestore.Client):
+    def __init__(self, db: "firestore.Client"):
         """
         Инициализация с существующим клиентом Firestore
         
@@ -22,6 +27,7 @@ class TrackerDB:
             db: Клиент Firestore
         """
         self.db = db
+        self.bulk_deleter = BulkDeleter(db)
     
     # === ПОЛЕЗНЫЕ ПРИВЫЧКИ ===
     
@@ -110,45 +116,35 @@ class TrackerDB:
             user_ref = self.db.collection('users').document(str(telegram_id))
             habit_ref = user_ref.collection('habits').document(habit_id)
             
-            # Получаем текущие данные привычки
-            habit = habit_ref.get()
-            if not habit.exists:
+            # Получаем привычку и пользователя (для часового пояса) одним запросом
+            snapshots = {doc.reference.path: doc for doc in self.db.get_all([user_ref, habit_ref])}
+            habit = snapshots.get(habit_ref.path)
+            if not habit or not habit.exists:
                 return False, 0, 0
             
+            user_doc = snapshots.get(user_ref.path)
+            tz_offset = get_tz_offset(user_doc.to_dict() if user_doc and user_doc.exists else None)
+            
             habit_data = habit.to_dict()
-            today = date.today()
-            last_completed = habit_data.get('last_completed')
+            update = advance_streak(
+                local_date(habit_data.get('last_completed'), tz_offset),
+                habit_data.get('current_streak', 0),
+                habit_data.get('best_streak', 0),
+                today_local(tz_offset)
+            )
             
             # Проверяем, не выполнена ли уже сегодня
-            if last_completed and last_completed.date() == today:
-            # bugfix: возвращаем 3 значения
-                 return False, habit_data.get('current_streak', 0), habit_data.get('best_streak', 0)
-            
-            # Обновляем streak
-            current_streak = habit_data.get('current_streak', 0)
-            if last_completed:
-                last_date = last_completed.date() if isinstance(last_completed, datetime) else last_completed
-                days_diff = (today - last_date).days
-                
-                if days_diff == 1:
-                    # Продолжаем streak
-                    current_streak += 1
-                elif days_diff > 1:
-                    # Streak сброшен
-                    current_streak = 1
-            else:
-                # Первое выполнение
-                current_streak = 1
-            
-            # Обновляем данные
-            best_streak = max(current_streak, habit_data.get('best_streak', 0))
-            total_completions = habit_data.get('total_completions', 0) + 1
+            if not update.counted:
+                return False, update.current_streak, update.best_streak
+            
+            current_streak = update.current_streak
+            best_streak = update.best_streak
             
             habit_ref.update({
                 'last_completed': datetime.utcnow(),
                 'current_streak': current_streak,
                 'best_streak': best_streak,
-                'total_completions': total_completions
+                'total_completions': firestore.Increment(1)
             })
             
             # Добавляем запись в историю
@@ -170,13 +166,9 @@ class TrackerDB:
             user_ref = self.db.collection('users').document(str(telegram_id))
             habit_ref = user_ref.collection('habits').document(habit_id)
             
-            # Удаляем историю
-            history = habit_ref.collection('history').stream()
-            for record in history:
-                record.reference.delete()
-            
-            # Удаляем саму привычку
+            # Удаляем саму привычку, история удаляется в фоне пакетами
             habit_ref.delete()
+            await self.bulk_deleter.schedule([f"{habit_ref.path}/history"])
             
             return True
         except Exception as e:
@@ -188,16 +180,21 @@ class TrackerDB:
         Проверяет, выполнена ли привычка сегодня
         """
         try:
-            habit = await self.get_habit(telegram_id, habit_id)
-            if not habit:
-                return False
+            user_ref = self.db.collection('users').document(str(telegram_id))
+            habit_ref = user_ref.collection('habits').document(habit_id)
             
-            last_completed = habit.get('last_completed')
-            if not last_completed:
+            # Привычка и часовой пояс пользователя одним запросом
+            snapshots = {
+                doc.reference.path: doc
+                for doc in self.db.get_all([user_ref, habit_ref], field_paths=['last_completed', TZ_OFFSET_FIELD])
+            }
+            habit = snapshots.get(habit_ref.path)
+            if not habit or not habit.exists:
                 return False
             
-            last_date = last_completed.date() if isinstance(last_completed, datetime) else last_completed
-            return last_date == date.today()
+            user_doc = snapshots.get(user_ref.path)
+            tz_offset = get_tz_offset(user_doc.to_dict() if user_doc and user_doc.exists else None)
+            return local_date(habit.to_dict().get('last_completed'), tz_offset) == today_local(tz_offset)
         except Exception as e:
             logger.error(f"Ошибка при проверке выполнения: {e}")
             return False
@@ -351,13 +348,9 @@ class TrackerDB:
             user_ref = self.db.collection('users').document(str(telegram_id))
             habit_ref = user_ref.collection('bad_habits').document(habit_id)
             
-            # Удаляем историю сбросов
-            resets = habit_ref.collection('resets').stream()
-            for reset in resets:
-                reset.reference.delete()
-            
-            # Удаляем привычку
+            # Удаляем привычку, история сбросов удаляется в фоне пакетами
             habit_ref.delete()
+            await self.bulk_deleter.schedule([f"{habit_ref.path}/resets"])
             
             return True
         except Exception as e:
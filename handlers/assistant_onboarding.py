@@ -1,19 +1,19 @@
 """
 Обработчики для онбординга ИИ-ассистента с полной логикой
 """
-import json
-import os
-from typing import Dict, Any, List, Optional
-from datetime import datetime, date, timezone
+from typing import Dict, Any, List, Optional, Set
 import logging
 import asyncio
+import time
 
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.filters import StateFilter, Command
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from utils.plan_generator import generate_plan
+from utils.lazy_import import lazy_module
 from handlers.assistant_plan import show_plan_preview
 from aiogram.fsm.state import State, StatesGroup
 
@@ -24,11 +24,33 @@ from database.firestore_db import FirestoreDB
 from database.assistant_profile_db import AssistantProfileDB
 from states.assistant_onboarding import AssistantOnboardingStates
 from keyboards.main_menu import get_main_menu_keyboard
+from utils.onboarding_questions import Step, question_registry
 
 # Создаем роутер
 router = Router()
+
+# Генератор планов тянет OpenAI и pydantic-модели - загружаем при первой генерации
+plan_generator = lazy_module('utils.plan_generator')
 logger = logging.getLogger(__name__)
 
+# Состояние ожидания ввода по типу вопроса
+INPUT_STATES = {
+    "text": AssistantOnboardingStates.waiting_for_text,
+    "number": AssistantOnboardingStates.waiting_for_number,
+    "date": AssistantOnboardingStates.waiting_for_date,
+    "time": AssistantOnboardingStates.waiting_for_time,
+    "list": AssistantOnboardingStates.waiting_for_list,
+}
+
+# Ответы копятся в FSM, в БД пишется контрольная точка: каждые
+# CHECKPOINT_EVERY ответов или если с прошлой прошло CHECKPOINT_INTERVAL секунд
+CHECKPOINT_EVERY = 5
+CHECKPOINT_INTERVAL = 120
+
+# Ключи FSM с незаписанными ответами: брошенный онбординг дописывает
+# фоновая задача (run_answers_flusher), а не следующий ответ
+_pending_keys: Set[StorageKey] = set()
+
 _db: Optional[FirestoreDB] = None
 _profile_db: Optional[AssistantProfileDB] = None
 
@@ -50,23 +72,6 @@ def get_db():
             _profile_db = None
     return _db, _profile_db
 
-# Загружаем вопросы из JSON
-def load_questions() -> Dict[str, Any]:
-    """Загружает вопросы онбординга из JSON файла"""
-    try:
-        json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'onboarding_questions.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Ошибка загрузки вопросов: {e}")
-        return {"categories": {}, "constraints_questions": {"general": []}}
-
-# Загружаем вопросы при старте
-QUESTIONS_DATA = load_questions()                                                   
-
-logger.info(f"Загружено категорий: {len(QUESTIONS_DATA.get('categories', {}))}")
-logger.info(f"Категории: {list(QUESTIONS_DATA.get('categories', {}).keys())}")
-
 @router.message(Command("onboarding"))
 async def start_onboarding_command(message: Message, state: FSMContext):
     """Обработчик команды /onboarding"""
@@ -82,6 +87,7 @@ async def start_onboarding_command(message: Message, state: FSMContext):
     profile = await profile_db.get_profile(message.from_user.id)
     
     if profile and profile.onboarding.completed:
+        category_info = question_registry.get().categories.get(profile.active_category)
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="🔄 Настроить заново", callback_data="onb_restart_confirmed")],
             [InlineKeyboardButton(text="📊 Мой план", callback_data="ai_show_plan")],
@@ -90,8 +96,7 @@ async def start_onboarding_command(message: Message, state: FSMContext):
         
         await message.answer(
             "✅ <b>У вас уже есть настроенный профиль!</b>\n\n"
-            f"Категория: {QUESTIONS_DATA['categories'].get(profile.active_category, {}).get('emoji', '')} "
-            f"{QUESTIONS_DATA['categories'].get(profile.active_category, {}).get('title', '')}\n\n"
+            f"Категория: {getattr(category_info, 'emoji', '')} {getattr(category_info, 'title', '')}\n\n"
             "Что вы хотите сделать?",
             reply_markup=keyboard,
             parse_mode="HTML"
@@ -112,216 +117,190 @@ async def start_onboarding_command(message: Message, state: FSMContext):
 db = FirestoreDB()
 profile_db = AssistantProfileDB(db.db)
 
-# Загружаем вопросы из JSON
-def load_questions() -> Dict[str, Any]:
-    """Загружает вопросы онбординга из JSON файла"""
-    try:
-        json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'onboarding_questions.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Ошибка загрузки вопросов: {e}")
-        return {"categories": {}, "constraints_questions": {"general": []}}
+# === БУФЕР ОТВЕТОВ ===
+
+async def buffer_answer(user_id: int, data: Dict[str, Any], question_id: str, value: Any,
+                        key: Optional[StorageKey] = None) -> Dict[str, Any]:
+    """
+    Добавляет ответ в буфер FSM и при необходимости пишет контрольную точку
+    
+    Args:
+        user_id: ID пользователя
+        data: Текущие данные FSM
+        question_id: ID вопроса
+        value: Ответ
+        key: Ключ FSM пользователя (state.key) - для фоновой записи буфера
+        
+    Returns:
+        Поля для state.update_data
+    """
+    answers = dict(data.get("answers", {}))
+    answers[question_id] = value
+    pending = list(data.get("pending_answers", []))
+    if question_id not in pending:
+        pending.append(question_id)
+    checkpoint_at = data.get("checkpoint_at") or time.time()
+    updates = {"answers": answers, "pending_answers": pending, "checkpoint_at": checkpoint_at}
+    
+    if len(pending) >= CHECKPOINT_EVERY or time.time() - checkpoint_at >= CHECKPOINT_INTERVAL:
+        _, profile_db = get_db()
+        if profile_db and await profile_db.save_onboarding_answers(
+            user_id, {qid: answers.get(qid) for qid in pending}
+        ):
+            updates.update(pending_answers=[], checkpoint_at=time.time())
+    
+    if key is not None:
+        if updates["pending_answers"]:
+            _pending_keys.add(key)
+        else:
+            _pending_keys.discard(key)
+    return updates
+
+
+def _storage_keys(storage: BaseStorage) -> List[StorageKey]:
+    """
+    Ключи FSM, у которых могут быть незаписанные ответы
+    
+    MemoryStorage обходится целиком. Из других хранилищ (Redis) берутся
+    ключи, буферизованные этим процессом: данные в них переживают
+    перезапуск и дописываются следующим ответом или таймером.
+    """
+    keys = set(_pending_keys)
+    if isinstance(storage, MemoryStorage):
+        keys.update(
+            key for key, record in list(storage.storage.items())
+            if record.data.get("pending_answers")
+        )
+    return list(keys)
 
-# Загружаем вопросы при старте
-QUESTIONS_DATA = load_questions()
 
+async def flush_pending_answers(storage: BaseStorage, max_age: float = CHECKPOINT_INTERVAL) -> int:
+    """
+    Записывает буферы ответов, не попавшие в БД дольше max_age секунд
+    
+    Args:
+        storage: Хранилище FSM диспетчера
+        max_age: Возраст последней контрольной точки (0 - записать все)
+        
+    Returns:
+        Количество записанных буферов
+    """
+    _, profile_db = get_db()
+    if not profile_db:
+        return 0
+    
+    flushed = 0
+    for key in _storage_keys(storage):
+        try:
+            data = await storage.get_data(key)
+            pending = data.get("pending_answers") or []
+            if not pending:
+                _pending_keys.discard(key)
+                continue
+            if time.time() - (data.get("checkpoint_at") or 0) < max_age:
+                continue
+            answers = data.get("answers", {})
+            if not await profile_db.save_onboarding_answers(
+                key.user_id, {qid: answers.get(qid) for qid in pending}
+            ):
+                continue
+            # Ответы, пришедшие во время записи, остаются в буфере
+            data = await storage.get_data(key)
+            remaining = [qid for qid in data.get("pending_answers") or [] if qid not in pending]
+            await storage.update_data(key, {"pending_answers": remaining, "checkpoint_at": time.time()})
+            if not remaining:
+                _pending_keys.discard(key)
+            flushed += 1
+        except Exception as e:
+            logger.error(f"Ошибка записи буфера ответов {key.user_id}: {e}")
+    return flushed
 
-# === НАВИГАЦИОННЫЕ КЛАВИАТУРЫ ===
 
+async def run_answers_flusher(storage: BaseStorage, interval: float = CHECKPOINT_INTERVAL):
+    """
+    Периодически записывает буферы брошенного онбординга
+    
+    Args:
+        storage: Хранилище FSM диспетчера
+        interval: Период проверки (секунды)
+    """
+    while True:
+        await asyncio.sleep(interval)
+        flushed = await flush_pending_answers(storage)
+        if flushed:
+            logger.info(f"Записаны буферы брошенного онбординга: {flushed}")
 
 
-def get_navigation_keyboard(question_index: int, total_questions: int, required: bool = True) -> InlineKeyboardMarkup:
-    """Клавиатура навигации по вопросам (без прогресс-бара)"""
-    builder = InlineKeyboardBuilder()
-    
-    # Кнопки навигации
-    buttons = []
-    
-    # Кнопка "Назад" (если не первый вопрос)
-    if question_index > 0:
-        buttons.append(
-            InlineKeyboardButton(
-                text="◀️ Назад",
-                callback_data="onb_previous_question"
-            )
-        )
-    
-    # Кнопка "Пропустить" (если вопрос не обязательный)
-    if not required:
-        buttons.append(
-            InlineKeyboardButton(
-                text="➡️ Пропустить",
-                callback_data="onb_skip_current"
-            )
-        )
-    
-    if buttons:
-        builder.row(*buttons)
-    
-    # Кнопка отмены
-    builder.row(
-        InlineKeyboardButton(
-            text="❌ Отмена",
-            callback_data="onb_cancel"
-        )
-    )
-    
-    return builder.as_markup()
+# === ПОКАЗ ВОПРОСОВ ===
 
+def get_current_step(data: Dict[str, Any]) -> Optional[Step]:
+    """Текущий шаг онбординга по категории и индексу из FSM"""
+    return question_registry.get().step(data.get("category"), data.get("current_question_index", 0))
 
-# === ОБНОВЛЕННЫЕ ФУНКЦИИ ПОКАЗА ВОПРОСОВ ===
 
 async def show_next_question(obj: Any, state: FSMContext):
     """Универсальная функция показа следующего вопроса"""
     data = await state.get_data()
-    
-    # Получаем все вопросы (категории + ограничения)
-    category_questions = data.get("category_questions", [])
-    constraint_questions = data.get("constraint_questions", [])
-    all_questions = category_questions + constraint_questions
-    
-    current_index = data.get("current_question_index", 0)
+    step = get_current_step(data)
     
     # Проверяем, закончились ли вопросы
-    if current_index >= len(all_questions):
+    if step is None:
         await show_summary(obj, state)
         return
     
-    # Получаем текущий вопрос
-    question = all_questions[current_index]
-    question_type = question["type"]
-    required = question.get("required", True)
-    
-    # Формируем текст вопроса
-    text = f"<b>Вопрос {current_index + 1} из {len(all_questions)}</b>\n\n"
-    text += question["text"]
-    
-    if question.get("placeholder"):
-        text += f"\n\n<i>Например: {question['placeholder']}</i>"
-    
-    # Сохраняем информацию о текущем вопросе
+    question = step.question
     await state.update_data(
-        all_questions=all_questions,
-        current_question=question,
-        current_question_id=question["id"],
-        current_question_required=required
+        current_question_id=question.id,
+        current_question_required=question.required
     )
     
-    # Показываем вопрос в зависимости от типа
-    if question_type == "select":
-        await show_select_question(obj, question, current_index, len(all_questions), text)
-        
-    elif question_type == "multiselect":
-        await show_multiselect_question(obj, state, question, current_index, len(all_questions), text)
-        
-    elif question_type in ["text", "number", "date", "time", "list"]:
-        await show_input_question(obj, state, question, question_type, current_index, len(all_questions), text, required)
-
-
-async def show_select_question(obj, question, current_index, total_questions, text):
-    """Показывает вопрос с выбором"""
-    builder = InlineKeyboardBuilder()
-    
-    # Добавляем опции выбора
-    for option in question["options"]:
-        builder.row(
-            InlineKeyboardButton(
-                text=option['label'],
-                callback_data=f"onb_answer_{question['id']}_{option['value']}"
-            )
-        )
-    
-    # Добавляем навигацию
-    nav_keyboard = get_navigation_keyboard(current_index, total_questions, question.get("required", True))
-    for row in nav_keyboard.inline_keyboard:
-        builder.row(*row)
-    
-    # Отправляем сообщение
+    # Текст и клавиатура шага собраны заранее
+    keyboard = step.keyboard_for(data.get("multiselect_temp", []))
     if hasattr(obj, 'message'):  # CallbackQuery
-        await obj.message.edit_text(text, reply_markup=builder.as_markup(), parse_mode="HTML")
+        await obj.message.edit_text(step.text, reply_markup=keyboard, parse_mode="HTML")
     else:  # Message
-        await obj.answer(text, reply_markup=builder.as_markup(), parse_mode="HTML")
+        await obj.answer(step.text, reply_markup=keyboard, parse_mode="HTML")
+    
+    # Для вопросов с вводом ждем ответ сообщением
+    if question.is_input:
+        await state.set_state(INPUT_STATES[question.type])
 
 
-async def show_multiselect_question(obj, state, question, current_index, total_questions, text):
-    """Показывает вопрос с множественным выбором"""
-    data = await state.get_data()
-    selected = data.get("multiselect_temp", [])
-    
-    builder = InlineKeyboardBuilder()
-    
-    # Опции с чекбоксами
-    for option in question["options"]:
-        is_selected = option['value'] in selected
-        checkbox = "✅" if is_selected else "⬜"
-        builder.row(
-            InlineKeyboardButton(
-                text=f"{checkbox} {option['label']}",
-                callback_data=f"onb_multi_{question['id']}_{option['value']}"
-            )
-        )
-    
-    # Кнопка "Далее" (активна только если выбран хотя бы один элемент или вопрос необязательный)
-    if selected or not question.get("required", True):
-        builder.row(
-            InlineKeyboardButton(
-                text="✅ Далее",
-                callback_data=f"onb_multi_done_{question['id']}"
-            )
-        )
+async def save_validated_input(message: Message, state: FSMContext):
+    """Проверяет введенный ответ валидатором вопроса и переходит дальше"""
+    _, profile_db = get_db()
+    if not profile_db:
+        await message.answer("⚠️ База данных временно недоступна")
+        return
     
-    # Навигация
-    nav_keyboard = get_navigation_keyboard(current_index, total_questions, question.get("required", True))
-    for row in nav_keyboard.inline_keyboard:
-        builder.row(*row)
+    data = await state.get_data()
+    step = get_current_step(data)
+    if step is None:
+        await show_summary(message, state)
+        return
     
-    if hasattr(obj, 'message'):
-        await obj.message.edit_text(text, reply_markup=builder.as_markup(), parse_mode="HTML")
-    else:
-        await obj.answer(text, reply_markup=builder.as_markup(), parse_mode="HTML")
-
-
-async def show_input_question(obj, state, question, question_type, current_index, total_questions, text, required):
-    """Показывает вопрос с вводом текста/числа/даты"""
-    # Добавляем инструкцию по вводу
-    input_instructions = {
-        "text": "📝 Введите текст:",
-        "number": "🔢 Введите число:",
-        "date": "📅 Введите дату (ДД.ММ.ГГГГ):",
-        "time": "🕐 Введите время (ЧЧ:ММ):",
-        "list": "📋 Введите элементы через запятую:"
-    }
+    value, error = step.question.validate(message.text or "")
+    if error:
+        await message.answer(error)
+        await message.delete()
+        return
     
-    text += f"\n\n{input_instructions.get(question_type, '📝 Введите ответ:')}"
+    # Сохраняем ответ и переходим дальше
+    await state.update_data(
+        current_question_index=step.index + 1,
+        **await buffer_answer(message.from_user.id, data, step.question.id, value, state.key)
+    )
     
-    # Показываем быстрые кнопки для некоторых типов
-    if question_type == "date" and question.get("validation") == "future_date":
-        keyboard = get_date_quick_select_keyboard()
-    elif question_type == "number" and "min" in question and "max" in question:
-        keyboard = get_number_quick_select_keyboard(
-            question["min"], 
-            question["max"], 
-            unit=question.get("unit", "")
-        )
-    else:
-        keyboard = get_navigation_keyboard(current_index, total_questions, required)
+    await message.delete()
     
-    # Отправляем сообщение
-    if hasattr(obj, 'message'):
-        await obj.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
-    else:
-        await obj.answer(text, reply_markup=keyboard, parse_mode="HTML")
+    # Показываем следующий вопрос
+    new_msg = await message.answer("✅ Сохранено!")
+    await asyncio.sleep(0.5)
+    await new_msg.delete()
     
-    # Устанавливаем состояние ожидания
-    state_map = {
-        "text": AssistantOnboardingStates.waiting_for_text,
-        "number": AssistantOnboardingStates.waiting_for_number,
-        "date": AssistantOnboardingStates.waiting_for_date,
-        "time": AssistantOnboardingStates.waiting_for_time,
-        "list": AssistantOnboardingStates.waiting_for_list
-    }
-    await state.set_state(state_map[question_type])
+    await state.set_state(AssistantOnboardingStates.answering_questions)
+    bot_msg = await message.answer("Загружаю следующий вопрос...")
+    await show_next_question(bot_msg, state)
 
 
 # === ОБРАБОТЧИКИ НАВИГАЦИИ ===
@@ -348,12 +327,9 @@ async def skip_current_question(callback: CallbackQuery, state: FSMContext):
     current_index = data.get("current_question_index", 0)
     
     # Сохраняем null для пропущенного вопроса
-    answers = data.get("answers", {})
-    answers[question_id] = None
-    
     await state.update_data(
-        answers=answers,
-        current_question_index=current_index + 1
+        current_question_index=current_index + 1,
+        **await buffer_answer(callback.from_user.id, data, question_id, None, state.key)
     )
     
     await show_next_question(callback, state)
@@ -463,7 +439,7 @@ async def generate_plan_from_existing_profile(callback: CallbackQuery, state: FS
     
     try:
         # Генерируем план
-        plan = await generate_plan(
+        plan = await plan_generator.generate_plan(
             category=profile.active_category,
             answers=profile.onboarding.answers,
             constraints=profile.constraints.dict() if profile.constraints else {},
@@ -472,7 +448,7 @@ async def generate_plan_from_existing_profile(callback: CallbackQuery, state: FS
         
         # Сохраняем план в состоянии для превью
         await state.update_data(
-            generated_plan=plan.dict(),
+            generated_plan=plan.to_compact(),
             current_start_day=1
         )
         await state.set_state(PlanPreviewStates.viewing)
@@ -527,28 +503,24 @@ async def process_category_choice(callback: CallbackQuery, state: FSMContext):
         return
     
     category = callback.data.split("_")[2]
+    if category not in question_registry.get().categories:
+        await callback.answer("Категория недоступна", show_alert=True)
+        return
     
-    # Подготавливаем вопросы
-    category_questions = QUESTIONS_DATA["categories"][category]["questions"]
-    constraint_questions = QUESTIONS_DATA.get("constraints_questions", {}).get("general", [])
-    
-    # Сохраняем в state
+    # Сохраняем в state (вопросы берутся из графа по категории и индексу)
     await state.update_data(
         category=category,
         answers={},
         current_question_index=0,
-        category_questions=category_questions,
-        constraint_questions=constraint_questions,
-        multiselect_temp=[]
+        multiselect_temp=[],
+        pending_answers=[],
+        checkpoint_at=time.time()
     )
     
-    # Создаем профиль если его нет
-    if not await profile_db.get_profile(callback.from_user.id):
+    # Создаем профиль если его нет (категория сохранится при завершении)
+    if not await profile_db.get_profile(callback.from_user.id, with_plan_days=False):
         await profile_db.create_profile(callback.from_user.id)
     
-    # Сохраняем выбор категории
-    await profile_db.save_onboarding_answer(callback.from_user.id, "category", category)
-    
     # Переходим к первому вопросу
     await state.set_state(AssistantOnboardingStates.answering_questions)
     await show_next_question(callback, state)
@@ -574,19 +546,12 @@ async def process_select_answer(callback: CallbackQuery, state: FSMContext):
     except ValueError:
         pass  # Оставляем как строку
     
-    # Сохраняем ответ
+    # Сохраняем ответ и переходим к следующему вопросу
     data = await state.get_data()
-    answers = data.get("answers", {})
-    answers[question_id] = answer
-    
-    # Сохраняем в БД
-    await profile_db.save_onboarding_answer(callback.from_user.id, question_id, answer)
-    
-    # Переходим к следующему вопросу
     current_index = data.get("current_question_index", 0)
     await state.update_data(
-        answers=answers,
-        current_question_index=current_index + 1
+        current_question_index=current_index + 1,
+        **await buffer_answer(callback.from_user.id, data, question_id, answer, state.key)
     )
     
     await show_next_question(callback, state)
@@ -598,111 +563,14 @@ async def process_select_answer(callback: CallbackQuery, state: FSMContext):
 @router.message(StateFilter(AssistantOnboardingStates.waiting_for_text))
 async def process_text_input(message: Message, state: FSMContext):
     """Обработка текстового ответа с валидацией"""
-    # Получаем БД
-    _, profile_db = get_db()
-    if not profile_db:
-        await message.answer("⚠️ База данных временно недоступна")
-        return
-    
-    data = await state.get_data()
-    question = data.get("current_question", {})
-    question_id = data.get("current_question_id")
-    
-    # Валидация длины
-    if "min_length" in question and len(message.text) < question["min_length"]:
-        await message.answer(f"❌ Минимум {question['min_length']} символов")
-        await message.delete()
-        return
-    
-    if "max_length" in question and len(message.text) > question["max_length"]:
-        await message.answer(f"❌ Максимум {question['max_length']} символов")
-        await message.delete()
-        return
-    
-    # Сохраняем ответ
-    answers = data.get("answers", {})
-    answers[question_id] = message.text
-    
-    await profile_db.save_onboarding_answer(message.from_user.id, question_id, message.text)
-    
-    # Переходим дальше
-    current_index = data.get("current_question_index", 0)
-    await state.update_data(
-        answers=answers,
-        current_question_index=current_index + 1
-    )
-    
-    await message.delete()
-    
-    # Показываем следующий вопрос
-    new_msg = await message.answer("✅ Сохранено!")
-    await asyncio.sleep(0.5)
-    await new_msg.delete()
-    
-    await state.set_state(AssistantOnboardingStates.answering_questions)
-    bot_msg = await message.answer("Загружаю следующий вопрос...")
-    await show_next_question(bot_msg, state)
+    await save_validated_input(message, state)
 
 
 @router.message(StateFilter(AssistantOnboardingStates.waiting_for_date))
 async def process_date_input(message: Message, state: FSMContext):
     """Обработка ввода даты"""
-    # Получаем БД
-    _, profile_db = get_db()
-    if not profile_db:
-        await message.answer("⚠️ База данных временно недоступна")
-        return
-    
     try:
-        # Пробуем разные форматы даты
-        date_formats = ["%d.%m.%Y", "%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d"]
-        date_value = None
-        
-        for fmt in date_formats:
-            try:
-                date_value = datetime.strptime(message.text, fmt).date()
-                break
-            except ValueError:
-                continue
-        
-        if not date_value:
-            await message.answer("❌ Неверный формат даты. Используйте ДД.ММ.ГГГГ")
-            await message.delete()
-            return
-        
-        data = await state.get_data()
-        question = data.get("current_question", {})
-        question_id = data.get("current_question_id")
-        
-        # Валидация будущей даты
-        if question.get("validation") == "future_date" and date_value <= date.today():
-            await message.answer("❌ Дата должна быть в будущем")
-            await message.delete()
-            return
-        
-        # Сохраняем ответ
-        answers = data.get("answers", {})
-        answers[question_id] = date_value.isoformat()
-        
-        await profile_db.save_onboarding_answer(message.from_user.id, question_id, date_value.isoformat())
-        
-        # Переходим дальше
-        current_index = data.get("current_question_index", 0)
-        await state.update_data(
-            answers=answers,
-            current_question_index=current_index + 1
-        )
-        
-        await message.delete()
-        
-        new_msg = await message.answer("✅ Сохранено!")
-        await asyncio.sleep(0.5)
-        await new_msg.delete()
-        
-        await state.set_state(AssistantOnboardingStates.answering_questions)
-        bot_msg = await message.answer("Загружаю следующий вопрос...")
-        await show_next_question(bot_msg, state)
-        
+        await save_validated_input(message, state)
     except Exception as e:
         logger.error(f"Ошибка обработки даты: {e}")
         await message.answer("❌ Ошибка обработки даты")
@@ -712,47 +580,7 @@ async def process_date_input(message: Message, state: FSMContext):
 @router.message(StateFilter(AssistantOnboardingStates.waiting_for_list))
 async def process_list_input(message: Message, state: FSMContext):
     """Обработка ввода списка через запятую"""
-    # Получаем БД
-    _, profile_db = get_db()
-    if not profile_db:
-        await message.answer("⚠️ База данных временно недоступна")
-        return
-    
-    data = await state.get_data()
-    question = data.get("current_question", {})
-    question_id = data.get("current_question_id")
-    
-    # Разбираем список
-    items = [item.strip() for item in message.text.split(",") if item.strip()]
-    
-    if not items:
-        await message.answer("❌ Пожалуйста, введите хотя бы один элемент")
-        await message.delete()
-        return
-    
-    # Сохраняем ответ
-    answers = data.get("answers", {})
-    answers[question_id] = items
-    
-    await profile_db.save_onboarding_answer(message.from_user.id, question_id, items)
-    
-    # Переходим дальше
-    current_index = data.get("current_question_index", 0)
-    await state.update_data(
-        answers=answers,
-        current_question_index=current_index + 1
-    )
-    
-    await message.delete()
-    
-    # Показываем следующий вопрос
-    new_msg = await message.answer("✅ Сохранено!")
-    await asyncio.sleep(0.5)
-    await new_msg.delete()
-    
-    await state.set_state(AssistantOnboardingStates.answering_questions)
-    bot_msg = await message.answer("Загружаю следующий вопрос...")
-    await show_next_question(bot_msg, state)
+    await save_validated_input(message, state)
 
 
 # === ПОКАЗ СВОДКИ ===
@@ -763,20 +591,20 @@ async def show_summary(obj: Any, state: FSMContext):
     category = data.get("category")
     answers = data.get("answers", {})
     
-    category_info = QUESTIONS_DATA["categories"][category]
+    graph = question_registry.get()
+    category_info = graph.categories[category]
     
     # Формируем текст сводки
     text = f"📊 <b>Проверьте ваши данные:</b>\n\n"
-    text += f"<b>Категория:</b> {category_info['emoji']} {category_info['title']}\n\n"
+    text += f"<b>Категория:</b> {category_info.emoji} {category_info.title}\n\n"
     
     # Разделяем ответы на категории и ограничения
     text += "<b>Основные параметры:</b>\n"
     
     # Показываем ответы на вопросы категории
-    category_questions = data.get("category_questions", [])
-    for q in category_questions:
-        if q["id"] in answers and answers[q["id"]] is not None:
-            value = answers[q["id"]]
+    for question_id in category_info.category_question_ids:
+        if answers.get(question_id) is not None:
+            value = answers[question_id]
             if isinstance(value, list):
                 value_str = ", ".join(str(v) for v in value)
             else:
@@ -786,26 +614,25 @@ async def show_summary(obj: Any, state: FSMContext):
             if len(value_str) > 50:
                 value_str = value_str[:50] + "..."
             
-            text += f"• {q['text'][:40]}...: <code>{value_str}</code>\n"
+            text += f"• {graph.question(question_id).text[:40]}...: <code>{value_str}</code>\n"
     
     text += "\n<b>Ограничения:</b>\n"
     
     # Показываем ограничения
-    constraint_questions = data.get("constraint_questions", [])
-    for q in constraint_questions:
-        if q["id"] in answers and answers[q["id"]] is not None:
-            value = answers[q["id"]]
-            if q["id"] == "working_days":
+    for question_id in category_info.constraint_question_ids:
+        if answers.get(question_id) is not None:
+            value = answers[question_id]
+            if question_id == "working_days":
                 days = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
                 value_str = ", ".join(days[d-1] for d in value if 1 <= d <= 7)
-            elif q["id"] == "daily_time_minutes":
+            elif question_id == "daily_time_minutes":
                 hours = value // 60
                 minutes = value % 60
                 value_str = f"{hours}ч {minutes}мин" if hours > 0 else f"{minutes} минут"
             else:
                 value_str = str(value)
             
-            text += f"• {q['text'][:40]}...: <code>{value_str}</code>\n"
+            text += f"• {graph.question(question_id).text[:40]}...: <code>{value_str}</code>\n"
     
     text += "\n<b>Все верно?</b>"
     
@@ -842,13 +669,13 @@ async def finalize_onboarding(callback: CallbackQuery, state: FSMContext):
     
     # Добавляем специфичные ограничения категории
     category_specific = {}
-    category_questions = data.get("category_questions", [])
+    category_info = question_registry.get().categories.get(category)
     
-    for q in category_questions:
-        if q["id"] in answers and answers[q["id"]] is not None:
-            category_specific[q["id"]] = answers[q["id"]]
+    for question_id in getattr(category_info, "category_question_ids", ()):
+        if answers.get(question_id) is not None:
+            category_specific[question_id] = answers[question_id]
     
-    # Финализируем онбординг
+    # Финализируем онбординг (все ответы одной записью)
     success = await profile_db.finalize_onboarding(
         callback.from_user.id,
         category,
@@ -857,6 +684,7 @@ async def finalize_onboarding(callback: CallbackQuery, state: FSMContext):
     )
     
     if success:
+        await state.update_data(pending_answers=[])
         await callback.message.edit_text(
             "✅ <b>Отлично! Данные сохранены.</b>\n\n"
             "🤖 Сейчас ИИ создаст для вас персональный план.\n"
@@ -866,7 +694,7 @@ async def finalize_onboarding(callback: CallbackQuery, state: FSMContext):
         
         try:
             # Генерируем план
-            plan = await generate_plan(
+            plan = await plan_generator.generate_plan(
                 category=category,
                 answers=answers,
                 constraints=constraints,
@@ -875,7 +703,7 @@ async def finalize_onboarding(callback: CallbackQuery, state: FSMContext):
             
             # Сохраняем план в состоянии для превью
             await state.update_data(
-                generated_plan=plan.dict(),
+                generated_plan=plan.to_compact(),
                 current_start_day=1
             )
             
@@ -961,25 +789,8 @@ async def handle_plan_actions_in_onboarding(callback: CallbackQuery, state: FSMC
 # === ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ===
 
 def get_category_keyboard() -> InlineKeyboardMarkup:
-    """Клавиатура выбора категории"""
-    builder = InlineKeyboardBuilder()
-    
-    for category_id, category_data in QUESTIONS_DATA["categories"].items():
-        builder.row(
-            InlineKeyboardButton(
-                text=f"{category_data['emoji']} {category_data['title']}",
-                callback_data=f"onb_category_{category_id}"
-            )
-        )
-    
-    builder.row(
-        InlineKeyboardButton(
-            text="◀️ Назад",
-            callback_data="assistant_menu"
-        )
-    )
-    
-    return builder.as_markup()
+    """Клавиатура выбора категории (собирается при загрузке вопросов)"""
+    return question_registry.get().category_keyboard
 
 
 def get_confirmation_keyboard() -> InlineKeyboardMarkup:
@@ -1008,62 +819,6 @@ def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-
-
-def get_date_quick_select_keyboard() -> InlineKeyboardMarkup:
-    """Быстрый выбор даты"""
-    from datetime import timedelta
-    
-    builder = InlineKeyboardBuilder()
-    today = date.today()
-    
-    options = [
-        ("Через неделю", 7),
-        ("Через 2 недели", 14),
-        ("Через месяц", 30),
-        ("Через 2 месяца", 60),
-        ("Через 3 месяца", 90)
-    ]
-    
-    for label, days in options:
-        target_date = today + timedelta(days=days)
-        builder.row(
-            InlineKeyboardButton(
-                text=f"{label} ({target_date.strftime('%d.%m.%Y')})",
-                callback_data=f"onb_date_{target_date.isoformat()}"
-            )
-        )
-    
-    return builder.as_markup()
-
-
-def get_number_quick_select_keyboard(min_val: int, max_val: int, unit: str = "") -> InlineKeyboardMarkup:
-    """Быстрый выбор числа"""
-    builder = InlineKeyboardBuilder()
-    
-    # Генерируем разумные опции
-    if max_val - min_val <= 10:
-        options = list(range(min_val, max_val + 1))
-    else:
-        step = (max_val - min_val) // 5
-        options = [min_val + i * step for i in range(6)]
-        if max_val not in options:
-            options[-1] = max_val
-    
-    # Кнопки в 2 ряда
-    for i in range(0, len(options), 3):
-        row_options = options[i:i+3]
-        builder.row(*[
-            InlineKeyboardButton(
-                text=f"{opt}{unit}",
-                callback_data=f"onb_number_{opt}"
-            )
-            for opt in row_options
-        ])
-    
-    return builder.as_markup()
-
-
 # === ОБРАБОТЧИКИ БЫСТРОГО ВЫБОРА ===
 
 @router.callback_query(F.data.startswith("onb_date_"))
@@ -1079,15 +834,10 @@ async def process_quick_date(callback: CallbackQuery, state: FSMContext):
     
     data = await state.get_data()
     question_id = data.get("current_question_id")
-    answers = data.get("answers", {})
-    answers[question_id] = date_str
-    
-    await profile_db.save_onboarding_answer(callback.from_user.id, question_id, date_str)
-    
     current_index = data.get("current_question_index", 0)
     await state.update_data(
-        answers=answers,
-        current_question_index=current_index + 1
+        current_question_index=current_index + 1,
+        **await buffer_answer(callback.from_user.id, data, question_id, date_str, state.key)
     )
     
     await state.set_state(AssistantOnboardingStates.answering_questions)
@@ -1108,15 +858,10 @@ async def process_quick_number(callback: CallbackQuery, state: FSMContext):
     
     data = await state.get_data()
     question_id = data.get("current_question_id")
-    answers = data.get("answers", {})
-    answers[question_id] = number
-    
-    await profile_db.save_onboarding_answer(callback.from_user.id, question_id, number)
-    
     current_index = data.get("current_question_index", 0)
     await state.update_data(
-        answers=answers,
-        current_question_index=current_index + 1
+        current_question_index=current_index + 1,
+        **await buffer_answer(callback.from_user.id, data, question_id, number, state.key)
     )
     
     await state.set_state(AssistantOnboardingStates.answering_questions)
@@ -1148,18 +893,12 @@ async def process_multiselect(callback: CallbackQuery, state: FSMContext):
         data = await state.get_data()
         selected = data.get("multiselect_temp", [])
         
-        # Сохраняем ответ
-        answers = data.get("answers", {})
-        answers[question_id] = selected
-        
-        await profile_db.save_onboarding_answer(callback.from_user.id, question_id, selected)
-        
-        # Очищаем временный выбор и переходим дальше
+        # Сохраняем ответ, очищаем временный выбор и переходим дальше
         current_index = data.get("current_question_index", 0)
         await state.update_data(
-            answers=answers,
             current_question_index=current_index + 1,
-            multiselect_temp=[]
+            multiselect_temp=[],
+            **await buffer_answer(callback.from_user.id, data, question_id, selected, state.key)
         )
         
         await show_next_question(callback, state)
@@ -1211,14 +950,15 @@ async def show_current_plan(callback: CallbackQuery, state: FSMContext):
     
     # Сохраняем план в состоянии для навигации
     await state.update_data(
-        viewing_plan=profile.plan.dict(),
+        viewing_plan=profile.plan.to_compact(),
         current_start_day=1,
         is_view_mode=True
     )
     await state.set_state(PlanPreviewStates.viewing)
     
     # Показываем план через функцию из assistant_plan
-    await show_plan_preview(callback.message, profile.plan, 1, is_view_mode=True)
+    await show_plan_preview(callback.message, profile.plan, 1, is_view_mode=True,
+                            telegram_id=callback.from_user.id)
     await callback.answer()
 
 
@@ -2,6 +2,7 @@
 Обработчик генерации и просмотра планов ИИ-ассистента
 """
 import logging
+from typing import Optional
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
@@ -9,7 +10,8 @@ from aiogram.fsm.state import State, StatesGroup
 
 from database.firestore_db import FirestoreDB
 from database.assistant_profile_db import AssistantProfileDB
-from utils.plan_generator import generate_plan
+from utils.lazy_import import lazy_module
+from utils.plan_cache import plan_cache
 from keyboards.assistant_plan import (
     get_plan_preview_keyboard,
     get_plan_saved_keyboard,
@@ -23,6 +25,10 @@ logger = logging.getLogger(__name__)
 # Создаем роутер
 router = Router()
 
+# Генератор планов тянет OpenAI и pydantic-модели - загружаем при первой генерации
+plan_generator = lazy_module('utils.plan_generator')
+ai_profile = lazy_module('models.ai_profile')
+
 # Инициализация БД
 db = FirestoreDB()
 profile_db = AssistantProfileDB(db.db)
@@ -52,7 +58,7 @@ async def cmd_plan(message: Message):
         
         # Показываем первые дни плана
         plan = profile.plan
-        await show_plan_preview(message, plan, 1, is_view_mode=True)
+        await show_plan_preview(message, plan, 1, is_view_mode=True, telegram_id=telegram_id)
         
     except Exception as e:
         logger.error(f"Ошибка при показе плана: {e}", exc_info=True)
@@ -100,7 +106,7 @@ async def generate_plan_handler(message: Message, telegram_id: int, state: FSMCo
         )
         
         # Генерируем план
-        plan = await generate_plan(
+        plan = await plan_generator.generate_plan(
             category=profile.active_category,
             answers=profile.onboarding.answers,
             constraints=profile.constraints.dict() if profile.constraints else {},
@@ -109,7 +115,7 @@ async def generate_plan_handler(message: Message, telegram_id: int, state: FSMCo
         
         # Сохраняем план в состоянии для превью
         await state.update_data(
-            generated_plan=plan.dict(),
+            generated_plan=plan.to_compact(),
             current_start_day=1
         )
         await state.set_state(PlanPreviewStates.viewing)
@@ -184,14 +190,15 @@ async def handle_plan_open_preview(callback: CallbackQuery, state: FSMContext):
         
         # Сохраняем план в состоянии для навигации
         await state.update_data(
-            viewing_plan=profile.plan.dict(),
+            viewing_plan=profile.plan.to_compact(),
             current_start_day=1,
             is_view_mode=True
         )
         await state.set_state(PlanPreviewStates.viewing)
         
         # Показываем план
-        await show_plan_preview(callback.message, profile.plan, 1, is_view_mode=True)
+        await show_plan_preview(callback.message, profile.plan, 1, is_view_mode=True,
+                                telegram_id=telegram_id)
         await callback.answer()
         
     except Exception as e:
@@ -246,20 +253,41 @@ async def handle_plan_generate_start(callback: CallbackQuery, state: FSMContext)
         logger.error(f"Ошибка при проверке плана: {e}", exc_info=True)
         await callback.answer("Произошла ошибка", show_alert=True)
 
-async def show_plan_preview(message: Message, plan, start_day: int, is_view_mode: bool = False):
-    """Показывает превью плана"""
-    text = f"<b>📅 {'Ваш план' if is_view_mode else 'Превью вашего плана'}</b>\n"
-    text += f"Горизонт: {plan.horizon_days} дней\n\n"
+async def show_plan_preview(message: Message, plan, start_day: int, is_view_mode: bool = False,
+                            telegram_id: Optional[int] = None):
+    """
+    Показывает превью плана
     
+    Args:
+        message: Сообщение для ответа или редактирования
+        plan: PlanData (сохраненный план может быть только заголовком)
+        start_day: Первый показываемый день
+        is_view_mode: Просмотр сохраненного плана, а не превью нового
+        telegram_id: Владелец сохраненного плана - для чтения задач видимых дней
+    """
     # Показываем 3 дня
     end_day = min(start_day + 2, plan.horizon_days)
     
+    # У сохраненного плана загружен только заголовок - читаем задачи видимых дней
+    if is_view_mode and telegram_id is not None and not plan.days:
+        tasks = await profile_db.get_plan_days(telegram_id, start_day, end_day)
+        plan = plan.model_copy(update={
+            'days': [ai_profile.construct_trusted(ai_profile.DayTask, task) for task in tasks]
+        })
+    
+    text = f"<b>📅 {'Ваш план' if is_view_mode else 'Превью вашего плана'}</b>\n"
+    text += f"Горизонт: {plan.horizon_days} дней\n\n"
+    
     for day_num in range(start_day, end_day + 1):
         # Находим задачи этого дня
-        day_tasks = [task for task in plan.days if task.day_number == day_num]
+        day_tasks = plan.tasks_for_day(day_num)
         
         if day_tasks:
-            text += f"<b>День {day_num}:</b>\n"
+            if is_view_mode:
+                done, total = plan.day_progress(day_num)
+                text += f"<b>День {day_num}:</b> {done}/{total} ✓\n"
+            else:
+                text += f"<b>День {day_num}:</b>\n"
             for task in day_tasks:
                 # Извлекаем время из описания
                 time_info = ""
@@ -270,10 +298,7 @@ async def show_plan_preview(message: Message, plan, start_day: int, is_view_mode
             text += "\n"
     
     # Информация о чекпоинтах
-    checkpoints_in_range = [
-        cp for cp in plan.checkpoints 
-        if start_day <= cp.day_number <= end_day
-    ]
+    checkpoints_in_range = plan.checkpoints_between(start_day, end_day)
     
     if checkpoints_in_range:
         text += "<b>🎯 Контрольные точки:</b>\n"
@@ -354,12 +379,15 @@ async def handle_plan_prev(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Ошибка: план не найден")
         return
     
-    # Преобразуем обратно в объект Plan
-    from models.ai_profile import PlanData
-    plan = PlanData(**plan_dict)
+    # Разобранный план берем из кэша, а не собираем заново на каждой странице
+    plan = plan_cache.get_or_parse(
+        (callback.from_user.id, 'view' if is_view_mode else 'preview'),
+        plan_dict
+    )
     
     await state.update_data(current_start_day=new_start)
-    await show_plan_preview(callback.message, plan, new_start, is_view_mode)
+    await show_plan_preview(callback.message, plan, new_start, is_view_mode,
+                            telegram_id=callback.from_user.id)
     await callback.answer()
 
 
@@ -382,12 +410,15 @@ async def handle_plan_next(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Ошибка: план не найден")
         return
     
-    # Преобразуем обратно в объект Plan
-    from models.ai_profile import PlanData
-    plan = PlanData(**plan_dict)
+    # Разобранный план берем из кэша, а не собираем заново на каждой странице
+    plan = plan_cache.get_or_parse(
+        (callback.from_user.id, 'view' if is_view_mode else 'preview'),
+        plan_dict
+    )
     
     await state.update_data(current_start_day=new_start)
-    await show_plan_preview(callback.message, plan, new_start, is_view_mode)
+    await show_plan_preview(callback.message, plan, new_start, is_view_mode,
+                            telegram_id=callback.from_user.id)
     await callback.answer()
 
 
@@ -407,7 +438,7 @@ async def handle_plan_save(callback: CallbackQuery, state: FSMContext):
         
         if success:
             # Подсчитываем статистику
-            total_tasks = len(plan_dict.get("days", []))
+            total_tasks = plan_dict.get("tasks_count", len(plan_dict.get("days", [])))
             total_checkpoints = len(plan_dict.get("checkpoints", []))
             total_buffer_days = len(plan_dict.get("buffer_days", []))
             
@@ -460,13 +491,14 @@ async def handle_plan_view(callback: CallbackQuery, state: FSMContext):
         
         # Сохраняем план в состоянии для навигации
         await state.update_data(
-            viewing_plan=profile.plan.dict(),
+            viewing_plan=profile.plan.to_compact(),
             current_start_day=1,
             is_view_mode=True
         )
         await state.set_state(PlanPreviewStates.viewing)
         
-        await show_plan_preview(callback.message, profile.plan, 1, is_view_mode=True)
+        await show_plan_preview(callback.message, profile.plan, 1, is_view_mode=True,
+                                telegram_id=telegram_id)
         await callback.answer()
         
     except Exception as e:
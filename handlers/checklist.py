@@ -24,6 +24,7 @@ from keyboards.checklist import (
 from keyboards.main_menu import get_main_menu_keyboard
 from states.checklist import TaskCreationStates, TaskEditStates
 from utils.messages import ERROR_MESSAGES
+from utils.render import Template, join
 from utils.achievements import POINTS_TABLE
 from handlers.profile import show_new_achievements
 
@@ -246,11 +247,11 @@ async def process_task_deadline(callback: CallbackQuery, state: FSMContext):
             priority_name = get_priority_name(data.get('priority'))
             
             await callback.message.edit_text(
-                f"<b>✓ Задача создана</b>\n\n"
-                f"{data.get('title')}\n"
-                f"Приоритет: {priority_name}\n"
-                f"{'Дедлайн: ' + deadline.strftime('%d.%m.%Y') if deadline else 'Без дедлайна'}\n\n"
-                f"Задача добавлена в ваш список.",
+                TASK_CREATED.render(
+                    title=data.get('title'),
+                    priority=priority_name,
+                    deadline=f"Дедлайн: {deadline:%d.%m.%Y}" if deadline else "Без дедлайна"
+                ),
                 reply_markup=get_checklist_menu_keyboard(),
                 parse_mode="HTML"
             )
@@ -266,6 +267,71 @@ async def process_task_deadline(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+# === ШАБЛОНЫ СПИСКОВ ЗАДАЧ ===
+
+PRIORITY_ORDER = [
+    'urgent_important',
+    'not_urgent_important', 
+    'urgent_not_important',
+    'not_urgent_not_important'
+]
+
+# Строки задач повторяются между показами и страницами - кэшируем готовый HTML
+TASK_LINES_CACHE_SIZE = 4096
+
+PRIORITY_HEADER = Template("\n<b>{} {}:</b>\n")
+ACTIVE_TASK_LINE = Template("• {}{}\n", cache_size=TASK_LINES_CACHE_SIZE)
+ALL_ACTIVE_TASK_LINE = Template("○ {} {}{}\n", cache_size=TASK_LINES_CACHE_SIZE)
+COMPLETED_TASK_LINE = Template("{}. {}{}\n", cache_size=TASK_LINES_CACHE_SIZE)
+RECENT_COMPLETED_LINE = Template("✓ {}{}\n", cache_size=TASK_LINES_CACHE_SIZE)
+TASK_STATUS_LINE = Template("{} {}\n", cache_size=TASK_LINES_CACHE_SIZE)
+NUMBERED_TASK_LINE = Template("{}. {} {}\n", cache_size=TASK_LINES_CACHE_SIZE)
+SHORT_DATE_SUFFIX = Template(" (до {:%d.%m})", cache_size=TASK_LINES_CACHE_SIZE)
+DONE_SHORT_SUFFIX = Template(" ({:%d.%m})", cache_size=TASK_LINES_CACHE_SIZE)
+DONE_DATE_SUFFIX = Template(" ({:%d.%m.%Y})", cache_size=TASK_LINES_CACHE_SIZE)
+DEADLINE_LINE = Template("   Дедлайн: {:%d.%m.%Y}\n", cache_size=TASK_LINES_CACHE_SIZE)
+
+# Экраны одной задачи: название и описание вводит пользователь
+TASK_TITLE = Template("<b>{}</b>\n\n")
+TASK_DESCRIPTION = Template("<i>{}</i>\n\n")
+TASK_PRIORITY_LINE = Template("{} Приоритет: {}\n")
+TASK_DEADLINE_LINE = Template("📅 Дедлайн: {:%d.%m.%Y}\n")
+TASK_DEADLINE_SHORT_LINE = Template("Дедлайн: {:%d.%m.%Y}\n")
+TASK_CREATED_AT_LINE = Template("📝 Создано: {:%d.%m.%Y %H:%M}\n")
+TASK_DONE = "\n✓ Выполнено"
+TASK_DONE_AT = Template("\n✓ Выполнено: {:%d.%m.%Y %H:%M}")
+TASK_CREATED = Template(
+    "<b>✓ Задача создана</b>\n\n"
+    "{title}\n"
+    "Приоритет: {priority}\n"
+    "{deadline}\n\n"
+    "Задача добавлена в ваш список."
+)
+TASK_EDIT_MENU = Template(
+    "<b>Редактирование задачи</b>\n\n"
+    "Задача: {}\n\n"
+    "Выберите, что хотите изменить:"
+)
+TASK_EDIT_TITLE_PROMPT = Template(
+    "<b>Редактирование названия</b>\n\n"
+    "Текущее название: {}\n\n"
+    "Введите новое название:"
+)
+TASK_TITLE_UPDATED = Template("✓ Название задачи обновлено.\n\nНовое название: {}")
+TASK_DESCRIPTION_UPDATED = Template("✓ Описание задачи обновлено:\n{}")
+TASK_DESCRIPTION_REMOVED = "✓ Описание задачи удалено"
+
+
+def _optional(task: dict, field: str, template: Template) -> str:
+    """Рендерит шаблон с полем задачи, если поле заполнено"""
+    value = task.get(field)
+    return template.render(value) if value else ""
+
+
+def _task_title(task: dict) -> str:
+    return task.get('title', 'Без названия')
+
+
 # === ПРОСМОТР ЗАДАЧ ===
 
 @router.callback_query(F.data == "active_tasks")
@@ -277,40 +343,25 @@ async def show_active_tasks(callback: CallbackQuery):
         # Получаем только активные задачи
         tasks = await checklist_db.get_all_tasks(user_id, status='active')
         
-        text = "<b>📋 Активные задачи</b>\n\n"
+        parts = ["<b>📋 Активные задачи</b>\n\n"]
         
         if not tasks:
-            text += "У вас пока нет активных задач.\n\n"
-            text += "Создайте новую задачу, чтобы начать работу!"
+            parts.append("У вас пока нет активных задач.\n\n")
+            parts.append("Создайте новую задачу, чтобы начать работу!")
         else:
             # Группируем задачи по приоритетам
             by_priority = {}
             for task in tasks:
-                priority = task.get('priority', 'not_urgent_not_important')
-                if priority not in by_priority:
-                    by_priority[priority] = []
-                by_priority[priority].append(task)
+                by_priority.setdefault(task.get('priority', 'not_urgent_not_important'), []).append(task)
             
-            # Порядок приоритетов
-            priority_order = [
-                'urgent_important',
-                'not_urgent_important', 
-                'urgent_not_important',
-                'not_urgent_not_important'
-            ]
-            
-            for priority in priority_order:
-                if priority in by_priority and by_priority[priority]:
-                    priority_name = get_priority_name(priority)
-                    priority_emoji = get_priority_emoji(priority)
-                    text += f"\n<b>{priority_emoji} {priority_name}:</b>\n"
-                    
-                    for task in by_priority[priority]:
-                        text += f"• {task.get('title', 'Без названия')}"
-                        if task.get('deadline'):
-                            deadline = task['deadline']
-                            text += f" (до {deadline.strftime('%d.%m')})"
-                        text += "\n"
+            for priority in PRIORITY_ORDER:
+                if by_priority.get(priority):
+                    parts.append(PRIORITY_HEADER.render(get_priority_emoji(priority), get_priority_name(priority)))
+                    parts.extend(
+                        ACTIVE_TASK_LINE.render(_task_title(task), _optional(task, 'deadline', SHORT_DATE_SUFFIX))
+                        for task in by_priority[priority]
+                    )
+        text = join(parts)
         
         await callback.message.edit_text(
             text,
@@ -335,24 +386,22 @@ async def show_completed_tasks(callback: CallbackQuery):
         # Получаем историю выполненных задач
         tasks = await checklist_db.get_completed_tasks_history(user_id, limit=50)
         
-        text = "<b>✓ Выполненные задачи</b>\n\n"
+        parts = ["<b>✓ Выполненные задачи</b>\n\n"]
         
         if not tasks:
-            text += "У вас пока нет выполненных задач.\n\n"
-            text += "Начните выполнять задачи, чтобы увидеть свой прогресс!"
+            parts.append("У вас пока нет выполненных задач.\n\n")
+            parts.append("Начните выполнять задачи, чтобы увидеть свой прогресс!")
         else:
             # Показываем последние 20 задач
-            text += f"Последние {min(20, len(tasks))} выполненных задач:\n\n"
-            
-            for i, task in enumerate(tasks[:20], 1):
-                text += f"{i}. {task.get('title', 'Без названия')}"
-                if task.get('completed_at'):
-                    completed_at = task['completed_at']
-                    text += f" ({completed_at.strftime('%d.%m.%Y')})"
-                text += "\n"
+            parts.append(f"Последние {min(20, len(tasks))} выполненных задач:\n\n")
+            parts.extend(
+                COMPLETED_TASK_LINE.render(i, _task_title(task), _optional(task, 'completed_at', DONE_DATE_SUFFIX))
+                for i, task in enumerate(tasks[:20], 1)
+            )
             
             if len(tasks) > 20:
-                text += f"\n... и ещё {len(tasks) - 20} задач"
+                parts.append(f"\n... и ещё {len(tasks) - 20} задач")
+        text = join(parts)
         
         # Создаем клавиатуру только с кнопкой назад
         builder = InlineKeyboardBuilder()
@@ -385,38 +434,38 @@ async def show_all_tasks(callback: CallbackQuery):
         # Получаем последние выполненные задачи
         completed_tasks = await checklist_db.get_completed_tasks_history(user_id, limit=10)
         
-        text = "<b>📋 Все задачи</b>\n\n"
+        parts = ["<b>📋 Все задачи</b>\n\n"]
         
         if not active_tasks and not completed_tasks:
-            text += "У вас пока нет задач.\n\n"
-            text += "Создайте новую задачу, чтобы начать!"
+            parts.append("У вас пока нет задач.\n\n")
+            parts.append("Создайте новую задачу, чтобы начать!")
         else:
             if active_tasks:
-                text += f"<b>Активные ({len(active_tasks)}):</b>\n"
-                for task in active_tasks[:10]:  # Показываем до 10 активных
-                    priority_emoji = get_priority_emoji(task.get('priority'))
-                    text += f"○ {priority_emoji} {task.get('title', 'Без названия')}"
-                    if task.get('deadline'):
-                        deadline = task['deadline']
-                        text += f" (до {deadline.strftime('%d.%m')})"
-                    text += "\n"
+                parts.append(f"<b>Активные ({len(active_tasks)}):</b>\n")
+                parts.extend(
+                    ALL_ACTIVE_TASK_LINE.render(
+                        get_priority_emoji(task.get('priority')),
+                        _task_title(task),
+                        _optional(task, 'deadline', SHORT_DATE_SUFFIX)
+                    )
+                    for task in active_tasks[:10]  # Показываем до 10 активных
+                )
                 
                 if len(active_tasks) > 10:
-                    text += f"... и ещё {len(active_tasks) - 10} активных задач\n"
+                    parts.append(f"... и ещё {len(active_tasks) - 10} активных задач\n")
                 
-                text += "\n"
+                parts.append("\n")
             
             if completed_tasks:
-                text += f"<b>Недавно выполненные ({len(completed_tasks)}):</b>\n"
-                for task in completed_tasks[:5]:  # Показываем до 5 выполненных
-                    text += f"✓ {task.get('title', 'Без названия')}"
-                    if task.get('completed_at'):
-                        completed_at = task['completed_at']
-                        text += f" ({completed_at.strftime('%d.%m')})"
-                    text += "\n"
+                parts.append(f"<b>Недавно выполненные ({len(completed_tasks)}):</b>\n")
+                parts.extend(
+                    RECENT_COMPLETED_LINE.render(_task_title(task), _optional(task, 'completed_at', DONE_SHORT_SUFFIX))
+                    for task in completed_tasks[:5]  # Показываем до 5 выполненных
+                )
                 
                 if len(completed_tasks) > 5:
-                    text += f"... и ещё {len(completed_tasks) - 5} выполненных задач\n"
+                    parts.append(f"... и ещё {len(completed_tasks) - 5} выполненных задач\n")
+        text = join(parts)
         
         # Используем активные задачи для клавиатуры
         await callback.message.edit_text(
@@ -453,13 +502,11 @@ async def view_tasks_by_priority(callback: CallbackQuery):
         if not tasks:
             text += "Задач в этой категории пока нет."
         else:
-            for task in tasks:
-                status = "✓" if task.get('status') == 'completed' else "○"
-                text += f"{status} {task.get('title', 'Без названия')}\n"
-                if task.get('deadline'):
-                    deadline = task['deadline']
-                    text += f"   Дедлайн: {deadline.strftime('%d.%m.%Y')}\n"
-                text += "\n"
+            text = join([text] + [
+                TASK_STATUS_LINE.render("✓" if task.get('status') == 'completed' else "○", _task_title(task))
+                + _optional(task, 'deadline', DEADLINE_LINE) + "\n"
+                for task in tasks
+            ])
         
         await callback.message.edit_text(
             text,
@@ -512,12 +559,11 @@ async def navigate_tasks_page(callback: CallbackQuery):
             start_idx = (page - 1) * tasks_per_page
             end_idx = min(start_idx + tasks_per_page, total_tasks)
             
-            for i, task in enumerate(tasks[start_idx:end_idx], start=start_idx+1):
-                status = "✓" if task.get('status') == 'completed' else "○"
-                text += f"{i}. {status} {task.get('title', 'Без названия')}\n"
-                if task.get('deadline'):
-                    deadline = task['deadline']
-                    text += f"   Дедлайн: {deadline.strftime('%d.%m.%Y')}\n"
+            text = join([text] + [
+                NUMBERED_TASK_LINE.render(i, "✓" if task.get('status') == 'completed' else "○", _task_title(task))
+                + _optional(task, 'deadline', DEADLINE_LINE)
+                for i, task in enumerate(tasks[start_idx:end_idx], start=start_idx+1)
+            ])
         
         await callback.message.edit_text(
             text,
@@ -565,28 +611,20 @@ async def view_task_from_list(callback: CallbackQuery):
         priority_emoji = get_priority_emoji(task.get('priority'))
         priority_name = get_priority_name(task.get('priority'))
         
-        text = f"<b>{task.get('title', 'Без названия')}</b>\n\n"
-        
-        if task.get('description'):
-            text += f"<i>{task['description']}</i>\n\n"
-        
-        text += f"{priority_emoji} Приоритет: {priority_name}\n"
-        
-        if task.get('deadline'):
-            deadline = task['deadline']
-            text += f"📅 Дедлайн: {deadline.strftime('%d.%m.%Y')}\n"
-        
-        if task.get('created_at'):
-            created_at = task['created_at']
-            text += f"📝 Создано: {created_at.strftime('%d.%m.%Y %H:%M')}\n"
-        
-        if task.get('status') == 'completed':
-            text += f"\n✓ Выполнено"
-            if task.get('completed_at'):
-                text += f": {task['completed_at'].strftime('%d.%m.%Y %H:%M')}"
-        
         # Используем правильное поле для проверки статуса
         is_completed = task.get('status') == 'completed'
+        done = ""
+        if is_completed:
+            done = _optional(task, 'completed_at', TASK_DONE_AT) or TASK_DONE
+        
+        text = join([
+            TASK_TITLE.render(_task_title(task)),
+            _optional(task, 'description', TASK_DESCRIPTION),
+            TASK_PRIORITY_LINE.render(priority_emoji, priority_name),
+            _optional(task, 'deadline', TASK_DEADLINE_LINE),
+            _optional(task, 'created_at', TASK_CREATED_AT_LINE),
+            done,
+        ])
         
         await callback.message.edit_text(
             text,
@@ -617,20 +655,14 @@ async def view_task_details(callback: CallbackQuery):
         priority_emoji = get_priority_emoji(task.get('priority'))
         priority_name = get_priority_name(task.get('priority'))
         
-        text = f"<b>{task.get('title', 'Без названия')}</b>\n\n"
-        
-        if task.get('description'):
-            text += f"<i>{task['description']}</i>\n\n"
-        
-        text += f"{priority_emoji} Приоритет: {priority_name}\n"
-        
-        if task.get('deadline'):
-            deadline = task['deadline']
-            text += f"Дедлайн: {deadline.strftime('%d.%m.%Y')}\n"
-        
         is_completed = task.get('status') == 'completed'
-        if is_completed and task.get('completed_at'):
-            text += f"\n✓ Выполнено: {task['completed_at'].strftime('%d.%m.%Y %H:%M')}"
+        text = join([
+            TASK_TITLE.render(_task_title(task)),
+            _optional(task, 'description', TASK_DESCRIPTION),
+            TASK_PRIORITY_LINE.render(priority_emoji, priority_name),
+            _optional(task, 'deadline', TASK_DEADLINE_SHORT_LINE),
+            _optional(task, 'completed_at', TASK_DONE_AT) if is_completed else "",
+        ])
         
         await callback.message.edit_text(
             text,
@@ -755,9 +787,7 @@ async def start_edit_task(callback: CallbackQuery, state: FSMContext):
         await state.update_data(task_id=task_id, task_data=task)
         
         await callback.message.edit_text(
-            f"<b>Редактирование задачи</b>\n\n"
-            f"Задача: {task.get('title', 'Без названия')}\n\n"
-            f"Выберите, что хотите изменить:",
+            TASK_EDIT_MENU.render(_task_title(task)),
             reply_markup=get_edit_field_keyboard(task_id),
             parse_mode="HTML"
         )
@@ -783,9 +813,7 @@ async def select_field_to_edit(callback: CallbackQuery, state: FSMContext):
     
     if field == "title":
         await callback.message.answer(
-            f"<b>Редактирование названия</b>\n\n"
-            f"Текущее название: {task_data.get('title', 'Без названия')}\n\n"
-            f"Введите новое название:",
+            TASK_EDIT_TITLE_PROMPT.render(_task_title(task_data)),
             reply_markup=get_cancel_edit_keyboard(task_id),
             parse_mode="HTML"
         )
@@ -847,8 +875,7 @@ async def process_new_title(message: Message, state: FSMContext):
         
         if success:
             await message.answer(
-                f"✓ Название задачи обновлено.\n\n"
-                f"Новое название: {message.text}",
+                TASK_TITLE_UPDATED.render(message.text),
                 reply_markup=get_main_menu_keyboard()
             )
             logger.info(f"Название задачи {task_id} обновлено пользователем {user_id}")
@@ -881,9 +908,8 @@ async def process_new_description(message: Message, state: FSMContext):
         success = await checklist_db.update_task(user_id, task_id, {'description': description})
         
         if success:
-            desc_text = "удалено" if description == "" else f"обновлено:\n{description}"
             await message.answer(
-                f"✓ Описание задачи {desc_text}",
+                TASK_DESCRIPTION_UPDATED.render(description) if description else TASK_DESCRIPTION_REMOVED,
                 reply_markup=get_main_menu_keyboard()
             )
             logger.info(f"Описание задачи {task_id} обновлено пользователем {user_id}")
@@ -1033,9 +1059,7 @@ async def show_checklist_stats(callback: CallbackQuery):
         # История
         if history:
             text += "\n<b>Последние выполненные:</b>\n"
-            for task in history[:5]:
-                title = task.get('title', 'Без названия')
-                text += f"• {title}\n"
+            text += join(ACTIVE_TASK_LINE.render(_task_title(task), "") for task in history[:5])
         
         # Сдержанное мотивационное сообщение
         total = stats.get('total_completed', 0)
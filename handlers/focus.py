@@ -22,6 +22,7 @@ from keyboards.focus import (
     get_stats_period_keyboard
 )
 from keyboards.main_menu import get_main_menu_keyboard
+from utils.render import Template
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -555,6 +556,16 @@ async def toggle_auto_break(callback: CallbackQuery):
 
 # === СТАТИСТИКА ===
 
+PERIOD_STATS_TEMPLATE = Template(
+    "📊 <b>Статистика {period}</b>\n\n"
+    "✅ Завершено сессий: {completed_sessions}\n"
+    "⏱ Общее время фокуса: {total_minutes} мин\n"
+    "📈 Средняя продолжительность: {avg_duration} мин\n"
+    "🔥 Текущий streak: {current_streak} дней\n"
+    "🏆 Лучший streak: {best_streak} дней"
+)
+
+
 @router.callback_query(F.data == "focus_stats")
 async def show_focus_stats(callback: CallbackQuery):
     """Показывает статистику фокус-сессий"""
@@ -596,12 +607,7 @@ async def show_period_stats(callback: CallbackQuery):
             'all': 'За всё время'
         }
         
-        text = f"📊 <b>Статистика {period_names[period]}</b>\n\n"
-        text += f"✅ Завершено сессий: {stats['completed_sessions']}\n"
-        text += f"⏱ Общее время фокуса: {stats['total_minutes']} мин\n"
-        text += f"📈 Средняя продолжительность: {stats['avg_duration']} мин\n"
-        text += f"🔥 Текущий streak: {stats['current_streak']} дней\n"
-        text += f"🏆 Лучший streak: {stats['best_streak']} дней"
+        text = PERIOD_STATS_TEMPLATE.render(**{**stats, 'period': period_names[period]})
         
         keyboard = InlineKeyboardBuilder()
         keyboard.row(
@@ -13,11 +13,16 @@ from database.firestore_db import FirestoreDB
 from database.gamification_db import GamificationDB
 from keyboards.profile import (
     get_profile_menu_keyboard, get_achievements_keyboard, get_stats_keyboard,
-    get_achievement_categories_keyboard, get_back_to_profile_keyboard
+    get_achievement_categories_keyboard, get_back_to_profile_keyboard, get_leaderboard_keyboard
 )
 from keyboards.main_menu import get_main_menu_keyboard
-from utils.achievements import ACHIEVEMENTS, get_achievement_message, get_rarity_color
+from utils.achievements import (
+    ACHIEVEMENTS, ACHIEVEMENT_CATALOG, ACHIEVEMENT_CATEGORIES, RARITY_NAMES,
+    get_achievement_message, get_rarity_color
+)
+from utils.leaderboard import BOARD_TITLES, leaderboards
 from utils.messages import ERROR_MESSAGES
+from utils.render import Template, cached_block, join
 
 # Создаем роутер
 router = Router()
@@ -28,6 +33,83 @@ db = FirestoreDB()
 gamification_db = GamificationDB(db.db)
 
 
+# === ШАБЛОНЫ ===
+
+PROFILE_TEMPLATE = Template(
+    "👤 <b>Твой профиль</b>\n\n"
+    "👋 {full_name}\n"
+    "{username_line}"
+    "{days_line}"
+    "\n"
+    "💰 <b>Баланс очков:</b> {balance}\n"
+    "💎 <b>Всего заработано:</b> {total_earned}\n\n"
+    "🏆 <b>Достижений получено:</b> {achievements_count}\n\n"
+    "<b>🔥 Лучшие серии:</b>\n"
+    "• Привычки: {streaks[habits]} дней\n"
+    "• Фокус: {streaks[focus]} дней\n"
+    "• Чек-лист: {streaks[checklist]} дней\n"
+    "• Без вредных привычек: {streaks[bad_habits]} дней\n\n"
+    "<b>📊 Общий прогресс:</b>\n"
+    "• Привычек выполнено: {progress[habits_completed]}\n"
+    "• Фокус-сессий: {progress[focus_sessions]}\n"
+    "• Задач выполнено: {progress[tasks_completed]}\n"
+    "• Часов в фокусе: {progress[focus_hours]}\n\n"
+    "{recent}"
+)
+USERNAME_LINE = Template("🔗 @{}\n")
+DAYS_WITH_US_LINE = Template("📅 С нами: {} дней\n")
+RECENT_HEADER = "<b>🕐 Последние действия:</b>\n"
+RECENT_ACTION_LINE = Template("• {name} (+{points} очков)\n")
+
+LEADERBOARD_TOP = 10
+LEADERBOARD_UNITS = {'points': 'очков', 'weekly': 'очков', 'focus': 'мин', 'streak': 'дн.'}
+LEADERBOARD_MEDALS = {1: '🥇', 2: '🥈', 3: '🥉'}
+LEADERBOARD_LINE = Template("{place} {name} - {score} {unit}\n")
+LEADERBOARD_POSITION = Template("\n<b>Твое место:</b> {rank} из {total} ({score} {unit})")
+LEADERBOARD_NO_POSITION = "\nТебя пока нет в этом рейтинге - выполняй задачи и фокус-сессии! 💪"
+
+ACHIEVEMENTS_PROGRESS_HEADER = Template(
+    "📈 <b>Прогресс по достижениям</b>\n\n"
+    "Общий прогресс: {unlocked}/{total} ({percent:.1f}%)\n"
+    "{bar}\n\n"
+    "<b>По редкости:</b>\n"
+)
+RARITY_PROGRESS_LINE = Template("{color} {name}: {unlocked}/{total}\n")
+ACHIEVEMENTS_NEAR_HEADER = "\n<b>🎯 Близко к получению:</b>\n"
+
+POINTS_HISTORY_HEADER = Template("💰 <b>История очков</b>\n\nТекущий баланс: {balance} очков\n\n")
+POINTS_HISTORY_EMPTY = "История пока пуста.\nВыполняй задачи и получай очки! 💪"
+POINTS_HISTORY_TITLE = "<b>Последние начисления:</b>\n"
+POINTS_HISTORY_LINE = Template("{timestamp:%d.%m %H:%M} | {action} | +{points}\n")
+POINTS_REASON_NAMES = {
+    'habit_completed': '✅ Привычка',
+    'focus_session_complete': '🎯 Фокус',
+    'task_completed': '📋 Задача',
+    'achievement_unlocked': '🏆 Достижение',
+    'bad_habit_day': '💪 День без вредной привычки',
+    'habit_streak_bonus': '🔥 Бонус за streak'
+}
+
+ACHIEVEMENT_LINE = Template("{emoji} {color} {name}\n")
+ACHIEVEMENT_UNLOCKED = Template("✅ {emoji} <b>{name}</b> {color}\n   <i>{description}</i>\n\n")
+ACHIEVEMENT_LOCKED = Template("🔒 {emoji} <s>{name}</s> {color}\n   <i>{description}</i>\n\n")
+
+@cached_block()
+def _achievement_catalog_lines(category: str):
+    """Готовые строки каталога категории: (ID, строка получено, строка закрыто)"""
+    lines = []
+    for ach_id in ACHIEVEMENT_CATALOG.by_category.get(category, ()):
+        ach_data = ACHIEVEMENTS[ach_id]
+        values = dict(
+            emoji=ach_data['emoji'],
+            name=ach_data['name'],
+            description=ach_data['description'],
+            color=get_rarity_color(ach_data['rarity'])
+        )
+        lines.append((ach_id, ACHIEVEMENT_UNLOCKED.render(**values), ACHIEVEMENT_LOCKED.render(**values)))
+    return tuple(lines)
+
+
 # === ГЛАВНОЕ МЕНЮ ПРОФИЛЯ ===
 
 @router.message(F.text == "👤 Профиль", StateFilter(default_state))
@@ -80,53 +162,30 @@ async def show_user_profile(user_id: int, answer_method):
             return
         
         # Формируем текст профиля
-        text = f"👤 <b>Твой профиль</b>\n\n"
-        
-        # Основная информация
-        text += f"👋 {profile.get('full_name', 'Пользователь')}\n"
-        if profile.get('username'):
-            text += f"🔗 @{profile['username']}\n"
-        
         created_at = profile.get('created_at')
+        days_line = ""
         if created_at:
-            from datetime import datetime, timezone 
-            days_with_us = (datetime.now(timezone.utc) - created_at).days
-            text += f"📅 С нами: {days_with_us} дней\n"
-        
-        text += "\n"
-        
-        # Очки
-        balance = profile.get('points_balance', 0)
-        total_earned = profile.get('total_points_earned', 0)
-        text += f"💰 <b>Баланс очков:</b> {balance}\n"
-        text += f"💎 <b>Всего заработано:</b> {total_earned}\n\n"
+            days_line = DAYS_WITH_US_LINE.render((datetime.now(timezone.utc) - created_at).days)
         
-        # Достижения
-        achievements_count = profile.get('achievements_count', 0)
-        text += f"🏆 <b>Достижений получено:</b> {achievements_count}\n\n"
+        recent = profile.get('recent_actions', [])[:3]
+        recent_block = ""
+        if recent:
+            recent_block = join([RECENT_HEADER, RECENT_ACTION_LINE.render_each(recent)])
         
-        # Лучшие streak'и
         streaks = profile.get('best_streaks', {})
-        text += "<b>🔥 Лучшие серии:</b>\n"
-        text += f"• Привычки: {streaks.get('habits', 0)} дней\n"
-        text += f"• Фокус: {streaks.get('focus', 0)} дней\n"
-        text += f"• Чек-лист: {streaks.get('checklist', 0)} дней\n"
-        text += f"• Без вредных привычек: {streaks.get('bad_habits', 0)} дней\n\n"
-        
-        # Общий прогресс
         progress = profile.get('total_progress', {})
-        text += "<b>📊 Общий прогресс:</b>\n"
-        text += f"• Привычек выполнено: {progress.get('habits_completed', 0)}\n"
-        text += f"• Фокус-сессий: {progress.get('focus_sessions', 0)}\n"
-        text += f"• Задач выполнено: {progress.get('tasks_completed', 0)}\n"
-        text += f"• Часов в фокусе: {progress.get('focus_hours', 0)}\n\n"
-        
-        # Последние действия
-        recent = profile.get('recent_actions', [])
-        if recent:
-            text += "<b>🕐 Последние действия:</b>\n"
-            for action in recent[:3]:
-                text += f"• {action['name']} (+{action['points']} очков)\n"
+        text = PROFILE_TEMPLATE.render(
+            full_name=profile.get('full_name', 'Пользователь'),
+            username_line=USERNAME_LINE.render(profile['username']) if profile.get('username') else "",
+            days_line=days_line,
+            balance=profile.get('points_balance', 0),
+            total_earned=profile.get('total_points_earned', 0),
+            achievements_count=profile.get('achievements_count', 0),
+            streaks={key: streaks.get(key, 0) for key in ('habits', 'focus', 'checklist', 'bad_habits')},
+            progress={key: progress.get(key, 0) for key in
+                      ('habits_completed', 'focus_sessions', 'tasks_completed', 'focus_hours')},
+            recent=recent_block
+        )
         
         logger.info(f"Профиль пользователя {user_id} успешно сформирован")
         
@@ -155,26 +214,29 @@ async def show_achievements_menu(callback: CallbackQuery):
     try:
         achievements = await gamification_db.get_user_achievements(user_id)
         
-        text = "🏆 <b>Твои достижения</b>\n\n"
+        parts = ["🏆 <b>Твои достижения</b>\n\n"]
         
         if not achievements:
-            text += "У тебя пока нет достижений.\n"
-            text += "Выполняй задачи, развивай привычки и получай награды! 💪"
+            parts.append("У тебя пока нет достижений.\n")
+            parts.append("Выполняй задачи, развивай привычки и получай награды! 💪")
         else:
-            text += f"Получено достижений: {len(achievements)}\n"
-            text += f"Всего доступно: {len(ACHIEVEMENTS)}\n\n"
+            parts.append(f"Получено достижений: {len(achievements)}\n")
+            parts.append(f"Всего доступно: {ACHIEVEMENT_CATALOG.total}\n\n")
             
             # Показываем последние 5 достижений
-            text += "<b>Последние полученные:</b>\n"
-            for ach in achievements[:5]:
-                emoji = ach.get('emoji', '🏅')
-                name = ach.get('name', 'Достижение')
-                rarity = ach.get('rarity', 'common')
-                color = get_rarity_color(rarity)
-                text += f"{emoji} {color} {name}\n"
+            parts.append("<b>Последние полученные:</b>\n")
+            parts.extend(
+                ACHIEVEMENT_LINE.render(
+                    emoji=ach.get('emoji', '🏅'),
+                    name=ach.get('name', 'Достижение'),
+                    color=get_rarity_color(ach.get('rarity', 'common'))
+                )
+                for ach in achievements[:5]
+            )
             
             if len(achievements) > 5:
-                text += f"\n...и еще {len(achievements) - 5} достижений"
+                parts.append(f"\n...и еще {len(achievements) - 5} достижений")
+        text = join(parts)
         
         await callback.message.edit_text(
             text,
@@ -207,51 +269,15 @@ async def show_achievements_by_category(callback: CallbackQuery):
     category = callback.data.split(":")[1]
     
     try:
-        # Получаем достижения пользователя
-        user_achievements = await gamification_db.get_user_achievements(user_id)
-        user_ach_ids = [ach.get('achievement_id') for ach in user_achievements if 'achievement_id' in ach]
+        # Получаем только ID достижений пользователя
+        user_ach_ids = await gamification_db.get_unlocked_achievement_ids(user_id)
         
-        # Фильтруем достижения по категории
-        category_achievements = []
-        for ach_id, ach_data in ACHIEVEMENTS.items():
-            condition_type = ach_data['condition']['type']
-            
-            # Определяем категорию
-            if category == 'habits' and condition_type == 'habit_streak':
-                category_achievements.append((ach_id, ach_data))
-            elif category == 'focus' and condition_type in ['focus_sessions', 'focus_hours']:
-                category_achievements.append((ach_id, ach_data))
-            elif category == 'tasks' and condition_type == 'tasks_completed':
-                category_achievements.append((ach_id, ach_data))
-            elif category == 'bad_habits' and condition_type == 'bad_habit_free':
-                category_achievements.append((ach_id, ach_data))
-            elif category == 'special' and condition_type in ['special', 'first_action']:
-                category_achievements.append((ach_id, ach_data))
-        
-        # Формируем текст
-        category_names = {
-            'habits': '🌱 Достижения привычек',
-            'focus': '🎯 Достижения фокуса',
-            'tasks': '📋 Достижения задач',
-            'bad_habits': '💪 Победа над вредными привычками',
-            'special': '⭐ Особые достижения'
-        }
-        
-        text = f"<b>{category_names.get(category, 'Достижения')}</b>\n\n"
-        
-        for ach_id, ach_data in category_achievements:
-            emoji = ach_data['emoji']
-            name = ach_data['name']
-            description = ach_data['description']
-            rarity = ach_data['rarity']
-            color = get_rarity_color(rarity)
-            
-            if ach_id in user_ach_ids:
-                text += f"✅ {emoji} <b>{name}</b> {color}\n"
-            else:
-                text += f"🔒 {emoji} <s>{name}</s> {color}\n"
-            
-            text += f"   <i>{description}</i>\n\n"
+        # Строки каталога собраны заранее, выбираем вариант по статусу
+        title = ACHIEVEMENT_CATEGORIES.get(category, ('Достижения',))[0]
+        text = join([f"<b>{title}</b>\n\n"] + [
+            unlocked if ach_id in user_ach_ids else locked
+            for ach_id, unlocked, locked in _achievement_catalog_lines(category)
+        ])
         
         await callback.message.edit_text(
             text,
@@ -271,49 +297,30 @@ async def show_achievements_progress(callback: CallbackQuery):
     user_id = callback.from_user.id
     
     try:
-        achievements = await gamification_db.get_user_achievements(user_id)
-        user_ach_ids = [ach.get('achievement_id') for ach in achievements if 'achievement_id' in ach]
-        
-        # Считаем по редкости
-        rarity_counts = {
-            'common': {'total': 0, 'unlocked': 0},
-            'rare': {'total': 0, 'unlocked': 0},
-            'epic': {'total': 0, 'unlocked': 0},
-            'legendary': {'total': 0, 'unlocked': 0}
-        }
-        
-        for ach_id, ach_data in ACHIEVEMENTS.items():
-            rarity = ach_data.get('rarity', 'common')
-            rarity_counts[rarity]['total'] += 1
-            if ach_id in user_ach_ids:
-                rarity_counts[rarity]['unlocked'] += 1
-        
-        text = "📈 <b>Прогресс по достижениям</b>\n\n"
+        user_ach_ids = await gamification_db.get_unlocked_achievement_ids(user_id)
         
-        total_unlocked = len(user_ach_ids)
-        total_available = len(ACHIEVEMENTS)
+        total_unlocked = len(user_ach_ids & ACHIEVEMENTS.keys())
+        total_available = ACHIEVEMENT_CATALOG.total
         progress_percent = (total_unlocked / total_available * 100) if total_available > 0 else 0
-        
-        text += f"Общий прогресс: {total_unlocked}/{total_available} ({progress_percent:.1f}%)\n"
-        text += f"{'█' * int(progress_percent / 10)}{'░' * (10 - int(progress_percent / 10))}\n\n"
-        
-        text += "<b>По редкости:</b>\n"
-        for rarity, counts in rarity_counts.items():
-            color = get_rarity_color(rarity)
-            rarity_names = {
-                'common': 'Обычные',
-                'rare': 'Редкие',
-                'epic': 'Эпические',
-                'legendary': 'Легендарные'
-            }
-            name = rarity_names.get(rarity, rarity)
-            unlocked = counts['unlocked']
-            total = counts['total']
-            text += f"{color} {name}: {unlocked}/{total}\n"
-        
-        # Ближайшие достижения
-        text += "\n<b>🎯 Близко к получению:</b>\n"
-        # Здесь можно добавить логику показа ближайших достижений
+        filled = int(progress_percent / 10)
+        
+        # Считаем по редкости по предвычисленным группам каталога
+        text = join([
+            ACHIEVEMENTS_PROGRESS_HEADER.render(
+                unlocked=total_unlocked, total=total_available, percent=progress_percent,
+                bar='█' * filled + '░' * (10 - filled)
+            ),
+            join(
+                RARITY_PROGRESS_LINE.render(
+                    color=get_rarity_color(rarity), name=RARITY_NAMES.get(rarity, rarity),
+                    unlocked=unlocked, total=total
+                )
+                for rarity, (unlocked, total) in ACHIEVEMENT_CATALOG.rarity_progress(user_ach_ids).items()
+            ),
+            # Ближайшие достижения
+            # Здесь можно добавить логику показа ближайших достижений
+            ACHIEVEMENTS_NEAR_HEADER,
+        ])
         
         await callback.message.edit_text(
             text,
@@ -338,34 +345,18 @@ async def show_points_history(callback: CallbackQuery):
         history = await gamification_db.get_points_history(user_id, limit=15)
         balance = await gamification_db.get_points_balance(user_id)
         
-        text = f"💰 <b>История очков</b>\n\n"
-        text += f"Текущий баланс: {balance} очков\n\n"
-        
-        if not history:
-            text += "История пока пуста.\n"
-            text += "Выполняй задачи и получай очки! 💪"
+        if history:
+            body = join([POINTS_HISTORY_TITLE] + [
+                POINTS_HISTORY_LINE.render(
+                    timestamp=record['timestamp'],
+                    action=POINTS_REASON_NAMES.get(record.get('reason', ''), 'Действие'),
+                    points=record.get('points', 0)
+                )
+                for record in history if record.get('timestamp')
+            ])
         else:
-            text += "<b>Последние начисления:</b>\n"
-            
-            reason_names = {
-                'habit_completed': '✅ Привычка',
-                'focus_session_complete': '🎯 Фокус',
-                'task_completed': '📋 Задача',
-                'achievement_unlocked': '🏆 Достижение',
-                'bad_habit_day': '💪 День без вредной привычки',
-                'habit_streak_bonus': '🔥 Бонус за streak'
-            }
-            
-            for record in history:
-                reason = record.get('reason', '')
-                points = record.get('points', 0)
-                timestamp = record.get('timestamp')
-                
-                action_name = reason_names.get(reason, 'Действие')
-                
-                if timestamp:
-                    time_str = timestamp.strftime('%d.%m %H:%M')
-                    text += f"{time_str} | {action_name} | +{points}\n"
+            body = POINTS_HISTORY_EMPTY
+        text = join([POINTS_HISTORY_HEADER.render(balance=balance), body])
         
         await callback.message.edit_text(
             text,
@@ -379,6 +370,57 @@ async def show_points_history(callback: CallbackQuery):
     await callback.answer()
 
 
+# === РЕЙТИНГ ===
+
+@router.callback_query(F.data.startswith("leaderboard:"))
+async def show_leaderboard(callback: CallbackQuery):
+    """Показывает первые места рейтинга и место пользователя"""
+    user_id = callback.from_user.id
+    board = callback.data.split(":", 1)[1]
+    if board not in BOARD_TITLES:
+        board = 'points'
+    
+    try:
+        # Рейтинги в памяти: место за O(log n), первые места за O(k)
+        top = leaderboards.top(board, LEADERBOARD_TOP)
+        position = leaderboards.position(board, user_id)
+        names = await gamification_db.get_display_names([uid for _, uid, _ in top])
+        unit = LEADERBOARD_UNITS[board]
+        
+        lines = join(
+            LEADERBOARD_LINE.render(
+                place=LEADERBOARD_MEDALS.get(rank, f"{rank}."),
+                name=names.get(uid, 'Пользователь'),
+                score=score,
+                unit=unit
+            )
+            for rank, uid, score in top
+        )
+        if position:
+            rank, score = position
+            footer = LEADERBOARD_POSITION.render(
+                rank=rank, total=leaderboards.size(board), score=score, unit=unit
+            )
+        else:
+            footer = LEADERBOARD_NO_POSITION
+        text = join([
+            f"🥇 <b>Рейтинг: {BOARD_TITLES[board]}</b>\n\n",
+            lines or "Рейтинг пока пуст.\n",
+            footer,
+        ])
+        
+        await callback.message.edit_text(
+            text,
+            reply_markup=get_leaderboard_keyboard(board),
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при показе рейтинга: {e}")
+        await callback.answer(ERROR_MESSAGES['unknown_error'], show_alert=True)
+    
+    await callback.answer()
+
+
 # === СТАТИСТИКА ===
 
 @router.callback_query(F.data == "detailed_stats")
@@ -8,39 +8,46 @@ from aiogram.filters import Command
 
 from database.firestore_db import FirestoreDB
 from database.settings_db import SettingsDB
-from keyboards.settings import get_settings_keyboard
+from database.reminder_db import DEFAULT_TIMEZONE, ReminderDB
+from database.assistant_profile_db import AssistantProfileDB
+from keyboards.settings import get_reminder_time_keyboard, get_settings_keyboard
 from keyboards.main_menu import get_main_menu_keyboard
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Снимки настроек и отложенные записи живут в одном экземпляре на процесс
+db = FirestoreDB()
+settings_db = SettingsDB(db.db)
+reminder_db = ReminderDB(db.db)
+profile_db = AssistantProfileDB(db.db)
+
+THEME_NAMES = {
+    'system': 'System',
+    'light': 'Light',
+    'dark': 'Dark'
+}
+
+
+def get_settings_text(settings: dict) -> str:
+    """Текст экрана настроек"""
+    notifications_status = "Включены" if settings['notifications_enabled'] else "Выключены"
+    current_theme = THEME_NAMES.get(settings['theme'], 'System')
+    return (
+        "⚙️ <b>Настройки</b>\n\n"
+        f"🔔 Уведомления: <b>{notifications_status}</b>\n"
+        f"🎨 Тема: <b>{current_theme}</b>\n\n"
+        "<i>Тема применится в Mini App</i>"
+    )
+
 
 async def show_settings_menu(message: Message):
     """Показать меню настроек"""
     try:
-        # Получаем экземпляр БД
-        db = FirestoreDB()
-        settings_db = SettingsDB(db.db)
-        
         # Получаем текущие настройки
         user_id = str(message.from_user.id)
-        settings = settings_db.get_settings(user_id)
-        
-        # Формируем текст
-        notifications_status = "Включены" if settings['notifications_enabled'] else "Выключены"
-        theme_names = {
-            'system': 'System',
-            'light': 'Light', 
-            'dark': 'Dark'
-        }
-        current_theme = theme_names.get(settings['theme'], 'System')
-        
-        text = (
-            "⚙️ <b>Настройки</b>\n\n"
-            f"🔔 Уведомления: <b>{notifications_status}</b>\n"
-            f"🎨 Тема: <b>{current_theme}</b>\n\n"
-            "<i>Тема применится в Mini App</i>"
-        )
+        settings = await settings_db.get_settings(user_id)
+        text = get_settings_text(settings)
         
         await message.answer(
             text,
@@ -75,33 +82,13 @@ async def settings_button(message: Message):
 async def toggle_notifications_handler(callback: CallbackQuery):
     """Переключить уведомления вкл/выкл"""
     try:
-        # Получаем БД
-        db = FirestoreDB()
-        settings_db = SettingsDB(db.db)
-        
         user_id = str(callback.from_user.id)
         
-        # Переключаем
-        new_value = settings_db.toggle_notifications(user_id)
-        
-        # Получаем все настройки для обновления клавиатуры
-        settings = settings_db.get_settings(user_id)
-        
-        # Обновляем сообщение
-        notifications_status = "Включены" if new_value else "Выключены"
-        theme_names = {
-            'system': 'System',
-            'light': 'Light',
-            'dark': 'Dark'
-        }
-        current_theme = theme_names.get(settings['theme'], 'System')
-        
-        text = (
-            "⚙️ <b>Настройки</b>\n\n"
-            f"🔔 Уведомления: <b>{notifications_status}</b>\n"
-            f"🎨 Тема: <b>{current_theme}</b>\n\n"
-            "<i>Тема применится в Mini App</i>"
-        )
+        # Переключаем: результат собирается из снимка, без повторного чтения
+        settings = await settings_db.toggle_notifications(user_id)
+        await reminder_db.set_enabled(user_id, settings['notifications_enabled'])
+        notifications_status = "Включены" if settings['notifications_enabled'] else "Выключены"
+        text = get_settings_text(settings)
         
         await callback.message.edit_text(
             text,
@@ -117,6 +104,85 @@ async def toggle_notifications_handler(callback: CallbackQuery):
         await callback.answer("❌ Произошла ошибка", show_alert=True)
 
 
+# Выбор времени напоминания
+@router.callback_query(F.data == "reminder_menu")
+async def reminder_menu_handler(callback: CallbackQuery):
+    """Показать выбор времени ежедневного напоминания"""
+    try:
+        user_id = str(callback.from_user.id)
+        reminder = await reminder_db.get_reminder(user_id) or {}
+        settings = await settings_db.get_settings(user_id)
+        
+        current = reminder.get('reminder_time')
+        text = "⏰ <b>Ежедневное напоминание</b>\n\n"
+        if current:
+            text += f"Сейчас: <b>{current}</b> ({reminder.get('timezone') or DEFAULT_TIMEZONE})\n"
+        else:
+            text += "Время не выбрано\n"
+        if not settings['notifications_enabled']:
+            text += "\n<i>Уведомления выключены - напоминание придет после их включения</i>\n"
+        text += "\nВыберите время:"
+        
+        await callback.message.edit_text(
+            text,
+            reply_markup=get_reminder_time_keyboard(current),
+            parse_mode="HTML"
+        )
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Ошибка показа времени напоминания: {e}", exc_info=True)
+        await callback.answer("❌ Произошла ошибка", show_alert=True)
+
+
+# Установка времени напоминания
+@router.callback_query(F.data.startswith("set_reminder:"))
+async def set_reminder_handler(callback: CallbackQuery):
+    """Сохранить время напоминания"""
+    try:
+        reminder_time = callback.data.split(":", 1)[1]
+        user_id = str(callback.from_user.id)
+        settings = await settings_db.get_settings(user_id)
+        
+        # Предпочтения профиля и индекс напоминаний обновляются вместе;
+        # при выключенных уведомлениях время сохраняется, но не планируется
+        success = await profile_db.update_preferences(int(user_id), {
+            'reminder_time': reminder_time,
+            'notifications_enabled': settings['notifications_enabled']
+        })
+        if not success:
+            await callback.answer("❌ Не удалось сохранить время", show_alert=True)
+            return
+        
+        await callback.message.edit_text(
+            get_settings_text(settings),
+            reply_markup=get_settings_keyboard(settings),
+            parse_mode="HTML"
+        )
+        await callback.answer(f"Напоминание: {reminder_time}")
+        
+    except Exception as e:
+        logger.error(f"Ошибка установки времени напоминания: {e}", exc_info=True)
+        await callback.answer("❌ Произошла ошибка", show_alert=True)
+
+
+# Возврат из выбора времени к настройкам
+@router.callback_query(F.data == "reminder_back")
+async def reminder_back_handler(callback: CallbackQuery):
+    """Вернуться к экрану настроек"""
+    try:
+        settings = await settings_db.get_settings(str(callback.from_user.id))
+        await callback.message.edit_text(
+            get_settings_text(settings),
+            reply_markup=get_settings_keyboard(settings),
+            parse_mode="HTML"
+        )
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Ошибка возврата к настройкам: {e}", exc_info=True)
+        await callback.answer("❌ Произошла ошибка", show_alert=True)
+
+
 # Установка темы
 @router.callback_query(F.data.startswith("set_theme:"))
 async def set_theme_handler(callback: CallbackQuery):
@@ -125,33 +191,15 @@ async def set_theme_handler(callback: CallbackQuery):
         # Извлекаем тему из callback_data
         theme = callback.data.split(":")[1]
         
-        # Получаем БД
-        db = FirestoreDB()
-        settings_db = SettingsDB(db.db)
-        
         user_id = str(callback.from_user.id)
         
         # Обновляем тему
-        updated_settings = settings_db.update_settings(
+        updated_settings = await settings_db.update_settings(
             user_id,
             {'theme': theme}
         )
-        
-        # Обновляем сообщение
-        notifications_status = "Включены" if updated_settings['notifications_enabled'] else "Выключены"
-        theme_names = {
-            'system': 'System',
-            'light': 'Light',
-            'dark': 'Dark'
-        }
-        current_theme = theme_names.get(theme, 'System')
-        
-        text = (
-            "⚙️ <b>Настройки</b>\n\n"
-            f"🔔 Уведомления: <b>{notifications_status}</b>\n"
-            f"🎨 Тема: <b>{current_theme}</b>\n\n"
-            "<i>Тема применится в Mini App</i>"
-        )
+        current_theme = THEME_NAMES.get(theme, 'System')
+        text = get_settings_text(updated_settings)
         
         await callback.message.edit_text(
             text,
@@ -180,62 +228,3 @@ async def back_to_main_handler(callback: CallbackQuery):
     except Exception as e:
         logger.error(f"Ошибка возврата в меню: {e}", exc_info=True)
         await callback.answer("❌ Произошла ошибка", show_alert=True)
-
-@router.callback_query(F.data == "toggle_notifications")
-async def toggle_notifications_handler(callback: CallbackQuery):
-    """Переключить уведомления вкл/выкл"""
-    try:
-        # Получаем БД
-        logger.info("Начинаем переключение уведомлений...")
-        db = FirestoreDB()
-        logger.info("FirestoreDB создан")
-        
-        settings_db = SettingsDB(db.db)
-        logger.info("SettingsDB создан")
-        
-        user_id = str(callback.from_user.id)
-        logger.info(f"User ID: {user_id}")
-        
-        # Переключаем
-        new_value = settings_db.toggle_notifications(user_id)
-        logger.info(f"Новое значение: {new_value}")
-        
-        # Получаем все настройки для обновления клавиатуры
-        settings = settings_db.get_settings(user_id)
-        logger.info(f"Настройки получены: {settings}")
-        
-        # Обновляем сообщение
-        notifications_status = "Включены" if new_value else "Выключены"
-        theme_names = {
-            'system': 'System',
-            'light': 'Light',
-            'dark': 'Dark'
-        }
-        current_theme = theme_names.get(settings['theme'], 'System')
-        
-        text = (
-            "⚙️ <b>Настройки</b>\n\n"
-            f"🔔 Уведомления: <b>{notifications_status}</b>\n"
-            f"🎨 Тема: <b>{current_theme}</b>\n\n"
-            "<i>Тема применится в Mini App</i>"
-        )
-        
-        await callback.message.edit_text(
-            text,
-            reply_markup=get_settings_keyboard(settings),
-            parse_mode="HTML"
-        )
-        
-        # Отвечаем коротким уведомлением
-        await callback.answer(f"Уведомления: {notifications_status}")
-        
-    except Exception as e:
-    # Выводим ошибку прямо в чат для отладки
-      error_text = f"Тип: {type(e).__name__}\nТекст: {str(e)}\nАтрибуты: {dir(e)}"
-    logger.error(f"ОТЛАДКА: {error_text}")
-    
-    # Показываем детали пользователю временно
-    await callback.answer(error_text[:200], show_alert=True)
-    
-    # Также отправим в чат для лучшей видимости
-    await callback.message.answer(f"<pre>ОТЛАДКА ОШИБКИ:\n{error_text}</pre>", parse_mode="HTML")
\ No newline at end of file
@@ -3,8 +3,10 @@
 """
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
+from keyboards.cache import static_keyboard
 
 
+@static_keyboard
 def get_assistant_menu_keyboard() -> InlineKeyboardMarkup:
     """
     Главное меню ИИ-ассистента
@@ -58,6 +60,7 @@ def get_assistant_menu_keyboard() -> InlineKeyboardMarkup:
 
 
 
+@static_keyboard
 def get_scenarios_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура с быстрыми сценариями
@@ -86,6 +89,7 @@ def get_scenarios_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_exit_keyboard() -> ReplyKeyboardMarkup:
     """
     Клавиатура для выхода из режима ассистента
@@ -99,6 +103,7 @@ def get_exit_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 
+@static_keyboard
 def get_back_to_scenarios_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура для возврата к сценариям после ответа
@@ -127,6 +132,7 @@ def get_back_to_scenarios_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_chat_mode_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура для режима свободного чата
@@ -155,6 +161,7 @@ def get_chat_mode_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_error_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура для сообщений об ошибках
@@ -177,6 +184,7 @@ def get_error_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_demo_mode_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура для демо-режима
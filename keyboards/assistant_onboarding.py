@@ -4,8 +4,10 @@
 from typing import List, Dict, Optional
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.cache import static_keyboard, cached_keyboard
 
 
+@static_keyboard
 def get_onboarding_start_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура начала онбординга"""
     builder = InlineKeyboardBuilder()
@@ -31,6 +33,7 @@ def get_onboarding_start_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@cached_keyboard
 def get_plan_preview_keyboard(start_day: int, horizon_days: int) -> InlineKeyboardMarkup:
     """
     Создает клавиатуру для превью плана с навигацией
@@ -82,6 +85,7 @@ def get_plan_preview_keyboard(start_day: int, horizon_days: int) -> InlineKeyboa
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@static_keyboard
 def get_plan_saved_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура после сохранения плана"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -101,6 +105,7 @@ def get_plan_saved_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@static_keyboard
 def get_plan_generate_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура с кнопкой генерации плана"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -120,6 +125,7 @@ def get_plan_generate_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@static_keyboard
 def get_plan_management_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура меню плана (когда план уже есть):
@@ -178,6 +184,7 @@ def get_category_selection_keyboard(categories: Dict[str, Dict]) -> InlineKeyboa
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_progress_keyboard(current: int, total: int) -> InlineKeyboardMarkup:
     """Клавиатура с прогрессом"""
     builder = InlineKeyboardBuilder()
@@ -196,6 +203,7 @@ def get_progress_keyboard(current: int, total: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_skip_or_back_keyboard(can_skip: bool = True) -> InlineKeyboardMarkup:
     """Клавиатура с опциями пропуска и возврата"""
     builder = InlineKeyboardBuilder()
@@ -228,6 +236,7 @@ def get_skip_or_back_keyboard(can_skip: bool = True) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_time_selection_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для быстрого выбора времени"""
     builder = InlineKeyboardBuilder()
@@ -298,6 +307,7 @@ def get_date_quick_select_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_number_quick_select_keyboard(min_val: int, max_val: int, step: int = 1, unit: str = "") -> InlineKeyboardMarkup:
     """Клавиатура для быстрого выбора числа"""
     builder = InlineKeyboardBuilder()
@@ -337,6 +347,7 @@ def get_number_quick_select_keyboard(min_val: int, max_val: int, step: int = 1,
     return builder.as_markup()
 
 
+@static_keyboard
 def get_help_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура помощи"""
     builder = InlineKeyboardBuilder()
@@ -377,6 +388,7 @@ def get_help_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_example_keyboard(category: str) -> InlineKeyboardMarkup:
     """Клавиатура с примерами для категории"""
     builder = InlineKeyboardBuilder()
@@ -439,6 +451,7 @@ def get_example_keyboard(category: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_error_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура при ошибке"""
     builder = InlineKeyboardBuilder()
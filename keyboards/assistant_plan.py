@@ -2,8 +2,10 @@
 Клавиатуры для работы с планами ИИ-ассистента
 """
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from keyboards.cache import static_keyboard, cached_keyboard
 
 
+@cached_keyboard
 def get_plan_preview_keyboard(start_day: int, horizon_days: int) -> InlineKeyboardMarkup:
     """
     Создает клавиатуру для превью плана с навигацией
@@ -57,6 +59,7 @@ def get_plan_preview_keyboard(start_day: int, horizon_days: int) -> InlineKeyboa
 
 
 
+@static_keyboard
 def get_plan_saved_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура после сохранения плана"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -76,6 +79,7 @@ def get_plan_saved_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@static_keyboard
 def get_plan_generate_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура с кнопкой генерации плана"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -94,6 +98,7 @@ def get_plan_generate_keyboard() -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@static_keyboard
 def get_plan_management_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура меню плана (когда план уже есть):
@@ -0,0 +1,109 @@
+"""
+Кэширование клавиатур
+
+Клавиатуры не зависят от пользователя, поэтому статические собираются
+один раз, а параметризованные кэшируются по аргументам (LRU).
+Возвращаемая разметка общая для всех вызовов, поэтому она заморожена:
+ряды - кортежи, а разметка и кнопки не допускают присваивания полей.
+Для правок собирайте новую клавиатуру из ее кнопок.
+"""
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+from pydantic import ConfigDict
+
+# Размер LRU-кэша для клавиатур с параметрами
+KEYBOARD_CACHE_SIZE = 1024
+
+_cached: List[Callable] = []
+
+
+class FrozenInlineKeyboardButton(InlineKeyboardButton):
+    """Кнопка общей клавиатуры: поля нельзя изменить"""
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """Общая inline-клавиатура: неизменяемые ряды и кнопки"""
+    model_config = ConfigDict(frozen=True)
+    inline_keyboard: Tuple[Tuple[FrozenInlineKeyboardButton, ...], ...]
+
+
+class FrozenKeyboardButton(KeyboardButton):
+    """Кнопка общей reply-клавиатуры: поля нельзя изменить"""
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenReplyKeyboardMarkup(ReplyKeyboardMarkup):
+    """Общая reply-клавиатура: неизменяемые ряды и кнопки"""
+    model_config = ConfigDict(frozen=True)
+    keyboard: Tuple[Tuple[FrozenKeyboardButton, ...], ...]
+
+
+def _freeze_rows(rows, button_cls) -> tuple:
+    return tuple(
+        tuple(button_cls.model_construct(_fields_set=button.model_fields_set, **dict(button)) for button in row)
+        for row in rows
+    )
+
+
+def freeze_markup(markup: Any) -> Any:
+    """
+    Замораживает клавиатуру перед помещением в общий кэш
+    
+    Args:
+        markup: InlineKeyboardMarkup / ReplyKeyboardMarkup (прочее возвращается как есть)
+        
+    Returns:
+        Замороженная копия разметки
+    """
+    if isinstance(markup, (FrozenInlineKeyboardMarkup, FrozenReplyKeyboardMarkup)):
+        return markup
+    if isinstance(markup, InlineKeyboardMarkup):
+        return FrozenInlineKeyboardMarkup.model_construct(
+            inline_keyboard=_freeze_rows(markup.inline_keyboard, FrozenInlineKeyboardButton)
+        )
+    if isinstance(markup, ReplyKeyboardMarkup):
+        fields = {name: value for name, value in markup if name != 'keyboard'}
+        return FrozenReplyKeyboardMarkup.model_construct(
+            _fields_set=markup.model_fields_set,
+            keyboard=_freeze_rows(markup.keyboard, FrozenKeyboardButton),
+            **fields
+        )
+    return markup
+
+
+def _frozen(func: Callable) -> Callable:
+    @wraps(func)
+    def build(*args, **kwargs):
+        return freeze_markup(func(*args, **kwargs))
+    return build
+
+
+def static_keyboard(func: Callable) -> Callable:
+    """Клавиатура без параметров: собирается при первом вызове и переиспользуется"""
+    cached = lru_cache(maxsize=None)(_frozen(func))
+    _cached.append(cached)
+    return cached
+
+
+def cached_keyboard(func: Callable) -> Callable:
+    """Клавиатура с хешируемыми параметрами: LRU-кэш по аргументам"""
+    cached = lru_cache(maxsize=KEYBOARD_CACHE_SIZE)(_frozen(func))
+    _cached.append(cached)
+    return cached
+
+
+def keyboard_cache_info() -> Dict[str, Dict[str, int]]:
+    """Статистика попаданий по всем кэшированным клавиатурам"""
+    return {
+        f"{func.__module__}.{func.__qualname__}": func.cache_info()._asdict()
+        for func in _cached
+    }
+
+
+def clear_keyboard_caches():
+    """Сбрасывает кэши всех клавиатур"""
+    for func in _cached:
+        func.cache_clear()
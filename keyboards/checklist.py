@@ -3,9 +3,11 @@
 """
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from keyboards.cache import static_keyboard, cached_keyboard
 
 
+@static_keyboard
 def get_checklist_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню чек-листа"""
     builder = InlineKeyboardBuilder()
@@ -27,6 +29,7 @@ def get_checklist_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_priority_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора приоритета задачи"""
     builder = InlineKeyboardBuilder()
@@ -65,25 +68,33 @@ def get_priority_keyboard() -> InlineKeyboardMarkup:
 def get_tasks_list_keyboard(tasks: List[Dict[str, Any]], task_type: str = "all", 
                            page: int = 1, tasks_per_page: int = 10) -> InlineKeyboardMarkup:
     """Клавиатура со списком задач с пагинацией"""
+    # Ключ кэша - только то, что видно на странице, плюс общее число задач
+    start_idx = (page - 1) * tasks_per_page
+    page_rows = tuple(
+        (task['id'], task.get('title', 'Без названия'), task.get('status'), task.get('priority'))
+        for task in tasks[start_idx:start_idx + tasks_per_page]
+    )
+    return _build_tasks_list_keyboard(page_rows, len(tasks), task_type, page, tasks_per_page)
+
+
+@cached_keyboard
+def _build_tasks_list_keyboard(page_rows: Tuple[Tuple[Any, ...], ...], total_tasks: int, task_type: str,
+                               page: int, tasks_per_page: int) -> InlineKeyboardMarkup:
+    """Собирает клавиатуру страницы списка задач"""
     builder = InlineKeyboardBuilder()
     
-    if not tasks:
+    if not total_tasks:
         builder.row(
             InlineKeyboardButton(text="Нет задач", callback_data="no_tasks")
         )
     else:
-        # Вычисляем индексы для текущей страницы
-        total_tasks = len(tasks)
         total_pages = (total_tasks + tasks_per_page - 1) // tasks_per_page
-        start_idx = (page - 1) * tasks_per_page
-        end_idx = min(start_idx + tasks_per_page, total_tasks)
         
         # Показываем задачи текущей страницы
-        for task in tasks[start_idx:end_idx]:
-            priority_symbol = get_priority_symbol(task.get('priority'))
+        for task_id, title, status, priority in page_rows:
+            priority_symbol = get_priority_symbol(priority)
             # Проверяем статус задачи
-            status = "✓" if task.get('status') == 'completed' else "▸"
-            title = task.get('title', 'Без названия')
+            status = "✓" if status == 'completed' else "▸"
             # Обрезаем слишком длинные названия
             if len(title) > 30:
                 title = title[:27] + "..."
@@ -91,7 +102,7 @@ def get_tasks_list_keyboard(tasks: List[Dict[str, Any]], task_type: str = "all",
             builder.row(
                 InlineKeyboardButton(
                     text=f"{status} {priority_symbol} {title}",
-                    callback_data=f"task_detail:{task['id']}"
+                    callback_data=f"task_detail:{task_id}"
                 )
             )
         
@@ -131,6 +142,7 @@ def get_tasks_list_keyboard(tasks: List[Dict[str, Any]], task_type: str = "all",
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_task_actions_keyboard(task_id: str, is_completed: bool) -> InlineKeyboardMarkup:
     """Клавиатура действий с задачей"""
     builder = InlineKeyboardBuilder()
@@ -153,6 +165,7 @@ def get_task_actions_keyboard(task_id: str, is_completed: bool) -> InlineKeyboar
     return builder.as_markup()
 
 
+@static_keyboard
 def get_deadline_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора дедлайна"""
     builder = InlineKeyboardBuilder()
@@ -182,6 +195,7 @@ def get_deadline_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_skip_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура для пропуска шага"""
     builder = ReplyKeyboardBuilder()
@@ -191,6 +205,7 @@ def get_skip_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 
+@static_keyboard
 def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура подтверждения действия"""
     builder = InlineKeyboardBuilder()
@@ -230,6 +245,7 @@ def get_priority_name(priority: str) -> str:
     return priority_names.get(priority, 'Без приоритета')
 
 
+@cached_keyboard
 def get_edit_field_keyboard(task_id: str) -> InlineKeyboardMarkup:
     """Клавиатура выбора поля для редактирования"""
     builder = InlineKeyboardBuilder()
@@ -253,6 +269,7 @@ def get_edit_field_keyboard(task_id: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_cancel_edit_keyboard(task_id: str) -> ReplyKeyboardMarkup:
     """Клавиатура отмены редактирования"""
     builder = ReplyKeyboardBuilder()
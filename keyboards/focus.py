@@ -4,8 +4,10 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from typing import Optional, Dict, Any, List
+from keyboards.cache import static_keyboard, cached_keyboard
 
 
+@static_keyboard
 def get_focus_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню модуля Фокус"""
     builder = InlineKeyboardBuilder()
@@ -27,6 +29,7 @@ def get_focus_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_session_control_keyboard(is_paused: bool = False) -> InlineKeyboardMarkup:
     """Управление активной сессией"""
     builder = InlineKeyboardBuilder()
@@ -112,6 +115,7 @@ def get_duration_presets_keyboard(duration_type: str, presets: List[int]) -> Inl
     return builder.as_markup()
 
 
+@static_keyboard
 def get_stats_period_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора периода статистики"""
     builder = InlineKeyboardBuilder()
@@ -135,6 +139,7 @@ def get_stats_period_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_session_complete_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура после завершения сессии"""
     builder = InlineKeyboardBuilder()
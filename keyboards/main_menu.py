@@ -5,9 +5,11 @@ from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.cache import static_keyboard, cached_keyboard
 
 
 
+@static_keyboard
 def get_main_menu_keyboard() -> ReplyKeyboardMarkup:
     """
     Создает клавиатуру главного меню
@@ -39,6 +41,7 @@ def get_main_menu_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 
+@static_keyboard
 def get_skip_keyboard() -> ReplyKeyboardMarkup:
     """
     Создает клавиатуру с кнопкой "Пропустить"
@@ -51,6 +54,7 @@ def get_skip_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
  
+@static_keyboard
 def main_menu_kb() -> InlineKeyboardMarkup:
     """Клавиатура главного меню"""
     builder = InlineKeyboardBuilder()
@@ -75,6 +79,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from typing import List, Dict, Any, Optional
 
 
+@static_keyboard
 def get_checklist_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню чек-листа"""
     builder = InlineKeyboardBuilder()
@@ -96,6 +101,7 @@ def get_checklist_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_priority_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора приоритета задачи"""
     builder = InlineKeyboardBuilder()
@@ -159,6 +165,7 @@ def get_tasks_list_keyboard(tasks: List[Dict[str, Any]], task_type: str = "all")
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_task_actions_keyboard(task_id: str, is_completed: bool) -> InlineKeyboardMarkup:
     """Клавиатура действий с задачей"""
     builder = InlineKeyboardBuilder()
@@ -181,6 +188,7 @@ def get_task_actions_keyboard(task_id: str, is_completed: bool) -> InlineKeyboar
     return builder.as_markup()
 
 
+@static_keyboard
 def get_deadline_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора дедлайна"""
     builder = InlineKeyboardBuilder()
@@ -210,6 +218,7 @@ def get_deadline_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_skip_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура для пропуска шага"""
     builder = ReplyKeyboardBuilder()
@@ -219,6 +228,7 @@ def get_skip_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 
+@static_keyboard
 def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура подтверждения действия"""
     builder = InlineKeyboardBuilder()
@@ -4,8 +4,10 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from typing import List, Dict
+from keyboards.cache import static_keyboard, cached_keyboard
 
 
+@static_keyboard
 def get_profile_menu_keyboard() -> InlineKeyboardMarkup:
     """
     Главное меню профиля
@@ -21,6 +23,9 @@ def get_profile_menu_keyboard() -> InlineKeyboardMarkup:
     builder.row(
         InlineKeyboardButton(text="📊 Статистика", callback_data="detailed_stats")
     )
+    builder.row(
+        InlineKeyboardButton(text="🥇 Рейтинг", callback_data="leaderboard:points")
+    )
     builder.row(
         InlineKeyboardButton(text="🔄 Обновить", callback_data="refresh_profile")
     )
@@ -31,6 +36,7 @@ def get_profile_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_achievements_keyboard(has_achievements: bool = True) -> InlineKeyboardMarkup:
     """
     Клавиатура для просмотра достижений
@@ -52,6 +58,7 @@ def get_achievements_keyboard(has_achievements: bool = True) -> InlineKeyboardMa
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_achievement_details_keyboard(achievement_id: str) -> InlineKeyboardMarkup:
     """
     Клавиатура для деталей достижения
@@ -68,6 +75,7 @@ def get_achievement_details_keyboard(achievement_id: str) -> InlineKeyboardMarku
     return builder.as_markup()
 
 
+@static_keyboard
 def get_stats_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура для статистики
@@ -90,6 +98,7 @@ def get_stats_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_achievement_categories_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура категорий достижений
@@ -117,6 +126,35 @@ def get_achievement_categories_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
+def get_leaderboard_keyboard(current: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура переключения рейтингов
+    """
+    builder = InlineKeyboardBuilder()
+    
+    boards = [
+        ("💎 За все время", "points"),
+        ("📅 За неделю", "weekly"),
+        ("🎯 Фокус", "focus"),
+        ("🔥 Серии", "streak")
+    ]
+    
+    buttons = [
+        InlineKeyboardButton(text=f"• {name}" if board == current else name,
+                             callback_data=f"leaderboard:{board}")
+        for name, board in boards
+    ]
+    builder.row(*buttons[:2])
+    builder.row(*buttons[2:])
+    builder.row(
+        InlineKeyboardButton(text="◀️ Назад в профиль", callback_data="view_profile")
+    )
+    
+    return builder.as_markup()
+
+
+@static_keyboard
 def get_back_to_profile_keyboard() -> InlineKeyboardMarkup:
     """
     Простая клавиатура возврата в профиль
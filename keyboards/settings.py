@@ -3,7 +3,7 @@
 """
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 def get_settings_keyboard(settings: Dict[str, Any]) -> InlineKeyboardMarkup:
@@ -27,6 +27,14 @@ def get_settings_keyboard(settings: Dict[str, Any]) -> InlineKeyboardMarkup:
         )
     )
     
+    # Время ежедневного напоминания
+    builder.row(
+        InlineKeyboardButton(
+            text="⏰ Время напоминания",
+            callback_data="reminder_menu"
+        )
+    )
+    
     # Кнопки выбора темы
     theme_buttons = []
     themes = [
@@ -69,4 +77,34 @@ def get_settings_keyboard(settings: Dict[str, Any]) -> InlineKeyboardMarkup:
         )
     )
     
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+# Время напоминания выбирается из сетки часов
+REMINDER_TIMES = [f"{hour:02d}:00" for hour in range(6, 24)]
+
+
+def get_reminder_time_keyboard(current: Optional[str] = None) -> InlineKeyboardMarkup:
+    """
+    Создает клавиатуру выбора времени напоминания
+    
+    Args:
+        current: Текущее время напоминания (HH:MM) или None
+        
+    Returns:
+        InlineKeyboardMarkup с сеткой времени
+    """
+    builder = InlineKeyboardBuilder()
+    
+    for reminder_time in REMINDER_TIMES:
+        text = reminder_time + (" ✓" if reminder_time == current else "")
+        builder.button(text=text, callback_data=f"set_reminder:{reminder_time}")
+    builder.adjust(4)
+    
+    builder.row(
+        InlineKeyboardButton(
+            text="🔙 Назад",
+            callback_data="reminder_back"
+        )
+    )
+    
+    return builder.as_markup()
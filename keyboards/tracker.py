@@ -4,7 +4,9 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from typing import List, Dict
+from keyboards.cache import static_keyboard, cached_keyboard
 
+@static_keyboard
 def get_tracker_menu_keyboard() -> InlineKeyboardMarkup:
     """
     Главное меню трекера привычек
@@ -28,6 +30,7 @@ def get_tracker_menu_keyboard() -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@cached_keyboard
 def get_habit_detail_keyboard(habit_id: str, is_completed_today: bool = False) -> InlineKeyboardMarkup:
     """
     Клавиатура для деталей привычки
@@ -53,6 +56,7 @@ def get_habit_detail_keyboard(habit_id: str, is_completed_today: bool = False) -
     
     return builder.as_markup()
 
+@cached_keyboard
 def get_bad_habit_detail_keyboard(habit_id: str) -> InlineKeyboardMarkup:
     """
     Клавиатура для деталей вредной привычки
@@ -73,6 +77,7 @@ def get_bad_habit_detail_keyboard(habit_id: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_trackers_menu_keyboard() -> InlineKeyboardMarkup:
     """
     Главное меню раздела Трекеры
@@ -93,6 +98,7 @@ def get_trackers_menu_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_habit_type_keyboard() -> InlineKeyboardMarkup:
     """
     Выбор типа привычки при создании
@@ -149,6 +155,7 @@ def get_habits_list_keyboard(habits: List[Dict], habit_type: str = "good") -> In
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_habit_actions_keyboard(habit_id: str, completed_today: bool = False) -> InlineKeyboardMarkup:
     """
     Действия с конкретной привычкой
@@ -175,6 +182,7 @@ def get_habit_actions_keyboard(habit_id: str, completed_today: bool = False) ->
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_bad_habit_actions_keyboard(habit_id: str) -> InlineKeyboardMarkup:
     """
     Действия с вредной привычкой
@@ -195,6 +203,7 @@ def get_bad_habit_actions_keyboard(habit_id: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_preset_habits_keyboard() -> InlineKeyboardMarkup:
     """
     Пресеты полезных привычек
@@ -229,6 +238,7 @@ def get_preset_habits_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_frequency_keyboard() -> ReplyKeyboardMarkup:
     """
     Клавиатура для выбора частоты привычки
@@ -252,6 +262,7 @@ def get_frequency_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 
+@static_keyboard
 def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     """
     Клавиатура подтверждения действия
@@ -266,6 +277,7 @@ def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@static_keyboard
 def get_cancel_keyboard() -> ReplyKeyboardMarkup:
     """
     Клавиатура с кнопкой отмены
@@ -1,56 +1,142 @@
 """
 Главный файл для запуска телеграм-бота
 """
+import time
+
+# Отсчет времени старта - до импорта зависимостей
+STARTED_AT = time.perf_counter()
+
 import asyncio
 import logging
-import sys
+import os
+from typing import Optional
 from config import BOT_TOKEN
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 
 # База данных
 from database.firestore_db import FirestoreDB
 from database.focus_db import FocusDB
 from database.focus_db_memory import FocusDBMemory
+from database.bulk_delete import BulkDeleter
+from database.reminder_db import ReminderDB
+from database.leaderboard_db import LeaderboardDB
 
 # Focus модули
 from services.focus_service import FocusService
+from services.reminder_service import ReminderDispatcher
+from services.broadcast_service import BroadcastEngine
+from services.leaderboard_service import LeaderboardService
+from services.telegram_sender import TelegramSender
 from utils.focus_scheduler import focus_scheduler
 
+# Метрики
+from middlewares.firestore_trace import FirestoreTraceMiddleware
+from middlewares.metrics import HandlerMetricsMiddleware, TelegramMetricsMiddleware
+from utils.metrics import ErrorLogCounter, monitor_event_loop_lag, start_metrics_server
+
+# Логирование
+from middlewares.logging_context import LoggingContextMiddleware
+from utils.logging_setup import setup_logging, shutdown_logging
+
+# Отложенные импорты
+from utils.lazy_import import warm_up
+from utils.openai_api import OPENAI_AVAILABLE, assistant as openai_assistant
+
+# Остановка
+from middlewares.in_flight import InFlightMiddleware
+from services.shutdown import GracefulShutdown
+
 # Импортируем обработчики
 from handlers import start, menu, trackers, focus, checklist, profile, assistant, settings, assistant_onboarding, assistant_plan
 
 
-async def main():
+def register_routers(dp: Dispatcher):
     """
-    Основная функция для запуска бота
+    Подключает все роутеры бота к диспетчеру
+    
+    Args:
+        dp: Диспетчер aiogram
     """
-    # Настройка логирования
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('bot.log', encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    logger = logging.getLogger(__name__)
+    dp.include_router(start.router)
+    dp.include_router(menu.router)
+    dp.include_router(trackers.router)
+    dp.include_router(focus.router)
+    dp.include_router(checklist.router)
+    dp.include_router(profile.router)
+    dp.include_router(assistant.router)
+    dp.include_router(settings.router)    
+    dp.include_router(assistant_onboarding.router)
+    dp.include_router(assistant_plan.router)
+
+
+def create_storage() -> BaseStorage:
+    """
+    Создает хранилище состояний FSM
     
-    # Инициализация бота и диспетчера
-    bot = Bot(
-        token=BOT_TOKEN,
-        default=DefaultBotProperties(
-            parse_mode=ParseMode.HTML
-        )
-    )
+    Если задан REDIS_URL, состояние (в том числе накопленные ответы
+    онбординга) переживает перезапуск бота. Иначе - хранилище в памяти.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+            return RedisStorage.from_url(redis_url)
+        except ImportError:
+            logging.getLogger(__name__).warning("Пакет redis не установлен, состояния хранятся в памяти")
+    return MemoryStorage()
+
+
+async def setup_metrics(dp: Dispatcher, bot: Bot):
+    """
+    Подключает сбор метрик, бюджет Firestore на апдейт и, если задан
+    METRICS_PORT, эндпоинт /metrics
     
-    # Создаем диспетчер с хранилищем состояний в памяти
-    dp = Dispatcher(storage=MemoryStorage())
+    Args:
+        dp: Диспетчер aiogram
+        bot: Экземпляр бота
+        
+    Returns:
+        (сервер метрик или None, задача мониторинга event loop)
+    """
+    # Inner middleware диспетчера действуют во всех вложенных роутерах
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(HandlerMetricsMiddleware())
+        observer.middleware(FirestoreTraceMiddleware())
+    bot.session.middleware(TelegramMetricsMiddleware())
+    logging.getLogger().addHandler(ErrorLogCounter())
+    lag_task = asyncio.create_task(monitor_event_loop_lag())
+    
+    server = None
+    port = os.getenv("METRICS_PORT")
+    if port:
+        try:
+            server = await start_metrics_server(int(port), os.getenv("METRICS_HOST", "127.0.0.1"))
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Не удалось запустить сервер метрик: {e}")
+    return server, lag_task
+
+
+async def setup_focus(bot: Bot):
+    """
+    Запускает планировщик, создает FocusService и восстанавливает
+    активные фокус-сессии
+    
+    Выполняется до polling: кнопки таймера, пришедшие сразу после
+    перезапуска, должны найти свои сессии.
+    
+    Args:
+        bot: Экземпляр бота
+        
+    Returns:
+        FocusService или None при ошибке
+    """
+    logger = logging.getLogger(__name__)
     
-    # --- ИНИЦИАЛИЗАЦИЯ FOCUS ---
     try:
         logger.info("Инициализация Focus модуля...")
         
@@ -58,50 +144,204 @@ async def main():
         await focus_scheduler.start()
         logger.info("Focus планировщик запущен")
         
-        # Создаем БД с обработкой ошибок Firestore
-        try:
-            db = FirestoreDB()
+        # Без Firestore используем in-memory версию БД
+        db = FirestoreDB()
+        if await db.connect():
             focus_db = FocusDB(db.db)
             logger.info("Focus БД инициализирована с Firestore")
-        except Exception as db_error:
-            logger.warning(f"Не удалось инициализировать Firestore: {db_error}")
+        else:
             logger.info("Focus будет работать с данными в памяти (без сохранения)")
-            # Используем in-memory версию БД
             focus_db = FocusDBMemory()
         
         # Создаем сервис с поддержкой обновления UI
         focus_service = FocusService(focus_db, focus_scheduler, bot)
         logger.info("FocusService создан с поддержкой обновления UI")
         
-        # Восстанавливаем активные сессии после перезапуска
-        restored_count = await focus_service.restore_active_sessions()
-        logger.info(f"Восстановлено {restored_count} активных сессий")
-        
         # 👉 Инъекция сервиса в модуль handlers.focus
         from handlers import focus as focus_handlers
         focus_handlers.focus_service = focus_service
         logger.info("FocusService инъецирован в handlers.focus")
         
+        # Восстанавливаем активные сессии после перезапуска
+        try:
+            restored_count = await focus_service.restore_active_sessions()
+            logger.info(f"Восстановлено {restored_count} активных сессий")
+        except Exception as e:
+            logger.error(f"Ошибка восстановления фокус-сессий: {e}", exc_info=True)
+        return focus_service
+        
     except Exception as e:
         logger.error(f"Ошибка инициализации Focus модуля: {e}", exc_info=True)
-        focus_service = None
+        return None
+
+
+async def restore_background_jobs(sender: TelegramSender,
+                                  leaderboard_service: Optional[LeaderboardService] = None):
+    """
+    Подключается к Firestore и восстанавливает фоновую работу после
+    перезапуска: очистки, напоминания, рассылки и рейтинги. Фокус-сессии
+    восстанавливаются раньше, в setup_focus.
+    Затем догружает отложенные модули (генератор планов, модели, OpenAI).
+    
+    В режиме STARTUP_MODE=lazy (по умолчанию) выполняется параллельно с
+    polling, в режиме eager - до него.
+    
+    Args:
+        sender: Общий пул отправителей
+        leaderboard_service: Снимки рейтингов или None
+        
+    Returns:
+        Запущенный ReminderDispatcher или None
+    """
+    logger = logging.getLogger(__name__)
+    started = time.perf_counter()
+    
+    db = FirestoreDB()
+    if not await db.connect():
+        return None
+    
+    # Продолжаем фоновые очистки, прерванные перезапуском
+    try:
+        await BulkDeleter(db.db).resume_pending_jobs()
+    except Exception as e:
+        logger.error(f"Не удалось продолжить фоновые очистки: {e}", exc_info=True)
+    
+    reminder_dispatcher = None
+    try:
+        reminder_dispatcher = ReminderDispatcher(sender, ReminderDB(db.db))
+        await reminder_dispatcher.start()
+        await BroadcastEngine(db.db, sender).resume_pending()
+    except Exception as e:
+        logger.error(f"Не удалось запустить напоминания и рассылки: {e}", exc_info=True)
+    
+    # Рейтинги: последний снимок, затем периодическое сохранение
+    if leaderboard_service:
+        await leaderboard_service.restore()
+        await leaderboard_service.start()
+    
+    # Первый пользователь не должен ждать импорта генератора планов и OpenAI
+    await warm_up(('httpx', 'openai') if OPENAI_AVAILABLE else ())
+    logger.info(f"Фоновые задачи восстановлены за {time.perf_counter() - started:.2f} с")
+    return reminder_dispatcher
+
+
+def create_shutdown(in_flight: InFlightMiddleware, focus_service: Optional[FocusService],
+                    restore_task: asyncio.Task,
+                    leaderboard_service: Optional[LeaderboardService] = None,
+                    storage: Optional[BaseStorage] = None) -> GracefulShutdown:
+    """
+    Собирает шаги остановки бота
+    
+    После остановки polling ждем апдейты в обработке, затем записываем
+    буферы ответов онбординга и отложенные изменения, сохраняем
+    оставшееся время таймеров одной пакетной записью и снимок рейтингов,
+    и только потом останавливаем фоновые задачи.
+    
+    Args:
+        in_flight: Middleware учета апдейтов в обработке
+        focus_service: FocusService или None
+        restore_task: Задача restore_background_jobs
+        leaderboard_service: Снимки рейтингов или None
+        storage: Хранилище FSM с буферами ответов онбординга
+        
+    Returns:
+        GracefulShutdown
+    """
+    logger = logging.getLogger(__name__)
+    shutdown = GracefulShutdown(in_flight)
+    
+    async def flush_onboarding_answers():
+        if storage is not None:
+            flushed = await assistant_onboarding.flush_pending_answers(storage, max_age=0)
+            logger.info(f"Записаны буферы ответов онбординга: {flushed}")
+    
+    async def flush_settings():
+        flushed = await settings.settings_db.flush_all()
+        logger.info(f"Записаны отложенные настройки: {flushed}")
+    
+    async def checkpoint_timers():
+        if focus_service:
+            await focus_service.checkpoint_timers()
+    
+    async def stop_scheduler():
+        await focus_scheduler.stop()
+        logger.info("Focus планировщик остановлен")
+    
+    async def save_leaderboards():
+        if leaderboard_service:
+            await leaderboard_service.stop()
+    
+    async def stop_background_jobs():
+        # Восстановление могло еще не закончиться
+        if restore_task.done() and not restore_task.cancelled() and restore_task.result():
+            await restore_task.result().stop()
+        else:
+            restore_task.cancel()
+    
+    shutdown.add_step("onboarding_answers", flush_onboarding_answers)
+    shutdown.add_step("settings", flush_settings)
+    shutdown.add_step("focus_checkpoint", checkpoint_timers)
+    shutdown.add_step("focus_scheduler", stop_scheduler)
+    shutdown.add_step("leaderboards", save_leaderboards)
+    shutdown.add_step("background_jobs", stop_background_jobs)
+    shutdown.add_step("openai", openai_assistant.close)
+    return shutdown
+
+
+async def main():
+    """
+    Основная функция для запуска бота
+    """
+    # Настройка логирования: запись на диск в фоновом потоке
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    
+    # Инициализация бота и диспетчера
+    bot = Bot(
+        token=BOT_TOKEN,
+        default=DefaultBotProperties(
+            parse_mode=ParseMode.HTML
+        )
+    )
+    
+    # Создаем диспетчер с хранилищем состояний
+    dp = Dispatcher(storage=create_storage())
+    dp.update.outer_middleware(LoggingContextMiddleware())
+    in_flight = InFlightMiddleware()
+    dp.update.outer_middleware(in_flight)
+    
+    # --- МЕТРИКИ ---
+    metrics_server, lag_task = await setup_metrics(dp, bot)
+    
+    # --- ИНИЦИАЛИЗАЦИЯ FOCUS ---
+    focus_service = await setup_focus(bot)
     
     # --- ПОДКЛЮЧЕНИЕ РОУТЕРОВ ---
-    dp.include_router(start.router)
-    dp.include_router(menu.router)
-    dp.include_router(trackers.router)
-    dp.include_router(focus.router)
-    dp.include_router(checklist.router)
-    dp.include_router(profile.router)
-    dp.include_router(assistant.router)
-    dp.include_router(settings.router)    
-    dp.include_router(assistant_onboarding.router)
-    dp.include_router(assistant_plan.router)
+    register_routers(dp)
     
-    # Удаляем вебхуки (если были установлены)
-    await bot.delete_webhook(drop_pending_updates=True)
+    # Буферы ответов брошенного онбординга пишутся по таймеру
+    answers_flusher = asyncio.create_task(assistant_onboarding.run_answers_flusher(dp.storage))
     
-    logger.info("Бот запущен и готов к работе!")
+    # --- ВОССТАНОВЛЕНИЕ, НАПОМИНАНИЯ И РАССЫЛКИ ---
+    # Один пул отправителей на бота: лимит Telegram общий
+    sender = TelegramSender(bot)
+    # Клиент Firestore общий на процесс и создается при первом запросе
+    leaderboard_service = LeaderboardService(LeaderboardDB(FirestoreDB().db))
+    restore_task = asyncio.create_task(restore_background_jobs(sender, leaderboard_service))
+    if os.getenv("STARTUP_MODE", "lazy").lower() == "eager":
+        # Прежний порядок: polling только после восстановления
+        await asyncio.wait([restore_task])
+    
+    # --- ОСТАНОВКА ---
+    # aiogram вызывает dp.shutdown после остановки polling, но до закрытия сессии бота
+    shutdown = create_shutdown(in_flight, focus_service, restore_task, leaderboard_service, dp.storage)
+    dp.shutdown.register(shutdown.run)
+    
+    # Удаляем вебхуки (если были установлены). Апдейты, пришедшие во время
+    # перезапуска, не сбрасываем (DROP_PENDING_UPDATES=1 - сбросить)
+    await bot.delete_webhook(drop_pending_updates=os.getenv("DROP_PENDING_UPDATES", "0") == "1")
+    
+    logger.info(f"Бот запущен и готов к работе (старт за {time.perf_counter() - STARTED_AT:.2f} с)")
     
     try:
         # Запускаем long polling
@@ -109,12 +349,13 @@ async def main():
     except Exception as e:
         logger.error(f"Критическая ошибка в работе бота: {e}", exc_info=True)
     finally:
-        # Останавливаем планировщик
-        try:
-            await focus_scheduler.stop()
-            logger.info("Focus планировщик остановлен")
-        except Exception as e:
-            logger.error(f"Ошибка при остановке планировщика: {e}")
+        # Если polling упал до вызова dp.shutdown (повторный вызов ничего не делает)
+        await shutdown.run()
+
+        lag_task.cancel()
+        answers_flusher.cancel()
+        if metrics_server:
+            metrics_server.close()
         
         # Корректно закрываем соединение
         await bot.session.close()
@@ -128,4 +369,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logging.info("Бот остановлен пользователем")
     except Exception as e:
-        logging.error(f"Неожиданная ошибка: {e}", exc_info=True)
\ No newline at end of file
+        logging.error(f"Неожиданная ошибка: {e}", exc_info=True)
+    finally:
+        shutdown_logging()
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Middleware трассировки Firestore: бюджет обращений на один апдейт
+"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from middlewares.metrics import handler_name
+from utils.firestore_trace import finish_trace, trace_firestore
+
+
+class FirestoreTraceMiddleware(BaseMiddleware):
+    """
+    Открывает трассу Firestore на время обработчика
+
+    Inner middleware (dp.message.middleware(...)): все операции клиента,
+    сделанные обработчиком, попадают в одну трассу, после чего пишется
+    сводка и проверяется бюджет (FIRESTORE_ROUND_TRIP_BUDGET,
+    FIRESTORE_DOCS_READ_BUDGET).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        name = handler_name(data)
+        with trace_firestore(name) as trace:
+            try:
+                return await handler(event, data)
+            finally:
+                finish_trace(trace, name)
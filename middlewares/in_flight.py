@@ -0,0 +1,60 @@
+"""
+Middleware: учет апдейтов, которые сейчас обрабатываются
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.metrics import REGISTRY
+
+IN_FLIGHT_UPDATES = REGISTRY.gauge("in_flight_updates", "Апдейты в обработке")
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Считает апдейты в обработке, чтобы при остановке дождаться их (drain)
+
+    Регистрируется как outer middleware апдейтов
+    (dp.update.outer_middleware(...)). Апдейт учитывается вместе со
+    всеми своими обработчиками, включая запросы к OpenAI и записи в БД.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.active += 1
+        self._idle.clear()
+        IN_FLIGHT_UPDATES.inc()
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            IN_FLIGHT_UPDATES.dec()
+            if not self.active:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Ждет завершения апдейтов в обработке
+
+        Args:
+            timeout: Максимальное ожидание в секундах
+
+        Returns:
+            Сколько апдейтов не успело завершиться
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.active
@@ -0,0 +1,30 @@
+"""
+Middleware: привязка записей лога к апдейту и пользователю
+"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.logging_setup import log_context
+
+
+class LoggingContextMiddleware(BaseMiddleware):
+    """
+    Выставляет update_id и user_id для всех записей лога апдейта
+
+    Регистрируется как outer middleware апдейтов
+    (dp.update.outer_middleware(...)) и срабатывает после встроенного
+    UserContextMiddleware, поэтому пользователь уже в data["event_from_user"].
+    Блокирующие вызовы через asyncio.to_thread получают копию контекста.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        with log_context(getattr(event, "update_id", None), user.id if user else None):
+            return await handler(event, data)
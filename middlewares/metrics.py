@@ -0,0 +1,83 @@
+"""
+Middleware для сбора метрик обработчиков и вызовов Bot API
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+
+from utils.metrics import REGISTRY
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "handler_seconds", "Длительность обработчиков aiogram", ("handler",))
+HANDLER_ERRORS = REGISTRY.counter(
+    "handler_errors_total", "Необработанные исключения в обработчиках", ("handler", "error"))
+TELEGRAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "telegram_request_seconds", "Длительность вызовов Bot API", ("method",))
+TELEGRAM_REQUEST_ERRORS = REGISTRY.counter(
+    "telegram_request_errors_total", "Ошибки вызовов Bot API", ("method", "error"))
+TELEGRAM_RETRY_AFTER = REGISTRY.counter(
+    "telegram_retry_after_total", "Ответы RetryAfter (превышен лимит Telegram)", ("method",))
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    """Имя обработчика в виде module.function"""
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unhandled"
+    return f"{getattr(callback, '__module__', '?')}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет длительность и ошибки обработчиков
+
+    Регистрируется как inner middleware (dp.message.middleware(...)),
+    поэтому обработчик уже выбран и его имя доступно в data["handler"].
+    Inner middleware диспетчера действуют и во вложенных роутерах.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        name = handler_name(data)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.inc(handler=name, error=type(e).__name__)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Замеряет вызовы Bot API (bot.session.middleware(...))"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter:
+            TELEGRAM_RETRY_AFTER.inc(method=name)
+            raise
+        except Exception as e:
+            TELEGRAM_REQUEST_ERRORS.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method=name)
@@ -1,10 +1,13 @@
 """
 Модели данных для профиля ИИ-ассистента
 """
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union, get_args
+import bisect
+from collections import defaultdict
 from datetime import datetime, date
 from enum import Enum
-from pydantic import BaseModel, Field, validator
+from functools import lru_cache
+from pydantic import BaseModel, Field, PrivateAttr, validator
 
 
 # Перечисления для типов
@@ -86,6 +89,29 @@ class OnboardingData(BaseModel):
         return v
 
 
+class PlanIndex:
+    """
+    Индексы плана: день -> позиции задач и чекпоинтов, ID задачи -> позиция
+
+    Строится при первом обращении и поддерживается методами PlanData,
+    изменяющими план. Если списки изменили напрямую или сменилась версия
+    плана (updated_at), индексы перестраиваются.
+    """
+    __slots__ = ('tasks_by_day', 'task_positions', 'checkpoints_by_day', 'version')
+    
+    def __init__(self, days: List['DayTask'], checkpoints: List['Checkpoint'], version: Tuple):
+        self.tasks_by_day: Dict[int, List[int]] = defaultdict(list)
+        self.task_positions: Dict[str, int] = {}
+        self.checkpoints_by_day: Dict[int, List[int]] = defaultdict(list)
+        self.version = version
+        
+        for position, task in enumerate(days):
+            self.tasks_by_day[task.day_number].append(position)
+            self.task_positions[task.id] = position
+        for position, checkpoint in enumerate(checkpoints):
+            self.checkpoints_by_day[checkpoint.day_number].append(position)
+
+
 class PlanData(BaseModel):
     """План пользователя"""
     type: CategoryType = Field(..., description="Тип плана")
@@ -107,6 +133,149 @@ class PlanData(BaseModel):
                 if checkpoint.day_number > values['horizon_days']:
                     raise ValueError(f"Чекпоинт на день {checkpoint.day_number} выходит за горизонт плана")
         return v
+    
+    # === Индексированный доступ ===
+    
+    _index: Optional[PlanIndex] = PrivateAttr(default=None)
+    
+    def _index_version(self) -> Tuple:
+        """Версия плана для индексов: updated_at и идентичность списков"""
+        return (self.updated_at, id(self.days), len(self.days), id(self.checkpoints), len(self.checkpoints))
+    
+    def _get_index(self) -> PlanIndex:
+        """Возвращает индексы, перестраивая их при смене версии плана"""
+        version = self._index_version()
+        index = self._index
+        if index is None or index.version != version:
+            index = PlanIndex(self.days, self.checkpoints, version)
+            self._index = index
+        return index
+    
+    def tasks_for_day(self, day_number: int) -> List[DayTask]:
+        """Задачи дня в порядке плана"""
+        return [self.days[position] for position in self._get_index().tasks_by_day.get(day_number, ())]
+    
+    def tasks_by_day(self) -> Dict[int, List[DayTask]]:
+        """Задачи, сгруппированные по дням"""
+        return {
+            day: [self.days[position] for position in positions]
+            for day, positions in sorted(self._get_index().tasks_by_day.items()) if positions
+        }
+    
+    def get_task(self, task_id: str) -> Optional[DayTask]:
+        """Задача по ID"""
+        position = self._get_index().task_positions.get(task_id)
+        return self.days[position] if position is not None else None
+    
+    def checkpoints_between(self, start_day: int, end_day: int) -> List[Checkpoint]:
+        """Чекпоинты в диапазоне дней (включительно)"""
+        index = self._get_index().checkpoints_by_day
+        return [
+            self.checkpoints[position]
+            for day in range(start_day, end_day + 1)
+            for position in index.get(day, ())
+        ]
+    
+    def day_progress(self, day_number: int) -> Tuple[int, int]:
+        """
+        Прогресс дня
+        
+        Returns:
+            (выполнено задач, всего задач)
+        """
+        tasks = self.tasks_for_day(day_number)
+        done = sum(1 for task in tasks if task.status == TaskStatus.COMPLETED)
+        return done, len(tasks)
+    
+    # === Изменение плана с поддержкой индексов ===
+    
+    def _touch(self, index: PlanIndex):
+        """Обновляет updated_at и версию индексов после изменения"""
+        self.updated_at = datetime.now()
+        index.version = self._index_version()
+    
+    def add_task(self, task: DayTask):
+        """Добавляет задачу и обновляет индексы"""
+        index = self._get_index()
+        position = len(self.days)
+        self.days.append(task)
+        index.tasks_by_day[task.day_number].append(position)
+        index.task_positions[task.id] = position
+        self._touch(index)
+    
+    def update_task(self, task_id: str, **changes) -> Optional[DayTask]:
+        """
+        Изменяет поля задачи (status, notes, day_number и т.д.)
+        
+        Returns:
+            Измененная задача или None если не найдена
+        """
+        index = self._get_index()
+        position = index.task_positions.get(task_id)
+        if position is None:
+            return None
+        
+        task = self.days[position]
+        new_day = changes.get('day_number', task.day_number)
+        if new_day != task.day_number:
+            index.tasks_by_day[task.day_number].remove(position)
+            bisect.insort(index.tasks_by_day[new_day], position)
+        
+        for field, value in changes.items():
+            setattr(task, field, value)
+        self._touch(index)
+        return task
+    
+    def remove_task(self, task_id: str) -> bool:
+        """Удаляет задачу (позиции следующих задач сдвигаются, индексы перестраиваются)"""
+        position = self._get_index().task_positions.get(task_id)
+        if position is None:
+            return False
+        del self.days[position]
+        self._index = None
+        self.updated_at = datetime.now()
+        return True
+    
+    # === Компактная форма ===
+    
+    def to_compact(self) -> Dict[str, Any]:
+        """
+        Компактная сериализация (JSON-совместимая): задачи сгруппированы
+        по дням, без повторяющегося day_number и пустых полей
+        """
+        data = self.model_dump(mode="json", exclude={'days'})
+        data['days'] = {
+            str(day): [
+                {key: value for key, value in task.model_dump(mode="json", exclude={'day_number'}).items()
+                 if value is not None}
+                for task in tasks
+            ]
+            for day, tasks in self.tasks_by_day().items()
+        }
+        data['tasks_count'] = len(self.days)
+        return data
+    
+    @staticmethod
+    def is_compact(data: Dict[str, Any]) -> bool:
+        """Сериализован ли план через to_compact"""
+        return isinstance(data.get('days'), dict)
+    
+    @staticmethod
+    def expand_compact(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Компактная форма -> обычный словарь плана (days - плоский список)"""
+        plan_data = dict(data)
+        plan_data.pop('tasks_count', None)
+        plan_data['days'] = [
+            {**task, 'day_number': int(day)}
+            for day, tasks in (data.get('days') or {}).items()
+            for task in tasks
+        ]
+        return plan_data
+    
+    @classmethod
+    def from_compact(cls, data: Dict[str, Any]) -> 'PlanData':
+        """Восстановление из компактной формы (доверенные данные)"""
+        return construct_trusted(cls, cls.expand_compact(data))
 
 
 class ConstraintsData(BaseModel):
@@ -179,26 +348,88 @@ class AIProfile(BaseModel):
         }
     
     def to_firestore(self) -> Dict[str, Any]:
-        """Преобразование в формат для Firestore"""
-        data = self.dict()
-        # Преобразуем datetime в timestamp для Firestore
-        def convert_datetime(obj):
-            if isinstance(obj, dict):
-                return {k: convert_datetime(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_datetime(item) for item in obj]
-            elif isinstance(obj, datetime):
-                return obj
-            return obj
-        
-        return convert_datetime(data)
+        """Преобразование в формат для Firestore (datetime пишутся как есть)"""
+        return self.dict()
     
     @classmethod
     def from_firestore(cls, data: Dict[str, Any]) -> 'AIProfile':
-        """Создание из данных Firestore"""
+        """
+        Создание из данных Firestore без валидации
+        
+        Данные в нашем хранилище уже прошли валидацию при записи,
+        поэтому при чтении модели собираются напрямую.
+        """
+        return construct_trusted(cls, data)
+    
+    @classmethod
+    def validate_firestore(cls, data: Dict[str, Any]) -> 'AIProfile':
+        """Создание из внешних данных с полной валидацией"""
         return cls(**data)
 
 
+# Вложенные модели для сборки без валидации: поле -> модель ([модель] для списков)
+_NESTED_MODELS = {
+    AIProfile: {
+        'onboarding': OnboardingData,
+        'plan': PlanData,
+        'constraints': ConstraintsData,
+        'risks': [RiskItem],
+        'progress': ProgressData,
+        'preferences': PreferencesData,
+    },
+    PlanData: {
+        'days': [DayTask],
+        'checkpoints': [Checkpoint],
+        'buffer_days': [BufferDay],
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def _datetime_fields(model_cls) -> tuple:
+    """Поля модели типа datetime / Optional[datetime]"""
+    return tuple(
+        name for name, field in model_cls.model_fields.items()
+        if field.annotation is datetime or datetime in get_args(field.annotation)
+    )
+
+
+def construct_trusted(model_cls, data: Optional[Dict[str, Any]]):
+    """
+    Собирает модель из доверенных данных без валидации (рекурсивно)
+    
+    Args:
+        model_cls: Класс модели
+        data: Данные из нашего хранилища (или уже готовая модель)
+        
+    Returns:
+        Экземпляр model_cls или None
+    """
+    if data is None or isinstance(data, model_cls):
+        return data
+    
+    values = dict(data)
+    for name, nested in _NESTED_MODELS.get(model_cls, {}).items():
+        value = values.get(name)
+        if value is None:
+            continue
+        if isinstance(nested, list):
+            values[name] = [construct_trusted(nested[0], item) for item in value]
+        else:
+            values[name] = construct_trusted(nested, value)
+    
+    # Старые записи хранят часть дат строками ISO
+    for name in _datetime_fields(model_cls):
+        value = values.get(name)
+        if isinstance(value, str):
+            try:
+                values[name] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    
+    return model_cls.model_construct(**values)
+
+
 # Типы для специфичных ответов онбординга
 class ExamOnboardingAnswers(BaseModel):
     """Ответы онбординга для экзамена"""
@@ -0,0 +1,81 @@
+"""Backfill daily focus rollups (users/{id}/focus_daily/{YYYY-MM-DD}).
+
+Rebuilds rollup documents from completed work sessions in focus_sessions.
+Rollups are overwritten with recomputed totals, so the script is idempotent
+and safe to re-run after a partial failure.
+
+Usage: python scripts/backfill_focus_rollups.py [--days N] [--dry-run]
+"""
+from __future__ import annotations
+
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.env_loader import load_env
+from utils.streaks import TZ_OFFSET_FIELD, get_tz_offset, local_date
+
+BATCH_LIMIT = 500
+ROLLUP_COLLECTION = "focus_daily"
+
+
+def parse_days(argv: list[str]) -> int:
+    if "--days" in argv:
+        return int(argv[argv.index("--days") + 1])
+    return 31
+
+
+def main() -> int:
+    load_env()
+    from google.cloud import firestore
+
+    dry_run = "--dry-run" in sys.argv
+    since = datetime.now(timezone.utc) - timedelta(days=parse_days(sys.argv) + 1)
+    db = firestore.Client()
+
+    offsets = {
+        user.id: get_tz_offset(user.to_dict())
+        for user in db.collection("users").select([TZ_OFFSET_FIELD]).stream()
+    }
+
+    totals: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0, 0])
+    query = (
+        db.collection("focus_sessions")
+        .where("status", "==", "completed")
+        .where("type", "==", "work")
+        .where("started_at", ">=", since)
+        .select(["user_id", "started_at", "completed_minutes"])
+    )
+    for session in query.stream():
+        data = session.to_dict()
+        user_id = str(data.get("user_id"))
+        day = local_date(data.get("started_at"), offsets.get(user_id))
+        if day is None:
+            continue
+        entry = totals[(user_id, day.isoformat())]
+        entry[0] += 1
+        entry[1] += data.get("completed_minutes", 0)
+
+    if not dry_run:
+        items = list(totals.items())
+        for start in range(0, len(items), BATCH_LIMIT):
+            batch = db.batch()
+            for (user_id, day), (sessions, minutes) in items[start:start + BATCH_LIMIT]:
+                ref = db.collection("users").document(user_id).collection(ROLLUP_COLLECTION).document(day)
+                batch.set(ref, {
+                    "date": day,
+                    "completed_sessions": sessions,
+                    "total_minutes": minutes,
+                    "updated_at": firestore.SERVER_TIMESTAMP,
+                })
+            batch.commit()
+
+    prefix = "Would write" if dry_run else "Wrote"
+    print(f"{prefix} {len(totals)} daily rollups")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Backfill the reminders index from users' profile preferences.
+
+Before the index existed, reminder times were only stored in
+users/{id}.ai_profile.preferences.reminder_time, so nothing was ever
+sent for them. This job writes one reminders/{id} document per user
+with a reminder time. Users who turned notifications off, either in the
+profile preferences or in users/{id}/settings/main, get a document
+without next_due: their time is kept, but nothing is scheduled until
+they turn notifications back on.
+
+Users that already have an index document are skipped, so the job is
+safe to re-run and does not reset delivery cursors. --force rewrites
+them.
+
+Usage: python scripts/backfill_reminders.py [--dry-run] [--force]
+"""
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from database.reminder_db import DEFAULT_TIMEZONE, REMINDERS_COLLECTION, minute_bucket, next_due_bucket
+from utils.env_loader import load_env
+
+BATCH_LIMIT = 500
+PREFERENCES_FIELDS = ["ai_profile.preferences.reminder_time", "ai_profile.preferences.notifications_enabled"]
+
+
+def disabled_in_settings(db) -> set[str]:
+    # users/{uid}/settings/main
+    return {
+        doc.reference.parent.parent.id
+        for doc in db.collection_group("settings").select(["notifications_enabled"]).stream()
+        if (doc.to_dict() or {}).get("notifications_enabled") is False
+    }
+
+
+def backfill(db, force: bool = False, dry_run: bool = False) -> tuple[int, int, int]:
+    """Returns (scheduled, disabled, skipped) counts."""
+    now_bucket = minute_bucket(datetime.now(timezone.utc))
+    existing = set() if force else {doc.id for doc in db.collection(REMINDERS_COLLECTION).select([]).stream()}
+    disabled_ids = disabled_in_settings(db)
+
+    writes: list[tuple[str, dict]] = []
+    scheduled = disabled = skipped = 0
+    for user in db.collection("users").select(PREFERENCES_FIELDS).stream():
+        preferences = ((user.to_dict() or {}).get("ai_profile") or {}).get("preferences") or {}
+        reminder_time = preferences.get("reminder_time")
+        if not reminder_time:
+            continue
+        if user.id in existing:
+            skipped += 1
+            continue
+        try:
+            next_due = next_due_bucket(reminder_time, DEFAULT_TIMEZONE, now_bucket)
+        except ValueError:
+            print(f"Skipping user {user.id}: bad reminder_time {reminder_time!r}")
+            skipped += 1
+            continue
+        entry = {
+            "telegram_id": user.id,
+            "reminder_time": reminder_time,
+            "timezone": DEFAULT_TIMEZONE,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        if preferences.get("notifications_enabled") is False or user.id in disabled_ids:
+            disabled += 1
+        else:
+            entry["next_due"] = next_due
+            scheduled += 1
+        writes.append((user.id, entry))
+
+    if not dry_run:
+        for start in range(0, len(writes), BATCH_LIMIT):
+            batch = db.batch()
+            for user_id, entry in writes[start:start + BATCH_LIMIT]:
+                batch.set(db.collection(REMINDERS_COLLECTION).document(user_id), entry)
+            batch.commit()
+    return scheduled, disabled, skipped
+
+
+def main() -> int:
+    load_env()
+    from google.cloud import firestore
+
+    dry_run = "--dry-run" in sys.argv
+    db = firestore.Client()
+    scheduled, disabled, skipped = backfill(db, force="--force" in sys.argv, dry_run=dry_run)
+    prefix = "Would index" if dry_run else "Indexed"
+    print(f"{prefix} {scheduled} reminders, {disabled} with notifications off; skipped {skipped}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
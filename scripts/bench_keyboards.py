@@ -0,0 +1,93 @@
+"""Benchmark cached vs rebuilt inline keyboards.
+
+Renders the keyboards used on hot paths (focus tick, checklist menus and a
+paginated task list) with the cached functions and with the original
+builders (``__wrapped__``). It reports CPU time and bytes allocated per
+call, measured with perf_counter and tracemalloc.
+
+Usage: python scripts/bench_keyboards.py [--iterations N] [--tasks N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from keyboards.cache import keyboard_cache_info
+from keyboards.checklist import (
+    _build_tasks_list_keyboard,
+    get_checklist_menu_keyboard,
+    get_priority_keyboard,
+    get_tasks_list_keyboard,
+)
+from keyboards.focus import get_focus_menu_keyboard, get_session_control_keyboard
+from keyboards.main_menu import get_main_menu_keyboard
+
+
+def make_tasks(count: int) -> list[dict]:
+    priorities = ["urgent_important", "not_urgent_important", "urgent_not_important", "not_urgent_not_important"]
+    return [
+        {"id": f"task{i}", "title": f"Задача номер {i} с длинным названием", "status": "active",
+         "priority": priorities[i % 4]}
+        for i in range(count)
+    ]
+
+
+def measure(render, iterations: int) -> tuple[float, float]:
+    """Returns (microseconds per call, bytes allocated per call)."""
+    render()  # warm up the cache
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    elapsed = (time.perf_counter() - started) / iterations * 1_000_000
+
+    # Results are kept alive so every rebuilt keyboard stays counted
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [render() for _ in range(iterations)]
+    allocated = (tracemalloc.get_traced_memory()[0] - before) / iterations
+    tracemalloc.stop()
+    del results
+    return elapsed, allocated
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--tasks", type=int, default=25)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    cases = {
+        "focus session control (tick)": (
+            get_session_control_keyboard, get_session_control_keyboard.__wrapped__),
+        "focus menu": (get_focus_menu_keyboard, get_focus_menu_keyboard.__wrapped__),
+        "main menu (reply)": (get_main_menu_keyboard, get_main_menu_keyboard.__wrapped__),
+        "checklist menu": (get_checklist_menu_keyboard, get_checklist_menu_keyboard.__wrapped__),
+        "priority picker": (get_priority_keyboard, get_priority_keyboard.__wrapped__),
+    }
+
+    def rebuilt_tasks_list():
+        page_rows = tuple((t["id"], t["title"], t["status"], t["priority"]) for t in tasks[:10])
+        return _build_tasks_list_keyboard.__wrapped__(page_rows, len(tasks), "active", 1, 10)
+
+    cases[f"tasks list ({args.tasks} tasks, page 1)"] = (
+        lambda: get_tasks_list_keyboard(tasks, "active"), rebuilt_tasks_list)
+
+    print(f"{'keyboard':<36} {'rebuilt us':>10} {'cached us':>10} {'rebuilt B':>10} {'cached B':>10}")
+    for name, (cached, rebuilt) in cases.items():
+        rebuilt_us, rebuilt_bytes = measure(rebuilt, args.iterations)
+        cached_us, cached_bytes = measure(cached, args.iterations)
+        print(f"{name:<36} {rebuilt_us:>10.2f} {cached_us:>10.2f} {rebuilt_bytes:>10.0f} {cached_bytes:>10.0f}"
+              f"   ({rebuilt_us / max(cached_us, 1e-9):.0f}x faster)")
+
+    hits = sum(info["hits"] for info in keyboard_cache_info().values())
+    print(f"\ncache hits across keyboards: {hits}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Benchmark full vs field-masked user-document reads.
+
+Seeds a realistic users/{id} document (stats blocks plus ai_profile with
+onboarding answers and a 90-day inline plan) in the in-memory Firestore
+client, then reads it the way each hot accessor does. It reports bytes
+transferred (JSON-encoded payload size) and read + deserialization time
+per call, for the whole document and for the projected fields.
+
+Usage: python scripts/bench_projections.py [--iterations N] [--plan-days N]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from database.memory_client import MemoryFirestoreClient
+
+# Accessor -> field mask it reads (keep in sync with the DB classes)
+ACCESSORS = {
+    "GamificationDB.get_points_balance": ["points_balance"],
+    "FocusDB.get_user_stats": ["focus_stats", "tz_offset_minutes"],
+    "ChecklistDB.get_user_stats": ["checklist_stats"],
+    "AssistantDB.get_last_use_date": ["assistant_stats.last_interaction"],
+}
+
+
+def make_user(plan_days: int) -> dict:
+    now = datetime.now(timezone.utc)
+    tasks = [
+        {
+            "id": f"task_{day}_{index}",
+            "day_number": day,
+            "title": f"День {day}: задача {index}",
+            "description": "Подробное описание задачи с рекомендациями " * 3,
+            "duration_minutes": 30,
+            "priority": 1 + index % 3,
+            "status": "pending",
+            "completed_at": None,
+            "notes": None,
+        }
+        for day in range(1, plan_days + 1)
+        for index in range(3)
+    ]
+    return {
+        "username": "bench",
+        "points_balance": 1250,
+        "tz_offset_minutes": 180,
+        "focus_stats": {"total_sessions": 120, "total_minutes": 3000, "current_streak": 5,
+                        "best_streak": 14, "last_session_date": now},
+        "checklist_stats": {"total_completed": 80, "total_points": 800, "current_streak": 3,
+                            "best_streak": 9, "completed_by_priority": {"urgent_important": 20}},
+        "assistant_stats": {"total_messages": 40, "last_interaction": now},
+        "ai_profile": {
+            "active_category": "exam",
+            "onboarding": {"completed": True, "answers": {f"q{i}": "ответ " * 20 for i in range(15)}},
+            "plan": {"type": "exam", "horizon_days": plan_days, "days": tasks,
+                     "created_at": now - timedelta(days=3), "updated_at": now},
+        },
+    }
+
+
+def payload_size(data) -> int:
+    return len(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def measure(read, iterations: int) -> tuple[float, int]:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        data = read()
+    elapsed = (time.perf_counter() - started) / iterations
+    return elapsed * 1_000_000, payload_size(data)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--plan-days", type=int, default=90)
+    args = parser.parse_args()
+
+    client = MemoryFirestoreClient()
+    user_ref = client.collection("users").document("1")
+    user_ref.set(make_user(args.plan_days))
+
+    full_us, full_bytes = measure(lambda: user_ref.get().to_dict(), args.iterations)
+    print(f"{'accessor':<38} {'bytes':>9} {'us/read':>9}")
+    print(f"{'full document':<38} {full_bytes:>9} {full_us:>9.1f}")
+    for name, fields in ACCESSORS.items():
+        us, size = measure(lambda: user_ref.get(field_paths=fields).to_dict(), args.iterations)
+        print(f"{name:<38} {size:>9} {us:>9.1f}   ({full_bytes / max(size, 1):.0f}x fewer bytes, "
+              f"{full_us / max(us, 1e-9):.0f}x faster)")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
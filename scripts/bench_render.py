@@ -0,0 +1,104 @@
+"""Benchmark message rendering: f-string concatenation vs compiled templates.
+
+Renders a task list the way the checklist screens did before (``text +=``
+in a loop) and with utils.render templates joined once. The template side
+also HTML-escapes every title. Its line templates keep an LRU cache, so
+the numbers show the repeat-view case: the same list opened again or paged
+through. The script also compares rebuilding an achievement catalog on
+every call with a cached block.
+
+Usage: python scripts/bench_render.py [--iterations N] [--items N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.render import Template, cached_block, join
+
+TASK_LINE = Template("{}. {} {}\n", cache_size=4096)
+DEADLINE_LINE = Template("   Дедлайн: {:%d.%m.%Y}\n", cache_size=4096)
+CATALOG_LINE = Template("🔒 {emoji} <s>{name}</s> {color}\n   <i>{description}</i>\n\n")
+
+
+def make_tasks(count: int) -> list[dict]:
+    now = datetime.now()
+    return [
+        {"title": f"Задача {i} <важная>", "status": "completed" if i % 3 == 0 else "active",
+         "deadline": now + timedelta(days=i % 10) if i % 2 else None}
+        for i in range(count)
+    ]
+
+
+def make_catalog(count: int) -> list[dict]:
+    return [
+        {"emoji": "🏅", "name": f"Достижение {i}", "color": "🟢", "description": "Описание достижения " * 3}
+        for i in range(count)
+    ]
+
+
+def concat_tasks(tasks: list[dict]) -> str:
+    text = "<b>📋 Все задачи</b>\n"
+    for i, task in enumerate(tasks, 1):
+        status = "✓" if task.get("status") == "completed" else "○"
+        text += f"{i}. {status} {task.get('title', 'Без названия')}\n"
+        if task.get("deadline"):
+            text += f"   Дедлайн: {task['deadline'].strftime('%d.%m.%Y')}\n"
+    return text
+
+
+def template_tasks(tasks: list[dict]) -> str:
+    return join(["<b>📋 Все задачи</b>\n"] + [
+        TASK_LINE.render(i, "✓" if task.get("status") == "completed" else "○", task.get("title", "Без названия"))
+        + (DEADLINE_LINE.render(task["deadline"]) if task.get("deadline") else "")
+        for i, task in enumerate(tasks, 1)
+    ])
+
+
+def concat_catalog(catalog: list[dict]) -> str:
+    text = "<b>Достижения</b>\n\n"
+    for item in catalog:
+        text += f"🔒 {item['emoji']} <s>{item['name']}</s> {item['color']}\n"
+        text += f"   <i>{item['description']}</i>\n\n"
+    return text
+
+
+def measure(render, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.items)
+    catalog = make_catalog(args.items)
+
+    @cached_block()
+    def cached_catalog(size: int) -> str:
+        return join(["<b>Достижения</b>\n\n", CATALOG_LINE.render_each(catalog[:size])])
+
+    cases = {
+        f"task list, {args.items} tasks": (lambda: concat_tasks(tasks), lambda: template_tasks(tasks)),
+        f"achievement catalog, {args.items} items": (
+            lambda: concat_catalog(catalog), lambda: cached_catalog(len(catalog))),
+    }
+    print(f"{'screen':<36} {'concat us':>10} {'render us':>10}")
+    for name, (before, after) in cases.items():
+        before_us = measure(before, args.iterations)
+        after_us = measure(after, args.iterations)
+        print(f"{name:<36} {before_us:>10.1f} {after_us:>10.1f}   ({before_us / max(after_us, 1e-9):.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Send a broadcast to every user of an assistant category.
+
+With --fake the run uses the in-memory Firestore client seeded with
+--users synthetic profiles and a fake Bot API session. No network or
+credentials are needed in that mode. Some fake users have blocked the
+bot, and every --retry-every-th call answers RetryAfter. Without --fake
+the broadcast goes to real users through Firestore and BOT_TOKEN. Either
+way the run prints sent/blocked/failed counts and throughput. Pass
+--resume ID to continue an interrupted broadcast.
+
+Usage: python scripts/broadcast.py --category CATEGORY --text TEXT
+       [--fake] [--users N] [--rate N] [--latency-ms MS] [--resume ID]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+
+def seed_users(db, category: str, count: int) -> None:
+    batch = db.batch()
+    for index in range(count):
+        user_id = 100_000 + index
+        batch.set(db.collection("users").document(str(user_id)), {
+            "telegram_id": user_id,
+            "ai_profile": {"active_category": category if index % 4 else "other"},
+        })
+        if len(batch) == 500:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+
+
+async def run(args: argparse.Namespace) -> int:
+    from services.broadcast_service import BroadcastEngine
+    from services.telegram_sender import TelegramSender
+
+    if args.fake:
+        os.environ["FIRESTORE_BACKEND"] = "memory"
+        from database.memory_client import get_memory_client
+        from services.fake_telegram import create_fake_bot
+
+        db = get_memory_client()
+        seed_users(db, args.category, args.users)
+        blocked = range(100_000, 100_000 + args.users, 50)
+        bot = create_fake_bot(latency=args.latency_ms / 1000, blocked=blocked,
+                              retry_after_every=args.retry_every, retry_after=1)
+    else:
+        from aiogram import Bot
+
+        from config import BOT_TOKEN
+        from database.firestore_db import FirestoreDB
+
+        db = FirestoreDB().db
+        bot = Bot(token=BOT_TOKEN)
+
+    engine = BroadcastEngine(db, TelegramSender(bot, rate_limit=args.rate))
+    try:
+        broadcast_id = args.resume or await engine.create(args.category, args.text)
+        report = await engine.run(broadcast_id)
+    finally:
+        await bot.session.close()
+
+    if report is None:
+        print(f"broadcast {broadcast_id} not found")
+        return 1
+    print(f"broadcast {report.broadcast_id}: {report.status}")
+    print(f"sent {report.sent}, blocked {report.blocked}, failed {report.failed}")
+    print(f"{report.elapsed:.1f} s, {report.throughput:.1f} msg/s")
+    return 0 if report.status == "done" else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--category", required=True)
+    parser.add_argument("--text", default="Тестовая рассылка")
+    parser.add_argument("--fake", action="store_true", help="in-memory Firestore and fake Bot API")
+    parser.add_argument("--users", type=int, default=1000, help="users to seed with --fake")
+    parser.add_argument("--rate", type=float, default=30, help="messages per second")
+    parser.add_argument("--latency-ms", type=float, default=20, help="fake Bot API latency")
+    parser.add_argument("--retry-every", type=int, default=0, help="fake RetryAfter every N calls")
+    parser.add_argument("--resume", help="continue an existing broadcast by ID")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Load test: replay synthetic Telegram updates through the bot Dispatcher.
+
+Builds the real Dispatcher with every router from main.py, runs all DB
+classes on the in-memory Firestore client (FIRESTORE_BACKEND=memory) and
+answers Bot API calls with a fake session. N simulated users play seeded
+scenarios (menu taps, checklist CRUD, habit completions, focus sessions,
+onboarding) concurrently. The report has p50/p95/p99 handler latency,
+updates/sec and event-loop lag. Runs are deterministic for a given seed,
+so a saved JSON result can be compared with a later commit.
+
+Usage: python scripts/load_test.py [--users N] [--rounds N] [--seed N]
+       [--db-latency-ms MS] [--db-error-rate R]
+       [--output result.json] [--compare baseline.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+# Step: (kind, payload). kind is "message" or "callback"; payload is a
+# string or a callable(user_id) -> str | None (None skips the step).
+Step = tuple[str, Union[str, Callable[[int], Optional[str]]]]
+
+
+def msg(text) -> Step:
+    return ("message", text)
+
+
+def cb(data) -> Step:
+    return ("callback", data)
+
+
+def first_doc_id(collection_path: str, **equals) -> Optional[str]:
+    from database.memory_client import get_memory_client
+
+    query = get_memory_client().collection(collection_path)
+    for field, value in equals.items():
+        query = query.where(field, "==", value)
+    docs = query.limit(1).get()
+    return docs[0].id if docs else None
+
+
+def active_task(user_id: int) -> Optional[str]:
+    task_id = first_doc_id(f"users/{user_id}/tasks", status="active")
+    return f"complete_task:{task_id}" if task_id else None
+
+
+def first_habit(user_id: int) -> Optional[str]:
+    habit_id = first_doc_id(f"users/{user_id}/habits")
+    return f"complete_habit:{habit_id}" if habit_id else None
+
+
+SCENARIOS: dict[str, list[Step]] = {
+    "menu": [
+        msg("📊 Трекеры"), cb("tracker_menu"), msg("✓ Чек-лист"),
+        cb("checklist_menu"), msg("⏱ Фокус"), cb("focus_stats"),
+    ],
+    "checklist_crud": [
+        cb("add_task"), msg("Нагрузочная задача"), msg("."),
+        cb("priority:urgent_important"), cb("deadline:tomorrow"),
+        cb("active_tasks"), cb(active_task), cb("checklist_stats"),
+    ],
+    "habits": [
+        cb("add_habit"), cb("habit_type:good"), msg("Зарядка"), msg("."),
+        msg("Ежедневно"), msg("."), cb("my_habits"), cb(first_habit),
+        cb("tracker_stats"),
+    ],
+    "focus": [
+        msg("⏱ Фокус"), cb("start_focus"), cb("pause_focus"),
+        cb("resume_focus"), cb("stop_focus"), cb("stats_period:today"),
+    ],
+    "onboarding": [
+        msg("/start"), msg("Выучить английский"), msg("Спорт, чтение"),
+        msg("Откладываю дела"), msg("/help"),
+    ],
+}
+
+# Onboarding is played once per user (first round), the rest by weight
+WEIGHTS = {"menu": 4, "checklist_crud": 3, "habits": 2, "focus": 2}
+
+
+class UpdateFactory:
+    def __init__(self, bot) -> None:
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _message(self, user_id: int, text: Optional[str], from_bot: bool = False) -> dict:
+        sender = (
+            {"id": self.bot.id, "is_bot": True, "first_name": "TimeFlow"}
+            if from_bot else
+            {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+        )
+        return {
+            "message_id": next(self._message_ids),
+            "date": datetime.now(timezone.utc),
+            "chat": {"id": user_id, "type": "private"},
+            "from": sender,
+            "text": text,
+        }
+
+    def build(self, user_id: int, kind: str, payload: str):
+        from aiogram.types import Update
+
+        data: dict[str, Any] = {"update_id": next(self._update_ids)}
+        if kind == "message":
+            message = self._message(user_id, payload)
+            if payload.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(payload.split()[0])}]
+            data["message"] = message
+        else:
+            data["callback_query"] = {
+                "id": str(data["update_id"]),
+                "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+                "chat_instance": str(user_id),
+                "data": payload,
+                "message": self._message(user_id, "menu", from_bot=True),
+            }
+        # Binding the bot here keeps feed_update from re-validating the update
+        return Update.model_validate(data, context={"bot": self.bot})
+
+
+async def monitor_loop_lag(samples: list[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "p50": round(pick(0.50) * 1000, 3),
+        "p95": round(pick(0.95) * 1000, 3),
+        "p99": round(pick(0.99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+async def simulate_user(user_id: int, rounds: int, rng: random.Random, dp, bot, factory,
+                        latencies: dict[str, list[float]], errors: Counter) -> int:
+    names = list(WEIGHTS)
+    weights = [WEIGHTS[name] for name in names]
+    plan = ["onboarding"] + rng.choices(names, weights=weights, k=max(0, rounds - 1))
+
+    handled = 0
+    for scenario in plan:
+        for kind, payload in SCENARIOS[scenario]:
+            value = payload(user_id) if callable(payload) else payload
+            if value is None:
+                continue
+            update = factory.build(user_id, kind, value)
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors[scenario] += 1
+            latencies[scenario].append(time.perf_counter() - started)
+            handled += 1
+            # Yield so users interleave like independent chats
+            await asyncio.sleep(0)
+    return handled
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from aiogram import Bot, Dispatcher
+    from aiogram.fsm.storage.memory import MemoryStorage
+
+    import main as bot_main
+    from database.memory_client import get_memory_client
+    from services.fake_telegram import FakeTelegramSession
+    from utils.focus_scheduler import focus_scheduler
+
+    bot = Bot(token=os.environ["BOT_TOKEN"], session=FakeTelegramSession())
+    dp = Dispatcher(storage=MemoryStorage())
+    await bot_main.setup_focus(bot)
+    bot_main.register_routers(dp)
+
+    factory = UpdateFactory(bot)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    lag: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag, stop))
+
+    started = time.perf_counter()
+    handled = await asyncio.gather(*(
+        simulate_user(100_000 + index, args.rounds, random.Random(args.seed + index),
+                      dp, bot, factory, latencies, errors)
+        for index in range(args.users)
+    ))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await monitor
+    await focus_scheduler.stop()
+    await bot.session.close()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    total = sum(handled)
+    return {
+        "revision": git_revision(),
+        "params": {
+            "users": args.users, "rounds": args.rounds, "seed": args.seed,
+            "db_latency_ms": args.db_latency_ms, "db_error_rate": args.db_error_rate,
+        },
+        "updates": total,
+        "elapsed_s": round(elapsed, 3),
+        "updates_per_s": round(total / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": percentiles(all_latencies),
+        "by_scenario": {name: percentiles(values) for name, values in sorted(latencies.items())},
+        "loop_lag_ms": percentiles(lag),
+        "errors": dict(errors),
+        "bot_api_calls": dict(bot.session.calls.most_common()),
+        "db_ops": dict(get_memory_client().stats.most_common()),
+    }
+
+
+def print_report(result: dict, baseline: Optional[dict]) -> None:
+    def delta(path: list[str]) -> str:
+        if baseline is None:
+            return ""
+        old: Any = baseline
+        new: Any = result
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else None
+            new = new.get(key, {}) if isinstance(new, dict) else None
+        if not isinstance(old, (int, float)) or not old:
+            return ""
+        return f"  ({(new - old) / old * 100:+.1f}% vs {baseline.get('revision', '?')})"
+
+    print(f"revision {result['revision']}: {result['updates']} updates in {result['elapsed_s']} s")
+    print(f"throughput: {result['updates_per_s']} updates/s{delta(['updates_per_s'])}")
+    for key in ("p50", "p95", "p99"):
+        print(f"latency {key}: {result['latency_ms'][key]} ms{delta(['latency_ms', key])}")
+    for key in ("p50", "p99", "max"):
+        print(f"loop lag {key}: {result['loop_lag_ms'][key]} ms{delta(['loop_lag_ms', key])}")
+    for name, stats in result["by_scenario"].items():
+        print(f"  {name:<15} p50 {stats['p50']:>8} ms  p95 {stats['p95']:>8} ms  p99 {stats['p99']:>8} ms")
+    if result["errors"]:
+        print(f"errors: {result['errors']}")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--db-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    # Must be set before the bot modules are imported: handlers create
+    # their DB clients and config validates the environment at import time
+    os.environ["FIRESTORE_BACKEND"] = "memory"
+    os.environ["MEMORY_DB_LATENCY_MS"] = str(args.db_latency_ms)
+    os.environ["MEMORY_DB_ERROR_RATE"] = str(args.db_error_rate)
+    os.environ.setdefault("BOT_TOKEN", "123456:LOAD-TEST-TOKEN")
+    os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "unused")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run(args))
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    print_report(result, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
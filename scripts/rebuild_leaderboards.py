@@ -0,0 +1,99 @@
+"""Rebuild leaderboard snapshots from user documents in one pass.
+
+Repair and initial fill job. The all-time points, focus minutes and
+best focus streak boards are rebuilt from the users collection, reading
+only the ranked fields. The weekly board is rebuilt from points_history
+entries since Monday 00:00 UTC. This query needs a collection group
+index on points_history.timestamp.
+
+Run it while the bot is stopped: on shutdown the bot writes its
+in-memory boards and would overwrite the rebuilt snapshots.
+
+Usage: python scripts/rebuild_leaderboards.py [--dry-run] [--skip-weekly]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.env_loader import load_env
+from utils.leaderboard import BOARDS, LeaderboardSet
+
+RANKED_FIELDS = ["total_points_earned", "focus_stats.total_minutes", "focus_stats.best_streak"]
+
+
+def week_start(now: datetime) -> datetime:
+    monday = now.date() - timedelta(days=now.weekday())
+    return datetime.combine(monday, dt_time.min, tzinfo=timezone.utc)
+
+
+def weekly_points(db, since: datetime) -> dict[int, int]:
+    from google.cloud import firestore
+
+    totals: dict[int, int] = defaultdict(int)
+    query = (
+        db.collection_group("points_history")
+        .where(filter=firestore.FieldFilter("timestamp", ">=", since.replace(tzinfo=None)))
+        .select(["points"])
+    )
+    # users/{uid}/points_history/{id}
+    for record in query.stream():
+        user_id = record.reference.parent.parent.id
+        if user_id.isdigit():
+            totals[int(user_id)] += record.get("points") or 0
+    return totals
+
+
+def build(db, skip_weekly: bool) -> LeaderboardSet:
+    boards = LeaderboardSet()
+    weekly = {} if skip_weekly else weekly_points(db, week_start(datetime.now(timezone.utc)))
+    for user in db.collection("users").select(RANKED_FIELDS).stream():
+        if not user.id.isdigit():
+            continue
+        uid = int(user.id)
+        data = user.to_dict() or {}
+        stats = data.get("focus_stats") or {}
+        boards.record_points(uid, data.get("total_points_earned") or 0, weekly.pop(uid, 0))
+        boards.record_focus(uid, stats.get("total_minutes") or 0, stats.get("best_streak") or 0)
+    # Points of users whose document was deleted are not ranked
+    return boards
+
+
+async def save(db, boards: LeaderboardSet) -> None:
+    from database.leaderboard_db import LeaderboardDB
+
+    leaderboard_db = LeaderboardDB(db)
+    for board in BOARDS:
+        if not await leaderboard_db.save_snapshot(board, boards.dump(board), boards.week):
+            raise RuntimeError(f"failed to save {board}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="build the boards without writing snapshots")
+    parser.add_argument("--skip-weekly", action="store_true", help="leave the weekly board empty")
+    args = parser.parse_args()
+
+    load_env()
+    from google.cloud import firestore
+
+    db = firestore.Client()
+    started = time.perf_counter()
+    boards = build(db, args.skip_weekly)
+    sizes = ", ".join(f"{board}={boards.size(board)}" for board in BOARDS)
+    print(f"Built leaderboards in {time.perf_counter() - started:.1f}s: {sizes}")
+    if args.dry_run:
+        return 0
+    asyncio.run(save(db, boards))
+    print(f"Saved snapshots for week {boards.week}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Recompute habit, checklist and focus streaks for all users in one pass.
+
+Repair job: streaks are rebuilt from the completion history
+(habits/*/history, completed_tasks, focus_sessions) using the shared
+streak engine, then written back with batched updates. Habits and
+users that were deleted while their history remained are skipped.
+
+Usage: python scripts/recompute_streaks.py [--dry-run]
+"""
+from __future__ import annotations
+
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.env_loader import load_env
+from utils.streaks import TZ_OFFSET_FIELD, compute_streaks_batch, get_tz_offset, local_date, today_local
+
+BATCH_LIMIT = 500
+
+
+def load_tz_offsets(db) -> dict[str, int]:
+    offsets: dict[str, int] = {}
+    for user in db.collection("users").select([TZ_OFFSET_FIELD]).stream():
+        offsets[user.id] = get_tz_offset(user.to_dict())
+    return offsets
+
+
+def habit_entries(db, offsets: dict[str, int]):
+    # users/{uid}/habits/{hid}/history/{rid}
+    for record in db.collection_group("history").select(["completed_at"]).stream():
+        habit_ref = record.reference.parent.parent
+        user_id = habit_ref.parent.parent.id
+        day = local_date(record.get("completed_at"), offsets.get(user_id))
+        yield habit_ref.path, day
+
+
+def checklist_entries(db, offsets: dict[str, int]):
+    # users/{uid}/completed_tasks/{tid}
+    for task in db.collection_group("completed_tasks").select(["completed_at"]).stream():
+        user_id = task.reference.parent.parent.id
+        yield user_id, local_date(task.get("completed_at"), offsets.get(user_id))
+
+
+def focus_entries(db, offsets: dict[str, int]):
+    query = (
+        db.collection("focus_sessions")
+        .where("status", "==", "completed")
+        .where("type", "==", "work")
+        .select(["user_id", "started_at"])
+    )
+    for session in query.stream():
+        user_id = str(session.get("user_id"))
+        yield user_id, local_date(session.get("started_at"), offsets.get(user_id))
+
+
+def write_updates(db, updates: list[tuple[str, dict]], dry_run: bool) -> int:
+    if dry_run:
+        return len(updates)
+    written = 0
+    for start in range(0, len(updates), BATCH_LIMIT):
+        chunk = updates[start:start + BATCH_LIMIT]
+        # History can outlive its habit or user; update() on a missing parent
+        # would fail the whole batch, set(merge=True) would resurrect it
+        refs = [db.document(path) for path, _ in chunk]
+        existing = {doc.reference.path for doc in db.get_all(refs, field_paths=[]) if doc.exists}
+        batch = db.batch()
+        for ref, (path, data) in zip(refs, chunk):
+            if path in existing:
+                batch.update(ref, data)
+        if existing:
+            batch.commit()
+        written += len(existing)
+    return written
+
+
+def main() -> int:
+    load_env()
+    from google.cloud import firestore
+
+    dry_run = "--dry-run" in sys.argv
+    db = firestore.Client()
+    offsets = load_tz_offsets(db)
+
+    def user_today(user_id: str):
+        return today_local(offsets.get(user_id))
+
+    def habit_today(habit_path: str):
+        # users/{uid}/habits/{hid}
+        return user_today(habit_path.split("/")[1])
+
+    habit_streaks = compute_streaks_batch(habit_entries(db, offsets), habit_today)
+    habit_updates = [
+        (path, {"current_streak": current, "best_streak": best})
+        for path, (current, best) in habit_streaks.items()
+    ]
+
+    user_updates: dict[str, dict] = defaultdict(dict)
+    for user_id, (current, best) in compute_streaks_batch(checklist_entries(db, offsets), user_today).items():
+        user_updates[f"users/{user_id}"].update({
+            "checklist_stats.current_streak": current,
+            "checklist_stats.best_streak": best,
+        })
+    for user_id, (current, best) in compute_streaks_batch(focus_entries(db, offsets), user_today).items():
+        user_updates[f"users/{user_id}"].update({
+            "focus_stats.current_streak": current,
+            "focus_stats.best_streak": best,
+        })
+
+    habits_written = write_updates(db, habit_updates, dry_run)
+    users_written = write_updates(db, list(user_updates.items()), dry_run)
+    prefix = "Would update" if dry_run else "Updated"
+    print(f"{prefix} {habits_written} habits and {users_written} users")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Move inline AI plan tasks out of user documents into plan_days.
+
+Old plans keep every task in users/{id}.ai_profile.plan.days. This script
+writes them to users/{id}/plan_days/{NNN} and leaves only the plan header
+in the user document. Already migrated plans are skipped, so the script can
+be re-run safely.
+
+Usage: python scripts/split_plans.py [--dry-run]
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.env_loader import load_env
+
+PLAN_DAYS_COLLECTION = "plan_days"
+
+
+def main() -> int:
+    load_env()
+    from google.cloud import firestore
+
+    dry_run = "--dry-run" in sys.argv
+    db = firestore.Client()
+    migrated = 0
+
+    for user in db.collection("users").select(["ai_profile.plan"]).stream():
+        plan = ((user.to_dict() or {}).get("ai_profile") or {}).get("plan")
+        if not plan or plan.get("split_days"):
+            continue
+
+        tasks_by_day: dict[int, list[dict]] = {}
+        for task in plan.pop("days", None) or []:
+            tasks_by_day.setdefault(int(task.get("day_number", 1)), []).append(task)
+        plan.update({
+            "split_days": True,
+            "days_count": len(tasks_by_day),
+            "tasks_count": sum(len(tasks) for tasks in tasks_by_day.values()),
+        })
+        migrated += 1
+        if dry_run:
+            continue
+
+        # Plans are at most 90 days, so one batch is enough
+        batch = db.batch()
+        days_ref = user.reference.collection(PLAN_DAYS_COLLECTION)
+        for day_number, tasks in tasks_by_day.items():
+            batch.set(days_ref.document(f"{day_number:03d}"), {
+                "day_number": day_number,
+                "task_ids": [task.get("id") for task in tasks],
+                "tasks": tasks,
+            })
+        batch.update(user.reference, {"ai_profile.plan": plan})
+        batch.commit()
+
+    prefix = "Would migrate" if dry_run else "Migrated"
+    print(f"{prefix} {migrated} plans")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Profile bot cold start: import-time report and startup benchmark.
+
+The import report runs ``python -X importtime -c "import main"`` and
+prints the modules with the largest cumulative import time. It also
+lists heavy dependencies that were imported eagerly. Those should stay
+behind utils.lazy_import until first use.
+
+The benchmark starts a fresh interpreter --runs times per mode. Each
+child does what main() does before polling, using the in-memory
+Firestore and a fake Bot API session. It prints the time spent on
+imports, the time spent on setup, and the total wall time including
+interpreter start. STARTUP_MODE=lazy starts polling right away and
+restores background jobs afterwards. STARTUP_MODE=eager restores them
+first.
+
+Usage: python scripts/startup_profile.py [--imports] [--bench]
+       [--runs N] [--top N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+# Modules that must not be imported before polling starts
+HEAVY_MODULES = ("google.cloud.firestore", "grpc", "openai", "httpx", "pydantic", "models.ai_profile",
+                 "utils.plan_generator")
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("BOT_TOKEN", "123456:fake")
+    env.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "/dev/null")
+    env["FIRESTORE_BACKEND"] = "memory"
+    env["LOG_FILE"] = ""
+    env["LOG_LEVEL"] = "WARNING"
+    return env
+
+
+def import_report(top: int) -> int:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, env=child_env(), capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else "import main failed")
+        return 1
+
+    total_us = max((cumulative for cumulative, _, name in rows if name.strip() == "main"), default=0)
+    print(f"import main: {total_us / 1000:.1f} ms, {len(rows)} modules")
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>13.1f} {self_us / 1000:>8.1f}  {name}")
+
+    imported = {name.strip() for _, _, name in rows}
+    eager = [module for module in HEAVY_MODULES if module in imported]
+    print("eagerly imported heavy modules: " + (", ".join(eager) if eager else "none"))
+    return 0
+
+
+async def _startup(mode: str) -> dict:
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    from aiogram import Dispatcher
+
+    from services.fake_telegram import create_fake_bot
+    from services.telegram_sender import TelegramSender
+
+    main.setup_logging()
+    bot = create_fake_bot()
+    dp = Dispatcher(storage=main.create_storage())
+    await main.setup_metrics(dp, bot)
+    await main.setup_focus(bot)
+    main.register_routers(dp)
+    leaderboard_service = main.LeaderboardService(main.LeaderboardDB(main.FirestoreDB().db))
+    restore_task = asyncio.create_task(main.restore_background_jobs(TelegramSender(bot), leaderboard_service))
+    if mode == "eager":
+        await restore_task
+    ready = time.perf_counter()
+    return {"imports": imported - started, "setup": ready - imported}
+
+
+def run_child(mode: str) -> None:
+    os.environ["STARTUP_MODE"] = mode
+    timings = asyncio.run(_startup(mode))
+    print(json.dumps(timings), flush=True)
+    # Skip interpreter teardown: background tasks and threads are irrelevant here
+    os._exit(0)
+
+
+def benchmark(runs: int) -> int:
+    print(f"{'mode':<6} {'imports ms':>11} {'setup ms':>9} {'total ms':>9}   (median of {runs}, total incl. interpreter)")
+    for mode in ("lazy", "eager"):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = subprocess.run([sys.executable, __file__, "--child", mode],
+                                    cwd=ROOT, env=child_env(), capture_output=True, text=True)
+            total = time.perf_counter() - started
+            if result.returncode != 0 or not result.stdout.strip():
+                print(f"{mode}: child failed\n{result.stderr}")
+                return 1
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+            samples.append((timings["imports"], timings["setup"], total))
+        imports, setup, total = (statistics.median(column) * 1000 for column in zip(*samples))
+        print(f"{mode:<6} {imports:>11.1f} {setup:>9.1f} {total:>9.1f}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--imports", action="store_true", help="import-time report only")
+    parser.add_argument("--bench", action="store_true", help="startup benchmark only")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25, help="modules to show in the import report")
+    parser.add_argument("--child", choices=("lazy", "eager"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+    status = 0
+    if args.imports or not args.bench:
+        status |= import_report(args.top)
+        print()
+    if args.bench or not args.imports:
+        status |= benchmark(args.runs)
+    return status
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
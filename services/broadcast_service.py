@@ -0,0 +1,242 @@
+"""
+Рассылки по сегментам пользователей.
+
+Участники сегмента читаются страницами по курсору, сообщения уходят
+через общий TelegramSender, а прогресс сохраняется после каждой
+страницы в коллекции broadcasts, поэтому прерванная рассылка
+продолжается с места остановки.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from database.assistant_profile_db import AssistantProfileDB
+from database.reminder_db import ReminderDB
+from services.telegram_sender import SendResult, TelegramSender
+
+logger = logging.getLogger(__name__)
+
+BROADCASTS_COLLECTION = 'broadcasts'
+# После каждой страницы сохраняется курсор: при аварийном
+# перезапуске повторно уйдет не больше одной страницы
+PAGE_SIZE = 200
+
+
+class BroadcastStatus:
+    """Статусы рассылки"""
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class BroadcastReport:
+    """Итоги рассылки"""
+    broadcast_id: str
+    status: str
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def throughput(self) -> float:
+        """Сообщений в секунду"""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+class BroadcastEngine:
+    """
+    Рассылка сообщения всем пользователям категории.
+
+    Задание хранится в broadcasts/{id}: текст, сегмент, курсор (ID
+    последнего обработанного пользователя) и счетчики. Пользователи,
+    заблокировавшие бота, исключаются из напоминаний.
+    """
+
+    # Ссылки на фоновые задачи, чтобы их не собрал GC
+    _background_tasks: Set[asyncio.Task] = set()
+
+    def __init__(self, db, sender: TelegramSender, page_size: int = PAGE_SIZE):
+        """
+        Args:
+            db: Клиент Firestore
+            sender: Пул отправителей (общий лимит скорости бота)
+            page_size: Размер страницы сегмента
+        """
+        self.db = db
+        self.sender = sender
+        self.page_size = max(1, page_size)
+        self.profile_db = AssistantProfileDB(db)
+        self.reminder_db = ReminderDB(db)
+
+    def _ref(self, broadcast_id: str):
+        return self.db.collection(BROADCASTS_COLLECTION).document(broadcast_id)
+
+    async def create(self, category: str, text: str) -> str:
+        """
+        Регистрирует рассылку
+
+        Args:
+            category: Категория пользователей (ai_profile.active_category)
+            text: Текст сообщения (HTML)
+
+        Returns:
+            ID рассылки
+        """
+        broadcast_id = str(uuid.uuid4())
+        await asyncio.to_thread(self._ref(broadcast_id).set, {
+            'category': category,
+            'text': text,
+            'status': BroadcastStatus.RUNNING,
+            'cursor': None,
+            'sent': 0,
+            'blocked': 0,
+            'failed': 0,
+            'elapsed': 0.0,
+            'created_at': datetime.now(timezone.utc)
+        })
+        logger.info(f"Создана рассылка {broadcast_id} для категории {category}")
+        return broadcast_id
+
+    async def start(self, category: str, text: str) -> str:
+        """
+        Регистрирует рассылку и запускает ее в фоне
+
+        Returns:
+            ID рассылки
+        """
+        broadcast_id = await self.create(category, text)
+        self._spawn(broadcast_id)
+        return broadcast_id
+
+    async def resume_pending(self) -> int:
+        """
+        Продолжает рассылки, прерванные перезапуском
+
+        Returns:
+            Количество возобновленных рассылок
+        """
+        try:
+            query = self.db.collection(BROADCASTS_COLLECTION).where('status', '==', BroadcastStatus.RUNNING)
+            docs = await asyncio.to_thread(query.get)
+        except Exception as e:
+            logger.error(f"Ошибка чтения незавершенных рассылок: {e}")
+            return 0
+
+        for doc in docs:
+            self._spawn(doc.id)
+        if docs:
+            logger.info(f"Возобновлено рассылок: {len(docs)}")
+        return len(docs)
+
+    def _spawn(self, broadcast_id: str):
+        task = asyncio.create_task(self.run(broadcast_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def get_report(self, broadcast_id: str) -> Optional[BroadcastReport]:
+        """Текущие итоги рассылки или None, если ее нет"""
+        doc = await asyncio.to_thread(self._ref(broadcast_id).get)
+        if not doc.exists:
+            return None
+        return self._report(broadcast_id, doc.to_dict())
+
+    @staticmethod
+    def _report(broadcast_id: str, job: Dict[str, Any]) -> BroadcastReport:
+        return BroadcastReport(
+            broadcast_id=broadcast_id,
+            status=job.get('status', BroadcastStatus.RUNNING),
+            sent=job.get('sent', 0),
+            blocked=job.get('blocked', 0),
+            failed=job.get('failed', 0),
+            elapsed=job.get('elapsed', 0.0)
+        )
+
+    async def run(self, broadcast_id: str) -> Optional[BroadcastReport]:
+        """
+        Выполняет (или продолжает) рассылку
+
+        Args:
+            broadcast_id: ID рассылки
+
+        Returns:
+            BroadcastReport или None, если рассылка не найдена
+        """
+        job_ref = self._ref(broadcast_id)
+        doc = await asyncio.to_thread(job_ref.get)
+        if not doc.exists:
+            logger.error(f"Рассылка {broadcast_id} не найдена")
+            return None
+        job = doc.to_dict()
+        report = self._report(broadcast_id, job)
+        if report.status != BroadcastStatus.RUNNING:
+            return report
+
+        started = time.monotonic() - report.elapsed
+        try:
+            pages = self.profile_db.iter_active_users_by_category(
+                job['category'], self.page_size, start_after=job.get('cursor')
+            )
+            async for user_ids in pages:
+                results = await self.sender.send_many(
+                    [(user_id, job['text']) for user_id in user_ids], parse_mode="HTML"
+                )
+                summary = TelegramSender.count(results)
+                report.sent += summary[SendResult.SENT.value]
+                report.blocked += summary[SendResult.BLOCKED.value]
+                report.failed += summary[SendResult.FAILED.value]
+                report.elapsed = time.monotonic() - started
+
+                blocked = [str(user_id) for user_id, result in zip(user_ids, results)
+                           if result is SendResult.BLOCKED]
+                if blocked:
+                    await self._disable_reminders(blocked)
+
+                await self._checkpoint(job_ref, report, cursor=user_ids[-1])
+
+            report.status = BroadcastStatus.DONE
+        except Exception as e:
+            logger.error(f"Ошибка рассылки {broadcast_id}: {e}", exc_info=True)
+            report.status = BroadcastStatus.FAILED
+
+        report.elapsed = time.monotonic() - started
+        await self._checkpoint(job_ref, report)
+        logger.info(
+            f"Рассылка {broadcast_id} ({report.status}): отправлено {report.sent}, "
+            f"заблокировали {report.blocked}, ошибок {report.failed}, "
+            f"{report.throughput:.1f} сообщ./с"
+        )
+        return report
+
+    async def _disable_reminders(self, telegram_ids):
+        """Выключает напоминания пользователям, заблокировавшим бота"""
+        try:
+            await self.reminder_db.disable_many(telegram_ids)
+        except Exception as e:
+            logger.warning(f"Не удалось выключить напоминания заблокировавшим бота: {e}")
+
+    async def _checkpoint(self, job_ref, report: BroadcastReport, cursor: Optional[int] = None):
+        """Сохраняет счетчики (и курсор) рассылки"""
+        update = {
+            'status': report.status,
+            'sent': report.sent,
+            'blocked': report.blocked,
+            'failed': report.failed,
+            'elapsed': report.elapsed,
+            'updated_at': datetime.now(timezone.utc)
+        }
+        if cursor is not None:
+            update['cursor'] = cursor
+        try:
+            await asyncio.to_thread(job_ref.update, update)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения прогресса рассылки: {e}")
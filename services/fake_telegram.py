@@ -0,0 +1,99 @@
+"""
+Фейковый Bot API для тестов и нагрузочных прогонов рассылок.
+
+Сессия aiogram, которая отвечает на запросы локально, без сети, и умеет
+имитировать задержку, пользователей, заблокировавших бота, ошибки
+сервера и RetryAfter.
+Работает с настоящим aiogram.Bot, поэтому проверяется тот же код отправки.
+"""
+import asyncio
+import itertools
+import typing
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, List, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter, TelegramServerError
+from aiogram.types import Chat, Message, User
+
+FAKE_TOKEN = "123456:FAKE-TOKEN"
+
+
+class FakeTelegramSession(BaseSession):
+    """Отвечает на вызовы Bot API локально"""
+
+    def __init__(self, latency: float = 0.0, blocked: Iterable[int] = (),
+                 retry_after_every: int = 0, retry_after: int = 1, failing: Iterable[int] = ()):
+        """
+        Args:
+            latency: Задержка ответа в секундах
+            blocked: ID чатов, заблокировавших бота (TelegramForbiddenError)
+            failing: ID чатов, отправка в которые падает (TelegramServerError)
+            retry_after_every: Каждый N-й запрос отвечает RetryAfter (0 - никогда)
+            retry_after: Пауза, которую запрашивает RetryAfter
+        """
+        super().__init__()
+        self.latency = latency
+        self.blocked = {int(chat_id) for chat_id in blocked}
+        self.failing = {int(chat_id) for chat_id in failing}
+        self.retry_after_every = retry_after_every
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        # (chat_id, text) доставленных сообщений
+        self.sent: List[Tuple[int, str]] = []
+        self._requests = itertools.count(1)
+        # ID исходящих сообщений не пересекаются с ID входящих в тестах
+        self._message_ids = itertools.count(1_000_000)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.retry_after_every and next(self._requests) % self.retry_after_every == 0:
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=self.retry_after)
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None and int(chat_id) in self.blocked:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        if chat_id is not None and int(chat_id) in self.failing:
+            raise TelegramServerError(method=method, message="Internal Server Error")
+
+        returning = method.__returning__
+        options = typing.get_args(returning) or (returning,)
+        if Message in options and returning is not bool and bool not in options:
+            text = getattr(method, "text", None)
+            self.sent.append((int(chat_id or 0), text))
+            return Message.model_validate({
+                "message_id": next(self._message_ids),
+                "date": datetime.now(timezone.utc),
+                "chat": Chat(id=int(chat_id or 0), type="private"),
+                "text": text,
+            }, context={"bot": bot})
+        if returning is User:
+            return User(id=bot.id, is_bot=True, first_name="Fake")
+        if typing.get_origin(returning) is list:
+            return []
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30,
+                             chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def create_fake_bot(**session_options) -> Bot:
+    """
+    Создает Bot с фейковой сессией
+
+    Args:
+        **session_options: Параметры FakeTelegramSession
+
+    Returns:
+        Bot (сессия доступна как bot.session)
+    """
+    return Bot(token=FAKE_TOKEN, session=FakeTelegramSession(**session_options))
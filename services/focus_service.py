@@ -191,7 +191,10 @@ class FocusService:
             session['id'],
             {
                 'status': SessionStatus.ACTIVE.value,
-                'resumed_at': datetime.now(timezone.utc)
+                'resumed_at': datetime.now(timezone.utc),
+                # Отсчет после перезапуска - от возобновления, а не от started_at
+                'checkpoint_remaining_seconds': remaining * 60,
+                'checkpointed_at': datetime.now(timezone.utc)
             }
         )
         
@@ -386,12 +389,13 @@ class FocusService:
         else:
             stats = await self.db.get_all_time_stats(user_id)
         
-        # Добавляем дополнительную информацию
-        user_stats = await self.db.get_user_stats(user_id)
-        stats.update({
-            'current_streak': user_stats.get('current_streak', 0),
-            'best_streak': user_stats.get('best_streak', 0)
-        })
+        # Добавляем streak, если БД не вернула его вместе со статистикой периода
+        if 'current_streak' not in stats or 'best_streak' not in stats:
+            user_stats = await self.db.get_user_stats(user_id)
+            stats.update({
+                'current_streak': user_stats.get('current_streak', 0),
+                'best_streak': user_stats.get('best_streak', 0)
+            })
         
         return stats
     
@@ -415,11 +419,8 @@ class FocusService:
                 # Восстанавливаем активные сессии
                 if session['status'] == SessionStatus.ACTIVE.value:
                     # Вычисляем оставшееся время с учетом прошедшего
-                    elapsed = (
-                        datetime.now(timezone.utc) - session['started_at']
-                    ).total_seconds() / 60
-                    
-                    remaining = session['duration_minutes'] - elapsed
+                    remaining_seconds = self._remaining_after_restart(session)
+                    remaining = remaining_seconds / 60
                     
                     if remaining > 0:
                         # Восстанавливаем таймер
@@ -428,13 +429,14 @@ class FocusService:
                             user_id=session['user_id'],
                             duration_minutes=int(remaining),
                             on_complete=self._on_session_complete,
-                            on_tick=self._on_session_tick
+                            on_tick=self._on_session_tick,
+                            duration_seconds=remaining_seconds
                         )
                         restored_count += 1
                         logger.info(
                             f"Восстановлена активная сессия {session['id']} "
                             f"для пользователя {session['user_id']}, "
-                            f"осталось {int(remaining)} минут"
+                            f"осталось {int(remaining_seconds)} секунд"
                         )
                     else:
                         # Сессия истекла, завершаем её
@@ -462,8 +464,34 @@ class FocusService:
         logger.info(f"Восстановлено {restored_count} сессий (активных и на паузе)")
         return restored_count
     
+    async def checkpoint_timers(self) -> int:
+        """
+        Сохраняет точное оставшееся время всех запущенных таймеров
+        одной пакетной записью (вызывается при остановке бота)
+        
+        Returns:
+            Количество сохраненных сессий
+        """
+        return await self.db.checkpoint_sessions(self.scheduler.snapshot())
+    
     # === Приватные методы ===
     
+    @staticmethod
+    def _remaining_after_restart(session: Dict[str, Any]) -> float:
+        """
+        Оставшееся время сессии в секундах на текущий момент
+        
+        Если при остановке был сохранен чекпоинт, считаем от него (точно,
+        в том числе для сессий после паузы), иначе - от начала сессии.
+        """
+        now = datetime.now(timezone.utc)
+        checkpointed_at = session.get('checkpointed_at')
+        if checkpointed_at is not None and session.get('checkpoint_remaining_seconds') is not None:
+            downtime = (now - checkpointed_at).total_seconds()
+            return session['checkpoint_remaining_seconds'] - downtime
+        elapsed = (now - session['started_at']).total_seconds()
+        return session['duration_minutes'] * 60 - elapsed
+    
     async def _on_session_complete(
         self,
         session_id: str,
@@ -0,0 +1,129 @@
+"""
+Восстановление и периодические снимки рейтингов
+
+Рейтинги живут в памяти процесса (utils/leaderboard.py) и обновляются
+на каждом начислении очков и завершенной фокус-сессии. Сервис при старте
+загружает последний снимок из Firestore, раз в SNAPSHOT_INTERVAL
+сохраняет изменившиеся рейтинги и делает финальный снимок при остановке.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from database.leaderboard_db import LeaderboardDB
+from utils.leaderboard import BOARDS, LeaderboardSet, leaderboards
+
+logger = logging.getLogger(__name__)
+
+# Как часто сохранять изменившиеся рейтинги (секунды)
+SNAPSHOT_INTERVAL = float(os.getenv('LEADERBOARD_SNAPSHOT_INTERVAL', '300'))
+
+
+class LeaderboardService:
+    """Загрузка снимков рейтингов при старте и их периодическое сохранение"""
+
+    def __init__(self, db: LeaderboardDB, boards: LeaderboardSet = leaderboards,
+                 interval: float = SNAPSHOT_INTERVAL):
+        """
+        Args:
+            db: Хранилище снимков
+            boards: Рейтинги процесса
+            interval: Период сохранения снимков
+        """
+        self.db = db
+        self.boards = boards
+        self.interval = interval
+        self._saved: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Пока снимки не загружены, сохранять нельзя - затрем их неполными рейтингами
+        self._restored = False
+
+    async def restore(self) -> int:
+        """
+        Загружает последние снимки рейтингов
+
+        Изменения, пришедшие во время загрузки, не теряются: они пишутся
+        в журнал и применяются к загруженным рейтингам.
+
+        Returns:
+            Количество пользователей в общем рейтинге (-1 при ошибке загрузки)
+        """
+        started = time.perf_counter()
+        self.boards.begin_restore()
+        loaded = None
+        dumps, week = {}, None
+        try:
+            for board in BOARDS:
+                snapshot = await self.db.load_snapshot(board)
+                if snapshot is not None:
+                    dumps[board], snapshot_week = snapshot
+                    if board == 'weekly':
+                        week = snapshot_week
+            if dumps:
+                loaded = await asyncio.to_thread(LeaderboardSet.from_snapshot, dumps, week)
+        except Exception as e:
+            logger.error(f"Не удалось загрузить рейтинги, снимки не будут обновляться: {e}", exc_info=True)
+            return -1
+        finally:
+            replayed = self.boards.adopt(loaded)
+        self._restored = True
+        if loaded is None:
+            logger.info("Снимков рейтингов нет, рейтинги заполняются по мере начислений")
+            return 0
+        # Загруженные рейтинги совпадают со снимком, пока к ним не применили журнал
+        self._saved = {board: 0 for board in dumps}
+        logger.info(f"Рейтинги загружены за {time.perf_counter() - started:.2f} с: "
+                    f"{self.boards.size('points')} пользователей, журнал {replayed}")
+        return self.boards.size('points')
+
+    async def start(self):
+        """Запускает периодическое сохранение"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Сохранение рейтингов запущено")
+
+    async def stop(self):
+        """Останавливает периодическое сохранение и делает финальный снимок"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.snapshot()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.snapshot()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка сохранения рейтингов: {e}", exc_info=True)
+
+    async def snapshot(self) -> int:
+        """
+        Сохраняет рейтинги, изменившиеся с прошлого снимка
+
+        Returns:
+            Количество сохраненных рейтингов
+        """
+        if not self._restored:
+            return 0
+        async with self._lock:
+            saved = 0
+            self.boards.update_metrics()
+            for board, version in self.boards.versions().items():
+                if self._saved.get(board) == version:
+                    continue
+                # Снимок берется в event loop (копия массивов), запись - в потоке
+                data = self.boards.dump(board)
+                if await self.db.save_snapshot(board, data, self.boards.week):
+                    self._saved[board] = version
+                    saved += 1
+            return saved
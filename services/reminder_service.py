@@ -0,0 +1,148 @@
+"""
+Диспетчер ежедневных напоминаний.
+
+Просыпается раз в минутную корзину, выбирает из индекса reminders
+пользователей со сроком отправки и рассылает сообщения через пул
+отправителей с общим ограничением скорости Telegram.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from database.reminder_db import ReminderDB, minute_bucket
+from services.telegram_sender import SendResult, TelegramSender
+
+logger = logging.getLogger(__name__)
+
+# Страница индекса: после ее отправки курсоры сдвигаются одним batch,
+# поэтому при аварийном перезапуске повторно уйдет не больше страницы
+PAGE_SIZE = 100
+# Напоминания, просроченные сильнее (бот был выключен), не отправляются.
+# Столько же минут повторяются неудачные отправки
+CATCHUP_MINUTES = 15
+
+REMINDER_TEXT = (
+    "⏰ <b>Напоминание</b>\n\n"
+    "Пора заглянуть в план на сегодня и отметить выполненные задачи."
+)
+
+
+class ReminderDispatcher:
+    """
+    Рассылка напоминаний по минутным корзинам.
+
+    Курсор доставки - поле next_due в индексе: страница сдвигается на
+    следующий день только после отправки, поэтому перезапуск продолжает
+    рассылку с места остановки. Неудачные отправки (не блокировка) не
+    сдвигаются и повторяются в следующих корзинах, пока не просрочены
+    на CATCHUP_MINUTES. Внутри одного прохода страницы листаются
+    курсором, чтобы не перечитывать оставленные документы. Все обращения к Firestore
+    выполняются в отдельных потоках, отправка идет через общий
+    TelegramSender, так что 100k напоминаний на одну минуту не
+    блокируют event loop и не превышают лимит Telegram.
+    """
+
+    def __init__(
+        self,
+        sender: TelegramSender,
+        reminder_db: ReminderDB,
+        page_size: int = PAGE_SIZE,
+        build_message: Optional[Callable[[Dict[str, Any]], str]] = None
+    ):
+        """
+        Args:
+            sender: Пул отправителей (общий лимит скорости бота)
+            reminder_db: Индекс напоминаний
+            page_size: Размер страницы индекса
+            build_message: Текст напоминания по документу индекса (опционально)
+        """
+        self.sender = sender
+        self.db = reminder_db
+        self.page_size = max(1, page_size)
+        self.build_message = build_message or (lambda entry: REMINDER_TEXT)
+        self.stats = {'sent': 0, 'skipped': 0, 'retried': 0}
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._started_bucket = 0
+
+    async def start(self):
+        """Запускает диспетчер"""
+        if not self._running:
+            self._running = True
+            self._started_bucket = minute_bucket(datetime.now(timezone.utc))
+            self._task = asyncio.create_task(self._run())
+            logger.info("Диспетчер напоминаний запущен")
+
+    async def stop(self):
+        """Останавливает диспетчер (текущая страница не досылается)"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info(f"Диспетчер напоминаний остановлен: {self.stats}")
+
+    async def _run(self):
+        while self._running:
+            try:
+                await self.dispatch_due(minute_bucket(datetime.now(timezone.utc)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка рассылки напоминаний: {e}", exc_info=True)
+
+            # Спим до начала следующей минутной корзины
+            await asyncio.sleep(60 - time.time() % 60 + 0.05)
+
+    async def dispatch_due(self, bucket: int) -> int:
+        """
+        Рассылает все напоминания со сроком до bucket включительно
+
+        Args:
+            bucket: Текущая минутная корзина
+
+        Returns:
+            Количество отправленных сообщений
+        """
+        sent_total = 0
+        stale_before = self._started_bucket - CATCHUP_MINUTES
+        cursor = None
+        while True:
+            entries = await self.db.get_due(bucket, self.page_size, after=cursor)
+            if not entries:
+                break
+            cursor = entries[-1]
+
+            fresh = [entry for entry in entries if entry['next_due'] >= stale_before]
+            self.stats['skipped'] += len(entries) - len(fresh)
+
+            results = await self.sender.send_many(
+                [(int(entry.get('telegram_id') or entry['id']), self.build_message(entry)) for entry in fresh],
+                parse_mode="HTML"
+            )
+            blocked = [entry['id'] for entry, result in zip(fresh, results) if result is SendResult.BLOCKED]
+            # Неудачную отправку оставляем в индексе для повтора, пока она не просрочена
+            retry_ids = {
+                entry['id'] for entry, result in zip(fresh, results)
+                if result is SendResult.FAILED and bucket - entry['next_due'] < CATCHUP_MINUTES
+            }
+            delivered = sum(1 for result in results if result is SendResult.SENT)
+            self.stats['sent'] += delivered
+            self.stats['retried'] += len(retry_ids)
+            sent_total += delivered
+
+            keep_ids = set(blocked) | retry_ids
+            await self.db.advance([entry for entry in entries if entry['id'] not in keep_ids], bucket)
+            if blocked:
+                await self.db.disable_many(blocked)
+
+            if len(entries) < self.page_size:
+                break
+
+        if sent_total:
+            logger.info(f"Напоминания за {bucket}: отправлено {sent_total}")
+        return sent_total
@@ -0,0 +1,96 @@
+"""
+Согласованная остановка бота
+
+Порядок: polling уже остановлен (новые апдейты не принимаются) ->
+дожидаемся апдейтов в обработке с ограничением по времени -> по очереди
+выполняем зарегистрированные шаги (запись отложенных изменений, чекпоинт
+таймеров, остановка фоновых задач). У каждого шага свой таймаут, ошибка
+одного шага не мешает остальным.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from middlewares.in_flight import InFlightMiddleware
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать апдейты в обработке и каждый шаг остановки (секунды)
+DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '10'))
+STEP_TIMEOUT = float(os.getenv('SHUTDOWN_STEP_TIMEOUT', '5'))
+
+SHUTDOWN_STEP_SECONDS = REGISTRY.histogram(
+    "shutdown_step_seconds", "Длительность шагов остановки бота", ("step",))
+
+ShutdownStep = Callable[[], Awaitable[object]]
+
+
+class GracefulShutdown:
+    """Упорядоченная остановка: drain апдейтов, затем шаги в порядке регистрации"""
+
+    def __init__(self, in_flight: Optional[InFlightMiddleware] = None,
+                 drain_timeout: float = DRAIN_TIMEOUT, step_timeout: float = STEP_TIMEOUT):
+        """
+        Args:
+            in_flight: Middleware учета апдейтов в обработке
+            drain_timeout: Максимальное ожидание апдейтов в обработке
+            step_timeout: Таймаут одного шага
+        """
+        self.in_flight = in_flight
+        self.drain_timeout = drain_timeout
+        self.step_timeout = step_timeout
+        self._steps: List[Tuple[str, ShutdownStep]] = []
+        self._done = False
+
+    def add_step(self, name: str, step: ShutdownStep):
+        """
+        Добавляет шаг остановки
+
+        Args:
+            name: Название для логов и метрик
+            step: Корутинная функция без аргументов
+        """
+        self._steps.append((name, step))
+
+    async def run(self) -> bool:
+        """
+        Выполняет остановку (повторный вызов ничего не делает)
+
+        Подходит для dp.shutdown.register(...): aiogram вызывает шаги до
+        закрытия сессии бота, поэтому обработчики успевают ответить.
+
+        Returns:
+            True если все апдейты дождались и все шаги прошли без ошибок
+        """
+        if self._done:
+            return True
+        self._done = True
+        started = time.perf_counter()
+        clean = True
+
+        if self.in_flight is not None and self.in_flight.active:
+            logger.info(f"Ожидаем завершения {self.in_flight.active} апдейтов (до {self.drain_timeout:g} с)")
+            left = await self.in_flight.drain(self.drain_timeout)
+            if left:
+                clean = False
+                logger.warning(f"Не дождались {left} апдейтов в обработке")
+
+        for name, step in self._steps:
+            step_started = time.perf_counter()
+            try:
+                await asyncio.wait_for(step(), self.step_timeout)
+            except asyncio.TimeoutError:
+                clean = False
+                logger.error(f"Шаг остановки '{name}' не уложился в {self.step_timeout:g} с")
+            except Exception as e:
+                clean = False
+                logger.error(f"Ошибка на шаге остановки '{name}': {e}", exc_info=True)
+            finally:
+                SHUTDOWN_STEP_SECONDS.observe(time.perf_counter() - step_started, step=name)
+
+        logger.info(f"Остановка выполнена за {time.perf_counter() - started:.2f} с"
+                    + ("" if clean else " (с ошибками)"))
+        return clean
@@ -0,0 +1,116 @@
+"""
+Массовая отправка сообщений с учетом лимитов Telegram.
+
+Общий для напоминаний и рассылок пул отправителей: ограничение скорости
+(token bucket), пауза по RetryAfter и учет пользователей, заблокировавших бота.
+"""
+import asyncio
+import logging
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Telegram допускает около 30 сообщений в секунду на бота
+GLOBAL_RATE_LIMIT = 30
+SENDER_WORKERS = 8
+SEND_ATTEMPTS = 3
+
+
+class SendResult(Enum):
+    """Итог отправки одного сообщения"""
+    SENT = "sent"
+    BLOCKED = "blocked"
+    FAILED = "failed"
+
+
+class TelegramSender:
+    """
+    Пул отправителей с общим лимитом скорости.
+
+    Один экземпляр на бота: лимит Telegram глобальный, поэтому
+    напоминания и рассылки должны делить один RateLimiter.
+    """
+
+    def __init__(self, bot: Bot, rate_limit: float = GLOBAL_RATE_LIMIT,
+                 workers: int = SENDER_WORKERS, attempts: int = SEND_ATTEMPTS):
+        """
+        Args:
+            bot: Экземпляр бота
+            rate_limit: Сообщений в секунду на весь бот
+            workers: Количество параллельных отправителей
+            attempts: Попыток на одно сообщение
+        """
+        self.bot = bot
+        self.limiter = RateLimiter(rate_limit)
+        self.workers = max(1, workers)
+        self.attempts = max(1, attempts)
+        self.stats = {result.value: 0 for result in SendResult}
+
+    async def send(self, chat_id: int, text: str, **kwargs: Any) -> SendResult:
+        """
+        Отправляет одно сообщение с повторами
+
+        Args:
+            chat_id: ID чата
+            text: Текст сообщения
+            **kwargs: Дополнительные параметры send_message
+
+        Returns:
+            SendResult
+        """
+        result = SendResult.FAILED
+        for attempt in range(self.attempts):
+            await self.limiter.acquire()
+            try:
+                await self.bot.send_message(chat_id, text, **kwargs)
+                result = SendResult.SENT
+                break
+            except TelegramRetryAfter as e:
+                logger.warning(f"Лимит Telegram, пауза {e.retry_after} с")
+                await self.limiter.pause(e.retry_after)
+            except TelegramForbiddenError:
+                result = SendResult.BLOCKED
+                break
+            except Exception as e:
+                logger.error(f"Ошибка отправки в чат {chat_id} (попытка {attempt + 1}): {e}")
+        self.stats[result.value] += 1
+        return result
+
+    async def send_many(self, messages: Iterable[Tuple[int, str]], **kwargs: Any) -> List[SendResult]:
+        """
+        Отправляет пачку сообщений через пул отправителей
+
+        Args:
+            messages: Пары (chat_id, текст)
+            **kwargs: Дополнительные параметры send_message
+
+        Returns:
+            Результаты в порядке сообщений
+        """
+        messages = list(messages)
+        results: List[SendResult] = [SendResult.FAILED] * len(messages)
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, message in enumerate(messages):
+            queue.put_nowait((index, message))
+
+        async def worker():
+            while not queue.empty():
+                index, (chat_id, text) = queue.get_nowait()
+                results[index] = await self.send(chat_id, text, **kwargs)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(messages)))))
+        return results
+
+    @staticmethod
+    def count(results: Iterable[SendResult]) -> Dict[str, int]:
+        """Сводка результатов по видам"""
+        summary = {result.value: 0 for result in SendResult}
+        for result in results:
+            summary[result.value] += 1
+        return summary
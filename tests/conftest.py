@@ -0,0 +1,25 @@
+"""
+Общие фикстуры тестов: Firestore в памяти вместо облака
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# До импорта модулей бота: FirestoreDB выбирает клиент при создании
+os.environ.setdefault("FIRESTORE_BACKEND", "memory")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database.memory_client import get_memory_client
+
+pytest_plugins = ["utils.firestore_trace_pytest"]
+
+
+@pytest.fixture(autouse=True)
+def memory_db():
+    """Общий in-memory клиент, пустой в начале каждого теста"""
+    client = get_memory_client()
+    client.clear()
+    yield client
+    client.clear()
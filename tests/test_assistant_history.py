@@ -0,0 +1,57 @@
+"""
+Очистка истории ассистента: фоновое удаление не задевает новые сообщения
+"""
+import asyncio
+
+from database.assistant_db import AssistantDB
+from database.bulk_delete import JOBS_COLLECTION, BulkDeleter
+from database.firestore_db import FirestoreDB
+
+USER_ID = 2001
+
+
+async def wait_background_jobs():
+    while BulkDeleter._background_tasks:
+        await asyncio.gather(*BulkDeleter._background_tasks)
+
+
+def test_clear_history_keeps_messages_after_clear(memory_db):
+    assistant_db = AssistantDB(FirestoreDB().db)
+
+    async def scenario():
+        for index in range(3):
+            await assistant_db.add_message(USER_ID, "user", f"старое {index}")
+        assert await assistant_db.clear_history(USER_ID)
+        # Задание еще не выполнено, но очищенные сообщения уже не видны
+        await assistant_db.add_message(USER_ID, "user", "новое")
+        history = await assistant_db.get_chat_history(USER_ID)
+        await wait_background_jobs()
+        return history
+
+    history = asyncio.run(scenario())
+
+    assert [message["content"] for message in history] == ["новое"]
+    stored = memory_db.collection(f"users/{USER_ID}/chat_history").get()
+    assert [doc.to_dict()["content"] for doc in stored] == ["новое"]
+    assert not memory_db.collection(JOBS_COLLECTION).get()
+
+
+def test_resumed_clear_job_respects_cutoff(memory_db):
+    assistant_db = AssistantDB(FirestoreDB().db)
+
+    async def scenario():
+        await assistant_db.add_message(USER_ID, "user", "старое")
+        assert await assistant_db.clear_history(USER_ID)
+        # Перезапуск до завершения: задание остается в cleanup_jobs
+        for task in list(BulkDeleter._background_tasks):
+            task.cancel()
+        await asyncio.gather(*BulkDeleter._background_tasks, return_exceptions=True)
+        await assistant_db.add_message(USER_ID, "user", "новый разговор")
+
+        assert await BulkDeleter(assistant_db.db).resume_pending_jobs() == 1
+        await wait_background_jobs()
+
+    asyncio.run(scenario())
+
+    stored = memory_db.collection(f"users/{USER_ID}/chat_history").get()
+    assert [doc.to_dict()["content"] for doc in stored] == ["новый разговор"]
@@ -0,0 +1,69 @@
+"""
+Рассылка по сегменту через фейковый Bot API
+"""
+import asyncio
+import time
+
+from database.firestore_db import FirestoreDB
+from scripts.broadcast import seed_users
+from services.broadcast_service import BroadcastEngine, BroadcastStatus
+from services.fake_telegram import create_fake_bot
+from services.telegram_sender import TelegramSender
+from utils.rate_limiter import RateLimiter
+
+USERS = 40
+# seed_users: каждый четвертый пользователь в другой категории
+SEGMENT = [100_000 + index for index in range(USERS) if index % 4]
+
+
+def run_broadcast(db, cursor=None, **session_options):
+    bot = create_fake_bot(**session_options)
+    engine = BroadcastEngine(db, TelegramSender(bot, rate_limit=1000), page_size=7)
+
+    async def scenario():
+        broadcast_id = await engine.create("habit", "Привет!")
+        if cursor is not None:
+            await asyncio.to_thread(engine._ref(broadcast_id).update, {"cursor": cursor})
+        return await engine.run(broadcast_id)
+
+    return asyncio.run(scenario()), bot.session
+
+
+def test_broadcast_reaches_segment_once(memory_db):
+    db = FirestoreDB().db
+    seed_users(db, "habit", USERS)
+    blocked = SEGMENT[:3]
+    for user_id in blocked:
+        db.collection("reminders").document(str(user_id)).set({"reminder_time": "09:00", "next_due": 1})
+
+    report, session = run_broadcast(db, blocked=blocked, retry_after_every=5, retry_after=0)
+
+    assert report.status == BroadcastStatus.DONE
+    assert (report.sent, report.blocked, report.failed) == (len(SEGMENT) - 3, 3, 0)
+    delivered = [chat_id for chat_id, _ in session.sent]
+    assert sorted(delivered) == SEGMENT[3:]
+    for user_id in blocked:
+        assert "next_due" not in db.collection("reminders").document(str(user_id)).get().to_dict()
+
+
+def test_resume_after_deleted_user(memory_db):
+    db = FirestoreDB().db
+    seed_users(db, "habit", USERS)
+    cursor = SEGMENT[10]
+    db.collection("users").document(str(cursor)).delete()
+
+    report, session = run_broadcast(db, cursor=cursor)
+
+    assert report.status == BroadcastStatus.DONE
+    assert sorted(chat_id for chat_id, _ in session.sent) == SEGMENT[11:]
+
+
+def test_concurrent_pauses_do_not_stack():
+    async def scenario():
+        limiter = RateLimiter(100)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.pause(0.2) for _ in range(5)))
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.5
@@ -0,0 +1,89 @@
+"""
+Бюджет Firestore на апдейт для горячих обработчиков
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from handlers import assistant_plan, settings, trackers
+from models.ai_profile import DayTask, PlanData
+from utils.firestore_trace import DOCS_READ_BUDGET
+
+
+def make_callback(user_id: int, data: str):
+    return SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=user_id),
+        message=SimpleNamespace(edit_text=AsyncMock(), answer=AsyncMock()),
+        answer=AsyncMock(),
+    )
+
+
+def seed_habit(memory_db, user_id: int, habit_id: str):
+    user_ref = memory_db.collection("users").document(str(user_id))
+    user_ref.set({"telegram_id": user_id, "points_balance": 0, "total_points_earned": 0, "achievements": []})
+    user_ref.collection("habits").document(habit_id).set({
+        "name": "Чтение",
+        "type": "good",
+        "current_streak": 2,
+        "best_streak": 2,
+        "last_completed": datetime.now(timezone.utc) - timedelta(days=1),
+    })
+
+
+# Отметка привычки в обычный день: выполнение, две записи очков и проверка
+# достижений. Выше бюджета апдейта (ROUND_TRIP_BUDGET) - GamificationDB
+# перечитывает документ пользователя на каждое начисление; тест не дает
+# этой цене расти дальше
+COMPLETE_HABIT_ROUND_TRIPS = 15
+
+
+def test_complete_habit_cost_does_not_grow(memory_db, firestore_budget):
+    seed_habit(memory_db, 2001, "h1")
+    # Первое выполнение открывает достижения - меряем следующий день
+    asyncio.run(trackers.complete_habit(make_callback(2001, "complete_habit:h1")))
+    memory_db.collection("users").document("2001").collection("habits").document("h1").update({
+        "last_completed": datetime.now(timezone.utc) - timedelta(days=1)
+    })
+    callback = make_callback(2001, "complete_habit:h1")
+
+    with firestore_budget(COMPLETE_HABIT_ROUND_TRIPS, DOCS_READ_BUDGET):
+        asyncio.run(trackers.complete_habit(callback))
+
+    callback.answer.assert_awaited_with("Отмечено")
+
+
+def test_set_reminder_within_budget(memory_db, firestore_budget):
+    memory_db.collection("users").document("2002").set({"telegram_id": 2002})
+    callback = make_callback(2002, "set_reminder:09:00")
+
+    # Чтение настроек, запись предпочтений, запись индекса
+    with firestore_budget(round_trips=3, docs_read=1):
+        asyncio.run(settings.set_reminder_handler(callback))
+
+    callback.answer.assert_awaited_with("Напоминание: 09:00")
+
+
+def test_plan_view_reads_only_visible_days(memory_db, firestore_budget):
+    plan = PlanData(type="exam", horizon_days=15, days=[
+        DayTask(id=f"t{day}", day_number=day, title=f"День {day}", duration_minutes=30)
+        for day in range(1, 16)
+    ])
+
+    async def scenario():
+        await assistant_plan.profile_db.create_profile(2003)
+        await assistant_plan.profile_db.save_plan(2003, plan)
+        callback = make_callback(2003, "plan:open_preview")
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=2003, user_id=2003))
+        # Заголовок плана из документа пользователя и три видимых дня
+        with firestore_budget(round_trips=2, docs_read=4):
+            await assistant_plan.handle_plan_open_preview(callback, state)
+        return callback.message.edit_text.call_args.args[0]
+
+    text = asyncio.run(scenario())
+    assert "День 3" in text and "День 4" not in text
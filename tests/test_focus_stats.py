@@ -0,0 +1,39 @@
+"""
+Статистика фокуса: серия в меню совпадает со статистикой за период
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from database.firestore_db import FirestoreDB
+from database.focus_db import FocusDB
+
+USER_ID = 4001
+
+
+def seed_focus_stats(memory_db, last_session: datetime):
+    memory_db.collection("users").document(str(USER_ID)).set({
+        "focus_stats": {
+            "total_sessions": 10,
+            "total_minutes": 250,
+            "current_streak": 5,
+            "best_streak": 7,
+            "last_session_date": last_session,
+        }
+    })
+
+
+def test_user_stats_drops_broken_streak(memory_db):
+    focus_db = FocusDB(FirestoreDB().db)
+    seed_focus_stats(memory_db, datetime.now(timezone.utc) - timedelta(days=3))
+
+    stats = asyncio.run(focus_db.get_user_stats(str(USER_ID)))
+
+    assert stats["current_streak"] == 0
+    assert stats["best_streak"] == 7
+
+
+def test_user_stats_keeps_streak_from_yesterday(memory_db):
+    focus_db = FocusDB(FirestoreDB().db)
+    seed_focus_stats(memory_db, datetime.now(timezone.utc) - timedelta(days=1))
+
+    assert asyncio.run(focus_db.get_user_stats(str(USER_ID)))["current_streak"] == 5
@@ -0,0 +1,32 @@
+"""
+Кэш клавиатур: общая разметка заморожена
+"""
+import pytest
+
+from keyboards.cache import freeze_markup, static_keyboard
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+@static_keyboard
+def sample_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="Назад", callback_data="back")]
+    ])
+
+
+def test_cached_keyboard_is_frozen():
+    markup = sample_keyboard()
+    assert markup is sample_keyboard()
+
+    with pytest.raises(AttributeError):
+        markup.inline_keyboard.append(())
+    with pytest.raises(Exception):
+        markup.inline_keyboard = ()
+    with pytest.raises(Exception):
+        markup.inline_keyboard[0][0].text = "Изменено"
+
+    assert markup.inline_keyboard[0][0].text == "Назад"
+    assert freeze_markup(markup) is markup
+    assert markup.model_dump(mode="json", exclude_none=True) == {
+        "inline_keyboard": [[{"text": "Назад", "callback_data": "back"}]]
+    }
@@ -0,0 +1,76 @@
+"""
+Индексированный план: поиск задачи по ID, изменения, компактная форма
+"""
+import asyncio
+
+from database.assistant_profile_db import AssistantProfileDB
+from database.firestore_db import FirestoreDB
+from models.ai_profile import DayTask, PlanData, TaskStatus
+from utils.plan_cache import plan_cache
+
+USER_ID = 3001
+
+
+def make_plan() -> PlanData:
+    return PlanData(type="exam", horizon_days=7, days=[
+        DayTask(id=f"t{day}-{index}", day_number=day, title=f"Задача {day}.{index}", duration_minutes=30)
+        for day in range(1, 4)
+        for index in range(2)
+    ])
+
+
+def test_index_follows_mutations():
+    plan = make_plan()
+    assert plan.get_task("t2-1").title == "Задача 2.1"
+
+    plan.update_task("t1-0", status=TaskStatus.COMPLETED)
+    assert plan.day_progress(1) == (1, 2)
+
+    plan.update_task("t1-1", day_number=3)
+    assert [task.id for task in plan.tasks_for_day(1)] == ["t1-0"]
+    assert [task.id for task in plan.tasks_for_day(3)] == ["t1-1", "t3-0", "t3-1"]
+
+    plan.add_task(DayTask(id="extra", day_number=2, title="Еще"))
+    assert plan.get_task("extra").day_number == 2
+    assert plan.day_progress(2) == (0, 3)
+
+    assert plan.remove_task("t2-0")
+    assert plan.get_task("t2-0") is None
+    assert plan.get_task("extra") is plan.days[-1]
+
+
+def test_compact_round_trip():
+    plan = make_plan()
+    plan.update_task("t3-1", status=TaskStatus.COMPLETED, notes="готово")
+
+    compact = plan.to_compact()
+    assert PlanData.is_compact(compact)
+    assert compact["tasks_count"] == 6
+    assert "day_number" not in compact["days"]["1"][0]
+
+    restored = PlanData.from_compact(compact)
+    assert [task.id for task in restored.tasks_for_day(3)] == ["t3-0", "t3-1"]
+    assert restored.get_task("t3-1").notes == "готово"
+    assert restored.day_progress(3) == (1, 2)
+
+
+def test_update_task_status_keeps_cached_plan(memory_db):
+    profile_db = AssistantProfileDB(FirestoreDB().db)
+
+    async def scenario():
+        await profile_db.create_profile(USER_ID)
+        assert await profile_db.save_plan(USER_ID, make_plan().to_compact())
+        cached = (await profile_db.get_profile(USER_ID, with_plan_days=True)).plan
+
+        assert await profile_db.update_task_status(USER_ID, "t2-1", "completed", notes="ok")
+        return cached, (await profile_db.get_profile(USER_ID, with_plan_days=True)).plan
+
+    cached, reloaded = asyncio.run(scenario())
+
+    # Кэш обновлен на месте и совпадает с новой версией заголовка
+    assert reloaded is cached
+    assert reloaded.get_task("t2-1").status == "completed"
+    assert reloaded.day_progress(2) == (1, 2)
+    day = memory_db.collection(f"users/{USER_ID}/plan_days").document("002").get().to_dict()
+    assert [task["status"] for task in day["tasks"]] == ["pending", "completed"]
+    plan_cache.invalidate(USER_ID)
@@ -0,0 +1,118 @@
+"""
+Напоминания: выбор времени в настройках -> индекс -> рассылка
+"""
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from database.reminder_db import DEFAULT_TIMEZONE, ReminderDB, minute_bucket, next_due_bucket
+from handlers import settings
+from scripts.backfill_reminders import backfill
+from services.fake_telegram import create_fake_bot
+from services.reminder_service import CATCHUP_MINUTES, REMINDER_TEXT, ReminderDispatcher
+from services.telegram_sender import TelegramSender
+
+
+def make_callback(user_id: int, data: str):
+    return SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=user_id),
+        message=SimpleNamespace(edit_text=AsyncMock()),
+        answer=AsyncMock(),
+    )
+
+
+def choose_time(memory_db, user_id: int, reminder_time: str) -> int:
+    """Пользователь выбирает время в настройках; возвращает next_due из индекса"""
+    memory_db.collection("users").document(str(user_id)).set({"telegram_id": user_id})
+    callback = make_callback(user_id, f"set_reminder:{reminder_time}")
+    asyncio.run(settings.set_reminder_handler(callback))
+    callback.answer.assert_awaited_with(f"Напоминание: {reminder_time}")
+    return memory_db.collection("reminders").document(str(user_id)).get().to_dict()["next_due"]
+
+
+def make_dispatcher(**session_options):
+    bot = create_fake_bot(**session_options)
+    dispatcher = ReminderDispatcher(TelegramSender(bot, attempts=1), ReminderDB(settings.db.db))
+    return dispatcher, bot.session
+
+
+def test_reminder_time_from_settings_is_delivered(memory_db):
+    now_bucket = minute_bucket(datetime.now(timezone.utc))
+    due = choose_time(memory_db, 1001, "09:00")
+
+    assert due == next_due_bucket("09:00", DEFAULT_TIMEZONE, now_bucket)
+    user = memory_db.collection("users").document("1001").get().to_dict()
+    assert user["ai_profile"]["preferences"]["reminder_time"] == "09:00"
+
+    dispatcher, session = make_dispatcher()
+    dispatcher._started_bucket = due
+    assert asyncio.run(dispatcher.dispatch_due(due - 1)) == 0
+    assert asyncio.run(dispatcher.dispatch_due(due)) == 1
+    assert session.sent == [(1001, REMINDER_TEXT)]
+
+    entry = memory_db.collection("reminders").document("1001").get().to_dict()
+    assert entry["next_due"] == next_due_bucket("09:00", DEFAULT_TIMEZONE, due)
+    assert entry["last_sent_bucket"] == due
+
+
+def test_reminder_not_scheduled_when_notifications_off(memory_db):
+    asyncio.run(settings.settings_db.update_settings("1004", {"notifications_enabled": False}))
+    memory_db.collection("users").document("1004").set({"telegram_id": 1004})
+    asyncio.run(settings.set_reminder_handler(make_callback(1004, "set_reminder:10:00")))
+
+    entry = memory_db.collection("reminders").document("1004").get().to_dict()
+    assert entry["reminder_time"] == "10:00"
+    assert "next_due" not in entry
+
+
+def test_failed_send_is_retried_blocked_is_disabled(memory_db):
+    due = choose_time(memory_db, 1001, "09:00")
+    choose_time(memory_db, 1002, "09:00")
+    choose_time(memory_db, 1003, "09:00")
+
+    dispatcher, session = make_dispatcher(failing={1002}, blocked={1003})
+    dispatcher._started_bucket = due
+    assert asyncio.run(dispatcher.dispatch_due(due)) == 1
+
+    reminders = memory_db.collection("reminders")
+    assert reminders.document("1002").get().to_dict()["next_due"] == due
+    assert "next_due" not in reminders.document("1003").get().to_dict()
+
+    # Следующая корзина: сбой прошел, напоминание доходит один раз
+    session.failing.clear()
+    assert asyncio.run(dispatcher.dispatch_due(due + 1)) == 1
+    assert session.sent == [(1001, REMINDER_TEXT), (1002, REMINDER_TEXT)]
+    assert reminders.document("1002").get().to_dict()["next_due"] > due + 1
+
+
+def test_failed_send_gives_up_after_catchup_window(memory_db):
+    due = choose_time(memory_db, 1002, "09:00")
+    dispatcher, session = make_dispatcher(failing={1002})
+    dispatcher._started_bucket = due
+
+    asyncio.run(dispatcher.dispatch_due(due + CATCHUP_MINUTES))
+
+    entry = memory_db.collection("reminders").document("1002").get().to_dict()
+    assert entry["next_due"] > due + CATCHUP_MINUTES
+
+
+def test_backfill_indexes_profile_preferences(memory_db):
+    users = memory_db.collection("users")
+    users.document("1").set({"ai_profile": {"preferences": {"reminder_time": "08:30", "notifications_enabled": True}}})
+    users.document("2").set({"ai_profile": {"preferences": {"reminder_time": "08:30", "notifications_enabled": False}}})
+    users.document("3").set({"ai_profile": {"preferences": {"reminder_time": "21:00"}}})
+    users.document("3").collection("settings").document("main").set({"notifications_enabled": False})
+    users.document("4").set({"ai_profile": {"preferences": {"reminder_time": None}}})
+
+    assert backfill(memory_db) == (1, 2, 0)
+    reminders = memory_db.collection("reminders")
+    assert reminders.document("1").get().to_dict()["reminder_time"] == "08:30"
+    assert "next_due" in reminders.document("1").get().to_dict()
+    assert "next_due" not in reminders.document("2").get().to_dict()
+    assert "next_due" not in reminders.document("3").get().to_dict()
+    assert not reminders.document("4").get().exists
+
+    # Повторный запуск не трогает уже проиндексированных
+    assert backfill(memory_db) == (0, 0, 3)
@@ -2,7 +2,9 @@
 Система достижений и очков
 Профессиональный стиль
 """
-from typing import Dict, List, Optional, Tuple
+from bisect import bisect_right
+from math import isqrt
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 
 # === ТАБЛИЦА НАЧИСЛЕНИЯ ОЧКОВ ===
@@ -220,6 +222,92 @@ ACHIEVEMENTS = {
 }
 
 
+# === ПРЕДВЫЧИСЛЕННЫЕ ИНДЕКСЫ КАТАЛОГА ===
+# ACHIEVEMENTS не меняется во время работы, поэтому группировки и пороги
+# строятся один раз при импорте, а экраны только сопоставляют их с
+# множеством полученных пользователем ID
+
+RARITY_ORDER = ('common', 'rare', 'epic', 'legendary')
+
+RARITY_NAMES = {
+    'common': 'Обычные',
+    'rare': 'Редкие',
+    'epic': 'Эпические',
+    'legendary': 'Легендарные'
+}
+
+# Категории экрана достижений: заголовок и типы условий
+ACHIEVEMENT_CATEGORIES = {
+    'habits': ('🌱 Достижения привычек', ('habit_streak',)),
+    'focus': ('🎯 Достижения фокуса', ('focus_sessions', 'focus_hours')),
+    'tasks': ('📋 Достижения задач', ('tasks_completed',)),
+    'bad_habits': ('💪 Победа над вредными привычками', ('bad_habit_free',)),
+    'special': ('⭐ Особые достижения', ('special', 'first_action')),
+}
+
+
+class AchievementCatalog:
+    """Индексы каталога достижений: по категории, редкости и типу условия"""
+    
+    def __init__(self, achievements: Dict[str, Dict]):
+        """
+        Args:
+            achievements: Каталог {ID: описание достижения}
+        """
+        self.achievements = achievements
+        self.total = len(achievements)
+        
+        by_condition: Dict[str, List[str]] = {}
+        by_rarity: Dict[str, List[str]] = {rarity: [] for rarity in RARITY_ORDER}
+        for ach_id, ach in achievements.items():
+            by_condition.setdefault(ach['condition']['type'], []).append(ach_id)
+            by_rarity.setdefault(ach.get('rarity', 'common'), []).append(ach_id)
+        
+        # Числовые условия сортируем по порогу: (пороги, ID) для bisect
+        self.thresholds: Dict[str, Tuple[Tuple[float, ...], Tuple[str, ...]]] = {}
+        for condition_type, ids in by_condition.items():
+            values = [achievements[ach_id]['condition']['value'] for ach_id in ids]
+            if all(isinstance(value, (int, float)) for value in values):
+                pairs = sorted(zip(values, ids))
+                ids[:] = [ach_id for _, ach_id in pairs]
+                self.thresholds[condition_type] = (
+                    tuple(value for value, _ in pairs),
+                    tuple(ach_id for _, ach_id in pairs)
+                )
+        
+        self.by_condition: Dict[str, Tuple[str, ...]] = {key: tuple(ids) for key, ids in by_condition.items()}
+        self.by_rarity: Dict[str, Tuple[str, ...]] = {key: tuple(ids) for key, ids in by_rarity.items()}
+        self.by_category: Dict[str, Tuple[str, ...]] = {
+            category: tuple(
+                ach_id for condition_type in condition_types
+                for ach_id in self.by_condition.get(condition_type, ())
+            )
+            for category, (_, condition_types) in ACHIEVEMENT_CATEGORIES.items()
+        }
+        self.rarity_totals: Dict[str, int] = {key: len(ids) for key, ids in self.by_rarity.items()}
+    
+    def reached(self, condition_type: str, value: float) -> Tuple[str, ...]:
+        """ID достижений числового условия, порог которых не выше value"""
+        thresholds, ids = self.thresholds.get(condition_type, ((), ()))
+        return ids[:bisect_right(thresholds, value)]
+    
+    def next_goal(self, condition_type: str, value: float) -> Optional[str]:
+        """Ближайшее еще не достигнутое достижение числового условия"""
+        thresholds, ids = self.thresholds.get(condition_type, ((), ()))
+        index = bisect_right(thresholds, value)
+        return ids[index] if index < len(ids) else None
+    
+    def rarity_progress(self, unlocked: Set[str]) -> Dict[str, Tuple[int, int]]:
+        """Прогресс по редкости: {редкость: (получено, всего)}"""
+        return {
+            rarity: (sum(1 for ach_id in ids if ach_id in unlocked), self.rarity_totals[rarity])
+            for rarity, ids in self.by_rarity.items()
+        }
+
+
+ACHIEVEMENT_CATALOG = AchievementCatalog(ACHIEVEMENTS)
+
+
 def get_achievement_message(achievement_id: str) -> str:
     """
     Возвращает поздравительное сообщение для достижения
@@ -277,6 +365,49 @@ def calculate_points_for_task(priority: str) -> int:
     return points_map.get(priority, 5)
 
 
+# === УРОВНИ И РАНГИ ===
+# Каждый уровень требует на 50 очков больше предыдущего:
+# уровень 2 - 100 очков, 3 - 200, 4 - 350 и т.д. Порог перехода с уровня k
+# на k + 1 в замкнутом виде: T(k) = 25 * k * (k + 1) + 50
+
+LEVEL_STEP = 50
+FIRST_LEVEL_POINTS = 100
+
+# Ранги по диапазонам уровней (включительно)
+RANK_RANGES = (
+    (1, 5, "Новичок"),
+    (6, 10, "Практик"),
+    (11, 20, "Специалист"),
+    (21, 30, "Эксперт"),
+    (31, 50, "Мастер"),
+    (51, 75, "Гуру"),
+    (76, 100, "Легенда"),
+)
+MAX_RANKED_LEVEL = RANK_RANGES[-1][1]
+DEFAULT_RANK = "Легенда"  # Для уровней вне таблицы
+
+# RANK_TABLE[level] - ранг для каждого уровня 1..MAX_RANKED_LEVEL
+RANK_TABLE: Tuple[str, ...] = (DEFAULT_RANK,) + tuple(
+    rank for min_level, max_level, rank in RANK_RANGES for _ in range(min_level, max_level + 1)
+)
+
+
+def level_threshold(level: int) -> int:
+    """
+    Очки, с которых начинается уровень
+    
+    Args:
+        level: Уровень (от 1)
+        
+    Returns:
+        int: Порог уровня (0 для первого уровня)
+    """
+    k = level - 1
+    if k < 1:
+        return 0
+    return LEVEL_STEP * k * (k + 1) // 2 + FIRST_LEVEL_POINTS - LEVEL_STEP
+
+
 def get_level_from_points(total_points: int) -> Tuple[int, int, int]:
     """
     Рассчитывает уровень по общему количеству очков
@@ -284,45 +415,39 @@ def get_level_from_points(total_points: int) -> Tuple[int, int, int]:
     Returns:
         Tuple[int, int, int]: (уровень, очки на текущем уровне, очки до следующего уровня)
     """
-    # Формула: каждый уровень требует на 50 очков больше предыдущего
-    # Уровень 1: 100 очков
-    # Уровень 2: 150 очков
-    # Уровень 3: 200 очков и т.д.
+    # Пройдено порогов k - наибольшее k с T(k) <= total_points, то есть
+    # k * (k + 1) <= (total_points - 50) // 25. Считаем через isqrt без float
+    m = (int(total_points) - (FIRST_LEVEL_POINTS - LEVEL_STEP)) // (LEVEL_STEP // 2)
+    passed = (isqrt(4 * m + 1) - 1) // 2 if m >= 2 else 0
+    level = passed + 1
     
-    level = 1
-    points_for_current_level = 0
-    points_for_next_level = 100
+    points_for_current_level = level_threshold(level)
+    points_for_next_level = level_threshold(level + 1)
     
-    while total_points >= points_for_next_level:
-        level += 1
-        points_for_current_level = points_for_next_level
-        points_for_next_level += 50 * level
-    
-    points_in_level = total_points - points_for_current_level
-    points_to_next = points_for_next_level - total_points
+    return level, total_points - points_for_current_level, points_for_next_level - total_points
+
+
+def get_levels_from_points(points: Iterable[int]) -> List[Tuple[int, int, int]]:
+    """
+    Пакетный расчет уровней (лидерборды, пересчет по всей базе за один проход)
     
-    return level, points_in_level, points_to_next
+    Args:
+        points: Суммы очков пользователей
+        
+    Returns:
+        List[Tuple[int, int, int]]: Результаты get_level_from_points в том же порядке
+    """
+    return [get_level_from_points(total) for total in points]
 
 
 def get_rank_by_level(level: int) -> str:
     """
     Возвращает ранг по уровню
     """
-    ranks = {
-        (1, 5): "Новичок",
-        (6, 10): "Практик",
-        (11, 20): "Специалист",
-        (21, 30): "Эксперт",
-        (31, 50): "Мастер",
-        (51, 75): "Гуру",
-        (76, 100): "Легенда"
-    }
-    
-    for (min_level, max_level), rank in ranks.items():
-        if min_level <= level <= max_level:
-            return rank
-    
-    return "Легенда"  # Для уровней выше 100
+    if 1 <= level <= MAX_RANKED_LEVEL:
+        return RANK_TABLE[level]
+    return DEFAULT_RANK
+
 
 def check_achievements_for_user(user_stats: Dict) -> List[str]:
     """
@@ -407,52 +532,25 @@ def check_achievements_for_user(user_stats: Dict, already_unlocked: List[str]) -
         List[str]: Список ID достижений для разблокировки
     """
     # bugfix: функция воссоздана для исправления ошибки импорта
-    unlockable = []
+    already = set(already_unlocked)
     
-    for achievement_id, achievement in ACHIEVEMENTS.items():
-        # Пропускаем уже разблокированные
-        if achievement_id in already_unlocked:
-            continue
-            
-        condition = achievement['condition']
-        condition_type = condition['type']
-        required_value = condition['value']
-        
-        # Проверяем разные типы условий
-        if condition_type == 'habit_streak':
-            max_streak = user_stats.get('max_habit_streak', 0)
-            if max_streak >= required_value:
-                unlockable.append(achievement_id)
-                
-        elif condition_type == 'focus_sessions':
-            total_sessions = user_stats.get('total_focus_sessions', 0)
-            if total_sessions >= required_value:
-                unlockable.append(achievement_id)
-                
-        elif condition_type == 'focus_hours':
-            total_minutes = user_stats.get('total_focus_minutes', 0)
-            total_hours = total_minutes // 60
-            if total_hours >= required_value:
-                unlockable.append(achievement_id)
-                
-        elif condition_type == 'tasks_completed':
-            total_tasks = user_stats.get('total_tasks_completed', 0)
-            if total_tasks >= required_value:
-                unlockable.append(achievement_id)
-                
-        elif condition_type == 'points_earned':
-            total_points = user_stats.get('total_points_earned', 0)
-            if total_points >= required_value:
-                unlockable.append(achievement_id)
-                
-        elif condition_type == 'bad_habit_days':
-            max_days = user_stats.get('max_bad_habit_days', 0)
-            if max_days >= required_value:
-                unlockable.append(achievement_id)
-                
-        elif condition_type == 'checklist_streak':
-            checklist_streak = user_stats.get('max_checklist_streak', 0)
-            if checklist_streak >= required_value:
-                unlockable.append(achievement_id)
+    # Значение статистики для каждого числового типа условия
+    stat_values = {
+        'habit_streak': user_stats.get('max_habit_streak', 0),
+        'focus_sessions': user_stats.get('total_focus_sessions', 0),
+        'focus_hours': user_stats.get('total_focus_minutes', 0) // 60,
+        'tasks_completed': user_stats.get('total_tasks_completed', 0),
+        'points_earned': user_stats.get('total_points_earned', 0),
+        'bad_habit_days': user_stats.get('max_bad_habit_days', 0),
+        'checklist_streak': user_stats.get('max_checklist_streak', 0),
+    }
+    
+    # Пороги отсортированы, поэтому достигнутые - это префикс списка
+    unlockable = []
+    for condition_type, value in stat_values.items():
+        unlockable.extend(
+            ach_id for ach_id in ACHIEVEMENT_CATALOG.reached(condition_type, value)
+            if ach_id not in already
+        )
     
     return unlockable
\ No newline at end of file
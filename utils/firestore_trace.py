@@ -0,0 +1,322 @@
+"""
+Трассировка обращений к Firestore в рамках одного апдейта Telegram
+
+TracedClient оборачивает клиент Firestore (настоящий или in-memory) и
+записывает каждую операцию - коллекцию, тип, число документов, размер,
+длительность - в трассу текущего контекста (contextvars). Трасса
+открывается middleware на время обработки апдейта: операции из
+asyncio.to_thread попадают в нее же, так как поток получает копию
+контекста. По завершении пишется сводка, а апдейты сверх бюджета
+round-trip или прочитанных документов помечаются в логе и метриках.
+
+Фикстура pytest firestore_budget, которая роняет тест при превышении
+бюджета, живет в отдельном плагине utils/firestore_trace_pytest.py,
+чтобы бот не импортировал pytest.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Бюджет на один апдейт (0 - без ограничения)
+ROUND_TRIP_BUDGET = int(os.getenv('FIRESTORE_ROUND_TRIP_BUDGET', '10'))
+DOCS_READ_BUDGET = int(os.getenv('FIRESTORE_DOCS_READ_BUDGET', '200'))
+
+UPDATE_ROUND_TRIPS = REGISTRY.histogram(
+    "update_firestore_round_trips", "Round-trip к Firestore на один апдейт", ("handler",),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55))
+UPDATE_DOCS_READ = REGISTRY.histogram(
+    "update_firestore_docs_read", "Прочитанных документов Firestore на один апдейт", ("handler",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+BUDGET_EXCEEDED = REGISTRY.counter(
+    "firestore_budget_exceeded_total", "Апдейты сверх бюджета Firestore", ("handler", "budget"))
+
+# Методы, которые возвращают ссылку или запрос (трассируются дальше по цепочке)
+_CHAIN_METHODS = frozenset({
+    'collection', 'document', 'collection_group', 'where', 'order_by', 'limit',
+    'limit_to_last', 'offset', 'start_after', 'start_at', 'end_before', 'end_at', 'select',
+})
+# Методы, которые ходят в Firestore
+_READ_METHODS = frozenset({'get', 'stream', 'get_all', 'list_documents', 'collections'})
+_WRITE_METHODS = frozenset({'set', 'update', 'delete', 'create', 'add'})
+_BATCH_WRITE_METHODS = frozenset({'set', 'update', 'delete', 'create'})
+
+
+@dataclass
+class TraceOp:
+    """Одна операция Firestore"""
+    collection: str
+    op: str
+    docs: int
+    bytes: int
+    duration: float
+
+
+@dataclass
+class UpdateTrace:
+    """Операции Firestore одного апдейта (или блока кода)"""
+    name: str
+    ops: List[TraceOp] = field(default_factory=list)
+    closed: bool = False
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.ops)
+
+    @property
+    def docs_read(self) -> int:
+        return sum(op.docs for op in self.ops if op.op in _READ_METHODS)
+
+    @property
+    def docs_written(self) -> int:
+        return sum(op.docs for op in self.ops if op.op not in _READ_METHODS)
+
+    @property
+    def bytes(self) -> int:
+        return sum(op.bytes for op in self.ops)
+
+    @property
+    def duration(self) -> float:
+        return sum(op.duration for op in self.ops)
+
+    def over_budget(self, round_trips: int = ROUND_TRIP_BUDGET, docs_read: int = DOCS_READ_BUDGET) -> List[str]:
+        """Названия превышенных бюджетов"""
+        exceeded = []
+        if round_trips and self.round_trips > round_trips:
+            exceeded.append('round_trips')
+        if docs_read and self.docs_read > docs_read:
+            exceeded.append('docs_read')
+        return exceeded
+
+    def summary(self) -> str:
+        """Сводка: итоги и операции по коллекциям"""
+        by_key: Dict[str, List[TraceOp]] = {}
+        for op in self.ops:
+            by_key.setdefault(f"{op.op} {op.collection}", []).append(op)
+        details = ", ".join(
+            f"{key} x{len(ops)} ({sum(op.docs for op in ops)} док., {sum(op.duration for op in ops) * 1000:.1f} мс)"
+            for key, ops in by_key.items()
+        )
+        return (
+            f"{self.name}: {self.round_trips} round-trip, прочитано {self.docs_read} док., "
+            f"записано {self.docs_written} док., {self.bytes} Б, {self.duration * 1000:.1f} мс"
+            + (f" | {details}" if details else "")
+        )
+
+
+_current_trace: ContextVar[Optional[UpdateTrace]] = ContextVar('firestore_trace', default=None)
+
+
+def current_trace() -> Optional[UpdateTrace]:
+    """Трасса текущего контекста или None"""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_firestore(name: str) -> Iterator[UpdateTrace]:
+    """
+    Собирает операции Firestore, сделанные внутри блока
+
+    Args:
+        name: Имя трассы (обработчик, сценарий теста)
+
+    Yields:
+        UpdateTrace
+    """
+    trace = UpdateTrace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        # Фоновые задачи, запущенные из блока, наследуют контекст - их операции не считаем
+        trace.closed = True
+        _current_trace.reset(token)
+
+
+def _record(collection: str, op: str, docs: int, size: int, started: float):
+    trace = _current_trace.get()
+    if trace is not None and not trace.closed:
+        trace.ops.append(TraceOp(collection, op, docs, size, time.perf_counter() - started))
+
+
+def estimate_size(value: Any) -> int:
+    """Примерный размер значения по правилам хранения Firestore"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime, date)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + 1 + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    return 8
+
+
+def _snapshot_size(snapshot: Any) -> int:
+    data = snapshot.to_dict() if getattr(snapshot, 'exists', True) else None
+    return estimate_size(data) if data else 0
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, _Traced):
+        return value._target
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    return value
+
+
+class _Traced:
+    """Прокси ссылки, запроса или batch с записью операций в трассу"""
+
+    __slots__ = ('_target', '_collection', '_writes')
+
+    def __init__(self, target: Any, collection: str):
+        self._target = target
+        self._collection = collection
+        self._writes = 0
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name in _CHAIN_METHODS:
+            return self._chain(name, attr)
+        if name in _READ_METHODS:
+            return self._read(name, attr)
+        if name in _WRITE_METHODS:
+            return self._write(name, attr)
+        if name == 'commit':
+            return self._commit(attr)
+        return attr
+
+    def _chain(self, name: str, method: Callable) -> Callable:
+        def call(*args, **kwargs):
+            result = method(*(_unwrap(arg) for arg in args), **kwargs)
+            collection = self._collection
+            if name in ('collection', 'collection_group', 'document') and args:
+                # Путь вида users/1/habits: коллекция - последний нечетный сегмент
+                segments = '/'.join(str(arg) for arg in args).strip('/').split('/')
+                if name != 'document':
+                    collection = segments[-1] if len(segments) % 2 else segments[-2]
+                elif len(segments) > 1:
+                    collection = segments[-2]
+            return _Traced(result, collection)
+        return call
+
+    def _read(self, name: str, method: Callable) -> Callable:
+        def call(*args, **kwargs):
+            if _current_trace.get() is None:
+                return method(*(_unwrap(arg) for arg in args), **kwargs)
+            started = time.perf_counter()
+            result = method(*(_unwrap(arg) for arg in args), **kwargs)
+            if name == 'stream' or (name == 'get_all' and not isinstance(result, list)):
+                return self._iterate(name, result, started)
+            if isinstance(result, list):
+                _record(self._collection, name, len(result), sum(_snapshot_size(doc) for doc in result), started)
+            elif name in ('list_documents', 'collections'):
+                items = list(result)
+                _record(self._collection, name, 0, 0, started)
+                return iter(items)
+            else:
+                exists = getattr(result, 'exists', True)
+                _record(self._collection, name, 1 if exists else 0, _snapshot_size(result), started)
+            return result
+        return call
+
+    def _iterate(self, name: str, iterator, started: float):
+        docs = size = 0
+        try:
+            for doc in iterator:
+                docs += 1
+                size += _snapshot_size(doc)
+                yield doc
+        finally:
+            _record(self._collection, name, docs, size, started)
+
+    def _write(self, name: str, method: Callable) -> Callable:
+        def call(*args, **kwargs):
+            args = [_unwrap(arg) for arg in args]
+            # Операции batch накапливаются и уходят одним commit
+            if self._collection == '(batch)' and name in _BATCH_WRITE_METHODS:
+                self._writes += 1
+                return method(*args, **kwargs)
+            if _current_trace.get() is None:
+                return method(*args, **kwargs)
+            started = time.perf_counter()
+            result = method(*args, **kwargs)
+            data = next((arg for arg in args if isinstance(arg, dict)), None)
+            _record(self._collection, name, 1, estimate_size(data) if data else 0, started)
+            return result
+        return call
+
+    def _commit(self, method: Callable) -> Callable:
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            result = method(*args, **kwargs)
+            _record('(batch)', 'commit', self._writes, 0, started)
+            self._writes = 0
+            return result
+        return call
+
+    def __len__(self):
+        return len(self._target)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"Traced({self._target!r})"
+
+
+class TracedClient(_Traced):
+    """Клиент Firestore с трассировкой операций"""
+
+    __slots__ = ()
+
+    def __init__(self, client: Any):
+        super().__init__(client, '(client)')
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name == 'batch':
+            return lambda *args, **kwargs: _Traced(attr(*args, **kwargs), '(batch)')
+        return super().__getattr__(name)
+
+    @property
+    def wrapped(self) -> Any:
+        """Исходный клиент"""
+        return self._target
+
+
+def finish_trace(trace: UpdateTrace, handler: str,
+                 round_trips: int = ROUND_TRIP_BUDGET, docs_read: int = DOCS_READ_BUDGET) -> List[str]:
+    """
+    Записывает сводку трассы в лог и метрики
+
+    Returns:
+        Названия превышенных бюджетов
+    """
+    UPDATE_ROUND_TRIPS.observe(trace.round_trips, handler=handler)
+    UPDATE_DOCS_READ.observe(trace.docs_read, handler=handler)
+    exceeded = trace.over_budget(round_trips, docs_read)
+    for budget in exceeded:
+        BUDGET_EXCEEDED.inc(handler=handler, budget=budget)
+    if exceeded:
+        logger.warning(f"Превышен бюджет Firestore ({', '.join(exceeded)}): {trace.summary()}")
+    elif trace.ops:
+        logger.debug(trace.summary())
+    return exceeded
+
@@ -0,0 +1,36 @@
+"""
+Плагин pytest: бюджет обращений к Firestore в тестах
+
+Подключение: pytest_plugins = ["utils.firestore_trace_pytest"]. Вынесен
+из utils/firestore_trace.py, чтобы бот не загружал pytest при старте.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from utils.firestore_trace import DOCS_READ_BUDGET, ROUND_TRIP_BUDGET, trace_firestore
+
+
+@pytest.fixture
+def firestore_budget():
+    """
+    Фикстура: бюджет Firestore для блока теста
+
+    with firestore_budget(round_trips=5, docs_read=50) as trace:
+        await handler(message)
+
+    Тест падает, если блок превысил бюджет; trace доступна для проверок.
+    """
+    @contextmanager
+    def budget(round_trips: int = ROUND_TRIP_BUDGET, docs_read: int = DOCS_READ_BUDGET,
+               name: str = 'test'):
+        with trace_firestore(name) as trace:
+            yield trace
+        exceeded = trace.over_budget(round_trips, docs_read)
+        if exceeded:
+            pytest.fail(
+                f"Превышен бюджет Firestore ({', '.join(exceeded)}; лимиты: "
+                f"{round_trips} round-trip, {docs_read} док.): {trace.summary()}"
+            )
+
+    return budget
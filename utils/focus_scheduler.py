@@ -3,14 +3,23 @@
 Управляет асинхронными задачами без блокировки event loop.
 """
 import asyncio
+import math
 from typing import Dict, Callable, Optional, Any, Set, List
 from datetime import datetime, timezone, timedelta
 import logging
 from dataclasses import dataclass
 from enum import Enum
+import time
+
+from utils.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+FOCUS_TICK_LAG = REGISTRY.histogram(
+    "focus_tick_lag_seconds", "Опоздание тика таймера фокус-сессии",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+FOCUS_ACTIVE_TIMERS = REGISTRY.gauge("focus_active_timers", "Запущенные таймеры фокус-сессий")
+
 
 class TimerState(Enum):
     """Состояния таймера"""
@@ -30,6 +39,15 @@ class TimerInfo:
     task: Optional[asyncio.Task] = None
     pause_time: Optional[datetime] = None
     tick_interval: int = 5  # секунд между тиками
+    total_seconds: float = 0.0  # точная длительность (0 - total_minutes * 60)
+    started_at: Optional[float] = None  # time.monotonic() запуска цикла таймера
+    
+    def remaining_seconds(self) -> float:
+        """Точное оставшееся время в секундах"""
+        total = self.total_seconds or self.total_minutes * 60
+        if self.started_at is None:
+            return total
+        return max(0.0, total - (time.monotonic() - self.started_at))
 
 
 class FocusScheduler:
@@ -56,12 +74,20 @@ class FocusScheduler:
             logger.info("Планировщик запущен")
     
     async def stop(self):
-        """Останавливает планировщик и все таймеры"""
+        """
+        Останавливает планировщик и все таймеры
+        
+        Таймеры отменяются одновременно. Сохранить оставшееся время нужно
+        до вызова (см. snapshot и FocusService.checkpoint_timers).
+        """
         self._running = False
         
-        # Останавливаем все таймеры
-        for timer_id in list(self.timers.keys()):
-            await self.stop_timer(timer_id)
+        # Останавливаем все таймеры разом
+        tasks = [timer.task for timer in self.timers.values() if timer.task and not timer.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.timers.clear()
         
         # Останавливаем монитор
         if self._monitor_task:
@@ -80,7 +106,8 @@ class FocusScheduler:
         duration_minutes: int,
         on_complete: Callable,
         on_tick: Optional[Callable] = None,
-        tick_interval: Optional[int] = None
+        tick_interval: Optional[int] = None,
+        duration_seconds: Optional[float] = None
     ) -> bool:
         """
         Запускает новый таймер для сессии.
@@ -92,6 +119,8 @@ class FocusScheduler:
             on_complete: Callback при завершении (session_id, user_id, completed_minutes)
             on_tick: Callback при тике (session_id, user_id, remaining_minutes)
             tick_interval: Интервал тиков в секундах
+            duration_seconds: Точная длительность в секундах (например, при
+                восстановлении после перезапуска); заменяет duration_minutes
             
         Returns:
             True если таймер запущен успешно
@@ -106,10 +135,11 @@ class FocusScheduler:
             timer_info = TimerInfo(
                 session_id=session_id,
                 user_id=user_id,
-                total_minutes=duration_minutes,
+                total_minutes=duration_minutes if duration_seconds is None else math.ceil(duration_seconds / 60),
                 elapsed_minutes=0,
                 state=TimerState.RUNNING,
-                tick_interval=tick_interval or self.default_tick_interval
+                tick_interval=tick_interval or self.default_tick_interval,
+                total_seconds=duration_seconds or 0.0
             )
             
             # Создаем задачу таймера
@@ -247,6 +277,23 @@ class FocusScheduler:
         else:
             return 0
     
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Точное оставшееся время всех запущенных таймеров
+        
+        Returns:
+            Список {'session_id', 'user_id', 'remaining_seconds'}
+        """
+        return [
+            {
+                'session_id': timer.session_id,
+                'user_id': timer.user_id,
+                'remaining_seconds': round(timer.remaining_seconds(), 1),
+            }
+            for timer in self.timers.values()
+            if timer.state == TimerState.RUNNING
+        ]
+    
     def get_timer_state(self, session_id: str) -> Optional[TimerState]:
         """Возвращает состояние таймера"""
         timer = self.timers.get(session_id)
@@ -302,8 +349,9 @@ class FocusScheduler:
         try:
             start_time = datetime.now(timezone.utc)
             last_tick_time = start_time
+            timer.started_at = time.monotonic()
             
-            while timer.elapsed_minutes < timer.total_minutes:
+            while timer.state == TimerState.PAUSED or timer.remaining_seconds() > 0:
                 # Проверяем состояние
                 if timer.state == TimerState.STOPPED:
                     break
@@ -312,8 +360,11 @@ class FocusScheduler:
                     await asyncio.sleep(1)
                     continue
                 
-                # Ждем интервал тика
-                await asyncio.sleep(timer.tick_interval)
+                # Ждем интервал тика (последний - ровно до конца таймера)
+                interval = min(timer.tick_interval, timer.remaining_seconds())
+                sleep_started = time.monotonic()
+                await asyncio.sleep(interval)
+                FOCUS_TICK_LAG.observe(max(0.0, time.monotonic() - sleep_started - interval))
                 
                 # Обновляем время
                 now = datetime.now(timezone.utc)
@@ -341,7 +392,7 @@ class FocusScheduler:
                     last_tick_time = now
                 
                 # Проверяем завершение
-                if timer.elapsed_minutes >= timer.total_minutes:
+                if timer.remaining_seconds() <= 0:
                     break
             
             # Таймер завершен
@@ -406,4 +457,5 @@ class FocusScheduler:
 
 
 # Глобальный экземпляр планировщика
-focus_scheduler = FocusScheduler(tick_interval=5)
\ No newline at end of file
+focus_scheduler = FocusScheduler(tick_interval=5)
+FOCUS_ACTIVE_TIMERS.set_function(focus_scheduler.get_active_timers_count)
@@ -0,0 +1,107 @@
+"""
+Отложенный импорт тяжелых зависимостей
+
+lazy_module("google.cloud.firestore") возвращает заместитель модуля:
+настоящий импорт происходит при первом обращении к атрибуту, а не при
+импорте модуля-пользователя. Так старт бота не ждет Firestore (gRPC),
+OpenAI/httpx и pydantic-моделей; время отложенного импорта попадает в
+метрику lazy_import_seconds. warm_up() догружает такие модули в фоновом
+потоке после старта, чтобы первый пользователь не платил за импорт.
+"""
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, Iterable
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LAZY_IMPORT_SECONDS = REGISTRY.histogram(
+    "lazy_import_seconds", "Длительность отложенного импорта модуля", ("module",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+class LazyModule:
+    """Заместитель модуля: импортирует его при первом обращении к атрибуту"""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is not None:
+            return module
+        with self.__dict__['_lock']:
+            module = self.__dict__['_module']
+            if module is None:
+                name = self.__dict__['_name']
+                already_loaded = name in sys.modules
+                started = time.perf_counter()
+                module = importlib.import_module(name)
+                if not already_loaded:
+                    elapsed = time.perf_counter() - started
+                    LAZY_IMPORT_SECONDS.observe(elapsed, module=name)
+                    logger.info(f"Отложенный импорт {name}: {elapsed * 1000:.0f} мс")
+                self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        """Импортирован ли модуль"""
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+_lazy_modules: Dict[str, LazyModule] = {}
+
+
+def lazy_module(name: str) -> LazyModule:
+    """
+    Заместитель модуля (один на имя)
+
+    Args:
+        name: Полное имя модуля
+
+    Returns:
+        LazyModule
+    """
+    module = _lazy_modules.get(name)
+    if module is None:
+        module = _lazy_modules.setdefault(name, LazyModule(name))
+    return module
+
+
+async def warm_up(names: Iterable[str] = ()) -> int:
+    """
+    Импортирует отложенные модули в фоновом потоке
+
+    Args:
+        names: Модули для загрузки (по умолчанию - все созданные заместители)
+
+    Returns:
+        Количество модулей, загруженных без ошибок
+    """
+    loaded = 0
+    for name in list(names) or list(_lazy_modules):
+        try:
+            await asyncio.to_thread(lazy_module(name)._load)
+            loaded += 1
+        except Exception as e:
+            logger.warning(f"Не удалось заранее импортировать {name}: {e}")
+    return loaded
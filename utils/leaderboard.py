@@ -0,0 +1,435 @@
+"""
+Рейтинги пользователей в памяти процесса
+
+Рейтинг - отсортированный набор 64-битных ключей
+(MAX_SCORE - score) << UID_BITS | uid: по возрастанию ключа идут
+пользователи по убыванию очков, при равенстве - по возрастанию id.
+Ключи хранятся шардами - массивами array('Q') примерно по BUCKET_SIZE
+элементов, длины шардов лежат в дереве Фенвика. Поэтому место
+пользователя ищется за O(log n), первые k мест читаются за O(k), а
+1M пользователей в одном рейтинге занимают около 8 МБ. Текущие очки
+хранятся колонками array('Q') по номеру слота пользователя, общему для
+всех рейтингов.
+
+Рейтинги обновляются инкрементально из GamificationDB.add_points и
+FocusDB.increment_stats и периодически сохраняются в Firestore
+(services/leaderboard_service.py).
+"""
+import logging
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Telegram id занимает младшие биты ключа, очки - старшие
+UID_BITS = 40
+SCORE_BITS = 64 - UID_BITS
+MAX_UID = (1 << UID_BITS) - 1
+MAX_SCORE = (1 << SCORE_BITS) - 1
+UID_MASK = MAX_UID
+
+# Снимки всегда little-endian
+_BIG_ENDIAN = array('H', [1]).tobytes() == b'\x00\x01'
+
+# Размер шарда: вставка сдвигает не больше 2 * BUCKET_SIZE ключей
+BUCKET_SIZE = 1000
+
+# Рейтинги: очки за все время, очки за неделю, минуты фокуса, лучшая серия фокуса
+BOARDS = ('points', 'weekly', 'focus', 'streak')
+BOARD_TITLES = {
+    'points': 'Очки за все время',
+    'weekly': 'Очки за неделю',
+    'focus': 'Минуты фокуса',
+    'streak': 'Лучшая серия фокуса',
+}
+
+LEADERBOARD_USERS = REGISTRY.gauge(
+    "leaderboard_users", "Пользователи в рейтинге", ("board",))
+
+
+def encode_key(uid: int, score: int) -> int:
+    """Ключ рейтинга: больше очков - меньше ключ"""
+    return ((MAX_SCORE - min(score, MAX_SCORE)) << UID_BITS) | uid
+
+
+def decode_key(key: int) -> Tuple[int, int]:
+    """(uid, score) по ключу рейтинга"""
+    return key & UID_MASK, MAX_SCORE - (key >> UID_BITS)
+
+
+def current_week(moment: Optional[datetime] = None) -> str:
+    """Неделя рейтинга по ISO (UTC, с понедельника), например '2024-W07'"""
+    year, week, _ = (moment or datetime.now(timezone.utc)).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class SortedKeys:
+    """Отсортированный набор ключей, разбитый на шарды с деревом Фенвика по их длинам"""
+
+    def __init__(self, keys: Iterable[int] = (), bucket_size: int = BUCKET_SIZE):
+        """
+        Args:
+            keys: Ключи в порядке возрастания без повторов
+            bucket_size: Целевой размер шарда
+        """
+        self._bucket_size = bucket_size
+        source = keys if isinstance(keys, array) else array('Q', keys)
+        self._buckets: List[array] = [source[i:i + bucket_size]
+                                      for i in range(0, len(source), bucket_size)]
+        self._maxes: List[int] = [bucket[-1] for bucket in self._buckets]
+        self._len = len(source)
+        self._rebuild_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for bucket in self._buckets:
+            yield from bucket
+
+    def __contains__(self, key: int) -> bool:
+        return self.index(key) is not None
+
+    def _rebuild_tree(self):
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, position: int, delta: int):
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, position: int) -> int:
+        """Количество ключей в шардах [0, position)"""
+        total = 0
+        i = position
+        while i:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find_bucket(self, index: int) -> Tuple[int, int]:
+        """(номер шарда, смещение в нем) для позиции index"""
+        position = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            nxt = position + step
+            if nxt < len(self._tree) and self._tree[nxt] <= index:
+                position = nxt
+                index -= self._tree[nxt]
+            step >>= 1
+        return position, index
+
+    def add(self, key: int):
+        """Вставляет ключ (повторная вставка не проверяется)"""
+        if not self._buckets:
+            self._buckets.append(array('Q', (key,)))
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+        position = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[position]
+        insort(bucket, key)
+        self._maxes[position] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self._bucket_size:
+            half = len(bucket) // 2
+            self._buckets[position:position + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[position:position + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(position, 1)
+
+    def discard(self, key: int) -> bool:
+        """Удаляет ключ, если он есть"""
+        position = bisect_left(self._maxes, key)
+        if position == len(self._buckets):
+            return False
+        bucket = self._buckets[position]
+        offset = bisect_left(bucket, key)
+        if bucket[offset] != key:
+            return False
+        del bucket[offset]
+        self._len -= 1
+        if bucket:
+            self._maxes[position] = bucket[-1]
+            self._tree_add(position, -1)
+        else:
+            del self._buckets[position]
+            del self._maxes[position]
+            self._rebuild_tree()
+        return True
+
+    def index(self, key: int) -> Optional[int]:
+        """Позиция ключа (с нуля) или None"""
+        position = bisect_left(self._maxes, key)
+        if position == len(self._buckets):
+            return None
+        bucket = self._buckets[position]
+        offset = bisect_left(bucket, key)
+        if bucket[offset] != key:
+            return None
+        return self._prefix(position) + offset
+
+    def islice(self, start: int, stop: int) -> Iterator[int]:
+        """Ключи на позициях [start, stop)"""
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return
+        position, offset = self._find_bucket(start)
+        left = stop - start
+        while left > 0:
+            chunk = self._buckets[position][offset:offset + left]
+            yield from chunk
+            left -= len(chunk)
+            position += 1
+            offset = 0
+
+    def to_bytes(self) -> bytes:
+        """Все ключи по порядку одним блоком (8 байт на ключ, little-endian)"""
+        data = array('Q')
+        for bucket in self._buckets:
+            data.extend(bucket)
+        if _BIG_ENDIAN:
+            data.byteswap()
+        return data.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, bucket_size: int = BUCKET_SIZE) -> 'SortedKeys':
+        """Набор из блока to_bytes()"""
+        keys = array('Q')
+        keys.frombytes(data)
+        if _BIG_ENDIAN:
+            keys.byteswap()
+        return cls(keys, bucket_size)
+
+
+class Leaderboard:
+    """Один рейтинг: отсортированные ключи и колонка текущих очков по слотам"""
+
+    def __init__(self, name: str, keys: Optional[SortedKeys] = None):
+        self.name = name
+        self.keys = keys or SortedKeys()
+        self.scores = array('Q')
+        # Растет при каждом изменении - по нему видно, нужен ли новый снимок
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def set(self, slot: int, uid: int, score: int):
+        """Выставляет очки пользователя (0 - убрать из рейтинга)"""
+        score = max(0, min(score, MAX_SCORE))
+        old = self.scores[slot]
+        if old == score:
+            return
+        if old:
+            self.keys.discard(encode_key(uid, old))
+        if score:
+            self.keys.add(encode_key(uid, score))
+        self.scores[slot] = score
+        self.version += 1
+
+    def rank(self, uid: int, score: int) -> Optional[int]:
+        """Место (с единицы) или None если пользователя нет в рейтинге"""
+        if not score:
+            return None
+        index = self.keys.index(encode_key(uid, score))
+        return None if index is None else index + 1
+
+    def entries(self, start: int, stop: int) -> List[Tuple[int, int, int]]:
+        """[(место, uid, очки)] для мест с start + 1 по stop"""
+        start = max(start, 0)
+        return [(start + i + 1, *decode_key(key))
+                for i, key in enumerate(self.keys.islice(start, stop))]
+
+    def clear(self):
+        """Очищает рейтинг (колонка очков обнуляется)"""
+        self.keys = SortedKeys()
+        self.scores = array('Q', bytes(8 * len(self.scores)))
+        self.version += 1
+
+
+class LeaderboardSet:
+    """
+    Все рейтинги бота и общий индекс пользователь -> слот
+
+    Методы синхронные и вызываются из event loop. Загрузка снимка строит
+    новый набор в отдельном потоке: на это время изменения записываются в
+    журнал (begin_restore) и применяются к загруженному набору
+    в adopt().
+    """
+
+    def __init__(self, week: Optional[str] = None):
+        self.week = week or current_week()
+        self.boards: Dict[str, Leaderboard] = {name: Leaderboard(name) for name in BOARDS}
+        self._slots: Dict[int, int] = {}
+        self._journal: Optional[List[Tuple[str, tuple]]] = None
+
+    def _slot(self, uid: int) -> int:
+        slot = self._slots.get(uid)
+        if slot is None:
+            slot = self._slots[uid] = len(self._slots)
+            for board in self.boards.values():
+                board.scores.append(0)
+        return slot
+
+    def _check_week(self):
+        week = current_week()
+        if week != self.week:
+            logger.info(f"Новая неделя рейтинга {week}, недельный рейтинг сброшен")
+            self.week = week
+            self.boards['weekly'].clear()
+
+    def _update(self, method: str, uid: int, *values):
+        if not 0 < uid <= MAX_UID:
+            logger.debug(f"Пользователь {uid} не помещается в ключ рейтинга")
+            return
+        if self._journal is not None:
+            self._journal.append((method, (uid, *values)))
+        getattr(self, method)(uid, *values)
+
+    def record_points(self, uid: int, total_earned: int, delta: int):
+        """
+        Начисление очков
+
+        Args:
+            uid: Telegram id
+            total_earned: total_points_earned после начисления
+            delta: Начисленные очки (в недельный рейтинг)
+        """
+        self._update('_apply_points', uid, total_earned, delta)
+
+    def record_focus(self, uid: int, total_minutes: int, best_streak: int):
+        """
+        Завершенная фокус-сессия
+
+        Args:
+            uid: Telegram id
+            total_minutes: focus_stats.total_minutes после сессии
+            best_streak: focus_stats.best_streak после сессии
+        """
+        self._update('_apply_focus', uid, total_minutes, best_streak)
+
+    def _apply_points(self, uid: int, total_earned: int, delta: int):
+        self._check_week()
+        slot = self._slot(uid)
+        self.boards['points'].set(slot, uid, total_earned)
+        weekly = self.boards['weekly']
+        weekly.set(slot, uid, weekly.scores[slot] + delta)
+
+    def _apply_focus(self, uid: int, total_minutes: int, best_streak: int):
+        slot = self._slot(uid)
+        self.boards['focus'].set(slot, uid, total_minutes)
+        self.boards['streak'].set(slot, uid, best_streak)
+
+    def top(self, board: str, limit: int = 10) -> List[Tuple[int, int, int]]:
+        """
+        Первые места рейтинга за O(limit)
+
+        Returns:
+            [(место, uid, очки)]
+        """
+        if board == 'weekly':
+            self._check_week()
+        return self.boards[board].entries(0, limit)
+
+    def position(self, board: str, uid: int) -> Optional[Tuple[int, int]]:
+        """
+        Место пользователя за O(log n)
+
+        Returns:
+            (место, очки) или None если пользователя нет в рейтинге
+        """
+        if board == 'weekly':
+            self._check_week()
+        slot = self._slots.get(uid)
+        if slot is None:
+            return None
+        leaderboard = self.boards[board]
+        score = leaderboard.scores[slot]
+        rank = leaderboard.rank(uid, score)
+        return None if rank is None else (rank, score)
+
+    def around(self, board: str, rank: int, radius: int = 2) -> List[Tuple[int, int, int]]:
+        """Соседи по рейтингу: места rank - radius .. rank + radius"""
+        return self.boards[board].entries(rank - 1 - radius, rank + radius)
+
+    def size(self, board: str) -> int:
+        """Количество пользователей в рейтинге"""
+        return len(self.boards[board])
+
+    def versions(self) -> Dict[str, int]:
+        """Версии рейтингов (меняются при каждом изменении)"""
+        return {name: board.version for name, board in self.boards.items()}
+
+    def dump(self, board: str) -> bytes:
+        """Снимок рейтинга: ключи по порядку, 8 байт на пользователя"""
+        return self.boards[board].keys.to_bytes()
+
+    def update_metrics(self):
+        """Обновляет метрики размеров рейтингов"""
+        for name, board in self.boards.items():
+            LEADERBOARD_USERS.set(len(board), board=name)
+
+    @classmethod
+    def from_snapshot(cls, dumps: Dict[str, bytes], week: Optional[str] = None) -> 'LeaderboardSet':
+        """
+        Набор рейтингов из снимков dump() (выполняется в отдельном потоке)
+
+        Args:
+            dumps: Снимки по именам рейтингов
+            week: Неделя недельного рейтинга в снимке
+        """
+        loaded = cls(week)
+        if loaded.week != current_week():
+            # Снимок за прошлую неделю - недельный рейтинг начинается заново
+            dumps = {name: data for name, data in dumps.items() if name != 'weekly'}
+            loaded.week = current_week()
+        for name, data in dumps.items():
+            board = loaded.boards.get(name)
+            if board is None:
+                continue
+            board.keys = SortedKeys.from_bytes(data)
+            for key in board.keys:
+                uid, score = decode_key(key)
+                board.scores[loaded._slot(uid)] = score
+        return loaded
+
+    def begin_restore(self):
+        """Начинает запись журнала изменений на время загрузки снимка"""
+        self._journal = []
+
+    def adopt(self, loaded: Optional['LeaderboardSet']) -> int:
+        """
+        Заменяет рейтинги загруженными и применяет к ним журнал
+
+        Args:
+            loaded: Набор из from_snapshot() или None (снимка нет)
+
+        Returns:
+            Количество примененных записей журнала
+        """
+        journal, self._journal = self._journal or [], None
+        if loaded is None:
+            return 0
+        for method, args in journal:
+            getattr(loaded, method)(*args)
+        self.week, self.boards, self._slots = loaded.week, loaded.boards, loaded._slots
+        self.update_metrics()
+        return len(journal)
+
+
+# Рейтинги бота (один набор на процесс)
+leaderboards = LeaderboardSet()
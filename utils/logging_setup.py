@@ -0,0 +1,324 @@
+"""
+Неблокирующая настройка логирования
+
+Логгеры пишут не в файл, а в ограниченную очередь (QueueHandler):
+в потоке event loop остаются только фильтры и подготовка записи.
+Форматирование и запись на диск/в stdout выполняет фоновый поток
+QueueListener. Если очередь переполнена, запись отбрасывается и
+учитывается в метриках - обработка апдейтов не ждет диск.
+
+Каждая запись получает update_id и user_id текущего апдейта (contextvars,
+см. middlewares/logging_context.py), файл пишется в JSON по строке на
+запись и ротируется по размеру и по времени. Частые сообщения ниже
+WARNING ограничиваются по месту вызова, для шумных логгеров можно
+задать долю сохраняемых записей (LOG_SAMPLE).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterator, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+LOG_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total", "Записи лога, отброшенные до записи", ("reason",))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(update_id)s/%(user_id)s] %(message)s'
+
+_update_id: ContextVar[Optional[int]] = ContextVar('log_update_id', default=None)
+_user_id: ContextVar[Optional[int]] = ContextVar('log_user_id', default=None)
+
+_listener: Optional[QueueListener] = None
+
+
+# === КОНТЕКСТ АПДЕЙТА ===
+
+@contextmanager
+def log_context(update_id: Optional[int] = None, user_id: Optional[int] = None) -> Iterator[None]:
+    """
+    Привязывает записи лога внутри блока к апдейту и пользователю
+
+    Args:
+        update_id: ID апдейта Telegram
+        user_id: Telegram ID пользователя
+    """
+    update_token = _update_id.set(update_id)
+    user_token = _user_id.set(user_id)
+    try:
+        yield
+    finally:
+        _user_id.reset(user_token)
+        _update_id.reset(update_token)
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи update_id и user_id текущего контекста"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = _update_id.get()
+        record.user_id = _user_id.get()
+        return True
+
+
+# === ОГРАНИЧЕНИЕ ЧАСТОТЫ ===
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """
+    Разбирает LOG_SAMPLE вида "database.focus_db=0.1,database.gamification_db=0.25"
+
+    Returns:
+        Имя логгера (или префикс) -> доля сохраняемых записей
+    """
+    sampling = {}
+    for item in value.split(','):
+        name, _, rate = item.strip().partition('=')
+        if not name or not rate:
+            continue
+        try:
+            sampling[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return sampling
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Сэмплирование и ограничение частоты записей ниже WARNING
+
+    Для логгеров из sampling сохраняется заданная доля записей. Кроме
+    того, с одного места вызова (логгер, файл, строка) проходит не
+    больше burst записей за period секунд; число пропущенных
+    добавляется к следующей прошедшей записи (поле suppressed).
+    WARNING и выше проходят всегда.
+    """
+
+    def __init__(self, burst: int = 20, period: float = 60.0,
+                 sampling: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.sampling = sampling or {}
+        # (логгер, файл, строка) -> [начало окна, записей в окне, пропущено]
+        self._sites: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def _sample_rate(self, name: str) -> float:
+        # Самый длинный совпавший префикс: "database" действует на "database.focus_db"
+        best, rate = -1, 1.0
+        for prefix, value in self.sampling.items():
+            if (name == prefix or name.startswith(prefix + '.')) and len(prefix) > best:
+                best, rate = len(prefix), value
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        if self.sampling and random.random() >= self._sample_rate(record.name):
+            LOG_DROPPED.inc(reason='sampled')
+            return False
+
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.period:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.burst:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                LOG_DROPPED.inc(reason='rate_limited')
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+# === ОЧЕРЕДЬ И ЗАПИСЬ ===
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler, который никогда не ждет: при полной очереди запись отбрасывается"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc(reason='queue_full')
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы и исключение превращаются в строки сразу: объекты
+        # могут измениться, пока запись ждет в очереди. Само
+        # форматирование (JSON или текст) делает фоновый поток.
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'update_id': getattr(record, 'update_id', None),
+            'user_id': getattr(record, 'user_id', None),
+            'line': f"{record.module}:{record.lineno}",
+        }
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Текстовый формат с ID апдейта и пользователя"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        for name in ('update_id', 'user_id'):
+            if getattr(record, name, None) is None:
+                setattr(record, name, '-')
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', None)
+        return f"{text} (+{suppressed} похожих пропущено)" if suppressed else text
+
+
+class RotatingLogFileHandler(RotatingFileHandler):
+    """Ротация файла по размеру и по времени - что наступит раньше"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int,
+                 interval: float, encoding: str = 'utf-8'):
+        """
+        Args:
+            filename: Путь к файлу лога
+            max_bytes: Максимальный размер файла (0 - без ограничения)
+            backup_count: Сколько старых файлов хранить
+            interval: Период ротации в секундах (0 - только по размеру)
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval > 0 else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and record.created >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rollover_at is not None:
+            self.rollover_at = time.time() + self.interval
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def setup_logging(level: Optional[str] = None, log_file: Optional[str] = None,
+                  fmt: Optional[str] = None) -> QueueListener:
+    """
+    Настраивает корневой логгер на запись через очередь
+
+    Параметры по умолчанию берутся из окружения: LOG_LEVEL (INFO),
+    LOG_FILE (bot.log, пустое значение - без файла), LOG_FORMAT
+    (json или text), LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+    LOG_ROTATE_HOURS, LOG_QUEUE_SIZE, LOG_RATE_LIMIT ("20/60" -
+    записей с одного места вызова за секунды), LOG_SAMPLE.
+
+    Args:
+        level: Уровень корневого логгера
+        log_file: Путь к файлу лога
+        fmt: Формат записей: json или text
+
+    Returns:
+        Запущенный QueueListener (останавливается shutdown_logging или при выходе)
+    """
+    global _listener
+    shutdown_logging()
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    log_file = os.getenv('LOG_FILE', 'bot.log') if log_file is None else log_file
+    fmt = (fmt or os.getenv('LOG_FORMAT', 'json')).lower()
+
+    formatter = JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(RotatingLogFileHandler(
+            log_file,
+            max_bytes=_env_int('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backup_count=_env_int('LOG_BACKUP_COUNT', 5),
+            interval=_env_int('LOG_ROTATE_HOURS', 24) * 3600,
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    burst, _, period = os.getenv('LOG_RATE_LIMIT', '20/60').partition('/')
+    try:
+        rate_limit = RateLimitFilter(int(burst), float(period or 60),
+                                     parse_sampling(os.getenv('LOG_SAMPLE', '')))
+    except ValueError:
+        rate_limit = RateLimitFilter(sampling=parse_sampling(os.getenv('LOG_SAMPLE', '')))
+
+    log_queue = queue.Queue(maxsize=_env_int('LOG_QUEUE_SIZE', 10000))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(rate_limit)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, (logging.StreamHandler, QueueHandler)):
+            root.removeHandler(handler)
+            handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Дописывает очередь и останавливает фоновый поток (повторный вызов ничего не делает)"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+
+
+# Выполняется раньше logging.shutdown (atexit вызывает функции в обратном порядке)
+atexit.register(shutdown_logging)
@@ -0,0 +1,388 @@
+"""
+Скомпилированный граф вопросов онбординга ИИ-ассистента.
+
+data/onboarding_questions.json один раз разбирается в неизменяемую
+структуру: вопросы по ID, упорядоченные потоки вопросов по категориям,
+валидаторы ответов, готовые тексты и клавиатуры. Каждый шаг онбординга
+сводится к поиску по индексу. При изменении файла граф пересобирается
+без перезапуска бота (проверка mtime не чаще раза в RELOAD_CHECK_INTERVAL).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'onboarding_questions.json')
+RELOAD_CHECK_INTERVAL = 2.0  # секунд между проверками mtime
+
+INPUT_TYPES = ("text", "number", "date", "time", "list")
+INPUT_INSTRUCTIONS = {
+    "text": "📝 Введите текст:",
+    "number": "🔢 Введите число:",
+    "date": "📅 Введите дату (ДД.ММ.ГГГГ):",
+    "time": "🕐 Введите время (ЧЧ:ММ):",
+    "list": "📋 Введите элементы через запятую:"
+}
+DATE_FORMATS = ("%d.%m.%Y", "%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d")
+TIME_PATTERN = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+
+# Результат валидации: (значение, текст ошибки или None)
+Validator = Callable[[str], Tuple[Any, Optional[str]]]
+
+
+# === ВАЛИДАТОРЫ ===
+
+def _make_validator(question: Mapping[str, Any]) -> Validator:
+    """Собирает функцию проверки ответа для вопроса с вводом"""
+    question_type = question.get("type")
+
+    if question_type == "text":
+        min_length = question.get("min_length")
+        max_length = question.get("max_length")
+
+        def validate_text(raw: str):
+            if min_length is not None and len(raw) < min_length:
+                return None, f"❌ Минимум {min_length} символов"
+            if max_length is not None and len(raw) > max_length:
+                return None, f"❌ Максимум {max_length} символов"
+            return raw, None
+        return validate_text
+
+    if question_type == "date":
+        future_only = question.get("validation") == "future_date"
+
+        def validate_date(raw: str):
+            for fmt in DATE_FORMATS:
+                try:
+                    value = datetime.strptime(raw.strip(), fmt).date()
+                    break
+                except ValueError:
+                    continue
+            else:
+                return None, "❌ Неверный формат даты. Используйте ДД.ММ.ГГГГ"
+            if future_only and value <= date.today():
+                return None, "❌ Дата должна быть в будущем"
+            return value.isoformat(), None
+        return validate_date
+
+    if question_type == "list":
+        def validate_list(raw: str):
+            items = [item.strip() for item in raw.split(",") if item.strip()]
+            if not items:
+                return None, "❌ Пожалуйста, введите хотя бы один элемент"
+            return items, None
+        return validate_list
+
+    if question_type == "number":
+        min_value = question.get("min")
+        max_value = question.get("max")
+
+        def validate_number(raw: str):
+            try:
+                value = int(raw.strip())
+            except ValueError:
+                return None, "❌ Введите целое число"
+            if min_value is not None and value < min_value:
+                return None, f"❌ Минимум {min_value}"
+            if max_value is not None and value > max_value:
+                return None, f"❌ Максимум {max_value}"
+            return value, None
+        return validate_number
+
+    if question_type == "time":
+        def validate_time(raw: str):
+            if not TIME_PATTERN.match(raw.strip()):
+                return None, "❌ Неверный формат времени. Используйте ЧЧ:ММ"
+            return raw.strip(), None
+        return validate_time
+
+    return lambda raw: (raw, None)
+
+
+# === КЛАВИАТУРЫ ===
+
+def build_navigation_keyboard(question_index: int, required: bool = True) -> InlineKeyboardMarkup:
+    """Клавиатура навигации по вопросам"""
+    builder = InlineKeyboardBuilder()
+    buttons = []
+
+    # Кнопка "Назад" (если не первый вопрос)
+    if question_index > 0:
+        buttons.append(InlineKeyboardButton(text="◀️ Назад", callback_data="onb_previous"))
+
+    # Кнопка "Пропустить" (если вопрос не обязательный)
+    if not required:
+        buttons.append(InlineKeyboardButton(text="➡️ Пропустить", callback_data="onb_skip_current"))
+
+    if buttons:
+        builder.row(*buttons)
+    builder.row(InlineKeyboardButton(text="❌ Отмена", callback_data="onb_cancel"))
+    return builder.as_markup()
+
+
+def build_number_keyboard(min_val: int, max_val: int, unit: str = "") -> InlineKeyboardMarkup:
+    """Быстрый выбор числа"""
+    builder = InlineKeyboardBuilder()
+
+    # Генерируем разумные опции
+    if max_val - min_val <= 10:
+        options = list(range(min_val, max_val + 1))
+    else:
+        step = (max_val - min_val) // 5
+        options = [min_val + i * step for i in range(6)]
+        if max_val not in options:
+            options[-1] = max_val
+
+    for i in range(0, len(options), 3):
+        builder.row(*[
+            InlineKeyboardButton(text=f"{opt}{unit}", callback_data=f"onb_number_{opt}")
+            for opt in options[i:i + 3]
+        ])
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=4)
+def build_date_keyboard(today: date) -> InlineKeyboardMarkup:
+    """Быстрый выбор даты (зависит от текущей даты, поэтому кэшируется по ней)"""
+    builder = InlineKeyboardBuilder()
+    options = [
+        ("Через неделю", 7),
+        ("Через 2 недели", 14),
+        ("Через месяц", 30),
+        ("Через 2 месяца", 60),
+        ("Через 3 месяца", 90)
+    ]
+    for label, days in options:
+        target_date = today + timedelta(days=days)
+        builder.row(InlineKeyboardButton(
+            text=f"{label} ({target_date.strftime('%d.%m.%Y')})",
+            callback_data=f"onb_date_{target_date.isoformat()}"
+        ))
+    return builder.as_markup()
+
+
+def _option_rows(question_id: str, options, prefix: str, selected=frozenset()):
+    rows = []
+    for option in options:
+        label = option['label']
+        if prefix == "onb_multi_":
+            label = f"{'✅' if option['value'] in selected else '⬜'} {label}"
+        rows.append([InlineKeyboardButton(text=label, callback_data=f"{prefix}{question_id}_{option['value']}")])
+    return rows
+
+
+# === СТРУКТУРЫ ГРАФА ===
+
+@dataclass(frozen=True)
+class Question:
+    """Скомпилированный вопрос"""
+    id: str
+    type: str
+    text: str
+    required: bool
+    options: Tuple[Mapping[str, Any], ...]
+    validate: Validator = field(compare=False)
+    raw: Mapping[str, Any] = field(compare=False)
+
+    @property
+    def is_input(self) -> bool:
+        return self.type in INPUT_TYPES
+
+
+@dataclass(frozen=True, eq=False)
+class Step:
+    """Вопрос на конкретной позиции потока категории"""
+    index: int
+    total: int
+    question: Question
+    text: str  # готовый текст сообщения
+    keyboard: Optional[InlineKeyboardMarkup]  # None для даты (строится по текущему дню)
+
+    def keyboard_for(self, selected=()) -> InlineKeyboardMarkup:
+        """Клавиатура шага (для multiselect - с учетом выбранных опций)"""
+        if self.question.type == "multiselect" and selected:
+            return _multiselect_keyboard(self, frozenset(selected))
+        if self.keyboard is None:
+            return build_date_keyboard(date.today())
+        return self.keyboard
+
+
+@lru_cache(maxsize=256)
+def _multiselect_keyboard(step: Step, selected: frozenset) -> InlineKeyboardMarkup:
+    question = step.question
+    rows = _option_rows(question.id, question.options, "onb_multi_", selected)
+    if selected or not question.required:
+        rows.append([InlineKeyboardButton(text="✅ Далее", callback_data=f"onb_multi_done_{question.id}")])
+    rows.extend(build_navigation_keyboard(step.index, question.required).inline_keyboard)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+@dataclass(frozen=True)
+class Category:
+    """Категория онбординга с полным потоком вопросов"""
+    id: str
+    title: str
+    emoji: str
+    steps: Tuple[Step, ...]
+    category_question_ids: Tuple[str, ...]
+    constraint_question_ids: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class QuestionGraph:
+    """Неизменяемый индекс вопросов онбординга"""
+    categories: Mapping[str, Category]
+    questions: Mapping[str, Question]
+    category_keyboard: InlineKeyboardMarkup
+    loaded_at: float
+
+    def step(self, category: str, index: int) -> Optional[Step]:
+        """Шаг потока по категории и индексу (None если вопросы закончились)"""
+        info = self.categories.get(category)
+        if info is None or not 0 <= index < len(info.steps):
+            return None
+        return info.steps[index]
+
+    def question(self, question_id: str) -> Optional[Question]:
+        return self.questions.get(question_id)
+
+
+def _compile_question(raw: Mapping[str, Any]) -> Question:
+    return Question(
+        id=raw["id"],
+        type=raw["type"],
+        text=raw["text"],
+        required=raw.get("required", True),
+        options=tuple(MappingProxyType(dict(option)) for option in raw.get("options", ())),
+        validate=_make_validator(raw),
+        raw=MappingProxyType(dict(raw))
+    )
+
+
+def _compile_step(question: Question, index: int, total: int) -> Step:
+    text = f"<b>Вопрос {index + 1} из {total}</b>\n\n{question.text}"
+    if question.raw.get("placeholder"):
+        text += f"\n\n<i>Например: {question.raw['placeholder']}</i>"
+
+    keyboard: Optional[InlineKeyboardMarkup]
+    if question.type == "select":
+        rows = _option_rows(question.id, question.options, "onb_answer_")
+        rows.extend(build_navigation_keyboard(index, question.required).inline_keyboard)
+        keyboard = InlineKeyboardMarkup(inline_keyboard=rows)
+    elif question.type == "multiselect":
+        keyboard = _multiselect_keyboard.__wrapped__(
+            Step(index, total, question, text, None), frozenset()
+        )
+    else:
+        text += f"\n\n{INPUT_INSTRUCTIONS.get(question.type, '📝 Введите ответ:')}"
+        if question.type == "date" and question.raw.get("validation") == "future_date":
+            keyboard = None
+        elif question.type == "number" and "min" in question.raw and "max" in question.raw:
+            keyboard = build_number_keyboard(question.raw["min"], question.raw["max"], question.raw.get("unit", ""))
+        else:
+            keyboard = build_navigation_keyboard(index, question.required)
+
+    return Step(index, total, question, text, keyboard)
+
+
+def compile_questions(data: Mapping[str, Any]) -> QuestionGraph:
+    """Собирает граф из разобранного JSON"""
+    constraint_raw = data.get("constraints_questions", {}).get("general", [])
+    constraint_questions = [_compile_question(raw) for raw in constraint_raw]
+
+    questions: Dict[str, Question] = {q.id: q for q in constraint_questions}
+    categories: Dict[str, Category] = {}
+    builder = InlineKeyboardBuilder()
+
+    for category_id, category_data in data.get("categories", {}).items():
+        category_questions = [_compile_question(raw) for raw in category_data.get("questions", [])]
+        questions.update({q.id: q for q in category_questions})
+
+        flow = category_questions + constraint_questions
+        categories[category_id] = Category(
+            id=category_id,
+            title=category_data.get("title", category_id),
+            emoji=category_data.get("emoji", ""),
+            steps=tuple(_compile_step(q, index, len(flow)) for index, q in enumerate(flow)),
+            category_question_ids=tuple(q.id for q in category_questions),
+            constraint_question_ids=tuple(q.id for q in constraint_questions)
+        )
+        builder.row(InlineKeyboardButton(
+            text=f"{category_data.get('emoji', '')} {category_data.get('title', category_id)}",
+            callback_data=f"onb_category_{category_id}"
+        ))
+
+    builder.row(InlineKeyboardButton(text="◀️ Назад", callback_data="assistant_menu"))
+
+    return QuestionGraph(
+        categories=MappingProxyType(categories),
+        questions=MappingProxyType(questions),
+        category_keyboard=builder.as_markup(),
+        loaded_at=time.time()
+    )
+
+
+class QuestionRegistry:
+    """Хранит текущий граф и пересобирает его при изменении файла"""
+
+    def __init__(self, path: str = QUESTIONS_PATH, check_interval: float = RELOAD_CHECK_INTERVAL):
+        """
+        Args:
+            path: Путь к JSON с вопросами
+            check_interval: Минимальный интервал между проверками mtime (секунды)
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._graph: Optional[QuestionGraph] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def get(self) -> QuestionGraph:
+        """Возвращает актуальный граф вопросов"""
+        now = time.monotonic()
+        if self._graph is not None and now - self._checked_at < self.check_interval:
+            return self._graph
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                logger.error(f"Файл вопросов недоступен: {e}")
+                mtime = None
+
+            if self._graph is None or (mtime is not None and mtime != self._mtime):
+                self._reload(mtime)
+            return self._graph
+
+    def _reload(self, mtime: Optional[float]):
+        """Пересобирает граф; при ошибке оставляет предыдущую версию"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                graph = compile_questions(json.load(f))
+        except Exception as e:
+            logger.error(f"Ошибка загрузки вопросов: {e}")
+            if self._graph is not None:
+                return
+            graph = compile_questions({"categories": {}, "constraints_questions": {"general": []}})
+
+        self._graph = graph
+        self._mtime = mtime
+        logger.info(f"Загружено категорий онбординга: {len(graph.categories)} ({list(graph.categories)})")
+
+
+# Глобальный реестр вопросов
+question_registry = QuestionRegistry()
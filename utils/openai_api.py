@@ -1,25 +1,33 @@
 """Модуль для работы с OpenAI API"""
 import os
+from importlib.util import find_spec
 from typing import Optional, Dict, List, Tuple, Any
 import logging
 import json
 import re
-import httpx
+import time
 from utils.env_loader import load_env
+from utils.metrics import REGISTRY
 
 load_env()
 
 logger = logging.getLogger(__name__)
 
-# Проверяем наличие OpenAI
-try:
-    from openai import AsyncOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# Проверяем наличие OpenAI без импорта: openai и httpx загружаются при первом запросе
+OPENAI_AVAILABLE = find_spec('openai') is not None
+if not OPENAI_AVAILABLE:
     logger.warning("OpenAI модуль не установлен. Бот будет работать в демо-режиме.")
 
 
+OPENAI_REQUEST_SECONDS = REGISTRY.histogram(
+    "openai_request_seconds", "Длительность запросов к OpenAI", ("operation",),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0, 120.0))
+OPENAI_TOKENS = REGISTRY.counter(
+    "openai_tokens_total", "Токены OpenAI по операциям", ("operation", "kind"))
+OPENAI_ERRORS = REGISTRY.counter(
+    "openai_errors_total", "Ошибки запросов к OpenAI", ("operation", "error"))
+
+
 class OpenAIAssistant:
     """Класс для работы с OpenAI API"""
     
@@ -27,7 +35,7 @@ class OpenAIAssistant:
         """Инициализация клиента OpenAI"""
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
-        self.client = None
+        self._client = None
         self.is_configured = False
         self._client_closed = False  # Флаг для отслеживания закрытия клиента
         self.proxy = os.getenv('OPENAI_PROXY')
@@ -80,20 +88,29 @@ class OpenAIAssistant:
 
 Помни: ты часть бота TimeFlow, который помогает отслеживать привычки, управлять задачами и проводить фокус-сессии."""
         
+        # Сам клиент (openai + httpx) создается при первом обращении к self.client
         if self.api_key and OPENAI_AVAILABLE:
+            self.is_configured = True
+        else:
+            if not self.api_key:
+                logger.warning("OpenAI API ключ не найден в переменных окружения")
+            self.is_configured = False
+    
+    @property
+    def client(self):
+        """Клиент AsyncOpenAI (создается при первом обращении) или None"""
+        if self._client is None and self.is_configured and not self._client_closed:
             try:
+                import httpx
+                from openai import AsyncOpenAI
+                
                 http_client = httpx.AsyncClient(proxy=self.proxy) if self.proxy else httpx.AsyncClient()
-                self.client = AsyncOpenAI(api_key=self.api_key, http_client=http_client)
-                self.is_configured = True
+                self._client = AsyncOpenAI(api_key=self.api_key, http_client=http_client)
                 logger.info(f"OpenAI клиент инициализирован. Модель: {self.model}")
             except Exception as e:
                 logger.error(f"Ошибка инициализации OpenAI клиента: {e}")
                 self.is_configured = False
-                self.client = None
-        else:
-            if not self.api_key:
-                logger.warning("OpenAI API ключ не найден в переменных окружения")
-            self.is_configured = False
+        return self._client
     
     def has_api_key(self) -> bool:
         """Проверяет наличие API ключа"""
@@ -105,11 +122,11 @@ class OpenAIAssistant:
     
     async def close(self):
         """Корректно закрывает клиент OpenAI"""
-        if self.client and not self._client_closed:
+        if self._client and not self._client_closed:
             try:
                 # Проверяем, есть ли у клиента метод aclose
-                if hasattr(self.client, 'aclose'):
-                    await self.client.aclose()
+                if hasattr(self._client, 'aclose'):
+                    await self._client.aclose()
                 self._client_closed = True
                 logger.info("OpenAI клиент закрыт")
             except AttributeError:
@@ -119,6 +136,29 @@ class OpenAIAssistant:
                 logger.error(f"Ошибка при закрытии OpenAI клиента: {e}")
                 self._client_closed = True
     
+    async def _create_completion(self, operation: str, **params):
+        """
+        Запрос chat.completions с учетом метрик (время, токены, ошибки)
+        
+        Args:
+            operation: Метка операции для метрик
+            **params: Параметры chat.completions.create
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(**params)
+        except Exception as e:
+            OPENAI_ERRORS.inc(operation=operation, error=type(e).__name__)
+            raise
+        finally:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            OPENAI_TOKENS.inc(getattr(usage, 'prompt_tokens', 0) or 0, operation=operation, kind="prompt")
+            OPENAI_TOKENS.inc(getattr(usage, 'completion_tokens', 0) or 0, operation=operation, kind="completion")
+        return response
+    
     async def get_chat_response(
         self, 
         user_message: str, 
@@ -184,7 +224,8 @@ class OpenAIAssistant:
                 return None, 0
                 
             # Используем новый клиент
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                "chat",
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
@@ -344,7 +385,7 @@ Return ONLY the JSON object."""
                     logger.warning(f"response_format не поддерживается: {e}")
             
             # Делаем запрос
-            response = await self.client.chat.completions.create(**request_params)
+            response = await self._create_completion("json", **request_params)
             
             content = response.choices[0].message.content
             finish_reason = response.choices[0].finish_reason
@@ -395,7 +436,7 @@ Do not repeat previous days. Return only JSON, no other text."""
                         if response_format_applied:
                             continuation_params["response_format"] = {"type": "json_object"}
                         
-                        continuation_response = await self.client.chat.completions.create(**continuation_params)
+                        continuation_response = await self._create_completion("json_continuation", **continuation_params)
                         continuation_content = continuation_response.choices[0].message.content
                         tokens_used += continuation_response.usage.total_tokens if hasattr(continuation_response, 'usage') else 0
                         
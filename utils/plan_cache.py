@@ -0,0 +1,91 @@
+"""
+Кэш разобранных планов ИИ-ассистента.
+
+Сборка PlanData занимает время, пропорциональное размеру плана, поэтому
+разобранный план хранится по ключу пользователя вместе с версией. Версия
+берется из метки updated_at плана, и запись с другой версией не выдается.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Optional, Tuple
+
+from utils.lazy_import import lazy_module
+
+if TYPE_CHECKING:
+    from models.ai_profile import PlanData
+
+ai_profile = lazy_module('models.ai_profile')
+
+DEFAULT_MAX_SIZE = 1024
+
+
+def plan_version(plan_data: Dict[str, Any]) -> Tuple:
+    """Дешевая версия плана: метки времени и число задач"""
+    return (
+        str(plan_data.get('created_at')),
+        str(plan_data.get('updated_at')),
+        plan_data.get('tasks_count', len(plan_data.get('days') or ())),
+    )
+
+
+class PlanCache:
+    """LRU-кэш PlanData по ключу пользователя"""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            max_size: Максимум планов в кэше
+        """
+        self.max_size = max_size
+        self._items: "OrderedDict[Hashable, Tuple[Tuple, PlanData]]" = OrderedDict()
+
+    def get(self, key: Hashable, version: Tuple) -> Optional[PlanData]:
+        """Возвращает план, если в кэше есть запись той же версии"""
+        item = self._items.get(key)
+        if item is None or item[0] != version:
+            return None
+        self._items.move_to_end(key)
+        return item[1]
+
+    def peek(self, key: Hashable) -> Optional[Tuple[Tuple, PlanData]]:
+        """Возвращает (версия, план) без проверки версии или None"""
+        return self._items.get(key)
+
+    def put(self, key: Hashable, version: Tuple, plan: PlanData):
+        """Сохраняет план"""
+        self._items[key] = (version, plan)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, user_id: Any):
+        """Удаляет все записи пользователя (ключ - ID или кортеж с ID первым)"""
+        for key in [k for k in self._items if k == user_id or (isinstance(k, tuple) and k[0] == user_id)]:
+            del self._items[key]
+
+    def get_or_parse(self, key: Hashable, plan_data: Dict[str, Any]) -> PlanData:
+        """
+        Возвращает разобранный план из кэша или собирает его
+
+        Args:
+            key: Ключ кэша, например (telegram_id, 'preview')
+            plan_data: План в виде словаря (из FSM или хранилища), в том
+                числе в компактной форме PlanData.to_compact
+
+        Returns:
+            PlanData
+        """
+        version = plan_version(plan_data)
+        plan = self.get(key, version)
+        if plan is None:
+            if ai_profile.PlanData.is_compact(plan_data):
+                plan = ai_profile.PlanData.from_compact(plan_data)
+            else:
+                plan = ai_profile.construct_trusted(ai_profile.PlanData, plan_data)
+            self.put(key, version, plan)
+        return plan
+
+
+# Глобальный кэш планов
+plan_cache = PlanCache()
@@ -28,8 +28,6 @@ from models.ai_profile import (
 from utils.openai_api import OpenAIAssistant
 
 logger = logging.getLogger(__name__)
-# Устанавливаем уровень логирования для диагностики
-logger.setLevel(logging.DEBUG)
 
 
 def calculate_horizon_days(
@@ -1432,7 +1430,7 @@ if __name__ == "__main__":
             print("-" * 40)
             
             for day_num in range(1, 4):
-                day_tasks = [task for task in plan.days if task.day_number == day_num]
+                day_tasks = plan.tasks_for_day(day_num)
                 if day_tasks:
                     print(f"\nДень {day_num}:")
                     for task in day_tasks:
@@ -1455,7 +1453,7 @@ if __name__ == "__main__":
             
             # Проверяем daily_minutes
             for day_num in range(1, 8):
-                day_tasks = [task for task in plan.days if task.day_number == day_num]
+                day_tasks = plan.tasks_for_day(day_num)
                 total_minutes = sum(task.duration_minutes for task in day_tasks)
                 print(f"День {day_num}: {total_minutes} минут (лимит: {test_constraints['daily_minutes']})")
                 
@@ -0,0 +1,65 @@
+"""
+Ограничение скорости операций (token bucket)
+
+Общий для отправки сообщений Telegram и фоновых чтений Firestore
+(выгрузка аналитики): операции ждут свободные токены, запас
+пополняется со скоростью rate в секунду.
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Ограничитель скорости (token bucket), общий для всех потребителей"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Args:
+            rate: Разрешенных операций в секунду
+            burst: Максимальный запас токенов (по умолчанию rate)
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        # До какого момента (monotonic) действует текущая пауза
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens: float = 1):
+        """
+        Ждет свободные токены
+
+        Args:
+            tokens: Сколько операций выполняется (например, документов на
+                странице). Запрос больше запаса ждет полного запаса и уводит
+                его в минус, так что средняя скорость все равно равна rate
+        """
+        async with self._lock:
+            needed = min(tokens, self.capacity)
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+
+    async def pause(self, seconds: float):
+        """
+        Останавливает все операции (например, ответ RetryAfter от Telegram)
+
+        Пока пауза идет, повторные вызовы сразу возвращаются: RetryAfter
+        обычно получают все отправители разом, и пауза не должна
+        повторяться N раз подряд. Вызвавшие все равно ждут ее конца в acquire.
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return
+        self._paused_until = now + seconds
+        async with self._lock:
+            await asyncio.sleep(seconds)
+            self._tokens = 0
+            self._updated = time.monotonic()
@@ -0,0 +1,115 @@
+"""
+Рендеринг сообщений по скомпилированным шаблонам
+
+Шаблон в синтаксисе str.format проверяется один раз при создании, а
+подстановка выполняется встроенным str.format. Строковые значения
+экранируются для parse_mode=HTML, кроме Markup (готовый HTML, например
+вложенный блок). Длинные сообщения собираются через список и join.
+"""
+import html
+from datetime import date, datetime
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Iterable, Mapping, Optional
+
+_formatter = Formatter()
+
+
+class Markup(str):
+    """Готовый HTML: не экранируется при подстановке в шаблон"""
+
+
+def escape(value: Any) -> Markup:
+    """Экранирует значение для parse_mode=HTML"""
+    if isinstance(value, Markup):
+        return value
+    return Markup(html.escape(str(value), quote=False))
+
+
+# Типы, которые подставляются как есть: их текст не содержит HTML-разметки,
+# а спецификация формата ({:%d.%m}, {:.1f}) применяется к исходному значению
+_PLAIN_TYPES = (int, float, date, datetime, type(None))
+
+
+def _prepare(value: Any) -> Any:
+    """Готовит значение к подстановке: экранирует строки и прочие объекты"""
+    if isinstance(value, Markup) or isinstance(value, _PLAIN_TYPES):
+        return value
+    if isinstance(value, str):
+        return html.escape(value, quote=False)
+    if isinstance(value, Mapping):
+        return {key: _prepare(item) for key, item in value.items()}
+    return html.escape(str(value), quote=False)
+
+
+class Template:
+    """Скомпилированный шаблон сообщения"""
+
+    __slots__ = ("source", "_format", "_cached")
+
+    def __init__(self, source: str, cache_size: int = 0):
+        """
+        Args:
+            source: Текст шаблона с полями {name}, {name:spec}, {name[key]} или {}
+            cache_size: Размер LRU-кэша готовых строк (0 - без кэша). Полезно
+                для строк списков, которые повторяются между показами
+        """
+        # Проверяем синтаксис сразу, чтобы ошибка была при импорте, а не при показе
+        list(_formatter.parse(source))
+        self.source = source
+        self._format = source.format
+        self._cached = lru_cache(maxsize=cache_size)(self._render) if cache_size else None
+
+    def render(self, *args: Any, **values: Any) -> Markup:
+        """
+        Подставляет значения в шаблон
+
+        Args:
+            *args: Позиционные значения для полей {} / {0}
+            **values: Именованные значения
+
+        Returns:
+            Markup с готовым HTML
+        """
+        if self._cached is not None:
+            try:
+                return self._cached(*args, **values)
+            except TypeError:
+                pass  # нехешируемые значения - рендерим без кэша
+        return self._render(*args, **values)
+
+    def _render(self, *args: Any, **values: Any) -> Markup:
+        if values:
+            values = {key: _prepare(value) for key, value in values.items()}
+        return Markup(self._format(*[_prepare(arg) for arg in args], **values))
+
+    def render_each(self, rows: Iterable[Mapping[str, Any]]) -> Markup:
+        """Рендерит шаблон для каждой строки данных и склеивает результат"""
+        return Markup("".join([self.render(**row) for row in rows]))
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+@lru_cache(maxsize=None)
+def template(source: str) -> Template:
+    """Компилирует шаблон один раз на процесс"""
+    return Template(source)
+
+
+def render(source: str, *args: Any, **values: Any) -> Markup:
+    """Рендерит текст шаблона (компиляция кэшируется)"""
+    return template(source).render(*args, **values)
+
+
+def join(parts: Iterable[Optional[str]], separator: str = "") -> Markup:
+    """Склеивает готовые блоки, пропуская пустые"""
+    return Markup(separator.join([part for part in parts if part]))
+
+
+def cached_block(maxsize: Optional[int] = 256):
+    """
+    Кэширует полностью отрендеренный блок, который редко меняется
+    (каталог достижений, справка). Аргументы функции - ключ кэша.
+    """
+    return lru_cache(maxsize=maxsize)
@@ -0,0 +1,174 @@
+"""
+Расчет серий (streak) с учетом часового пояса пользователя.
+
+Единая логика для привычек, чек-листа и фокус-сессий. Все функции чистые:
+не обращаются к БД и не зависят от часового пояса сервера. Границы дня
+определяются по смещению пользователя относительно UTC (в минутах).
+"""
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple, Union
+
+# Смещение по умолчанию для пользователей без сохраненного часового пояса
+DEFAULT_TZ_OFFSET_MINUTES = int(os.getenv('DEFAULT_TZ_OFFSET_MINUTES', '0'))
+
+# Поле документа пользователя со смещением часового пояса
+TZ_OFFSET_FIELD = 'tz_offset_minutes'
+
+
+class StreakUpdate(NamedTuple):
+    """Результат инкрементального обновления серии"""
+    current_streak: int
+    best_streak: int
+    counted: bool  # False если день уже был засчитан
+
+
+def get_tz_offset(user_data: Optional[Dict[str, Any]]) -> int:
+    """Возвращает смещение часового пояса пользователя в минутах"""
+    if user_data:
+        offset = user_data.get(TZ_OFFSET_FIELD)
+        if isinstance(offset, int):
+            return offset
+    return DEFAULT_TZ_OFFSET_MINUTES
+
+
+def local_date(moment: Any, tz_offset_minutes: Optional[int] = None) -> Optional[date]:
+    """
+    Переводит момент времени в локальную дату пользователя.
+
+    Наивные datetime считаются UTC (так их пишет datetime.utcnow()).
+    Объекты date возвращаются как есть.
+    """
+    if moment is None:
+        return None
+    if not isinstance(moment, datetime):
+        return moment if isinstance(moment, date) else None
+
+    if tz_offset_minutes is None:
+        tz_offset_minutes = DEFAULT_TZ_OFFSET_MINUTES
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone(timedelta(minutes=tz_offset_minutes))).date()
+
+
+def today_local(tz_offset_minutes: Optional[int] = None) -> date:
+    """Текущая дата в часовом поясе пользователя"""
+    return local_date(datetime.now(timezone.utc), tz_offset_minutes)
+
+
+def day_start_utc(day: date, tz_offset_minutes: Optional[int] = None) -> datetime:
+    """Начало локального дня пользователя в UTC"""
+    if tz_offset_minutes is None:
+        tz_offset_minutes = DEFAULT_TZ_OFFSET_MINUTES
+    local_midnight = datetime.combine(day, time.min, tzinfo=timezone(timedelta(minutes=tz_offset_minutes)))
+    return local_midnight.astimezone(timezone.utc)
+
+
+def advance_streak(
+    last_day: Optional[date],
+    current_streak: int,
+    best_streak: int,
+    day: date
+) -> StreakUpdate:
+    """
+    Инкрементально обновляет серию при выполнении в день day.
+
+    Args:
+        last_day: Локальная дата предыдущего выполнения
+        current_streak: Текущая серия
+        best_streak: Лучшая серия
+        day: Локальная дата нового выполнения
+
+    Returns:
+        StreakUpdate с новыми значениями
+    """
+    if last_day is None:
+        current = 1
+    else:
+        days_diff = (day - last_day).days
+        if days_diff <= 0:
+            # Этот день уже засчитан
+            return StreakUpdate(current_streak, max(current_streak, best_streak), False)
+        current = current_streak + 1 if days_diff == 1 else 1
+
+    return StreakUpdate(current, max(current, best_streak), True)
+
+
+def active_streak(last_day: Optional[date], current_streak: int, today: date) -> int:
+    """
+    Серия на сегодня: сохраненное значение, если ее еще можно продолжить
+
+    Args:
+        last_day: Локальная дата последнего выполнения
+        current_streak: Сохраненная серия
+        today: Локальная дата пользователя
+
+    Returns:
+        current_streak, если последнее выполнение было сегодня или вчера, иначе 0
+    """
+    if last_day is None or (today - last_day).days > 1:
+        return 0
+    return current_streak
+
+
+def compute_streaks(days: Iterable[date], today: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Считает серии по набору дат выполнения.
+
+    Args:
+        days: Локальные даты выполнения (в любом порядке, с повторами)
+        today: Если передано, серия, прерванная до вчерашнего дня, обнуляется
+
+    Returns:
+        (current_streak, best_streak)
+    """
+    result = compute_streaks_batch(((None, day) for day in days), today)
+    return result.get(None, (0, 0))
+
+
+def compute_streaks_batch(
+    entries: Iterable[Tuple[Hashable, date]],
+    today: Union[date, Callable[[Hashable], date], None] = None
+) -> Dict[Hashable, Tuple[int, int]]:
+    """
+    Пересчитывает серии сразу для многих ключей за один проход.
+
+    Args:
+        entries: Пары (ключ, локальная дата выполнения), ключ - например
+            путь привычки или ID пользователя
+        today: Если передано, прерванные серии обнуляются. Может быть
+            функцией ключ -> дата, если у ключей разные часовые пояса
+
+    Returns:
+        Словарь ключ -> (current_streak, best_streak)
+    """
+    # Даты переводим в порядковые номера и сортируем один раз
+    ordinals = sorted({(key, day.toordinal()) for key, day in entries if day is not None},
+                      key=lambda item: (str(item[0]), item[1]))
+
+    results: Dict[Hashable, Tuple[int, int]] = {}
+    prev_key = object()
+    prev_ordinal = 0
+    run = best = 0
+
+    def flush(key, last_ordinal):
+        current = run
+        key_today = today(key) if callable(today) else today
+        if key_today is not None and key_today.toordinal() - last_ordinal > 1:
+            current = 0
+        results[key] = (current, best)
+
+    for key, ordinal in ordinals:
+        if key != prev_key:
+            if run:
+                flush(prev_key, prev_ordinal)
+            prev_key, run, best = key, 1, 1
+        else:
+            run = run + 1 if ordinal - prev_ordinal == 1 else 1
+            best = max(best, run)
+        prev_ordinal = ordinal
+
+    if run:
+        flush(prev_key, prev_ordinal)
+
+    return results